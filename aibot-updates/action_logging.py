@@ -0,0 +1,159 @@
+# actions/action_logging.py
+"""
+Action Logging
+Subsystem loggers for the action server, replacing print() on hot paths.
+
+1. Per-subsystem levels from ACTION_LOG_LEVELS ("store=DEBUG,cart=WARNING"),
+   default ACTION_LOG_LEVEL (INFO). Names are relative to the actions
+   package, so helper modules can be tuned too ("cart_cache=DEBUG")
+2. Lazy payloads: pass LazyJson(obj) as a %s argument - it is only
+   serialized if the record is actually emitted
+3. Per-sender debug sampling: DEBUG records of INFO-level subsystems are
+   still emitted for ACTION_DEBUG_SENDERS and for a stable
+   ACTION_DEBUG_SAMPLE_RATE fraction of senders (whole conversations)
+4. ACTION_LOG_FORMAT=json writes one JSON object per line, with the
+   action, sender_id and trace_id attached
+
+Usage:
+    store_log = get_logger("store")
+    store_log.debug("[STORE PRODUCTS] Parsed JSON: %s", LazyJson(data, limit=1000))
+"""
+import json
+import logging
+import os
+import sys
+import zlib
+from typing import Any, Dict, Optional
+
+from actions.action_metrics import current_action
+from actions.turn_tracing import current_trace_id
+
+DEFAULT_LEVEL = logging.getLevelName(os.getenv("ACTION_LOG_LEVEL", "INFO").upper())
+
+# "store=DEBUG,cart=WARNING"
+SUBSYSTEM_LEVELS: Dict[str, int] = {}
+for _entry in os.getenv("ACTION_LOG_LEVELS", "").split(","):
+    _name, _, _level = _entry.partition("=")
+    if _name.strip() and _level.strip():
+        SUBSYSTEM_LEVELS[_name.strip()] = logging.getLevelName(_level.strip().upper())
+
+DEBUG_SAMPLE_RATE = float(os.getenv("ACTION_DEBUG_SAMPLE_RATE", "0"))
+DEBUG_SENDERS = {s.strip() for s in os.getenv("ACTION_DEBUG_SENDERS", "").split(",") if s.strip()}
+
+LOG_FORMAT = os.getenv("ACTION_LOG_FORMAT", "text").lower()
+
+# Payload previews are cut here unless LazyJson(limit=...) says otherwise
+DEFAULT_PAYLOAD_LIMIT = 2000
+
+ROOT_LOGGER = "actions"
+
+
+# ============================================
+# LAZY PAYLOADS
+# ============================================
+
+class LazyJson:
+    """JSON dump of obj, computed only when the log record is formatted"""
+    __slots__ = ("obj", "limit")
+
+    def __init__(self, obj: Any, limit: Optional[int] = DEFAULT_PAYLOAD_LIMIT):
+        self.obj = obj
+        self.limit = limit
+
+    def __str__(self) -> str:
+        try:
+            text = json.dumps(self.obj, default=str, ensure_ascii=False)
+        except (TypeError, ValueError):
+            text = repr(self.obj)
+        if self.limit and len(text) > self.limit:
+            return f"{text[:self.limit]}... ({len(text)} chars)"
+        return text
+
+
+# ============================================
+# SAMPLING
+# ============================================
+
+def sender_sampled(sender_id: str) -> bool:
+    """True if DEBUG output is sampled for this sender (stable per sender)"""
+    if not sender_id:
+        return False
+    if sender_id in DEBUG_SENDERS:
+        return True
+    return DEBUG_SAMPLE_RATE > 0 and (zlib.crc32(sender_id.encode("utf-8")) % 10000) < DEBUG_SAMPLE_RATE * 10000
+
+
+def _sampling_enabled() -> bool:
+    return DEBUG_SAMPLE_RATE > 0 or bool(DEBUG_SENDERS)
+
+
+class _SampledDebugFilter(logging.Filter):
+    """Pass records at/above the subsystem level; below it only for sampled senders"""
+
+    def __init__(self, level: int):
+        super().__init__()
+        self.level = level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= self.level or sender_sampled(current_action()[1])
+
+
+class _ContextFilter(logging.Filter):
+    """Attach the running action, sender_id and trace_id to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.action, record.sender_id = current_action()
+        record.trace_id = current_trace_id()
+        return True
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "action": getattr(record, "action", ""),
+            "sender_id": getattr(record, "sender_id", ""),
+            "trace_id": getattr(record, "trace_id", ""),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+# ============================================
+# LOGGERS
+# ============================================
+
+def _configure(logger: logging.Logger, level: int):
+    if level > logging.DEBUG and _sampling_enabled():
+        # Let DEBUG records be created; the filter keeps only sampled senders
+        logger.setLevel(logging.DEBUG)
+        if not any(isinstance(f, _SampledDebugFilter) for f in logger.filters):
+            logger.addFilter(_SampledDebugFilter(level))
+    else:
+        logger.setLevel(level)
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """Logger "actions.<subsystem>" with its configured level and sampling"""
+    logger = logging.getLogger(f"{ROOT_LOGGER}.{subsystem}")
+    _configure(logger, SUBSYSTEM_LEVELS.get(subsystem, DEFAULT_LEVEL))
+    return logger
+
+
+def configure_logging():
+    """Apply ACTION_LOG_LEVELS to helper modules and set up JSON output (idempotent)"""
+    for name, level in SUBSYSTEM_LEVELS.items():
+        _configure(logging.getLogger(f"{ROOT_LOGGER}.{name}"), level)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    if LOG_FORMAT == "json" and not any(getattr(h, "_action_logging", False) for h in root.handlers):
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(_JsonFormatter())
+        handler.addFilter(_ContextFilter())
+        handler._action_logging = True
+        root.addHandler(handler)
+        root.propagate = False
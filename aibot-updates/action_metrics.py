@@ -0,0 +1,482 @@
+# actions/action_metrics.py
+"""
+Action Metrics
+Latency of every Action.run and of the HTTP calls made while it runs,
+served as Prometheus text from the action server process.
+
+1. instrument_actions() wraps run() of every Action subclass in the
+   actions package: wall time per action, channel and tenant (store_id)
+2. install_http_hooks() times every requests / httpx call (Laravel API,
+   Stripe, Meta Graph, OpenAI) per service and endpoint, and charges the
+   time to the action that made it
+   (both also emit turn_tracing spans when tracing is configured).
+   httpx is never imported here: it is hooked once the OpenAI SDK loaded it
+3. start_metrics_server() serves GET /metrics on ACTION_METRICS_PORT, or
+   on one of the next ACTION_METRICS_PORT_TRIES - 1 ports if that one is
+   taken (one per action server process on the host)
+
+Histograms use fixed buckets, so p50 / p95 / p99 per action or per seller
+come from histogram_quantile() in Prometheus.
+
+When circuit_breaker rejected a backend call during an action and the
+action ends without replying (or raises), the wrapper sends
+BACKEND_UNAVAILABLE_MESSAGE instead of leaving the customer waiting.
+"""
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from actions.turn_tracing import TRACING_ENABLED, parent_from_metadata, record_span, span
+
+logger = logging.getLogger(__name__)
+
+# Port for GET /metrics ("0" disables the server)
+METRICS_PORT = int(os.getenv("ACTION_METRICS_PORT", "9102"))
+# Ports tried from METRICS_PORT on, so each process on the host exports its own metrics
+METRICS_PORT_TRIES = int(os.getenv("ACTION_METRICS_PORT_TRIES", "8"))
+
+# Reply for actions cut short by an open circuit breaker
+BACKEND_UNAVAILABLE_MESSAGE = os.getenv(
+    "BACKEND_UNAVAILABLE_MESSAGE",
+    "Sorry, we're having trouble reaching the store right now. Please try again in a minute.",
+)
+
+SELLER_API_HOST = urlsplit(os.getenv("SELLER_API_URL", "https://stageshipperapi.thedelivio.com/api")).hostname
+
+# Bucket upper bounds (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# host -> service label
+_SERVICES = {
+    "api.stripe.com": "stripe",
+    "api.openai.com": "llm",
+    "graph.facebook.com": "whatsapp",
+}
+
+# Path segments that are IDs, not endpoint names (numbers, Stripe ids, hashes)
+_ID_SEGMENT = re.compile(r"^(\d+|[a-z]{2,5}_[A-Za-z0-9_]{6,}|[0-9a-fA-F-]{16,})$")
+
+# The action currently running in this context (see _ActionRecord)
+_current_action: contextvars.ContextVar = contextvars.ContextVar("current_action", default=None)
+
+
+# ============================================
+# HISTOGRAMS / COUNTERS
+# ============================================
+
+class _Histogram:
+    """Prometheus histogram keyed by label values"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # counts per bucket + [sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            base = _labels(self.labels, label_values)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class _Counter:
+    """Prometheus counter keyed by label values"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...]):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float, *label_values: str):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {value:g}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class _Gauge(_Counter):
+    """Prometheus gauge keyed by label values"""
+
+    def set(self, value: float, *label_values: str):
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+
+
+ACTION_DURATION = _Histogram(
+    "rasa_action_duration_seconds", "Wall time of Action.run", ("action", "channel", "tenant"))
+ACTION_EXCEPTIONS = _Counter(
+    "rasa_action_exceptions_total", "Action.run calls that raised", ("action", "channel", "tenant"))
+ACTION_BACKEND_CALLS = _Counter(
+    "rasa_action_backend_calls_total", "HTTP calls made during an action", ("action", "service"))
+ACTION_BACKEND_SECONDS = _Counter(
+    "rasa_action_backend_seconds_total", "Time spent in HTTP calls during an action", ("action", "service"))
+BACKEND_DURATION = _Histogram(
+    "rasa_backend_request_duration_seconds", "HTTP call latency", ("service", "endpoint"))
+BACKEND_REQUESTS = _Counter(
+    "rasa_backend_requests_total", "HTTP calls by response status", ("service", "endpoint", "status"))
+
+_METRICS = [ACTION_DURATION, ACTION_EXCEPTIONS, ACTION_BACKEND_CALLS, ACTION_BACKEND_SECONDS,
+            BACKEND_DURATION, BACKEND_REQUESTS]
+
+
+def register_metric(metric):
+    """Serve a metric defined in another module (e.g. circuit_breaker) on /metrics"""
+    if metric not in _METRICS:
+        _METRICS.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def clear_metrics():
+    """Reset all metrics"""
+    for metric in _METRICS:
+        metric.clear()
+    logger.info("[ACTION METRICS] Metrics cleared")
+
+
+# ============================================
+# ACTION INSTRUMENTATION
+# ============================================
+
+class _ActionRecord:
+    """Per-run accumulator for HTTP time, shared with worker threads via in_action_context()"""
+    __slots__ = ("action", "sender_id", "lock", "backend", "rejected")
+
+    def __init__(self, action: str, sender_id: str = ""):
+        self.action = action
+        self.sender_id = sender_id
+        self.lock = threading.Lock()
+        self.backend: Dict[str, List[float]] = {}  # service -> [calls, seconds]
+        self.rejected = 0  # calls fast-failed by an open circuit breaker
+
+    def add_backend(self, service: str, seconds: float):
+        with self.lock:
+            entry = self.backend.setdefault(service, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+
+def note_circuit_rejection():
+    """Mark the running action as cut short by an open circuit breaker"""
+    record = _current_action.get()
+    if record is not None:
+        with record.lock:
+            record.rejected += 1
+
+
+def current_action() -> Tuple[str, str]:
+    """(action name, sender_id) of the action running in this context, or ("", "")"""
+    record = _current_action.get()
+    return (record.action, record.sender_id) if record is not None else ("", "")
+
+
+def _action_labels(action: Any, tracker: Any) -> Tuple[str, str, str]:
+    try:
+        name = action.name()
+    except Exception:
+        name = type(action).__name__
+    channel, tenant = "unknown", "none"
+    try:
+        channel = tracker.get_latest_input_channel() or "unknown"
+        tenant = str(tracker.get_slot("store_id") or "none")
+    except Exception:
+        pass
+    return name, channel, tenant
+
+
+def _finish(record: _ActionRecord, labels: Tuple[str, str, str], start: float, failed: bool):
+    ACTION_DURATION.observe(time.perf_counter() - start, *labels)
+    if failed:
+        ACTION_EXCEPTIONS.inc(1, *labels)
+    with record.lock:
+        backend = dict(record.backend)
+    for service, (calls, seconds) in backend.items():
+        ACTION_BACKEND_CALLS.inc(calls, labels[0], service)
+        ACTION_BACKEND_SECONDS.inc(seconds, labels[0], service)
+
+
+def _action_span(labels: Tuple[str, str, str], tracker: Any):
+    """Span for one action, continuing the trace the connector put in the message metadata"""
+    try:
+        metadata = (tracker.latest_message or {}).get("metadata")
+    except Exception:
+        metadata = None
+    return span(
+        f"action {labels[0]}",
+        {"action": labels[0], "channel": labels[1], "tenant": labels[2]},
+        parent=parent_from_metadata(metadata),
+    )
+
+
+def _unavailable_reply(record: _ActionRecord, labels: Tuple[str, str, str], dispatcher: Any):
+    """Tell the customer to retry if a breaker cut the action short and it said nothing"""
+    if not record.rejected or getattr(dispatcher, "messages", None):
+        return
+    logger.warning(f"[ACTION METRICS] {labels[0]}: {record.rejected} backend call(s) rejected by open circuit, "
+                   f"sending unavailable reply")
+    dispatcher.utter_message(text=BACKEND_UNAVAILABLE_MESSAGE)
+
+
+def _wrap_run(run: Callable) -> Callable:
+    if inspect.iscoroutinefunction(run):
+        @functools.wraps(run)
+        async def async_timed_run(self, dispatcher, tracker, domain, *args, **kwargs):
+            if _current_action.get() is not None:  # called from another action - counted there
+                return await run(self, dispatcher, tracker, domain, *args, **kwargs)
+            labels = _action_labels(self, tracker)
+            record = _ActionRecord(labels[0], str(getattr(tracker, "sender_id", "") or ""))
+            token = _current_action.set(record)
+            start, failed = time.perf_counter(), True
+            try:
+                with _action_span(labels, tracker):
+                    result = await run(self, dispatcher, tracker, domain, *args, **kwargs)
+                failed = False
+            except Exception:
+                if not record.rejected:
+                    raise
+                result = []  # backend outage - answer below instead of erroring the turn
+            finally:
+                _current_action.reset(token)
+                _finish(record, labels, start, failed)
+            _unavailable_reply(record, labels, dispatcher)
+            return result
+        async_timed_run._action_metrics = True
+        return async_timed_run
+
+    @functools.wraps(run)
+    def timed_run(self, dispatcher, tracker, domain, *args, **kwargs):
+        if _current_action.get() is not None:  # called from another action - counted there
+            return run(self, dispatcher, tracker, domain, *args, **kwargs)
+        labels = _action_labels(self, tracker)
+        record = _ActionRecord(labels[0], str(getattr(tracker, "sender_id", "") or ""))
+        token = _current_action.set(record)
+        start, failed = time.perf_counter(), True
+        try:
+            with _action_span(labels, tracker):
+                result = run(self, dispatcher, tracker, domain, *args, **kwargs)
+            failed = False
+        except Exception:
+            if not record.rejected:
+                raise
+            result = []  # backend outage - answer below instead of erroring the turn
+        finally:
+            _current_action.reset(token)
+            _finish(record, labels, start, failed)
+        _unavailable_reply(record, labels, dispatcher)
+        return result
+    timed_run._action_metrics = True
+    return timed_run
+
+
+def instrument_actions(base: type, package: str = "actions") -> int:
+    """
+    Wrap run() of every subclass of base defined in package.
+
+    Returns:
+        number of classes instrumented
+    """
+    count = 0
+    seen = set()
+    pending = list(base.__subclasses__())
+    while pending:
+        cls = pending.pop()
+        if cls in seen:
+            continue
+        seen.add(cls)
+        pending.extend(cls.__subclasses__())
+        run = getattr(cls, "run", None)
+        if not cls.__module__.startswith(package) or run is None or getattr(run, "_action_metrics", False):
+            continue
+        cls.run = _wrap_run(run)
+        count += 1
+    logger.info(f"[ACTION METRICS] Instrumented {count} actions")
+    return count
+
+
+def in_action_context(fn: Callable) -> Callable:
+    """
+    Bind fn to the caller's context, so HTTP calls it makes from a thread
+    pool are still charged to the running action.
+    """
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def bound(*args, **kwargs):
+        # A Context can only be entered by one thread at a time - run in a copy
+        return ctx.copy().run(fn, *args, **kwargs)
+    return bound
+
+
+# ============================================
+# HTTP INSTRUMENTATION
+# ============================================
+
+def classify_url(url: str) -> Tuple[str, str]:
+    """URL -> (service, endpoint) labels with IDs stripped from the path"""
+    parts = urlsplit(str(url))
+    host = parts.hostname or ""
+    if host == SELLER_API_HOST:
+        service = "seller_api"
+    else:
+        service = _SERVICES.get(host, "other")
+    segments = [s for s in parts.path.split("/") if s]
+    if service == "seller_api" and segments[:1] == ["api"]:
+        segments = segments[1:]
+    endpoint = "/".join(":id" if _ID_SEGMENT.match(s) else s for s in segments) or "/"
+    if service == "other":
+        endpoint = f"{host}/{endpoint}"
+    return service, endpoint
+
+
+def record_backend_call(url: str, status: str, seconds: float):
+    """Record one HTTP call (also used for calls that bypass requests / httpx)"""
+    service, endpoint = classify_url(url)
+    BACKEND_DURATION.observe(seconds, service, endpoint)
+    BACKEND_REQUESTS.inc(1, service, endpoint, status)
+    record = _current_action.get()
+    if record is not None:
+        record.add_backend(service, seconds)
+
+
+def _timed_send(send: Callable) -> Callable:
+    @functools.wraps(send)
+    def timed_send(self, request, *args, **kwargs):
+        start, start_ns, status = time.perf_counter(), time.time_ns(), "error"
+        try:
+            response = send(self, request, *args, **kwargs)
+            status = str(getattr(response, "status_code", "unknown"))
+            return response
+        finally:
+            url = str(request.url)
+            record_backend_call(url, status, time.perf_counter() - start)
+            if TRACING_ENABLED:
+                service, endpoint = classify_url(url)
+                record_span(
+                    f"{getattr(request, 'method', 'HTTP')} {service} {endpoint}", start_ns, time.time_ns(),
+                    {"service": service, "endpoint": endpoint, "http.status": status},
+                    error=None if status.isdigit() and int(status) < 500 else status,
+                )
+    timed_send._action_metrics = True
+    return timed_send
+
+
+def install_http_hooks():
+    """
+    Time requests.Session.send, and httpx.Client.send if httpx is loaded
+    (idempotent). httpx only comes with the OpenAI SDK, so it is not
+    imported here; domains/common.openai_client() calls this again once it is.
+    """
+    try:
+        import requests
+        if not getattr(requests.Session.send, "_action_metrics", False):
+            requests.Session.send = _timed_send(requests.Session.send)
+    except ImportError:
+        pass
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and not getattr(httpx.Client.send, "_action_metrics", False):
+        httpx.Client.send = _timed_send(httpx.Client.send)
+
+
+# ============================================
+# /metrics SERVER
+# ============================================
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scraped every few seconds - keep it out of the action server log
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int = METRICS_PORT, tries: int = METRICS_PORT_TRIES) -> Optional[ThreadingHTTPServer]:
+    """Serve GET /metrics in a daemon thread; no-op if disabled or already running"""
+    global _server
+    if _server is not None or port <= 0:
+        return _server
+    for candidate in range(port, port + max(1, tries)):
+        try:
+            _server = ThreadingHTTPServer(("0.0.0.0", candidate), _MetricsHandler)
+            port = candidate
+            break
+        except OSError as e:
+            # e.g. another action server process on the same host - try the next port
+            logger.debug(f"[ACTION METRICS] Metrics port {candidate} unavailable: {e}")
+    if _server is None:
+        logger.warning(f"[ACTION METRICS] No free metrics port in {port}-{port + max(1, tries) - 1}, not serving /metrics")
+        return None
+    threading.Thread(target=_server.serve_forever, name="action-metrics", daemon=True).start()
+    logger.info(f"[ACTION METRICS] Serving /metrics on port {port}")
+    return _server
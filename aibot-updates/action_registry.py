@@ -0,0 +1,355 @@
+# actions/action_registry.py
+"""
+Action Registry
+Imports action code on first use instead of at action-server startup.
+
+1. Actions live in domain modules under actions/domains/ (account,
+   catalog, cart, checkout, wishlist, coupons, stores, fallback);
+   ACTION_DOMAINS maps each domain to its action names
+2. The action server registers one lightweight proxy per name, defined
+   here - startup imports neither the domains nor stripe / openai
+3. A proxy's first run imports its domain, instantiates every action in
+   it and delegates; later runs go straight to the cached instance
+4. ACTION_PRELOAD ("all", or domains like "catalog,cart") imports domains
+   in a background thread after startup, so the first customer of a new
+   worker does not wait for the import
+5. Proxies are async: a synchronous action runs on a bounded thread pool
+   (ACTION_WORKERS) instead of blocking the action server's event loop,
+   so slow backend / LLM / Stripe calls of one customer no longer hold
+   up everyone else's turns
+6. Turns of one sender_id still run one at a time, in arrival order
+   (ACTION_SERIALIZE_SENDERS=0 turns that off)
+
+actions/domains/ has no __init__.py on purpose: rasa_sdk imports every
+regular submodule of the actions package when it registers actions, which
+would load all domains at startup. As a namespace directory it is skipped
+and only imported through get_action(). Should rasa_sdk still come across
+a domain class (ACTION_PRELOAD finishing before registration, auto-reload
+re-scanning the Action subclasses), install_registration_filter() keeps it
+from replacing the proxy of the same name.
+
+Actions that hand a turn to another action use get_action(name).run(...)
+(already on the pool thread, so they call the real action directly).
+Domain import times, busy workers and the wait before an action starts
+are exported on /metrics (rasa_action_domain_import_seconds,
+rasa_action_workers_busy, rasa_action_queue_seconds). The proxies are not
+timed; rasa_action_duration_seconds comes from the real action, measured
+once it runs on its worker.
+"""
+import asyncio
+import contextlib
+import functools
+import importlib
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Text
+
+from rasa_sdk import Action
+
+from actions.action_metrics import _Gauge, _Histogram, in_action_context, instrument_actions, register_metric
+
+logger = logging.getLogger(__name__)
+
+ACTION_PRELOAD = os.getenv("ACTION_PRELOAD", "").strip()
+
+# Threads running synchronous actions; turns beyond that queue for a free worker
+ACTION_WORKERS = int(os.getenv("ACTION_WORKERS", "16"))
+SERIALIZE_SENDERS = os.getenv("ACTION_SERIALIZE_SENDERS", "1") != "0"
+
+ACTION_DOMAINS: Dict[str, List[str]] = {
+    "account": [
+        "action_prompt_login",
+        "action_login_user",
+        "action_custom_greet",
+        "action_logout_user",
+        "action_restart",
+    ],
+    "catalog": [
+        "action_show_categories_with_products",
+        "action_search_products",
+        "action_select_product",
+        "action_product_llm_search",
+        "action_next_product_page",
+        "action_reset_search_page",
+        "action_show_store_products",
+    ],
+    "cart": [
+        "action_add_to_cart",
+        "action_view_cart",
+        "action_remove_from_cart",
+        "action_clear_cart",
+        "action_confirm_remove_item",
+        "action_confirm_clear_cart",
+        "action_update_cart_quantity",
+        "action_undo_cart_action",
+        "action_save_cart_for_later",
+        "action_handle_whatsapp_native_order",
+    ],
+    "checkout": [
+        "action_checkout",
+        "action_get_address",
+        "action_create_stripe_checkout",
+        "action_check_stripe_payment",
+        "action_handle_delivery_location",
+        "action_confirm_order_and_pay",
+        "action_prompt_share_location",
+        "action_prompt_type_address",
+        "action_process_typed_address",
+        "action_show_user_addresses",
+        "action_select_delivery_address",
+        "action_payment_confirmed",
+        "action_track_order",
+        "action_track_my_orders",
+    ],
+    "wishlist": [
+        "action_add_to_wishlist",
+        "action_view_wishlist",
+        "action_remove_from_wishlist",
+        "action_add_wishlist_to_cart",
+        "action_get_wishlist_count",
+        "action_clear_wishlist",
+        "action_handle_wishlist_item_selection",
+    ],
+    "coupons": [
+        "action_view_coupons",
+        "action_apply_coupon",
+        "action_remove_coupon",
+    ],
+    "stores": [
+        "action_change_zipcode",
+        "validate_zipcode_form",
+        "action_get_nearest_store",
+        "action_set_selected_store",
+        "action_recall_previous_location",
+        "action_show_store_options",
+        "action_change_store",
+        "action_change_zipcode_enhanced",
+        "action_detect_store_context",
+    ],
+    "fallback": [
+        "action_custom_fallback",
+        "action_general_ai_response",
+        "action_smart_fallback",
+        "action_smart_fallback_enhanced",
+        "action_confirm_and_execute",
+        "action_handle_deny",
+        "action_intelligent_response",
+    ],
+}
+
+DOMAIN_OF = {name: domain for domain, names in ACTION_DOMAINS.items() for name in names}
+
+DOMAIN_IMPORT_SECONDS = register_metric(_Gauge(
+    "rasa_action_domain_import_seconds", "Time taken to import an action domain", ("domain",)))
+ACTION_WORKERS_BUSY = register_metric(_Gauge(
+    "rasa_action_workers_busy", "Worker threads running a synchronous action", ()))
+ACTION_QUEUE_WAIT = register_metric(_Histogram(
+    "rasa_action_queue_seconds", "Wait before an action starts (earlier turn of the sender, free worker)", ("action",)))
+
+
+# ============================================
+# LOADING
+# ============================================
+
+_instances: Dict[str, Action] = {}
+_loaded: Dict[str, float] = {}  # domain -> import seconds
+_domain_locks = {domain: threading.Lock() for domain in ACTION_DOMAINS}
+
+
+def _domain_actions(module) -> List[Action]:
+    """One instance of every concrete Action class defined in module"""
+    return [
+        cls() for cls in vars(module).values()
+        if inspect.isclass(cls) and issubclass(cls, Action)
+        and cls.__module__ == module.__name__ and not inspect.isabstract(cls)
+    ]
+
+
+def load_domain(domain: str) -> float:
+    """
+    Import a domain module and cache its actions (no-op once loaded).
+
+    Returns:
+        seconds the import took
+    """
+    if domain in _loaded:
+        return _loaded[domain]
+    with _domain_locks[domain]:  # KeyError for unknown domains
+        if domain in _loaded:
+            return _loaded[domain]
+        start = time.perf_counter()
+        module = importlib.import_module(f"actions.domains.{domain}")
+        # The real actions are timed, not the proxies: rasa_action_duration_seconds starts on the worker
+        instrument_actions(Action)
+        actions = _domain_actions(module)
+        for action in actions:
+            _instances[action.name()] = action
+        seconds = _loaded[domain] = time.perf_counter() - start
+    DOMAIN_IMPORT_SECONDS.set(round(seconds, 4), domain)
+    logger.info(f"[ACTION REGISTRY] Loaded {domain} ({len(actions)} actions) in {seconds * 1000:.0f} ms")
+    return seconds
+
+
+def get_action(name: Text) -> Action:
+    """Action instance for name, importing its domain on first use"""
+    action = _instances.get(name)
+    if action is None:
+        domain = DOMAIN_OF.get(name)
+        if domain is None:
+            raise KeyError(f"Unknown action {name!r} (not in ACTION_DOMAINS)")
+        load_domain(domain)
+        action = _instances.get(name)
+        if action is None:
+            raise KeyError(f"{name!r} is not defined in actions.domains.{domain}")
+    return action
+
+
+def loaded_domains() -> Dict[str, float]:
+    """domain -> import seconds for every domain loaded so far"""
+    return dict(_loaded)
+
+
+def preload_domains(domains: Optional[List[str]] = None):
+    """Import domains now (all by default); errors are logged, not raised"""
+    for domain in domains or list(ACTION_DOMAINS):
+        try:
+            load_domain(domain)
+        except Exception as e:
+            logger.error(f"[ACTION REGISTRY] Preloading {domain} failed: {e}")
+
+
+def start_preload() -> Optional[threading.Thread]:
+    """Preload the ACTION_PRELOAD domains in a daemon thread (None if unset)"""
+    if not ACTION_PRELOAD:
+        return None
+    if ACTION_PRELOAD == "all":
+        domains = list(ACTION_DOMAINS)
+    else:
+        domains = [d.strip() for d in ACTION_PRELOAD.split(",") if d.strip()]
+        unknown = [d for d in domains if d not in ACTION_DOMAINS]
+        if unknown:
+            logger.warning(f"[ACTION REGISTRY] Ignoring unknown ACTION_PRELOAD domains: {', '.join(unknown)}")
+            domains = [d for d in domains if d in ACTION_DOMAINS]
+    thread = threading.Thread(target=preload_domains, args=(domains,), name="action-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def install_registration_filter():
+    """Keep rasa_sdk from registering domain classes over their proxies"""
+    try:
+        from rasa_sdk.executor import ActionExecutor
+    except ImportError:
+        return
+    register = getattr(ActionExecutor, "register_action", None)
+    if register is None or getattr(register, "_domain_filter", False):
+        return
+
+    @functools.wraps(register)
+    def register_action(self, action):
+        cls = action if inspect.isclass(action) else type(action)
+        if cls.__module__.startswith("actions.domains."):
+            # Registered as-is, a sync run would execute on the event loop, past the pool and sender order
+            logger.debug(f"[ACTION REGISTRY] Not registering {cls.__name__}, served by its proxy")
+            return
+        return register(self, action)
+    register_action._domain_filter = True
+    ActionExecutor.register_action = register_action
+
+
+def check_registry() -> List[str]:
+    """
+    Load every domain and compare what it defines with ACTION_DOMAINS.
+
+    Returns:
+        problems found (empty if the registry matches the code)
+    """
+    problems = []
+    for domain, names in ACTION_DOMAINS.items():
+        load_domain(domain)
+        defined = {action.name(): action for action in _domain_actions(sys.modules[f"actions.domains.{domain}"])}
+        for name in sorted(set(names) - set(defined)):
+            problems.append(f"{name}: listed under {domain} but not defined there")
+        for name in sorted(set(defined) - set(names)):
+            problems.append(f"{name}: defined in {domain} but missing from ACTION_DOMAINS[{domain!r}]")
+    return problems
+
+
+# ============================================
+# EXECUTION
+# ============================================
+
+_pool = ThreadPoolExecutor(max_workers=ACTION_WORKERS, thread_name_prefix="action")
+_sender_turns: Dict[str, List[Any]] = {}  # sender_id -> [asyncio.Lock, turns holding or waiting]
+
+
+@contextlib.asynccontextmanager
+async def sender_turn(sender_id: str):
+    """Hold sender_id's turn; its other turns wait here in arrival order"""
+    if not SERIALIZE_SENDERS or not sender_id:
+        yield
+        return
+    entry = _sender_turns.get(sender_id)
+    if entry is None:
+        entry = _sender_turns[sender_id] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _sender_turns[sender_id]
+
+
+def _pooled(run: Callable, name: str, queued_at: float, dispatcher, tracker, domain):
+    ACTION_QUEUE_WAIT.observe(time.perf_counter() - queued_at, name)
+    ACTION_WORKERS_BUSY.inc(1)
+    try:
+        return run(dispatcher, tracker, domain)
+    finally:
+        ACTION_WORKERS_BUSY.inc(-1)
+
+
+async def run_action(name: str, dispatcher, tracker, domain):
+    """Run an action for the server: one turn per sender at a time, sync actions on the worker pool"""
+    arrived = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    async with sender_turn(str(getattr(tracker, "sender_id", "") or "")):
+        action = _instances.get(name)
+        if action is None:  # first use - import the domain off the event loop
+            action = await loop.run_in_executor(_pool, get_action, name)
+        if inspect.iscoroutinefunction(action.run):
+            ACTION_QUEUE_WAIT.observe(time.perf_counter() - arrived, name)
+            return await action.run(dispatcher, tracker, domain)
+        # in_action_context: the action's metrics record and trace span follow it onto the worker
+        return await loop.run_in_executor(
+            _pool, in_action_context(_pooled), action.run, name, arrived, dispatcher, tracker, domain)
+
+
+# ============================================
+# PROXIES
+# ============================================
+
+def _proxy_class(name: str) -> type:
+    """Action subclass that registers name and delegates run() to the real action"""
+    async def run(self, dispatcher, tracker, domain):
+        return await run_action(name, dispatcher, tracker, domain)
+    run._action_metrics = True  # instrument_actions() skips it - the wait goes to rasa_action_queue_seconds only
+
+    class_name = "".join(part.title() for part in name.split("_")) + "Proxy"
+    return type(class_name, (Action,), {
+        "__module__": __name__,
+        "__doc__": f"Lazy proxy for {name} (actions.domains.{DOMAIN_OF[name]})",
+        "name": lambda self: name,
+        "run": run,
+    })
+
+
+# Registered by rasa_sdk like any other Action subclass
+PROXIES = {name: _proxy_class(name) for name in DOMAIN_OF}
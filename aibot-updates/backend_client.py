@@ -0,0 +1,299 @@
+# actions/backend_client.py
+"""
+Backend Client
+seller_post() for Laravel API calls whose latency is long-tailed
+(getMasterProducts, getCategories, cart-list).
+
+1. Rolling latency per endpoint (last LATENCY_WINDOW calls). Large reads
+   of PAGED_ENDPOINTS (items >= LARGE_READ_ITEMS, or no "items" at all =
+   the whole catalog) have their own window, so the p99 of small pages
+   does not cut them off
+2. Adaptive timeouts: p99 x ADAPTIVE_TIMEOUT_FACTOR, at least
+   ADAPTIVE_TIMEOUT_MIN and never more than the caller's timeout
+   (used as-is until LATENCY_MIN_SAMPLES calls were seen)
+3. Hedged reads: for idempotent reads in HEDGE_ENDPOINTS, a second
+   identical request goes out if the first has not answered after the
+   endpoint's p95; the first response wins, the loser is discarded.
+   Large reads are not hedged
+4. Hedge budget: each call earns HEDGE_BUDGET of a hedge (0.1 = at most
+   ~10% extra requests), so a slow backend is not hit twice as hard
+5. Single-flight: concurrent identical reads of SINGLE_FLIGHT_ENDPOINTS
+   (same endpoint and canonical JSON payload) share one in-flight call -
+   e.g. many customers of one dedicated store opening its catalog at once
+6. Calls that cannot be hedged (delay unknown, budget empty, large read)
+   run on the caller's thread. The hedge pool is only used while it has an
+   idle worker - never queued on; a hedged call needs the primary off the
+   caller's thread, or a faster hedge could not be returned
+
+Hedges are counted on /metrics (rasa_backend_hedges_total, by outcome),
+as are calls that joined an in-flight request (rasa_backend_coalesced_total);
+the current adaptive timeout per endpoint is exported as a gauge.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import requests
+
+from actions.action_metrics import _Counter, _Gauge, in_action_context, note_circuit_rejection, register_metric
+from actions.circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+API_BASE = os.getenv("SELLER_API_URL", "https://stageshipperapi.thedelivio.com/api")
+
+ADAPTIVE_TIMEOUTS_ENABLED = os.getenv("ADAPTIVE_TIMEOUTS", "1") != "0"
+ADAPTIVE_TIMEOUT_FACTOR = float(os.getenv("ADAPTIVE_TIMEOUT_FACTOR", "3"))
+ADAPTIVE_TIMEOUT_MIN = float(os.getenv("ADAPTIVE_TIMEOUT_MIN", "2"))  # seconds
+
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "200"))
+LATENCY_MIN_SAMPLES = int(os.getenv("LATENCY_MIN_SAMPLES", "20"))
+
+# Idempotent reads that may be sent twice ("" disables hedging)
+HEDGE_ENDPOINTS = {e.strip() for e in os.getenv("HEDGE_ENDPOINTS", "getMasterProducts,getCategories,cart-list").split(",") if e.strip()}
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.1"))  # hedges earned per call
+HEDGE_BUDGET_MAX = 10.0  # burst allowance (hedges)
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))  # seconds
+
+# Paged reads whose size decides their latency window
+PAGED_ENDPOINTS = {e.strip() for e in os.getenv("PAGED_ENDPOINTS", "getMasterProducts").split(",") if e.strip()}
+LARGE_READ_ITEMS = int(os.getenv("LARGE_READ_ITEMS", "50"))
+
+# Reads shared between concurrent identical calls. cart-list is left out on
+# purpose: it is per user and interleaves with that user's cart writes
+SINGLE_FLIGHT_ENDPOINTS = {e.strip() for e in os.getenv("SINGLE_FLIGHT_ENDPOINTS", "getMasterProducts,getCategories").split(",") if e.strip()}
+
+HEDGE_POOL_SIZE = int(os.getenv("HEDGE_POOL_SIZE", "32"))
+_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix="hedge")
+
+BACKEND_HEDGES = register_metric(_Counter(
+    "rasa_backend_hedges_total", "Hedged read requests by outcome (sent, won, lost, no_budget, pool_full)", ("endpoint", "outcome")))
+BACKEND_COALESCED = register_metric(_Counter(
+    "rasa_backend_coalesced_total", "Reads answered by an identical in-flight request", ("endpoint",)))
+ADAPTIVE_TIMEOUT = register_metric(_Gauge(
+    "rasa_backend_adaptive_timeout_seconds", "Current adaptive timeout per endpoint", ("endpoint",)))
+
+
+# ============================================
+# LATENCY WINDOW
+# ============================================
+
+_latencies: Dict[str, Deque[float]] = {}
+_hedge_tokens = HEDGE_BUDGET_MAX
+_pool_busy = 0
+_lock = threading.Lock()
+
+
+def latency_key(endpoint: str, payload: Dict[str, Any]) -> str:
+    """Latency window of a call: endpoint, or "endpoint[large]" for large reads of PAGED_ENDPOINTS"""
+    if endpoint not in PAGED_ENDPOINTS:
+        return endpoint
+    try:
+        items = int(payload.get("items")) if payload.get("items") is not None else None
+    except (TypeError, ValueError):
+        return endpoint
+    if items is None or items >= LARGE_READ_ITEMS:
+        return f"{endpoint}[large]"
+    return endpoint
+
+
+def record_latency(endpoint: str, seconds: float):
+    with _lock:
+        window = _latencies.get(endpoint)
+        if window is None:
+            window = _latencies[endpoint] = deque(maxlen=LATENCY_WINDOW)
+        window.append(seconds)
+
+
+def latency_percentile(endpoint: str, q: float) -> Optional[float]:
+    """q-quantile of recent latencies, or None until LATENCY_MIN_SAMPLES calls were seen"""
+    with _lock:
+        window = _latencies.get(endpoint)
+        if window is None or len(window) < LATENCY_MIN_SAMPLES:
+            return None
+        ordered = sorted(window)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def adaptive_timeout(endpoint: str, default: float) -> float:
+    """Timeout for the next call: p99 x factor, within [ADAPTIVE_TIMEOUT_MIN, default]"""
+    if not ADAPTIVE_TIMEOUTS_ENABLED:
+        return default
+    p99 = latency_percentile(endpoint, 0.99)
+    if p99 is None:
+        return default
+    timeout = min(default, max(ADAPTIVE_TIMEOUT_MIN, p99 * ADAPTIVE_TIMEOUT_FACTOR))
+    ADAPTIVE_TIMEOUT.set(round(timeout, 3), endpoint)
+    return timeout
+
+
+def _hedge_affordable() -> bool:
+    """True if the budget holds a hedge right now (nothing is spent)"""
+    with _lock:
+        return _hedge_tokens + HEDGE_BUDGET >= 1
+
+
+def _earn_and_spend_hedge(spend: bool) -> bool:
+    """Add this call's share to the hedge budget; take one hedge from it if asked and available"""
+    global _hedge_tokens
+    with _lock:
+        _hedge_tokens = min(HEDGE_BUDGET_MAX, _hedge_tokens + HEDGE_BUDGET)
+        if spend and _hedge_tokens >= 1:
+            _hedge_tokens -= 1
+            return True
+    return False
+
+
+def _refund_hedge():
+    """Return a hedge that was taken but could not be sent"""
+    global _hedge_tokens
+    with _lock:
+        _hedge_tokens = min(HEDGE_BUDGET_MAX, _hedge_tokens + 1)
+
+
+def clear_latency_stats():
+    """Forget latency windows and refill the hedge budget"""
+    global _hedge_tokens
+    with _lock:
+        _latencies.clear()
+        _hedge_tokens = HEDGE_BUDGET_MAX
+    ADAPTIVE_TIMEOUT.clear()
+    logger.info("[BACKEND] Latency stats cleared")
+
+
+# ============================================
+# CALLS
+# ============================================
+
+def _timed_post(endpoint: str, key: str, payload: Dict[str, Any], timeout: float) -> requests.Response:
+    start = time.perf_counter()
+    try:
+        response = requests.post(f"{API_BASE}/{endpoint}", json=payload, timeout=timeout)
+    except requests.exceptions.Timeout:
+        record_latency(key, timeout)  # censored sample - keeps the window honest during slowdowns
+        raise
+    record_latency(key, time.perf_counter() - start)
+    return response
+
+
+def _submit_if_idle(fn, *args) -> Optional[Future]:
+    """Run fn on the hedge pool if a worker is idle right now; None instead of queueing"""
+    global _pool_busy
+    with _lock:
+        if _pool_busy >= HEDGE_POOL_SIZE:
+            return None
+        _pool_busy += 1
+
+    def run():
+        global _pool_busy
+        try:
+            return fn(*args)
+        finally:
+            with _lock:
+                _pool_busy -= 1
+
+    return _pool.submit(run)
+
+
+_inflight: Dict[Tuple[str, str], Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def seller_post(endpoint: str, payload: Dict[str, Any], timeout: float = 10) -> requests.Response:
+    """
+    POST {API_BASE}/{endpoint} with an adaptive timeout; hedged for
+    HEDGE_ENDPOINTS, shared with identical concurrent calls for
+    SINGLE_FLIGHT_ENDPOINTS.
+
+    Args:
+        endpoint: API path after /api, e.g. "getMasterProducts"
+        timeout: upper bound (seconds), also used until enough latency is known
+
+    Returns:
+        requests.Response of whichever request answered first (read-only -
+        shared between coalesced callers, .json() gives each its own copy)
+
+    Raises:
+        requests exceptions like requests.post (the first error if both requests failed)
+    """
+    if endpoint not in SINGLE_FLIGHT_ENDPOINTS:
+        return _hedged_post(endpoint, payload, timeout)
+
+    key = (endpoint, json.dumps(payload, sort_keys=True, default=str))
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+
+    if not leader:
+        BACKEND_COALESCED.inc(1, endpoint)
+        logger.debug(f"[BACKEND] Joined in-flight {endpoint}")
+        try:
+            return future.result()
+        except CircuitOpenError:
+            note_circuit_rejection()  # so this action also gets the unavailable reply
+            raise
+
+    try:
+        response = _hedged_post(endpoint, payload, timeout)
+        future.set_result(response)
+        return response
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _hedged_post(endpoint: str, payload: Dict[str, Any], timeout: float) -> requests.Response:
+    key = latency_key(endpoint, payload)
+    timeout = adaptive_timeout(key, timeout)
+    hedgeable = endpoint in HEDGE_ENDPOINTS and key == endpoint  # large reads are not sent twice
+    delay = latency_percentile(key, HEDGE_PERCENTILE) if hedgeable else None
+
+    call = in_action_context(_timed_post)
+    primary = None
+    if delay is not None and _hedge_affordable():
+        primary = _submit_if_idle(call, endpoint, key, payload, timeout)
+        if primary is None:
+            BACKEND_HEDGES.inc(1, endpoint, "pool_full")
+    if primary is None:
+        # Not hedged: the caller's thread makes the request
+        _earn_and_spend_hedge(False)
+        return _timed_post(endpoint, key, payload, timeout)
+
+    done, _ = wait([primary], timeout=max(HEDGE_MIN_DELAY, delay))
+    if done:
+        _earn_and_spend_hedge(False)
+        return primary.result()
+    if not _earn_and_spend_hedge(True):
+        BACKEND_HEDGES.inc(1, endpoint, "no_budget")
+        return primary.result()
+
+    hedge = _submit_if_idle(call, endpoint, key, payload, timeout)
+    if hedge is None:
+        _refund_hedge()
+        BACKEND_HEDGES.inc(1, endpoint, "pool_full")
+        return primary.result()
+    BACKEND_HEDGES.inc(1, endpoint, "sent")
+    logger.debug(f"[BACKEND] Hedged {endpoint} after {delay * 1000:.0f} ms")
+
+    pending = {primary, hedge}
+    first_error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                BACKEND_HEDGES.inc(1, endpoint, "won" if future is hedge else "lost")
+                return future.result()
+            first_error = first_error or error
+    raise first_error
@@ -0,0 +1,88 @@
+# actions/cart_cache.py
+"""
+Cart Snapshot Cache
+Short-TTL cache of cart-list responses per (user_id, shipper_id, coupon_id).
+
+A checkout flow reads cart-list several times (view cart, apply coupon,
+create Stripe session...) with nothing changed in between; those turns
+reuse the snapshot. Every cart mutation must call invalidate_cart(user_id)
+- the cart actions, coupon apply/remove and cart_sync do this.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+from actions.backend_client import seller_post
+
+logger = logging.getLogger(__name__)
+
+# Cache timeout (seconds) - short, the web app can change the cart too
+CART_CACHE_TIMEOUT = int(os.getenv("CART_CACHE_TTL", "30"))
+
+# (user_id, shipper_id, coupon_id) -> (status_code, response json)
+_cart_cache: Dict[Tuple[str, str, str], Tuple[int, Dict[str, Any]]] = {}
+_cart_timestamps: Dict[Tuple[str, str, str], float] = {}
+_lock = threading.Lock()
+
+
+def _cart_key(user_id: Any, shipper_id: Any = None, coupon_id: Any = None) -> Tuple[str, str, str]:
+    return (str(user_id), str(shipper_id or ""), str(coupon_id or ""))
+
+
+def get_cart_list(user_id: Any, shipper_id: Any = None, coupon_id: Any = None,
+                  timeout: int = 10, fresh: bool = False) -> Tuple[int, Dict[str, Any]]:
+    """
+    cart-list for a user, served from the snapshot when possible.
+
+    Args:
+        shipper_id / coupon_id: same optional filters as the API payload
+        fresh: skip the snapshot (the response is still cached)
+
+    Returns:
+        (HTTP status code, response json)
+
+    Raises:
+        requests exceptions / ValueError like a direct requests.post().json()
+        (the call has an adaptive timeout and may be hedged - see backend_client)
+    """
+    key = _cart_key(user_id, shipper_id, coupon_id)
+    if not fresh:
+        with _lock:
+            ts = _cart_timestamps.get(key)
+            if ts is not None and (time.time() - ts) < CART_CACHE_TIMEOUT:
+                logger.debug(f"[CART CACHE] Hit for {key}")
+                return _cart_cache[key]
+
+    payload = {"user_id": str(user_id), "coupon_id": str(coupon_id or "")}
+    if shipper_id:
+        payload["shipper_id"] = str(shipper_id)
+    response = seller_post("cart-list", payload, timeout=timeout)
+    data = response.json()
+    result = (response.status_code, data)
+
+    # Only cache real answers (an empty cart, code 402, is a real answer)
+    if response.status_code == 200 and (data.get("status") == 1 or data.get("code") == 402):
+        with _lock:
+            _cart_cache[key] = result
+            _cart_timestamps[key] = time.time()
+    return result
+
+
+def invalidate_cart(user_id: Any):
+    """Drop every snapshot of this user's cart (call after any cart mutation)"""
+    uid = str(user_id)
+    with _lock:
+        for key in [k for k in _cart_cache if k[0] == uid]:
+            _cart_cache.pop(key, None)
+            _cart_timestamps.pop(key, None)
+    logger.debug(f"[CART CACHE] Invalidated user {uid}")
+
+
+def clear_cart_cache():
+    """Clear all cart snapshots"""
+    with _lock:
+        _cart_cache.clear()
+        _cart_timestamps.clear()
+    logger.info("[CART CACHE] Cache cleared")
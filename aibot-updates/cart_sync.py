@@ -0,0 +1,384 @@
+# actions/cart_sync.py
+"""
+Backend Cart Sync
+Pushes WhatsApp native order lines into the Laravel cart.
+
+1. reconcile_cart() diffs the current cart-list against the order and
+   applies only the needed add / update / remove operations
+2. Operations run with bounded concurrency (CART_SYNC_CONCURRENCY), so a
+   15-item order costs roughly one round-trip instead of fifteen
+3. If CART_BULK_ADD_ENDPOINT is configured, adds are sent in one request,
+   with per-item fallback if that call fails
+4. A quantity change is sent to CART_UPDATE_ENDPOINT (Laravel
+   Cart::updateProductCartQuantity); if that fails, or the endpoint is
+   set to "", the line is removed and added again
+5. If an update or remove still fails, the cart is cleared and rebuilt
+   from the order; lines that cannot be added come back as failed
+   results, and the caller must not continue to checkout with them
+6. bulk_add_to_cart() adds many catalog products at once (wishlist "add all")
+"""
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from actions.action_metrics import in_action_context
+from actions.cart_cache import get_cart_list, invalidate_cart
+
+logger = logging.getLogger(__name__)
+
+API_BASE = os.getenv("SELLER_API_URL", "https://stageshipperapi.thedelivio.com/api")
+
+CART_SYNC_CONCURRENCY = int(os.getenv("CART_SYNC_CONCURRENCY", "6"))
+
+# Optional bulk endpoint, e.g. "add-products-to-cart" (not in the API yet)
+CART_BULK_ADD_ENDPOINT = os.getenv("CART_BULK_ADD_ENDPOINT", "")
+
+# Quantity of one cart line (Cart::updateProductCartQuantity, by cart-list "id"); "" = remove + add
+CART_UPDATE_ENDPOINT = os.getenv("CART_UPDATE_ENDPOINT", "update-product-cart-quantity")
+
+ADD_TIMEOUT = 10
+
+
+def _add_one(user_id: str, shipper_id: Any, line: Dict[str, Any]) -> Dict[str, Any]:
+    """Add one line via add-product-to-cart and describe the outcome"""
+    product_id = line.get("product_retailer_id", "")
+    quantity = int(line.get("quantity", 1))
+    result = {"product_id": product_id, "quantity": quantity, "success": False, "error": None}
+
+    # The product_retailer_id from WhatsApp is the ai_product_id
+    payload = {
+        "user_id": user_id,
+        "product_id": product_id,
+        "quantity": quantity,
+        "shipper_id": shipper_id  # API requires shipper_id, not store_id!
+    }
+    try:
+        response = requests.post(f"{API_BASE}/add-product-to-cart", json=payload, timeout=ADD_TIMEOUT)
+        if response.status_code != 200:
+            result["error"] = f"HTTP {response.status_code}"
+        else:
+            data = response.json()
+            if data.get("status") == 1:
+                result["success"] = True
+            else:
+                result["error"] = data.get("message") or "rejected"
+    except Exception as e:
+        result["error"] = str(e)
+
+    if result["success"]:
+        logger.info(f"[CART SYNC] Added {product_id} x{quantity}")
+    else:
+        logger.warning(f"[CART SYNC] Failed to add {product_id}: {result['error']}")
+    return result
+
+
+def _bulk_add(user_id: str, shipper_id: Any, lines: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """Single-request add; None if the endpoint is not configured or failed"""
+    if not CART_BULK_ADD_ENDPOINT:
+        return None
+    payload = {
+        "user_id": user_id,
+        "shipper_id": shipper_id,
+        "items": [
+            {"product_id": l.get("product_retailer_id", ""), "quantity": int(l.get("quantity", 1))}
+            for l in lines
+        ]
+    }
+    try:
+        response = requests.post(f"{API_BASE}/{CART_BULK_ADD_ENDPOINT}", json=payload, timeout=ADD_TIMEOUT)
+        data = response.json()
+        if data.get("status") != 1:
+            logger.warning(f"[CART SYNC] Bulk add rejected: {data.get('message')}")
+            return None
+        # Optional per-item statuses: data.items = [{product_id, status, message}]
+        statuses = {str(i.get("product_id")): i for i in (data.get("data") or {}).get("items", [])}
+        results = []
+        for item in payload["items"]:
+            status = statuses.get(str(item["product_id"]))
+            ok = status is None or status.get("status") == 1
+            results.append({
+                "product_id": item["product_id"],
+                "quantity": item["quantity"],
+                "success": ok,
+                "error": None if ok else (status.get("message") or "rejected"),
+            })
+        return results
+    except Exception as e:
+        logger.warning(f"[CART SYNC] Bulk add failed, falling back to per-item: {e}")
+        return None
+
+
+def add_items_to_cart(user_id: str, shipper_id: Any, lines: List[Dict[str, Any]],
+                      max_workers: int = CART_SYNC_CONCURRENCY) -> List[Dict[str, Any]]:
+    """
+    Add WhatsApp order lines to the backend cart.
+
+    The first line is added on its own so the backend creates the cart
+    row exactly once; the rest run in parallel.
+
+    Returns:
+        One {product_id, quantity, success, error} per line, in order
+    """
+    if not lines:
+        return []
+
+    invalidate_cart(user_id)
+    results = _bulk_add(user_id, shipper_id, lines)
+    if results is not None:
+        return results
+
+    return _first_then_parallel(lambda line: _add_one(user_id, shipper_id, line), lines, max_workers)
+
+
+def _first_then_parallel(fn, items: List[Any], max_workers: int) -> List[Any]:
+    """Run fn on the first item alone (creates the cart row), the rest in a bounded pool"""
+    if not items:
+        return []
+    results = [fn(items[0])]
+    rest = items[1:]
+    if rest:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(rest)))) as executor:
+            results += list(executor.map(in_action_context(fn), rest))
+    return results
+
+
+# ============================================
+# BULK ADD (catalog products, e.g. favorites)
+# ============================================
+
+def _addtocart_one(user_id: str, default_shipper_id: Any, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Add one product via addtocart (qty 1), as the single-item wishlist flow does"""
+    product_id = item.get("product_id")
+    shipper_id = item.get("shipper_id") or default_shipper_id
+    title = item.get("title", "Product")
+    result = {"product_id": product_id, "title": title, "success": False, "error": None}
+    payload = {
+        "product_id": str(product_id),
+        "user_id": str(user_id),
+        "product_qty": "1",
+        "shipper_id": str(shipper_id) if shipper_id else ""
+    }
+    try:
+        response = requests.post(f"{API_BASE}/addtocart", json=payload, timeout=ADD_TIMEOUT)
+        data = response.json()
+        if data.get("status") == 1 or data.get("code") == 200:
+            result["success"] = True
+        else:
+            result["error"] = data.get("message") or "rejected"
+    except Exception as e:
+        result["error"] = str(e)
+    if not result["success"]:
+        logger.warning(f"[CART SYNC] addtocart {product_id} failed: {result['error']}")
+    return result
+
+
+def bulk_add_to_cart(user_id: str, items: List[Dict[str, Any]], default_shipper_id: Any = None,
+                     max_workers: int = CART_SYNC_CONCURRENCY) -> List[Dict[str, Any]]:
+    """
+    Add many products (dicts with product_id / shipper_id / title) to the cart.
+
+    Returns:
+        One {product_id, title, success, error} per item with a product_id
+    """
+    items = [i for i in items if isinstance(i, dict) and i.get("product_id")]
+    invalidate_cart(user_id)
+    return _first_then_parallel(lambda i: _addtocart_one(user_id, default_shipper_id, i), items, max_workers)
+
+
+# ============================================
+# DIFF-BASED RECONCILIATION
+# ============================================
+
+def fetch_cart(user_id: str) -> Optional[Dict[str, Any]]:
+    """Fresh cart-list response, or None if the call failed (empty cart = code 402)"""
+    try:
+        status_code, data = get_cart_list(user_id, timeout=10, fresh=True)
+        if status_code != 200:
+            logger.warning(f"[CART SYNC] cart-list HTTP {status_code}")
+            return None
+        return data
+    except Exception as e:
+        logger.warning(f"[CART SYNC] cart-list failed: {e}")
+        return None
+
+
+def _cartlist(cart_data: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not cart_data or cart_data.get("status") != 1:
+        return []
+    data = cart_data.get("data")
+    return data.get("cartlist", []) if isinstance(data, dict) else []
+
+
+def _cart_line_keys(item: Dict[str, Any]) -> List[str]:
+    """IDs a cart line may be known by (WhatsApp sends the ai_product_id)"""
+    keys = []
+    for field in ("ai_product_id", "product_id"):
+        value = item.get(field)
+        if value not in (None, ""):
+            keys.append(str(value))
+    return keys
+
+
+def plan_cart_diff(cartlist: List[Dict[str, Any]], lines: List[Dict[str, Any]],
+                   shipper_id: Any = None) -> List[Dict[str, Any]]:
+    """
+    Minimal operations turning the backend cart into the WhatsApp order.
+
+    - lines missing from the cart          -> add
+    - lines with a different quantity      -> update (by cart line id)
+    - cart lines not in the order, lines from another store, duplicates -> remove
+
+    Order lines for the same product are summed; a total of 0 or less
+    means the product is not wanted.
+    """
+    wanted: "OrderedDict[str, int]" = OrderedDict()
+    for line in lines:
+        pid = str(line.get("product_retailer_id", ""))
+        if pid:
+            wanted[pid] = wanted.get(pid, 0) + int(line.get("quantity", 1))
+    for pid in [p for p, qty in wanted.items() if qty <= 0]:
+        del wanted[pid]
+
+    ops: List[Dict[str, Any]] = []
+    matched = set()
+    for item in cartlist:
+        cart_id = item.get("id")
+        item_shipper = item.get("shipper_id")
+        other_store = shipper_id and item_shipper not in (None, "") and str(item_shipper) != str(shipper_id)
+        pid = next((k for k in _cart_line_keys(item) if k in wanted), None)
+
+        if other_store or pid is None or pid in matched:
+            ops.append({"op": "remove", "cart_id": cart_id, "product_id": (_cart_line_keys(item) or [""])[0]})
+            continue
+
+        matched.add(pid)
+        try:
+            current_qty = int(float(item.get("quantity", 0)))
+        except (ValueError, TypeError):
+            current_qty = 0
+        if current_qty != wanted[pid]:
+            ops.append({"op": "update", "cart_id": cart_id, "product_id": pid, "quantity": wanted[pid]})
+
+    for pid, qty in wanted.items():
+        if pid not in matched:
+            ops.append({"op": "add", "product_id": pid, "quantity": qty})
+    return ops
+
+
+def _post_cart_op(endpoint: str, payload: Dict[str, Any]) -> Optional[str]:
+    """POST a cart operation; None on success, else the error"""
+    try:
+        response = requests.post(f"{API_BASE}/{endpoint}", json=payload, timeout=ADD_TIMEOUT)
+        data = response.json()
+        if response.status_code == 200 and data.get("status") == 1:
+            return None
+        return data.get("message") or f"HTTP {response.status_code}"
+    except Exception as e:
+        return str(e)
+
+
+def update_cart_line(user_id: str, cart_line_id: Any, quantity: int) -> Optional[str]:
+    """Set the quantity of one cart line (cart-list "id") in place; None on success, else the error"""
+    if not CART_UPDATE_ENDPOINT:
+        return "no update endpoint"
+    return _post_cart_op(CART_UPDATE_ENDPOINT,
+                         {"user_id": user_id, "cart_detail_id": cart_line_id, "quantity": quantity})
+
+
+def _apply_one(user_id: str, shipper_id: Any, op: Dict[str, Any]) -> Dict[str, Any]:
+    """Run an update/remove operation (an update falls back to remove + add)"""
+    result = {"op": op["op"], "product_id": op.get("product_id"), "quantity": op.get("quantity"),
+              "success": False, "error": None}
+    try:
+        cart_line_id = int(op["cart_id"])
+    except (KeyError, TypeError, ValueError):
+        # A malformed cart row is a failed op (the cart gets rebuilt), not an error for the whole sync
+        result["error"] = f"bad cart line id {op.get('cart_id')!r}"
+        logger.warning(f"[CART SYNC] {op['op']} {op.get('product_id')} failed: {result['error']}")
+        return result
+    remove_payload = {"user_id": user_id, "id": cart_line_id}
+    if op["op"] == "remove":
+        result["error"] = _post_cart_op("remove-product-from-cart", remove_payload)
+    else:
+        error = update_cart_line(user_id, cart_line_id, op["quantity"])
+        if error is not None:
+            logger.info(f"[CART SYNC] Replacing {op['product_id']} x{op['quantity']} ({error})")
+            error = _post_cart_op("remove-product-from-cart", remove_payload)
+            if error is None:
+                added = _add_one(user_id, shipper_id,
+                                 {"product_retailer_id": op["product_id"], "quantity": op["quantity"]})
+                error = added["error"]
+        result["error"] = error
+    result["success"] = result["error"] is None
+    if not result["success"]:
+        logger.warning(f"[CART SYNC] {op['op']} {op.get('product_id')} failed: {result['error']}")
+    return result
+
+
+def _rebuild_cart(user_id: str, shipper_id: Any, lines: List[Dict[str, Any]],
+                  max_workers: int) -> List[Dict[str, Any]]:
+    """Clear the cart and add every order line; a failed clear adds nothing"""
+    invalidate_cart(user_id)
+    error = None
+    try:
+        response = requests.post(f"{API_BASE}/destroy-cart", json={"user_id": user_id}, timeout=10)
+        if response.status_code != 200:
+            error = f"HTTP {response.status_code}"
+    except Exception as e:
+        error = str(e)
+    if error is not None:
+        logger.warning(f"[CART SYNC] destroy-cart failed: {error}")
+        return [{"op": "clear", "product_id": None, "quantity": None, "success": False, "error": error}]
+    return [dict(r, op="add") for r in add_items_to_cart(user_id, shipper_id, lines, max_workers)]
+
+
+def reconcile_cart(user_id: str, shipper_id: Any, lines: List[Dict[str, Any]],
+                   max_workers: int = CART_SYNC_CONCURRENCY) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Bring the backend cart in line with a WhatsApp order.
+
+    Returns:
+        (results, cart_data): one result per applied operation
+        ({op, product_id, quantity, success, error}) and the final
+        cart-list response (reused from the diff if nothing changed).
+        Failed results mean the cart does not match the order - after a
+        rebuild they are the lines that could not be added ("clear" if
+        the cart could not even be emptied).
+    """
+    before = fetch_cart(user_id)
+    if before is None:
+        # Cart state unknown - fall back to destroy-and-rebuild
+        logger.warning("[CART SYNC] Could not read cart, rebuilding it")
+        return _rebuild_cart(user_id, shipper_id, lines, max_workers), fetch_cart(user_id)
+
+    cartlist = _cartlist(before)
+    ops = plan_cart_diff(cartlist, lines, shipper_id)
+    logger.info(f"[CART SYNC] {len(cartlist)} lines in cart, {len(ops)} operations: "
+                f"{sum(o['op'] == 'add' for o in ops)} add, {sum(o['op'] == 'update' for o in ops)} update, "
+                f"{sum(o['op'] == 'remove' for o in ops)} remove")
+    if not ops:
+        return [], before
+
+    add_lines = [{"product_retailer_id": o["product_id"], "quantity": o["quantity"]} for o in ops if o["op"] == "add"]
+    other_ops = [o for o in ops if o["op"] != "add"]
+
+    invalidate_cart(user_id)
+    results: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(other_ops) or 1))) as executor:
+        pending = [executor.submit(in_action_context(_apply_one), user_id, shipper_id, o) for o in other_ops]
+        if add_lines:
+            # An empty cart has no cart row yet - add_items_to_cart serialises its first add
+            adds = add_items_to_cart(user_id, shipper_id, add_lines, max_workers)
+            results += [dict(r, op="add") for r in adds]
+        results += [f.result() for f in pending]
+
+    stale = [r for r in results if not r["success"] and r["op"] != "add"]
+    if stale:
+        # A stale or extra line would be charged at checkout - start over from the order
+        logger.warning(f"[CART SYNC] {len(stale)} update/remove operations failed, rebuilding the cart")
+        results = _rebuild_cart(user_id, shipper_id, lines, max_workers)
+    return results, fetch_cart(user_id)
@@ -0,0 +1,317 @@
+# actions/catalog_cache.py
+"""
+Catalog Snapshot Cache
+Keeps full product/store dicts in process memory so tracker slots only
+carry compact ID lists.
+
+Usage in actions:
+    SlotSet("recent_products", compact_product_slot(products, "action_search_products"))
+    products = resolve_product_slot(tracker.get_slot("recent_products"))
+
+Slots written by older versions (full JSON dict lists) still resolve, so
+running conversations are not broken by a deploy.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from actions.action_metrics import in_action_context
+from actions.backend_client import seller_post
+from actions.selection_index import SelectionIndex, register_selection_index
+
+logger = logging.getLogger(__name__)
+
+# Cache timeout (seconds) - selection_index.INDEX_CACHE_TIMEOUT matches it
+CATALOG_CACHE_TIMEOUT = 1800  # 30 minutes
+MAX_CACHE_ENTRIES = 20000
+
+# Max products fetched from the API when resolving a slot after cache expiry
+MAX_REFETCH = 20
+# Parallel getMasterProducts calls for those (the API takes one product_id per call)
+REFETCH_CONCURRENCY = 10
+
+STORE_REF_PREFIX = "store:"
+
+# In-memory snapshot: ref -> dict
+_catalog_cache: Dict[str, Dict[str, Any]] = {}
+_catalog_timestamps: Dict[str, float] = {}
+_cache_lock = threading.Lock()
+
+# Per-slot size metrics: slot -> counters
+_slot_metrics: Dict[str, Dict[str, int]] = {}
+_metrics_lock = threading.Lock()
+
+
+# ============================================
+# SNAPSHOT STORAGE
+# ============================================
+
+def product_ref(product: Dict[str, Any]) -> Optional[str]:
+    """ID used to reference a product in slots"""
+    raw_id = product.get("product_id") or product.get("ai_product_id") or product.get("id")
+    return str(raw_id).strip() if raw_id not in (None, "") else None
+
+
+def store_ref(store: Dict[str, Any]) -> str:
+    """ID used to reference a store in slots (stores have no product id)"""
+    key = store.get("wh_account_id") or store.get("store_name") or store.get("name") or ""
+    return f"{STORE_REF_PREFIX}{key}"
+
+
+def _evict_expired():
+    """Drop expired entries once the cache grows past MAX_CACHE_ENTRIES"""
+    if len(_catalog_cache) <= MAX_CACHE_ENTRIES:
+        return
+    cutoff = time.time() - CATALOG_CACHE_TIMEOUT
+    for ref in [r for r, ts in _catalog_timestamps.items() if ts < cutoff]:
+        _catalog_cache.pop(ref, None)
+        _catalog_timestamps.pop(ref, None)
+    if len(_catalog_cache) > MAX_CACHE_ENTRIES:
+        # Still full: drop the oldest quarter
+        oldest = sorted(_catalog_timestamps, key=_catalog_timestamps.get)[:MAX_CACHE_ENTRIES // 4]
+        for ref in oldest:
+            _catalog_cache.pop(ref, None)
+            _catalog_timestamps.pop(ref, None)
+
+
+def _remember(entries: Dict[str, Dict[str, Any]]):
+    now = time.time()
+    with _cache_lock:
+        _catalog_cache.update(entries)
+        for ref in entries:
+            _catalog_timestamps[ref] = now
+        _evict_expired()
+
+
+def _get_cached(ref: str) -> Optional[Dict[str, Any]]:
+    ts = _catalog_timestamps.get(ref)
+    if ts is None or (time.time() - ts) >= CATALOG_CACHE_TIMEOUT:
+        return None
+    return _catalog_cache.get(ref)
+
+
+def _anon_ref(product: Dict[str, Any]) -> str:
+    """Ref for a product without an id: a hash of its content, so equal dicts share it"""
+    content = json.dumps(product, sort_keys=True, default=str).encode("utf-8")
+    return f"_anon_{hashlib.sha1(content).hexdigest()[:16]}"
+
+
+def remember_products(products: List[Dict[str, Any]]) -> List[str]:
+    """Cache product dicts and return their refs in list order"""
+    refs, entries = [], {}
+    for p in products:
+        if not isinstance(p, dict):
+            continue
+        ref = product_ref(p) or _anon_ref(p)
+        entries[ref] = p
+        refs.append(ref)
+    _remember(entries)
+    return refs
+
+
+def remember_stores(stores: List[Dict[str, Any]]) -> List[str]:
+    """Cache store dicts and return their refs in list order"""
+    refs, entries = [], {}
+    for s in stores:
+        if not isinstance(s, dict):
+            continue
+        ref = store_ref(s)
+        entries[ref] = s
+        refs.append(ref)
+    _remember(entries)
+    return refs
+
+
+def get_product(product_id: Any) -> Optional[Dict[str, Any]]:
+    """Single product from the snapshot (no API call)"""
+    return _get_cached(str(product_id)) if product_id not in (None, "") else None
+
+
+# ============================================
+# SLOT HELPERS
+# ============================================
+
+def _record_slot_size(slot: str, source: str, compact_bytes: int, full_bytes: int):
+    with _metrics_lock:
+        m = _slot_metrics.setdefault(slot, {
+            "writes": 0, "compact_bytes": 0, "full_bytes": 0, "max_compact_bytes": 0, "max_full_bytes": 0,
+        })
+        m["writes"] += 1
+        m["compact_bytes"] += compact_bytes
+        m["full_bytes"] += full_bytes
+        m["max_compact_bytes"] = max(m["max_compact_bytes"], compact_bytes)
+        m["max_full_bytes"] = max(m["max_full_bytes"], full_bytes)
+    logger.debug("[CATALOG CACHE] %s -> %s: %sB (full list would be ~%sB)", source, slot, compact_bytes, full_bytes)
+
+
+def _compact(slot: str, source: str, items: List[Dict[str, Any]], refs: List[str]) -> str:
+    value = json.dumps(refs)
+    # Estimated from the first item - serializing the whole list is the cost the compact slot avoids
+    try:
+        full_bytes = len(json.dumps(items[0], default=str)) * len(items) if items else 0
+    except (TypeError, ValueError):
+        full_bytes = 0
+    _record_slot_size(slot, source, len(value), full_bytes)
+    return value
+
+
+def compact_product_slot(products: List[Dict[str, Any]], source: str, slot: str = "recent_products") -> str:
+    """Cache products, index them for selection and return the JSON ID list for the slot"""
+    value = _compact(slot, source, products, remember_products(products))
+    register_selection_index(value, SelectionIndex([p for p in products if isinstance(p, dict)]))
+    return value
+
+
+def compact_store_slot(stores: List[Dict[str, Any]], source: str, slot: str = "recent_products") -> str:
+    """Cache stores and return the JSON ref list to store in the slot"""
+    return _compact(slot, source, stores, remember_stores(stores))
+
+
+def _parse_slot(slot_value: Any) -> List[Any]:
+    if not slot_value:
+        return []
+    if isinstance(slot_value, str):
+        slot_value = json.loads(slot_value)
+    if not isinstance(slot_value, list):
+        raise ValueError("slot did not contain a list")
+    return slot_value
+
+
+def _fetch_product(product_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch one product by id after a cache miss"""
+    payload = {
+        "wh_account_id": "",
+        "upc": "",
+        "ai_category_id": "",
+        "ai_product_id": "",
+        "product_id": str(product_id),
+        "search_string": "",
+        "zipcode": "",
+        "user_id": "",
+        "page": "1",
+        "items": "1"
+    }
+    try:
+        response = seller_post("getMasterProducts", payload, timeout=8)
+        products = (response.json().get("data") or {}).get("getMasterProducts", [])
+        for p in products:
+            if product_ref(p) == str(product_id):
+                return p
+    except Exception as e:
+        logger.warning(f"[CATALOG CACHE] Refetch failed for product {product_id}: {e}")
+    return None
+
+
+def _fetch_products(product_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Refetch products in parallel (REFETCH_CONCURRENCY); missing ones are left out"""
+    if not product_ids:
+        return {}
+    if len(product_ids) == 1:
+        product = _fetch_product(product_ids[0])
+        return {product_ids[0]: product} if product else {}
+    with ThreadPoolExecutor(max_workers=min(REFETCH_CONCURRENCY, len(product_ids))) as executor:
+        products = list(executor.map(in_action_context(_fetch_product), product_ids))
+    return {pid: p for pid, p in zip(product_ids, products) if p}
+
+
+def resolve_product_slot(slot_value: Any, fetch_missing: bool = True) -> List[Dict[str, Any]]:
+    """
+    Turn a recent_products slot back into product dicts (list order kept).
+
+    Accepts the compact ID list or a legacy full JSON list. Refs missing
+    from the snapshot are refetched together, in parallel (up to
+    MAX_REFETCH); anything still unresolved becomes a placeholder
+    {"product_id": ..., "unresolved": True} so positions stay aligned
+    with what the user was shown. Callers must not act on a placeholder -
+    see refetch_product().
+
+    Raises:
+        ValueError / json.JSONDecodeError if the slot is not a list
+    """
+    items = _parse_slot(slot_value)
+    cached: Dict[str, Optional[Dict[str, Any]]] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            cached[str(item)] = _get_cached(str(item))
+
+    refetched: Dict[str, Dict[str, Any]] = {}
+    if fetch_missing:
+        missing = [ref for ref, product in cached.items()
+                   if product is None and not ref.startswith(("_anon_", STORE_REF_PREFIX))]
+        if len(missing) > MAX_REFETCH:
+            logger.warning(f"[CATALOG CACHE] {len(missing)} expired products, refetching {MAX_REFETCH}")
+        refetched = _fetch_products(missing[:MAX_REFETCH])
+        if refetched:
+            _remember(refetched)
+            logger.info(f"[CATALOG CACHE] Refetched {len(refetched)}/{len(missing)} expired products")
+
+    resolved = []
+    for item in items:
+        if isinstance(item, dict):
+            resolved.append(item)
+            continue
+        ref = str(item)
+        resolved.append(cached[ref] or refetched.get(ref) or {"product_id": ref, "unresolved": True})
+    return resolved
+
+
+def refetch_product(product: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The full product for a placeholder from resolve_product_slot (one more API try), or None"""
+    ref = str(product.get("product_id") or "")
+    if not ref or ref.startswith(("_anon_", STORE_REF_PREFIX)):
+        return None
+    found = _get_cached(ref) or _fetch_product(ref)
+    if found:
+        _remember({ref: found})
+    return found
+
+
+def resolve_store_slot(slot_value: Any, lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+                       keep_missing: bool = False) -> List[Optional[Dict[str, Any]]]:
+    """
+    Turn a store ref list (or legacy store dict list) back into store dicts.
+
+    Args:
+        lookup: called with the store key (wh_account_id) of refs missing
+                from the snapshot, e.g. store_directory.find_store
+        keep_missing: None for refs still unresolved, so positions match
+                      the list the customer was shown (dropped otherwise)
+    """
+    stores, found = [], {}
+    for item in _parse_slot(slot_value):
+        if isinstance(item, dict):
+            stores.append(item)
+            continue
+        ref = str(item)
+        store = _get_cached(ref)
+        if store is None and lookup is not None and ref.startswith(STORE_REF_PREFIX):
+            store = lookup(ref[len(STORE_REF_PREFIX):])
+            if store:
+                found[ref] = store
+        if store or keep_missing:
+            stores.append(store or None)
+    if found:
+        _remember(found)
+    return stores
+
+
+# ============================================
+# METRICS / MAINTENANCE
+# ============================================
+
+def get_slot_size_metrics() -> Dict[str, Dict[str, int]]:
+    """Per-slot write counts and byte totals (compact vs. estimated full JSON)"""
+    with _metrics_lock:
+        return {slot: dict(m) for slot, m in _slot_metrics.items()}
+
+
+def clear_catalog_cache():
+    """Clear the snapshot (e.g. after catalog updates)"""
+    with _cache_lock:
+        _catalog_cache.clear()
+        _catalog_timestamps.clear()
+    logger.info("[CATALOG CACHE] Cache cleared")
@@ -0,0 +1,247 @@
+# actions/checkout_sessions.py
+"""
+Stripe Checkout Session Registry
+Reuses a still-open Checkout session when "Pay Now" is tapped again for
+the same cart, instead of creating a new session every time.
+
+Sessions are keyed by a fingerprint of the cart lines, totals, delivery
+address, coupon and the customer's newest cached order id. A new session is only
+created when the fingerprint changes, the session expires or it was paid.
+Creation uses a Stripe idempotency key derived from the same fingerprint,
+so a retried or double-tapped create returns the same session.
+
+The fingerprint does no I/O: the order id comes from the order cache, so
+"Pay Now" costs no order-lists call. A paid session is kept from coming
+back by forget_checkout_session() on this worker (its fingerprint gets a
+new generation, and with it a new key). Elsewhere (another worker, after a
+restart) the same key can make Stripe replay the paid session; such a
+create is retried with a random key.
+
+Usage in actions:
+    last_order_id = latest_order_id(user_id)
+    fingerprint = checkout_fingerprint(user_id, cart_data, total_amount, address_id, coupon_id, store_id, channel,
+                                       last_order_id)
+    session, reused = get_or_create_checkout_session(
+        fingerprint,
+        lambda key, expires_at: stripe.checkout.Session.create(..., expires_at=expires_at, idempotency_key=key),
+    )
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from actions.order_cache import cached_newest_order_id
+
+logger = logging.getLogger(__name__)
+
+# Session lifetime requested from Stripe (Stripe allows 30 min - 24 h)
+CHECKOUT_SESSION_TTL = int(os.getenv("CHECKOUT_SESSION_TTL", "3600"))
+
+# Don't hand out a session that is about to expire (seconds)
+EXPIRY_MARGIN = 300
+
+# Re-check an old entry with Session.retrieve before reusing it (seconds) -
+# the customer may have paid without the bot hearing about it
+REVERIFY_AFTER = 600
+
+# fingerprint -> {"session", "expires_at", "created_at", "verified_at"}
+_sessions: Dict[str, Dict[str, Any]] = {}
+# fingerprint -> number of sessions already used up (paid / expired)
+_generations: Dict[str, int] = {}
+_lock = threading.Lock()
+_fingerprint_locks: Dict[str, threading.Lock] = {}
+
+
+# ============================================
+# FINGERPRINT
+# ============================================
+
+def checkout_fingerprint(user_id: Any, cart_data: Optional[Dict[str, Any]], total_amount: float,
+                         delivery_address_id: Any = "", coupon_id: Any = "", store_id: Any = "",
+                         channel: str = "", last_order_id: Any = "") -> str:
+    """Stable hash of everything that changes what the customer pays for"""
+    data = (cart_data or {}).get("data")
+    cartlist = data.get("cartlist", []) if isinstance(data, dict) else []
+    lines = sorted(
+        (
+            str(item.get("product_id") or item.get("ai_product_id") or item.get("id") or ""),
+            str(item.get("quantity", "")),
+            str(item.get("price", item.get("product_price", ""))),
+        )
+        for item in cartlist if isinstance(item, dict)
+    )
+    key = {
+        "user_id": str(user_id),
+        "store_id": str(store_id or ""),
+        "channel": channel,
+        "lines": lines,
+        "total_cents": int(round(float(total_amount) * 100)),
+        "address_id": str(delivery_address_id or ""),
+        "coupon_id": str(coupon_id or ""),
+        "last_order_id": str(last_order_id or ""),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def latest_order_id(user_id: Any) -> str:
+    """
+    Newest order id of the customer from the order cache, for
+    checkout_fingerprint() - no API call ("" if none is cached). A stale
+    value is safe: see get_or_create_checkout_session's paid-session retry.
+    """
+    return cached_newest_order_id(user_id)
+
+
+def _idempotency_key(fingerprint: str, generation: int, nonce: str = "") -> Tuple[str, int]:
+    """
+    Idempotency key and matching expires_at for a create.
+
+    The fingerprint includes the newest cached order id, and generation
+    moves on when a session is paid or expires in this process; the time bucket stops a key from outliving the session it
+    created. expires_at is derived from the bucket too, because Stripe
+    rejects a reused key sent with different parameters. nonce forces a
+    key that was never used before.
+    """
+    bucket = int(time.time()) // CHECKOUT_SESSION_TTL
+    expires_at = (bucket + 2) * CHECKOUT_SESSION_TTL  # TTL..2*TTL from now
+    suffix = f"-{nonce}" if nonce else ""
+    return f"checkout-{fingerprint[:40]}-{generation}-{bucket}{suffix}", expires_at
+
+
+def _is_paid(session: Any) -> bool:
+    return getattr(session, "payment_status", None) == "paid" or getattr(session, "status", None) == "complete"
+
+
+# ============================================
+# REGISTRY
+# ============================================
+
+def _session_status(session_id: str) -> Optional[str]:
+    """Current Stripe status ("open", "complete", "expired") or None if unknown"""
+    import stripe  # not at module level: this module is imported at action-server startup
+
+    try:
+        session = stripe.checkout.Session.retrieve(session_id)
+        if getattr(session, "payment_status", None) == "paid":
+            return "complete"
+        return getattr(session, "status", None)
+    except Exception as e:
+        logger.warning(f"[CHECKOUT SESSIONS] Could not verify {session_id}: {e}")
+        return None
+
+
+def _usable_entry(fingerprint: str) -> Optional[Dict[str, Any]]:
+    now = time.time()
+    with _lock:
+        entry = _sessions.get(fingerprint)
+    if not entry:
+        return None
+    if entry["expires_at"] - EXPIRY_MARGIN <= now:
+        _retire(fingerprint)
+        return None
+    if now - entry["verified_at"] >= REVERIFY_AFTER:
+        status = _session_status(entry["session"].id)
+        if status not in ("open", None):
+            logger.info(f"[CHECKOUT SESSIONS] Session {entry['session'].id} is {status}, not reusing")
+            _retire(fingerprint)
+            return None
+        entry["verified_at"] = now
+    return entry
+
+
+def _retire(fingerprint: str):
+    with _lock:
+        if _sessions.pop(fingerprint, None) is not None:
+            _generations[fingerprint] = _generations.get(fingerprint, 0) + 1
+
+
+def get_or_create_checkout_session(fingerprint: str, create: Callable[[str, int], Any]):
+    """
+    Open session for this fingerprint, creating one only if needed.
+
+    Args:
+        create: called as create(idempotency_key, expires_at) and must
+                return the Stripe session (e.g. stripe.checkout.Session.create)
+
+    Returns:
+        (session, reused)
+    """
+    import stripe
+
+    with _lock:
+        fp_lock = _fingerprint_locks.setdefault(fingerprint, threading.Lock())
+
+    # Double taps for the same cart wait for the first create instead of racing it
+    with fp_lock:
+        entry = _usable_entry(fingerprint)
+        if entry:
+            logger.info(f"[CHECKOUT SESSIONS] Reusing open session {entry['session'].id}")
+            return entry["session"], True
+
+        with _lock:
+            generation = _generations.get(fingerprint, 0)
+        key, expires_at = _idempotency_key(fingerprint, generation)
+        try:
+            session = create(key, expires_at)
+        except stripe.error.IdempotencyError as e:
+            # Key already used with other parameters (e.g. before a restart) - take a fresh one
+            logger.warning(f"[CHECKOUT SESSIONS] Idempotency conflict, retrying with new key: {e}")
+            with _lock:
+                generation = _generations[fingerprint] = generation + 1
+            key, expires_at = _idempotency_key(fingerprint, generation)
+            session = create(key, expires_at)
+
+        if _is_paid(session):
+            # Stripe replayed a create that was already paid (order not listed yet) - never hand it out
+            logger.warning(f"[CHECKOUT SESSIONS] Key {key} returned paid session {session.id}, creating a new one")
+            with _lock:
+                _generations[fingerprint] = generation + 1
+            key, expires_at = _idempotency_key(fingerprint, generation + 1, uuid.uuid4().hex[:12])
+            session = create(key, expires_at)
+
+        now = time.time()
+        with _lock:
+            _sessions[fingerprint] = {
+                "session": session,
+                "expires_at": getattr(session, "expires_at", None) or expires_at,
+                "created_at": now,
+                "verified_at": now,
+            }
+            _evict_expired(now)
+        logger.info(f"[CHECKOUT SESSIONS] Created session {session.id}")
+        return session, False
+
+
+def _evict_expired(now: float):
+    """Drop expired entries (called with _lock held)"""
+    for fp in [fp for fp, e in _sessions.items() if e["expires_at"] <= now]:
+        _sessions.pop(fp, None)
+        _generations[fp] = _generations.get(fp, 0) + 1
+        fp_lock = _fingerprint_locks.get(fp)
+        if fp_lock is not None and not fp_lock.locked():
+            _fingerprint_locks.pop(fp, None)
+
+
+def forget_checkout_session(session_id: str):
+    """Call once a session is paid so the same cart never reuses it"""
+    if not session_id:
+        return
+    with _lock:
+        matches = [fp for fp, e in _sessions.items() if getattr(e["session"], "id", None) == session_id]
+    for fp in matches:
+        _retire(fp)
+        logger.info(f"[CHECKOUT SESSIONS] Retired paid session {session_id}")
+
+
+def clear_checkout_sessions():
+    """Clear the registry"""
+    with _lock:
+        _sessions.clear()
+        _generations.clear()
+        _fingerprint_locks.clear()
+    logger.info("[CHECKOUT SESSIONS] Registry cleared")
@@ -0,0 +1,220 @@
+# actions/circuit_breaker.py
+"""
+Circuit Breakers
+Fast-fail for backend endpoints that keep timing out or erroring, so a
+stageshipperapi outage costs each call microseconds instead of its full
+timeout=8/10/15 (and sequential flows no longer stack those waits).
+
+1. One breaker per (service, endpoint), fed by every requests call through
+   a Session.send hook. Failures are exceptions (timeouts, connection
+   errors) and HTTP 5xx; Laravel "status": 0 answers are successes
+2. Closed -> open once at least CIRCUIT_MIN_CALLS calls in the last
+   CIRCUIT_WINDOW seconds failed at CIRCUIT_FAILURE_RATE or more
+3. Open: calls raise CircuitOpenError (a requests ConnectionError) without
+   touching the network, for CIRCUIT_OPEN_SECONDS
+4. Half-open: CIRCUIT_HALF_OPEN_PROBES calls go through; a success closes
+   the breaker, a failure reopens it
+5. A per-service breaker ("<service> *") counts only exceptions across all
+   endpoints, so a dead host trips once instead of endpoint by endpoint
+
+Callers just see a failed request: the read caches (coupons, orders,
+wishlist, address book, user lookup, store directory) serve their last
+data, and the action wrapper (action_metrics) replies "try again shortly"
+when an action ends without an answer.
+
+Breakers guard the services in CIRCUIT_SERVICES (default: seller_api);
+CIRCUIT_BREAKERS=0 turns them off.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Tuple
+
+import requests
+
+from actions.action_metrics import _Counter, _Gauge, classify_url, note_circuit_rejection, register_metric
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_BREAKERS_ENABLED = os.getenv("CIRCUIT_BREAKERS", "1") != "0"
+CIRCUIT_SERVICES = {s.strip() for s in os.getenv("CIRCUIT_SERVICES", "seller_api").split(",") if s.strip()}
+
+FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW", "30"))
+OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "20"))
+HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+SERVICE_WIDE = "*"
+
+CIRCUIT_STATE = register_metric(_Gauge(
+    "rasa_circuit_breaker_state", "Breaker state (0 closed, 1 open, 2 half-open)", ("service", "endpoint")))
+CIRCUIT_REJECTED = register_metric(_Counter(
+    "rasa_circuit_breaker_rejected_total", "Calls fast-failed by an open breaker", ("service", "endpoint")))
+CIRCUIT_TRANSITIONS = register_metric(_Counter(
+    "rasa_circuit_breaker_transitions_total", "Breaker state changes", ("service", "endpoint", "state")))
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while its breaker is open"""
+
+
+# ============================================
+# BREAKER
+# ============================================
+
+class CircuitBreaker:
+    """Failure-rate breaker over a sliding time window"""
+
+    def __init__(self, service: str, endpoint: str):
+        self.service = service
+        self.endpoint = endpoint
+        self.state = CLOSED
+        self._calls: Deque[Tuple[float, bool]] = deque()  # (monotonic time, failed)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(0, service, endpoint)
+
+    def acquire(self) -> bool:
+        """
+        Admit one call.
+
+        Returns:
+            True if the call is a half-open probe (pass it back to release())
+
+        Raises:
+            CircuitOpenError while open (or half-open with all probes in flight)
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= OPEN_SECONDS:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and self._probes < HALF_OPEN_PROBES:
+                self._probes += 1
+                return True
+        CIRCUIT_REJECTED.inc(1, self.service, self.endpoint)
+        raise CircuitOpenError(f"circuit open for {self.service} {self.endpoint}")
+
+    def release(self, failed: bool, probe: bool):
+        """Record the outcome of an admitted call"""
+        now = time.monotonic()
+        with self._lock:
+            if probe:
+                self._probes = max(0, self._probes - 1)
+                if self.state == HALF_OPEN:
+                    if failed:
+                        self._open(now)
+                    else:
+                        self._calls.clear()
+                        self._transition(CLOSED)
+                return
+            if self.state != CLOSED:
+                return  # started before the breaker opened
+            self._calls.append((now, failed))
+            while self._calls and now - self._calls[0][0] > WINDOW_SECONDS:
+                self._calls.popleft()
+            if failed and len(self._calls) >= MIN_CALLS:
+                failures = sum(1 for _, f in self._calls if f)
+                if failures / len(self._calls) >= FAILURE_RATE:
+                    self._open(now)
+
+    def cancel(self, probe: bool):
+        """Give back a probe slot for a call that was never sent"""
+        if probe:
+            with self._lock:
+                self._probes = max(0, self._probes - 1)
+
+    def _open(self, now: float):
+        self._opened_at = now
+        self._calls.clear()
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"[CIRCUIT] {self.service} {self.endpoint}: {self.state} -> {state}")
+        self.state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state], self.service, self.endpoint)
+        CIRCUIT_TRANSITIONS.inc(1, self.service, self.endpoint, state)
+
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_lock = threading.Lock()
+
+
+def get_breaker(service: str, endpoint: str) -> CircuitBreaker:
+    key = (service, endpoint)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.setdefault(key, CircuitBreaker(service, endpoint))
+    return breaker
+
+
+def open_circuits() -> List[str]:
+    """"service endpoint" of every breaker that is not closed"""
+    return sorted(f"{b.service} {b.endpoint}" for b in list(_breakers.values()) if b.state != CLOSED)
+
+
+def clear_circuit_breakers():
+    """Forget all breakers (all closed again)"""
+    with _lock:
+        _breakers.clear()
+    CIRCUIT_STATE.clear()
+    logger.info("[CIRCUIT] Breakers reset")
+
+
+# ============================================
+# REQUESTS HOOK
+# ============================================
+
+def _guarded_send(send: Callable) -> Callable:
+    @functools.wraps(send)
+    def guarded_send(self, request, *args, **kwargs):
+        service, endpoint = classify_url(str(request.url))
+        if service not in CIRCUIT_SERVICES:
+            return send(self, request, *args, **kwargs)
+
+        host = get_breaker(service, SERVICE_WIDE)
+        breaker = get_breaker(service, endpoint)
+        try:
+            host_probe = host.acquire()
+            try:
+                probe = breaker.acquire()
+            except CircuitOpenError:
+                host.cancel(host_probe)
+                raise
+        except CircuitOpenError as e:
+            note_circuit_rejection()
+            logger.info(f"[CIRCUIT] Rejected {request.method} {service} {endpoint}")
+            raise CircuitOpenError(str(e), request=request)
+
+        failed = errored = True
+        try:
+            response = send(self, request, *args, **kwargs)
+            errored = False
+            failed = response.status_code >= 500
+            return response
+        finally:
+            breaker.release(failed, probe)
+            host.release(errored, host_probe)
+
+    guarded_send._circuit_breaker = True
+    return guarded_send
+
+
+def install_circuit_breakers():
+    """Guard requests.Session.send with the breakers (idempotent, no-op if disabled)"""
+    if not CIRCUIT_BREAKERS_ENABLED:
+        return
+    if not getattr(requests.Session.send, "_circuit_breaker", False):
+        requests.Session.send = _guarded_send(requests.Session.send)
+        logger.info(f"[CIRCUIT] Breakers installed for {', '.join(sorted(CIRCUIT_SERVICES))}")
@@ -0,0 +1,237 @@
+# actions/coupon_cache.py
+"""
+Coupon Catalog Cache
+getCouponList results per (shipper_id, user_id), plus a local evaluator
+for the rules the bot can check itself (minimum order, start / end date,
+discount type).
+
+1. ActionViewCoupons lists only coupons that apply to the current cart,
+   with the savings already worked out
+2. ActionApplyCoupon rejects a known coupon that is expired or below its
+   minimum without calling check-coupon (codes the bot doesn't know about
+   still go to the backend, which stays the source of truth)
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+API_BASE = os.getenv("SELLER_API_URL", "https://stageshipperapi.thedelivio.com/api")
+
+# Cache timeout (seconds)
+COUPON_CACHE_TIMEOUT = int(os.getenv("COUPON_CACHE_TTL", "300"))  # 5 minutes
+
+# (shipper_id, user_id) -> getCouponList "data"
+_coupon_cache: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+_coupon_timestamps: Dict[Tuple[str, str], float] = {}
+_lock = threading.Lock()
+
+_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%m/%d/%Y", "%d-%m-%Y")
+
+
+def _coupon_key(user_id: Any, shipper_id: Any = "") -> Tuple[str, str]:
+    return (str(shipper_id or ""), str(user_id))
+
+
+# ============================================
+# CATALOG
+# ============================================
+
+def get_coupons(user_id: Any, shipper_id: Any = "", timeout: int = 10) -> List[Dict[str, Any]]:
+    """
+    getCouponList for a user and shipper ("" = general coupons), cached.
+
+    Raises:
+        requests exceptions / ValueError like a direct getCouponList call
+    """
+    key = _coupon_key(user_id, shipper_id)
+    with _lock:
+        ts = _coupon_timestamps.get(key)
+        if ts is not None and (time.time() - ts) < COUPON_CACHE_TIMEOUT:
+            logger.debug(f"[COUPON CACHE] Hit for {key}")
+            return list(_coupon_cache[key])
+
+    payload = {"user_id": str(user_id), "shipper_id": str(shipper_id or "")}
+    try:
+        response = requests.post(f"{API_BASE}/getCouponList", json=payload, timeout=timeout)
+        coupons = response.json().get("data", []) or []
+    except Exception as e:
+        with _lock:
+            stale = _coupon_cache.get(key)
+        if stale is not None:
+            logger.warning(f"[COUPON CACHE] Refresh failed for {key}, serving stale list: {e}")
+            return list(stale)
+        raise
+    if not isinstance(coupons, list):
+        coupons = []
+    with _lock:
+        _coupon_cache[key] = list(coupons)
+        _coupon_timestamps[key] = time.time()
+    logger.info(f"[COUPON CACHE] Loaded {len(coupons)} coupons for {key}")
+    return list(coupons)
+
+
+def get_cached_coupon(user_id: Any, code: str) -> Optional[Dict[str, Any]]:
+    """A coupon by code from any fresh list cached for this user (no API call)"""
+    if not code:
+        return None
+    code = code.strip().upper()
+    now = time.time()
+    with _lock:
+        for key, coupons in _coupon_cache.items():
+            if key[1] != str(user_id) or (now - _coupon_timestamps.get(key, 0)) >= COUPON_CACHE_TIMEOUT:
+                continue
+            for coupon in coupons:
+                if str(coupon.get("code", "")).strip().upper() == code:
+                    return coupon
+    return None
+
+
+def invalidate_coupons(user_id: Any):
+    """Forget every coupon list cached for a user (e.g. after a one-time coupon was used)"""
+    with _lock:
+        for key in [k for k in _coupon_cache if k[1] == str(user_id)]:
+            _coupon_cache.pop(key, None)
+            _coupon_timestamps.pop(key, None)
+
+
+def clear_coupon_cache():
+    """Clear all cached coupon lists"""
+    with _lock:
+        _coupon_cache.clear()
+        _coupon_timestamps.clear()
+    logger.info("[COUPON CACHE] Cache cleared")
+
+
+# ============================================
+# LOCAL EVALUATION
+# ============================================
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    if not value or not isinstance(value, str):
+        return None
+    text = value.strip()
+    for fmt in _DATE_FORMATS:
+        has_time = "%H" in fmt
+        try:
+            parsed = datetime.strptime(text[:19] if has_time else text[:10], fmt)
+        except ValueError:
+            continue
+        if not has_time:
+            # Date-only end dates are valid for the whole day
+            parsed = parsed.replace(hour=23, minute=59, second=59)
+        return parsed
+    return None
+
+
+def cart_subtotal(cart: Dict[str, Any]) -> float:
+    """
+    Subtotal coupons are checked against, from a cart-list "data" dict:
+    sum of cartlist lines, else orderMetaData.sub_total_amount.
+    """
+    total = 0.0
+    for item in cart.get("cartlist", []) or []:
+        price = _to_float(item.get("discounted_price") or item.get("price"))
+        try:
+            qty = int(item.get("quantity", 1))
+        except (TypeError, ValueError):
+            qty = 1
+        total += price * qty
+    if total <= 0:
+        total = _to_float((cart.get("orderMetaData") or {}).get("sub_total_amount"))
+    return round(total, 2)
+
+
+def is_percentage(coupon: Dict[str, Any]) -> bool:
+    """P = percentage off, anything else is a fixed amount"""
+    return str(coupon.get("discount_type") or coupon.get("type") or "").upper() == "P"
+
+
+def coupon_savings(coupon: Dict[str, Any], cart_total: float) -> float:
+    """Discount this coupon gives on cart_total (before tax)"""
+    discount = _to_float(coupon.get("discount"))
+    if is_percentage(coupon):
+        savings = cart_total * discount / 100
+        cap = _to_float(coupon.get("max_discount") or coupon.get("max_amount"))
+        if cap > 0:
+            savings = min(savings, cap)
+    else:
+        savings = discount
+    return round(max(0.0, min(savings, cart_total)), 2)
+
+
+def evaluate_coupon(coupon: Dict[str, Any], cart_total: Optional[float] = None,
+                    now: Optional[datetime] = None) -> Tuple[bool, str, float]:
+    """
+    Check the rules the bot knows about. Unknown or unparseable fields never
+    reject a coupon - the backend has the final say.
+
+    Args:
+        cart_total: cart subtotal, or None when unknown (minimum not checked)
+
+    Returns:
+        (applicable, reason if not, savings on cart_total)
+    """
+    now = now or datetime.now()
+
+    date_end = _parse_date(coupon.get("date_end"))
+    if date_end and date_end < now:
+        return False, "This coupon has expired.", 0.0
+
+    date_start = _parse_date(coupon.get("date_start"))
+    if date_start and date_start.replace(hour=0, minute=0, second=0) > now:
+        return False, "This coupon is not active yet.", 0.0
+
+    if _to_float(coupon.get("discount")) <= 0:
+        return False, "This coupon has no discount.", 0.0
+
+    if cart_total is None:
+        return True, "", 0.0
+
+    min_amount = _to_float(coupon.get("min_amount"))
+    if min_amount > 0 and cart_total < min_amount:
+        return False, f"This coupon needs a minimum order of ${min_amount:.2f} (your cart: ${cart_total:.2f}).", 0.0
+
+    return True, "", coupon_savings(coupon, cart_total)
+
+
+def applicable_coupons(coupons: List[Dict[str, Any]], cart_total: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Coupons that pass evaluate_coupon, each with "savings", best savings first"""
+    now = datetime.now()
+    result = []
+    for coupon in coupons:
+        ok, _, savings = evaluate_coupon(coupon, cart_total, now)
+        if ok:
+            result.append(dict(coupon, savings=savings))
+    result.sort(key=lambda c: c["savings"], reverse=True)
+    return result
+
+
+def precheck_coupon(user_id: Any, code: str, cart_total: Optional[float] = None) -> Tuple[bool, str]:
+    """
+    Local check before check-coupon.
+
+    Returns:
+        (False, reason) only for a cached coupon that clearly fails its rules;
+        (True, "") otherwise, including codes the bot has not seen
+    """
+    coupon = get_cached_coupon(user_id, code)
+    if not coupon:
+        return True, ""
+    ok, reason, _ = evaluate_coupon(coupon, cart_total)
+    if not ok:
+        logger.info(f"[COUPON CACHE] Rejected {code} locally: {reason}")
+    return ok, reason
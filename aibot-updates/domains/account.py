@@ -0,0 +1,562 @@
+# actions/domains/account.py
+"""
+Account Actions
+Login by phone number, greeting, logout and conversation restart.
+
+1. action_login_user looks the customer up by WhatsApp number (cached in
+   user_cache) and other domains hand the login step to it
+2. action_custom_greet greets returning customers by name
+"""
+import json
+import re
+from typing import Any, Dict, List, Text
+
+import requests
+from rasa_sdk import Action, Tracker
+from rasa_sdk.events import EventType, SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.action_registry import get_action
+from actions.domains.common import API_BASE, session_log
+
+
+class ActionPromptLogin(Action):
+    def name(self) -> Text:
+        return "action_prompt_login"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[EventType]:
+        dispatcher.utter_message(text="You need to log in to continue. If you already have an account, please choose 'Login' and we'll ask for your phone and password. If you're new, choose 'Register' to sign up on our website.",
+                                 buttons=[
+                                     {"title": "Login", "payload": "login"},
+                                     {"title": "Register", "payload": "register"}
+                                 ])
+        return []
+
+
+class ActionLoginUser(Action):
+    """Enhanced login with pre-selected product handling"""
+
+    def name(self) -> Text:
+        return "action_login_user"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+        events: List[EventType] = []
+
+        login_step = tracker.get_slot("login_step") or ""
+        login_phone = tracker.get_slot("login_phone") or ""
+        login_password = tracker.get_slot("login_password") or ""
+        last_message = (tracker.latest_message.get("text") or "").strip()
+
+        def ask_phone() -> List[EventType]:
+            dispatcher.utter_message(text="Please enter your phone number:")
+            return [SlotSet("login_step", "awaiting_phone"), SlotSet("login_password", None)]
+
+        def ask_password() -> List[EventType]:
+            dispatcher.utter_message(text="Thanks. Now enter your password:")
+            return [SlotSet("login_step", "awaiting_password")]
+
+        # Entry point
+        if not login_step:
+            return ask_phone()
+
+        # Collect phone
+        if login_step == "awaiting_phone":
+            if len(re.sub(r"\D", "", last_message)) >= 6 or len(last_message) >= 6:
+                events += [SlotSet("login_phone", last_message)]
+                return events + ask_password()
+            dispatcher.utter_message(
+                text="That doesn't look like a phone number. Please re-enter your phone number."
+            )
+            return [SlotSet("login_step", "awaiting_phone")]
+
+        # Collect password and authenticate
+        if login_step == "awaiting_password":
+            password = login_password
+            phone = login_phone
+
+            if not password:
+                dispatcher.utter_message(text="It seems you haven't provided a password. Please enter your password:")
+                return [SlotSet("login_step", "awaiting_password")]
+
+            try:
+                payload = {
+                    "phone": phone,
+                    "password": password,
+                    "iosDeviceToken": "",
+                    "androidDeviceToken": "",
+                }
+                resp = requests.post(
+                    f"{API_BASE}/customer-phone-login", json=payload, timeout=15
+                )
+                data = resp.json()
+
+                status = data.get("status", 0)
+                user_id = (
+                    data.get("user_id")
+                    or data.get("userid")
+                    or data.get("data", {}).get("user_id")
+                )
+
+                if status == 1 and user_id:
+                    # ✅ LOGIN SUCCESS
+                    dispatcher.utter_message(text="Login successful! 🎉")
+
+                    # 🎯 CHECK IF USER HAD A SELECTED PRODUCT BEFORE LOGIN
+                    selected_product = tracker.get_slot("selected_product")
+                    stored_zipcode = tracker.get_slot("zipcode")
+
+                    # Detect channel
+                    input_channel = tracker.get_latest_input_channel()
+                    is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+                    # 🛒 IF PRODUCT WAS SELECTED BEFORE LOGIN
+                    if selected_product:
+                        try:
+                            product = json.loads(selected_product)
+                            product_name = product.get("title", "Selected Product")
+
+                            if is_whatsapp:
+                                # WhatsApp interactive buttons (max 3)
+                                dispatcher.utter_message(
+                                    text=f"🛍️ You were viewing: *{product_name}*\n\nWhat would you like to do?",
+                                    json_message={
+                                        "type": "buttons",
+                                        "text": f"🛍️ You were viewing: *{product_name}*\n\nWhat would you like to do?",
+                                        "buttons": [
+                                            {"id": "add_to_cart", "title": "➕ Add to Cart"},
+                                            {"id": "view_cart", "title": "🛒 View Cart"},
+                                            {"id": "browse_products", "title": "🛍️ Browse More"}
+                                        ]
+                                    }
+                                )
+                            else:
+                                dispatcher.utter_message(
+                                    text=f"You were viewing: **{product_name}**\n\nWhat would you like to do?",
+                                    buttons=[
+                                        {"title": "➕ Add to Cart", "payload": "/add_to_cart"},
+                                        {"title": "🛒 View Cart", "payload": "/view_cart"},
+                                        {"title": "🛍️ Browse More", "payload": "/show_categories"},
+                                        {"title": "📍 Find Stores", "payload": "find stores"}
+                                    ]
+                                )
+                        except Exception as e:
+                            session_log.warning("[WARN] Could not parse selected product: %s", e)
+                            # Fallback to standard post-login menu
+                            selected_product = None
+
+                    # 📍 STANDARD POST-LOGIN MENU (no pre-selected product)
+                    if not selected_product:
+                        if stored_zipcode:
+                            if is_whatsapp:
+                                # WhatsApp: Use ONLY json_message to avoid duplicates
+                                dispatcher.utter_message(
+                                    json_message={
+                                        "type": "buttons",
+                                        "text": "Welcome back! What would you like to do?",
+                                        "buttons": [
+                                            {"id": "view_cart", "title": "🛒 View Cart"},
+                                            {"id": "browse_products", "title": "🛍️ Browse Products"},
+                                            {"id": "my_orders", "title": "📦 My Orders"}
+                                        ]
+                                    }
+                                )
+                            else:
+                                dispatcher.utter_message(
+                                    text=f"Welcome back! What would you like to do?",
+                                    buttons=[
+                                        {"title": "🛒 View Cart", "payload": "/view_cart"},
+                                        {"title": "🛍️ Browse Products", "payload": "/show_categories"},
+                                        {"title": "📍 Find Stores", "payload": "find stores near me"},
+                                        {"title": "📦 My Orders", "payload": "/track_my_orders"}
+                                    ]
+                                )
+                        else:
+                            if is_whatsapp:
+                                # WhatsApp: Use ONLY json_message to avoid duplicates
+                                dispatcher.utter_message(
+                                    json_message={
+                                        "type": "buttons",
+                                        "text": "Great! Let's get started. What would you like to do?",
+                                        "buttons": [
+                                            {"id": "browse_products", "title": "🛍️ Browse Products"},
+                                            {"id": "view_cart", "title": "🛒 View Cart"},
+                                            {"id": "find_stores", "title": "📍 Find Stores"}
+                                        ]
+                                    }
+                                )
+                            else:
+                                dispatcher.utter_message(
+                                    text="Great! Let's get started. What would you like to do?",
+                                    buttons=[
+                                        {"title": "📍 Find Stores", "payload": "find stores near me"},
+                                        {"title": "🛍️ Browse Products", "payload": "/show_categories"},
+                                        {"title": "🛒 View Cart", "payload": "/view_cart"}
+                                    ]
+                                )
+
+                    # Store user_id and clear transient login slots
+                    events += [SlotSet("user_id", str(user_id))]
+                    events += [
+                        SlotSet("login_step", None),
+                        SlotSet("login_phone", None),
+                        SlotSet("login_password", None)
+                    ]
+                    return events
+
+                # ❌ LOGIN FAILURE
+                msg = data.get("message") or "Login failed. Please check your phone and password."
+                dispatcher.utter_message(text=msg)
+                dispatcher.utter_message(text="Please try entering your password again.")
+                return [SlotSet("login_step", "awaiting_password"), SlotSet("login_password", None)]
+
+            except Exception as e:
+                session_log.warning("[EXCEPTION] in ActionLoginUser: %s", e)
+                dispatcher.utter_message(
+                    text="Sorry, there was a problem contacting the login service. Please try again."
+                )
+                return [SlotSet("login_step", "awaiting_password"), SlotSet("login_password", None)]
+
+        # Default fallback
+        return ask_phone()
+
+
+class ActionCustomGreet(Action):
+    """Modified to show store-branded greeting for dedicated bots"""
+
+    def name(self) -> Text:
+        return "action_custom_greet"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[EventType]:
+        try:
+            session_log.debug("[DEBUG] ActionCustomGreet triggered")
+
+            # If login in progress, continue login flow
+            if tracker.get_slot("login_step"):
+                try:
+                    session_log.debug("[DEBUG] Login step active, delegating to login")
+                    login_action = get_action("action_login_user")
+                    return login_action.run(dispatcher, tracker, domain)
+                except Exception as e:
+                    session_log.warning("[EXCEPTION] delegating to login: %s", e)
+                    dispatcher.utter_message(text="Hello! How can I help you today?")
+                    return []
+
+            # Check user status
+            user_id = tracker.get_slot("user_id")
+            is_logged_in = user_id and isinstance(user_id, str) and user_id.isdigit()
+
+            # Check if already greeted
+            has_been_greeted = tracker.get_slot("has_been_greeted")
+
+            # Detect channel
+            input_channel = tracker.get_latest_input_channel()
+            is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+            # ⭐ NEW: Check if this is a store-specific bot
+            is_dedicated_bot = tracker.get_slot("is_dedicated_bot")
+            store_name = tracker.get_slot("store_name")
+            store_id = tracker.get_slot("store_id")
+
+            session_log.debug("🔍 DEBUG [GREETING]: is_dedicated_bot = %s", is_dedicated_bot)
+            session_log.debug("🔍 DEBUG [GREETING]: store_name = '%s'", store_name)
+            session_log.debug("🔍 DEBUG [GREETING]: store_id = '%s'", store_id)
+            session_log.debug("🔍 DEBUG [GREETING]: input_channel = '%s'", input_channel)
+            session_log.debug("🔍 DEBUG [GREETING]: is_whatsapp = %s", is_whatsapp)
+
+            # ✅ ALWAYS SHOW STORE GREETING FOR DEDICATED BOTS
+            if is_dedicated_bot and store_name:
+                session_log.debug("[GREETING] Store-specific bot: %s", store_name)
+
+                if is_whatsapp:
+                    # WhatsApp: Use list message for logged-in users (more options)
+                    if is_logged_in:
+                        dispatcher.utter_message(
+                            json_message={
+                                "type": "list",
+                                "text": f"👋 Welcome to {store_name}!\n\nI'm your personal shopping assistant. What would you like to do?",
+                                "button_text": "Menu Options",
+                                "sections": [
+                                    {
+                                        "title": "Shopping",
+                                        "rows": [
+                                            {"id": "browse_products", "title": "🛍️ Browse Products", "description": "View our catalog"},
+                                            {"id": "search_products", "title": "🔍 Search", "description": "Find specific items"},
+                                            {"id": "view_wishlist", "title": "❤️ My Favorites", "description": "Saved items for quick reorder"}
+                                        ]
+                                    },
+                                    {
+                                        "title": "My Account",
+                                        "rows": [
+                                            {"id": "view_cart", "title": "🛒 View Cart", "description": "See items in your cart"},
+                                            {"id": "my_orders", "title": "📦 My Orders", "description": "Track your orders"}
+                                        ]
+                                    }
+                                ]
+                            }
+                        )
+                    else:
+                        # Not logged in - just show Browse Products (login happens automatically via WhatsApp)
+                        dispatcher.utter_message(
+                            json_message={
+                                "type": "buttons",
+                                "text": f"👋 Welcome to {store_name}!\n\nShop our products with ease.",
+                                "buttons": [
+                                    {"id": "browse_products", "title": "🛍️ View Products"}
+                                ]
+                            }
+                        )
+                else:
+                    if is_logged_in:
+                        dispatcher.utter_message(
+                            text=f"👋 **Welcome to {store_name}!**\n\n"
+                                 f"I'm your personal shopping assistant. What would you like to do?",
+                            buttons=[
+                                {"title": "🛍️ Browse Our Products", "payload": "/browse_store_products"},
+                                {"title": "🛒 View Cart", "payload": "/view_cart"},
+                                {"title": "📦 My Orders", "payload": "/track_my_orders"},
+                                {"title": "🚪 Logout", "payload": "/logout"}
+                            ]
+                        )
+                    else:
+                        # Not logged in - just show Browse Products (login happens automatically)
+                        dispatcher.utter_message(
+                            text=f"👋 **Welcome to {store_name}!**\n\n"
+                                 f"Shop our products with ease. What would you like to do?",
+                            buttons=[
+                                {"title": "🛍️ Browse Our Products", "payload": "/browse_store_products"}
+                            ]
+                        )
+
+                return [SlotSet("has_been_greeted", True)]
+
+            # ✅ MARKETPLACE BOT - SHOW FIRST-TIME GREETING
+            elif not has_been_greeted:
+                session_log.debug("[GREETING] Marketplace bot - first time")
+
+                if is_whatsapp:
+                    if is_logged_in:
+                        # Use list message for more options
+                        dispatcher.utter_message(
+                            json_message={
+                                "type": "list",
+                                "text": "👋 Welcome back! I'm your AnythingInstantly Shop Bot.\n\nWhat would you like to do?",
+                                "button_text": "Menu Options",
+                                "sections": [
+                                    {
+                                        "title": "Shopping",
+                                        "rows": [
+                                            {"id": "browse_products", "title": "🛍️ Browse Products", "description": "View categories & products"},
+                                            {"id": "find_stores", "title": "📍 Find Stores", "description": "Stores near you"},
+                                            {"id": "view_wishlist", "title": "❤️ My Favorites", "description": "Quick reorder saved items"}
+                                        ]
+                                    },
+                                    {
+                                        "title": "My Account",
+                                        "rows": [
+                                            {"id": "view_cart", "title": "🛒 View Cart", "description": "Items in your cart"},
+                                            {"id": "my_orders", "title": "📦 My Orders", "description": "Track your orders"}
+                                        ]
+                                    }
+                                ]
+                            }
+                        )
+                    else:
+                        dispatcher.utter_message(
+                            json_message={
+                                "type": "buttons",
+                                "text": "👋 Hi! Welcome to AnythingInstantly!\n\nI can help you shop from local stores.",
+                                "buttons": [
+                                    {"id": "browse_products", "title": "🛍️ Browse Products"},
+                                    {"id": "find_stores", "title": "📍 Find Stores"},
+                                    {"id": "login", "title": "🔐 Login"}
+                                ]
+                            }
+                        )
+                else:
+                    if is_logged_in:
+                        dispatcher.utter_message(
+                            text="👋 **Welcome back!** I'm your AnythingInstantly Shop Bot.\n\n"
+                                 "What would you like to do today?",
+                            buttons=[
+                                {"title": "🛍️ Browse Products", "payload": "/show_categories"},
+                                {"title": "🏪 Find Stores", "payload": "find stores near me"},
+                                {"title": "🛒 View Cart", "payload": "/view_cart"},
+                                {"title": "📦 My Orders", "payload": "/track_my_orders"},
+                                {"title": "🚪 Logout", "payload": "/logout"}
+                            ]
+                        )
+                    else:
+                        dispatcher.utter_message(
+                            text="👋 **Hi! Welcome to AnythingInstantly!**\n\n"
+                                 "I can help you shop from local stores. What would you like to do?",
+                            buttons=[
+                                {"title": "🛍️ Browse Products", "payload": "/show_categories"},
+                                {"title": "🏪 Find Stores", "payload": "find stores near me"},
+                                {"title": "🔐 Login", "payload": "/login"}
+                            ]
+                        )
+
+                return [SlotSet("has_been_greeted", True)]
+
+            # ✅ RETURNING USER - SHORT GREETING
+            else:
+                session_log.debug("[GREETING] Returning user")
+                if is_whatsapp:
+                    if is_logged_in:
+                        dispatcher.utter_message(
+                            text="Hello again! 👋\n\n"
+                                 "Reply: *1* Browse | *2* Cart | *3* Orders"
+                        )
+                    else:
+                        dispatcher.utter_message(
+                            text="Hello again! 👋\n\n"
+                                 "Reply: *1* Browse | *2* Stores | *3* Login"
+                        )
+                else:
+                    if is_logged_in:
+                        dispatcher.utter_message(
+                            text="Hello again! What would you like to do?",
+                            buttons=[
+                                {"title": "🛍️ Browse Products", "payload": "/show_categories"},
+                                {"title": "🏪 Find Stores", "payload": "find stores near me"},
+                                {"title": "🛒 View Cart", "payload": "/view_cart"},
+                                {"title": "📦 My Orders", "payload": "/track_my_orders"}
+                            ]
+                        )
+                    else:
+                        dispatcher.utter_message(
+                            text="Hello again! What would you like to do?",
+                            buttons=[
+                                {"title": "🛍️ Browse Products", "payload": "/show_categories"},
+                                {"title": "🏪 Find Stores", "payload": "find stores near me"},
+                                {"title": "🔐 Login", "payload": "/login"}
+                            ]
+                        )
+
+                return []
+
+        except Exception as e:
+            session_log.warning("[CRITICAL EXCEPTION] in ActionCustomGreet: %s", e)
+            import traceback
+            traceback.print_exc()
+
+            # Emergency fallback
+            dispatcher.utter_message(
+                text="Hi! How can I help you today?",
+                buttons=[
+                    {"title": "Browse Products", "payload": "/show_categories"},
+                    {"title": "Find Stores", "payload": "find stores"}
+                ]
+            )
+            return []
+
+
+class ActionLogoutUser(Action):
+    """Handle user logout - clear all user-related slots"""
+
+    def name(self) -> Text:
+        return "action_logout_user"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+
+        if not user_id:
+            dispatcher.utter_message(text="You are not currently logged in.")
+            return []
+
+        # Clear all user-related data
+        dispatcher.utter_message(
+            text="You have been logged out successfully. Have a great day! 👋",
+            buttons=[
+                {"title": "Login Again", "payload": "login"},
+                {"title": "Browse Products", "payload": "/show_categories"},
+                {"title": "Find Stores", "payload": "find stores near me"}
+            ]
+        )
+
+        return [
+            SlotSet("user_id", None),
+            SlotSet("login_step", None),
+            SlotSet("login_phone", None),
+            SlotSet("login_password", None),
+            SlotSet("selected_product", None),
+            SlotSet("recent_products", None),
+            SlotSet("order_id", None)
+        ]
+
+
+class ActionRestart(Action):
+    """Reset all slots and restart conversation"""
+
+    def name(self) -> Text:
+        return "action_restart"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        # Detect channel
+        input_channel = tracker.get_latest_input_channel()
+        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+        # ✅ Show appropriate restart message based on channel
+        if is_whatsapp:
+            # Use ONLY json_message for WhatsApp to avoid duplicate messages
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": "🔄 Restarting...\n\n👋 Hi! I'm your shopping assistant. How can I help?",
+                    "buttons": [
+                        {"id": "browse_products", "title": "🛍️ Browse Products"},
+                        {"id": "find_stores", "title": "📍 Find Stores"},
+                        {"id": "login", "title": "🔐 Login"}
+                    ]
+                }
+            )
+        else:
+            dispatcher.utter_message(
+                text="🔄 Restarting conversation...\n\n"
+                     "👋 Hi! I'm your AnythingInstantly Shop Bot. How can I assist you today?",
+                buttons=[
+                    {"title": "Browse Categories", "payload": "Show Categories"},
+                    {"title": "Find Stores", "payload": "Find Stores Near Me"},
+                    {"title": "Login", "payload": "login"}
+                ]
+            )
+
+        # Clear ALL slots - DON'T trigger followup action
+        return [
+            SlotSet("user_id", None),
+            SlotSet("recent_products", None),
+            SlotSet("selected_product", None),
+            SlotSet("zipcode", None),
+            SlotSet("selected_store", None),
+            SlotSet("stores_list", None),
+            SlotSet("login_step", None),
+            SlotSet("login_phone", None),
+            SlotSet("login_password", None),
+            SlotSet("has_been_greeted", True),  # ✅ Mark as greeted to avoid double greeting
+            SlotSet("store_context", False),
+            SlotSet("search_page", None),
+            SlotSet("last_search_string", None),
+            SlotSet("stripe_session_id", None),
+            SlotSet("payment_amount", None),
+            SlotSet("pending_action", None),
+            SlotSet("pending_query", None),
+            SlotSet("last_zipcode", None)
+            # ✅ NO FollowupAction - we already sent the greeting above
+        ]
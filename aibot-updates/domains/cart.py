@@ -0,0 +1,1517 @@
+# actions/domains/cart.py
+"""
+Cart Actions
+Add, view, change, undo and clear cart items, plus WhatsApp native cart
+orders (the catalog "Send to business" message).
+
+1. Cart reads go through cart_cache; every write invalidates it
+2. Native orders are added in bulk by cart_sync
+"""
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Text
+
+import requests
+from rasa_sdk import Action, Tracker
+from rasa_sdk.events import EventType, FollowupAction, SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.action_logging import LazyJson
+from actions.action_metrics import in_action_context
+from actions.backend_client import seller_post
+from actions.cart_cache import get_cart_list, invalidate_cart
+from actions.cart_sync import reconcile_cart, update_cart_line
+from actions.domains.common import API_BASE, cart_log, store_log
+from actions.user_cache import (
+    cache_user_lookup,
+    get_cached_user_lookup,
+    get_stale_user_lookup,
+    invalidate_user_lookup,
+)
+
+
+class ActionAddToCart(Action):
+    def name(self) -> Text:
+        return "action_add_to_cart"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        # Require login: user_id must be set and numeric
+        user_id = tracker.get_slot("user_id")
+        if not user_id or not isinstance(user_id, str) or not user_id.isdigit():
+            # Check channel for WhatsApp
+            input_channel = tracker.get_latest_input_channel()
+            is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+            if is_whatsapp:
+                # WhatsApp interactive buttons
+                dispatcher.utter_message(
+                    text="You need to log in before adding a product to your cart.",
+                    json_message={
+                        "type": "buttons",
+                        "text": "You need to log in before adding a product to your cart.",
+                        "buttons": [
+                            {"id": "login", "title": "🔐 Login"},
+                            {"id": "register", "title": "📝 Register"}
+                        ]
+                    }
+                )
+            else:
+                # Web widget buttons
+                dispatcher.utter_message(
+                    text="You need to log in before adding a product to your cart. Please type 'login' to log in.",
+                    buttons=[
+                        {"title": "Login", "payload": "login"},
+                        {"title": "Register", "payload": "register"}
+                    ]
+                )
+            return []  # ← Changed from FollowupAction to empty return
+
+        selected_product_json = tracker.get_slot("selected_product")
+        if not selected_product_json:
+            dispatcher.utter_message(text="You have not selected a product to add. Please select a product first.")
+            return []
+
+        try:
+            product = json.loads(selected_product_json)
+        except (json.JSONDecodeError, TypeError) as e:
+            cart_log.warning("[EXCEPTION] parsing selected product: %s", e)
+            dispatcher.utter_message(text="Sorry, I had trouble with your selected product.")
+            return []
+
+        product_id = product.get("product_id")
+        shipper_id = product.get("shipper_id")
+        if not product_id or not shipper_id:
+            dispatcher.utter_message(text="Selected product information incomplete.")
+            return []
+
+        payload = {
+            "user_id": user_id,
+            "quantity": 1,
+            "product_id": product_id,
+            "shipper_id": shipper_id,
+        }
+
+        try:
+            url = f"{API_BASE}/add-product-to-cart"
+            res = requests.post(url, json=payload, timeout=8)
+            invalidate_cart(user_id)
+            cart_log.debug("[API CALL] POST %s - Status: %s, Body: %s", url, res.status_code, LazyJson(payload))
+            resp_json = res.json()
+            cart_log.debug("[API RESPONSE] %s", LazyJson(resp_json))
+
+            if res.status_code == 200 and resp_json.get("status") == 1:
+                product_name = product.get('title', 'The product')
+
+                # Check channel for WhatsApp
+                input_channel = tracker.get_latest_input_channel()
+                is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+                if is_whatsapp:
+                    # WhatsApp interactive buttons with Favorites option
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": f"🛒 *{product_name}* added to cart!\n\nWhat would you like to do next?",
+                            "buttons": [
+                                {"id": "view_cart", "title": "🛒 View Cart"},
+                                {"id": "add_to_wishlist", "title": "❤️ Save to Favorites"},
+                                {"id": "continue_shopping", "title": "🛍️ Continue Shopping"}
+                            ]
+                        }
+                    )
+                else:
+                    # Web widget buttons
+                    dispatcher.utter_message(
+                        text=f"🛒 {product_name} has been added to your cart!\n\nWhat would you like to do next?",
+                        buttons=[
+                            {"title": "🛒 View Cart", "payload": "View Cart"},
+                            {"title": "❤️ Save to Favorites", "payload": "/add_to_wishlist"},
+                            {"title": "🛍️ Continue Shopping", "payload": "/show_categories"}
+                        ]
+                    )
+
+            else:
+                msg = resp_json.get("message", "Could not add the product to your cart, please try again.")
+                dispatcher.utter_message(text=msg)
+        except Exception as e:
+            cart_log.warning("[EXCEPTION] adding product to cart: %s", e)
+            dispatcher.utter_message(text="An error occurred while adding to cart.")
+        return []
+
+
+class ActionViewCart(Action):
+    """Enhanced cart view with empty cart handling + remove buttons"""
+
+    def name(self) -> Text:
+        return "action_view_cart"
+
+    def run(
+        self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
+    ) -> List[EventType]:
+        user_id = tracker.get_slot("user_id")
+        store_id = tracker.get_slot("store_id")  # Get store filter
+
+
+        # Require login
+        if not user_id or not isinstance(user_id, str) or not user_id.isdigit():
+            dispatcher.utter_message(text="You need to log in before viewing your cart.")
+            return [FollowupAction("action_prompt_login")]
+
+        # Check if a coupon is applied and include it in cart request
+        applied_coupon_id = tracker.get_slot("applied_coupon_id") or ""
+        payload = {"user_id": user_id, "coupon_id": applied_coupon_id}
+
+        # Add store filter if available (multi-tenant support)
+        if store_id:
+            payload["shipper_id"] = str(store_id)
+
+        cart_log.debug("[CART VIEW] Fetching cart with coupon_id: %s, shipper_id: %s", applied_coupon_id, store_id)
+
+        # Detect channel
+        input_channel = tracker.get_latest_input_channel()
+        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+        try:
+            # Snapshot cache - reused until the cart is mutated or the TTL expires
+            status_code, data = get_cart_list(user_id, store_id, applied_coupon_id, timeout=10)
+
+            cart_log.debug("[CART API] Status Code: %s", status_code)
+            cart_log.debug("[CART API] Parsed JSON Status: %s", data.get('status'))
+            cart_log.debug("[CART API] API Code: %s", data.get('code'))
+
+            if status_code != 200:
+                cart_log.warning("[CART API] HTTP Error: Status code %s", status_code)
+                dispatcher.utter_message(text="Sorry, I couldn't retrieve your cart details right now.")
+                return []
+
+            # Check for EMPTY CART using API code 402
+            api_code = data.get("code")
+            api_status = data.get("status")
+
+            if api_code == 402 or (api_status == 0 and "Lonely" in data.get("message", "").lower()):
+                cart_log.debug("[CART API] ✅ EMPTY CART DETECTED - Code: %s, Status: %s", api_code, api_status)
+
+                if is_whatsapp:
+                    # Use WhatsApp interactive buttons
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": "🛒 Your cart is empty! Let's find something great.\n\nWhat would you like to do?",
+                            "buttons": [
+                                {"id": "browse_products", "title": "🛍️ Browse Products"},
+                                {"id": "my_orders", "title": "📦 My Orders"}
+                            ]
+                        }
+                    )
+                else:
+                    dispatcher.utter_message(
+                        text="🛒 **Your cart is empty!** Let's find something great.",
+                        buttons=[
+                            {"title": "🛍️ Browse Products", "payload": "/show_categories"},
+                            {"title": "📦 My Orders", "payload": "/track_my_orders"}
+                        ]
+                    )
+                return []
+
+            if api_status != 1:
+                cart_log.warning("[CART API] API Error: Status field is %s, Code: %s", api_status, api_code)
+                dispatcher.utter_message(text="Sorry, I couldn't retrieve your cart details right now.")
+                return []
+
+            cart_data = data.get("data")
+            if not isinstance(cart_data, dict):
+                cart_log.warning("[CART API] Error: 'data' is not a dict")
+                dispatcher.utter_message(text="Sorry, I couldn't retrieve your cart details right now.")
+                return []
+
+            cartlist = cart_data.get("cartlist", [])
+            cart_log.debug("[CART API] Cart List Length: %s", len(cartlist))
+
+            if not cartlist or len(cartlist) == 0:
+                cart_log.debug("[CART API] ✅ EMPTY CART - Empty cartlist")
+
+                if is_whatsapp:
+                    # Use WhatsApp interactive buttons
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": "🛒 Your cart is empty! Let's find something great.\n\nWhat would you like to do?",
+                            "buttons": [
+                                {"id": "browse_products", "title": "🛍️ Browse Products"},
+                                {"id": "my_orders", "title": "📦 My Orders"}
+                            ]
+                        }
+                    )
+                else:
+                    dispatcher.utter_message(
+                        text="🛒 **Your cart is empty!** Let's find something great.",
+                        buttons=[
+                            {"title": "🛍️ Browse Products", "payload": "/show_categories"},
+                            {"title": "📦 My Orders", "payload": "/track_my_orders"}
+                        ]
+                    )
+                return []
+
+            # 🛍️ CART HAS ITEMS - Show details with remove options
+            cart_log.debug("[CART API] ✅ CART HAS %s ITEMS", len(cartlist))
+
+            order_meta = cart_data.get("orderMetaData", {})
+
+            # Build product list with item numbers - show clear pricing
+            product_lines = []
+            for idx, item in enumerate(cartlist, start=1):
+                title = item.get("title", "Unnamed Product")
+                qty = item.get("quantity", 1)
+
+                # Get pricing info
+                try:
+                    original_price = float(item.get("product_price", 0) or item.get("price", 0) or 0)
+                    discounted_price = float(item.get("discounted_price", 0) or 0)
+                    discount_percent = float(item.get("discount", 0) or 0)
+                except (ValueError, TypeError):
+                    original_price = 0
+                    discounted_price = 0
+                    discount_percent = 0
+
+                # Format price display - show original, discount %, and final price clearly
+                if discount_percent > 0 and original_price > discounted_price > 0:
+                    # Show: ~$999.00~ 99% OFF → $9.99
+                    price_display = f"~${original_price:.2f}~ {discount_percent:.0f}% OFF → *${discounted_price:.2f}*"
+                elif discounted_price > 0:
+                    price_display = f"${discounted_price:.2f}"
+                elif original_price > 0:
+                    price_display = f"${original_price:.2f}"
+                else:
+                    price_display = "Price N/A"
+
+                line = f"{idx}. {title}\n   Qty: {qty} | {price_display}"
+                product_lines.append(line)
+
+            # Payment summary - show clear breakdown
+            payment_lines = []
+            if order_meta:
+                sub_total = float(order_meta.get("sub_total_amount", 0) or 0)
+                discount = float(order_meta.get("discount_amount", 0) or 0)
+                discounted_price = float(order_meta.get("discounted_price", 0) or 0)
+                coupon_discount = float(order_meta.get("coupon_discount", 0) or 0)
+                tax = float(order_meta.get("tax", 0) or 0)
+                delivery = float(order_meta.get("total_delivery_charge", 0) or order_meta.get("delivery_fee", 0) or 0)
+                platform_fee = float(order_meta.get("Platform_Fee", 0) or order_meta.get("platform_fee", 0) or 0)
+                total = float(order_meta.get("total", 0) or 0)
+
+                # Show original subtotal only if there are discounts
+                if discount > 0:
+                    payment_lines.append(f"~Subtotal: ${sub_total:.2f}~")  # Strikethrough
+                    payment_lines.append(f"Discount: -${discount:.2f}")
+                    payment_lines.append(f"*Subtotal: ${discounted_price:.2f}*")
+                else:
+                    payment_lines.append(f"Subtotal: ${sub_total:.2f}")
+
+                if coupon_discount > 0:
+                    payment_lines.append(f"Coupon: -${coupon_discount:.2f}")
+                if tax > 0:
+                    payment_lines.append(f"Tax: ${tax:.2f}")
+                if delivery > 0:
+                    payment_lines.append(f"Delivery: ${delivery:.2f}")
+                if platform_fee > 0:
+                    payment_lines.append(f"Platform Fee: ${platform_fee:.2f}")
+                if total > 0:
+                    payment_lines.append(f"\n*Total: ${total:.2f}*")
+
+            cart_info = "\n".join(product_lines)
+            payment_info = "\n".join(payment_lines)
+
+            out_msg = f"🛒 **Your Cart** ({len(cartlist)} items):\n\n{cart_info}"
+            if payment_info:
+                out_msg += f"\n\n{payment_info}"
+
+            # Show appropriate buttons based on channel
+            if is_whatsapp:
+                # Check if coupon is applied - use data from API response
+                applied_coupon = tracker.get_slot("applied_coupon_code")
+                coupon_msg = ""
+                if applied_coupon:
+                    # Get coupon discount from API response (orderMetaData.coupon_discount)
+                    coupon_discount = float(order_meta.get("coupon_discount", 0)) if order_meta else 0
+                    if coupon_discount > 0:
+                        coupon_msg = f"\n\n🎟️ Coupon *{applied_coupon}* applied (-${coupon_discount:.2f})"
+                    else:
+                        # Fallback to slot value
+                        discount_amount = tracker.get_slot("coupon_discount_amount") or 0
+                        if discount_amount > 0:
+                            coupon_msg = f"\n\n🎟️ Coupon *{applied_coupon}* applied (-${discount_amount:.2f})"
+
+                dispatcher.utter_message(text=out_msg + coupon_msg)
+
+                # WhatsApp list message with more options
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "list",
+                        "text": "What would you like to do?",
+                        "button_text": "Cart Options",
+                        "sections": [
+                            {
+                                "title": "Checkout",
+                                "rows": [
+                                    {"id": "checkout", "title": "💳 Checkout", "description": "Proceed to payment"},
+                                    {"id": "view_coupons", "title": "🎟️ Apply Promo Code", "description": "View available discounts"}
+                                ]
+                            },
+                            {
+                                "title": "More Options",
+                                "rows": [
+                                    {"id": "browse_products", "title": "🛍️ Continue Shopping", "description": "Add more items"},
+                                    {"id": "clear_cart", "title": "🗑️ Clear Cart", "description": "Remove all items"}
+                                ]
+                            }
+                        ]
+                    }
+                )
+            else:
+                dispatcher.utter_message(text=out_msg)
+
+                # Add individual remove buttons for each item
+                remove_buttons = []
+                for idx in range(min(len(cartlist), 3)):  # Show 3 remove buttons
+                    remove_buttons.append({
+                        "title": f"❌ Remove Item {idx+1}",
+                        "payload": f"remove {idx+1}"
+                    })
+
+                dispatcher.utter_message(
+                    text="**Quick Actions:**",
+                    buttons=remove_buttons + [
+                        {"title": "🔄 Update Quantities", "payload": "/update_cart_quantity"},  # NEW
+                        {"title": "📍 View Address", "payload": "/get_address"},
+                        {"title": "🛍️ Continue Shopping", "payload": "/show_categories"},
+                        {"title": "💾 Save Cart", "payload": "/save_cart_for_later"},  # NEW
+                        {"title": "🗑️ Clear Cart", "payload": "/clear_cart"}
+                    ]
+                )
+
+            return [SlotSet("recent_cart_items", json.dumps(cartlist))]
+
+        except Exception as e:
+            cart_log.warning("[EXCEPTION] in ActionViewCart: %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="Sorry, an error occurred while fetching your cart.")
+            return []
+
+
+class ActionRemoveFromCart(Action):
+    """Remove a single product from cart"""
+
+    def name(self) -> Text:
+        return "action_remove_from_cart"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+        user_id = tracker.get_slot("user_id")
+
+        # Require login
+        if not user_id or not isinstance(user_id, str) or not user_id.isdigit():
+            dispatcher.utter_message(text="You need to log in to manage your cart.")
+            return [FollowupAction("action_prompt_login")]
+
+        # Get the cart item ID from slot (set by cart view)
+        cart_item_id = tracker.get_slot("cart_item_to_remove")
+
+        if not cart_item_id:
+            dispatcher.utter_message(text="Please select an item to remove from your cart.")
+            return [FollowupAction("action_view_cart")]
+
+        try:
+            url = f"{API_BASE}/remove-product-from-cart"
+            payload = {
+                "user_id": user_id,
+                "id": int(cart_item_id)  # cart_id from cartlist
+            }
+
+            cart_log.debug("[REMOVE FROM CART] Request: %s", LazyJson(payload))
+
+            response = requests.post(url, json=payload, timeout=8)
+            invalidate_cart(user_id)
+            data = response.json()
+
+            cart_log.debug("[REMOVE FROM CART] Response: %s", LazyJson(data))
+
+            # Check response
+            if response.status_code == 200 and data.get("status") == 1:
+                # Success
+                product_name = tracker.get_slot("cart_item_name") or "Product"
+                dispatcher.utter_message(text=f"✅ {product_name} removed from your cart!")
+
+                # Clear the temporary slots
+                events = [
+                    SlotSet("cart_item_to_remove", None),
+                    SlotSet("cart_item_name", None)
+                ]
+
+                # Refresh cart view
+                dispatcher.utter_message(text="Here's your updated cart:")
+                return events + [FollowupAction("action_view_cart")]
+
+            else:
+                # Error
+                error_msg = data.get("message", "Could not remove item from cart.")
+                dispatcher.utter_message(text=f"❌ {error_msg}")
+                return [
+                    SlotSet("cart_item_to_remove", None),
+                    SlotSet("cart_item_name", None)
+                ]
+
+        except Exception as e:
+            cart_log.warning("[EXCEPTION] Removing from cart: %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="An error occurred while removing the item.")
+            return [
+                SlotSet("cart_item_to_remove", None),
+                SlotSet("cart_item_name", None)
+            ]
+
+
+class ActionClearCart(Action):
+    """Clear entire cart"""
+
+    def name(self) -> Text:
+        return "action_clear_cart"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+        user_id = tracker.get_slot("user_id")
+
+        # Require login
+        if not user_id or not isinstance(user_id, str) or not user_id.isdigit():
+            dispatcher.utter_message(text="You need to log in to manage your cart.")
+            return [FollowupAction("action_prompt_login")]
+
+        try:
+            url = f"{API_BASE}/destroy-cart"
+            payload = {"user_id": user_id}
+
+            cart_log.debug("[CLEAR CART] Request: %s", LazyJson(payload))
+
+            response = requests.post(url, json=payload, timeout=8)
+            invalidate_cart(user_id)
+            data = response.json()
+
+            cart_log.debug("[CLEAR CART] Response: %s", LazyJson(data))
+
+            # Detect channel
+            input_channel = tracker.get_latest_input_channel()
+            is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+            # Check response
+            if response.status_code == 200 and data.get("status") == 1:
+                # Success - cart cleared
+                if is_whatsapp:
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": "✅ Cart cleared successfully!\n\nWhat would you like to do?",
+                            "buttons": [
+                                {"id": "browse_products", "title": "🛍️ Browse Products"},
+                                {"id": "my_orders", "title": "📦 My Orders"}
+                            ]
+                        }
+                    )
+                else:
+                    dispatcher.utter_message(
+                        text="✅ **Cart cleared successfully!**\n\nReady to shop again?",
+                        buttons=[
+                            {"title": "🛍️ Browse Products", "payload": "/show_categories"},
+                            {"title": "📦 My Orders", "payload": "/track_my_orders"}
+                        ]
+                    )
+
+                # Clear coupon slots when cart is cleared
+                return [
+                    SlotSet("applied_coupon_id", None),
+                    SlotSet("applied_coupon_code", None),
+                    SlotSet("applied_coupon_discount", None),
+                    SlotSet("whatsapp_order_items", None),
+                    SlotSet("whatsapp_order_total", None)
+                ]
+
+            else:
+                # Error or cart not found
+                error_msg = data.get("message", "Could not clear cart.")
+
+                if "not found" in error_msg.lower():
+                    # Cart already empty
+                    dispatcher.utter_message(text="Your cart is already empty!")
+                else:
+                    dispatcher.utter_message(text=f"❌ {error_msg}")
+
+                return []
+
+        except Exception as e:
+            cart_log.warning("[EXCEPTION] Clearing cart: %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="An error occurred while clearing your cart.")
+            return []
+
+
+class ActionConfirmRemoveItem(Action):
+    """Ask for confirmation before removing item"""
+
+    def name(self) -> Text:
+        return "action_confirm_remove_item"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        # Get the item info from message entities or latest message
+        user_text = tracker.latest_message.get("text", "").strip().lower()
+
+        # Check if user typed "remove 1", "delete 2", etc.
+        match = re.search(r"(?:remove|delete)\s+(\d+)", user_text)
+
+        if match:
+            item_number = int(match.group(1))
+
+            # Get recent cart data
+            recent_cart_json = tracker.get_slot("recent_cart_items")
+
+            if recent_cart_json:
+                try:
+                    cart_items = json.loads(recent_cart_json)
+
+                    if 1 <= item_number <= len(cart_items):
+                        item = cart_items[item_number - 1]
+                        item_id = item.get("id")  # cart_id for removal
+                        item_name = item.get("title", "this item")
+
+                        # Detect channel
+                        input_channel = tracker.get_latest_input_channel()
+                        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+                        if is_whatsapp:
+                            dispatcher.utter_message(
+                                json_message={
+                                    "type": "buttons",
+                                    "text": f"⚠️ Remove {item_name} from cart?",
+                                    "buttons": [
+                                        {"id": "confirm_yes", "title": "✅ Yes, Remove"},
+                                        {"id": "confirm_no", "title": "❌ Cancel"}
+                                    ]
+                                }
+                            )
+                        else:
+                            dispatcher.utter_message(
+                                text=f"⚠️ Are you sure you want to remove **{item_name}** from your cart?",
+                                buttons=[
+                                    {"title": "Yes, Remove", "payload": "/confirm_remove_item"},
+                                    {"title": "Cancel", "payload": "/deny"}
+                                ]
+                            )
+
+                        return [
+                            SlotSet("cart_item_to_remove", str(item_id)),
+                            SlotSet("cart_item_name", item_name),
+                            SlotSet("pending_action", "remove_item")
+                        ]
+
+                except Exception as e:
+                    cart_log.warning("[ERROR] Parsing cart items: %s", e)
+
+        dispatcher.utter_message(text="Please specify which item to remove (e.g., 'remove 1')")
+        return [FollowupAction("action_view_cart")]
+
+
+class ActionConfirmClearCart(Action):
+    """Ask for confirmation before clearing entire cart"""
+
+    def name(self) -> Text:
+        return "action_confirm_clear_cart"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        # Detect channel
+        input_channel = tracker.get_latest_input_channel()
+        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+        if is_whatsapp:
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": "⚠️ Clear your entire cart?\n\nThis will remove ALL items.",
+                    "buttons": [
+                        {"id": "confirm_yes", "title": "✅ Yes, Clear All"},
+                        {"id": "confirm_no", "title": "❌ Cancel"}
+                    ]
+                }
+            )
+        else:
+            dispatcher.utter_message(
+                text="⚠️ **Are you sure you want to clear your entire cart?**\n\nThis will remove all items.",
+                buttons=[
+                    {"title": "Yes, Clear All", "payload": "/confirm_clear_cart"},
+                    {"title": "Cancel", "payload": "/deny"}
+                ]
+            )
+
+        return [SlotSet("pending_action", "action_clear_cart")]
+
+
+class ActionUpdateCartQuantity(Action):
+    """Update quantity of items in cart"""
+
+    def name(self) -> Text:
+        return "action_update_cart_quantity"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+        user_id = tracker.get_slot("user_id")
+
+        if not user_id or not isinstance(user_id, str) or not user_id.isdigit():
+            dispatcher.utter_message(text="You need to log in to manage your cart.")
+            return [FollowupAction("action_prompt_login")]
+
+        user_text = tracker.latest_message.get("text", "").strip().lower()
+
+        # Parse "change item 1 to 3" or "make it 5"
+        match = re.search(r"(?:item\s+)?(\d+)(?:\s+to\s+|\s+)(\d+)", user_text)
+
+        if match:
+            item_number = int(match.group(1))
+            new_quantity = int(match.group(2))
+
+            # Get cart items
+            recent_cart_json = tracker.get_slot("recent_cart_items")
+
+            if recent_cart_json:
+                try:
+                    cart_items = json.loads(recent_cart_json)
+
+                    if 1 <= item_number <= len(cart_items):
+                        item = cart_items[item_number - 1]
+                        cart_line_id = item.get("id")  # cart-list "id" is the cart line, "cart_id" the cart
+
+                        # Same quantity route as the WhatsApp order sync (cart_sync.CART_UPDATE_ENDPOINT)
+                        error = update_cart_line(user_id, cart_line_id, new_quantity)
+                        invalidate_cart(user_id)
+
+                        if error is None:
+                            dispatcher.utter_message(
+                                text=f"✅ Updated quantity to {new_quantity}!"
+                            )
+                            return [FollowupAction("action_view_cart")]
+                        else:
+                            cart_log.warning("[UPDATE QUANTITY] Line %s: %s", cart_line_id, error)
+                            dispatcher.utter_message(text="❌ Could not update quantity.")
+                            return []
+
+                except Exception as e:
+                    cart_log.warning("[ERROR] Updating quantity: %s", e)
+
+        # If no match, show instructions
+        dispatcher.utter_message(
+            text="To update quantity, say:\n"
+                 "• 'change item 1 to 3'\n"
+                 "• 'make it 5'\n"
+                 "• 'set item 2 to 10'"
+        )
+        return []
+
+
+class ActionUndoCartAction(Action):
+    """Undo last cart modification"""
+
+    def name(self) -> Text:
+        return "action_undo_cart_action"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        # Get last action from tracker
+        last_action = None
+        for event in reversed(tracker.events):
+            if event.get("event") == "action":
+                action_name = event.get("name")
+                if action_name in ["action_remove_from_cart", "action_clear_cart"]:
+                    last_action = action_name
+                    break
+
+        if last_action == "action_remove_from_cart":
+            dispatcher.utter_message(
+                text="⚠️ Undo is not yet supported. Please re-add the item from the product list."
+            )
+        elif last_action == "action_clear_cart":
+            dispatcher.utter_message(
+                text="⚠️ Cannot undo full cart clear. Please add items again."
+            )
+        else:
+            dispatcher.utter_message(text="Nothing to undo.")
+
+        return []
+
+
+class ActionSaveCartForLater(Action):
+    """Save cart for later (placeholder for future feature)"""
+
+    def name(self) -> Text:
+        return "action_save_cart_for_later"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+
+        if not user_id:
+            dispatcher.utter_message(text="Please log in to save your cart.")
+            return [FollowupAction("action_prompt_login")]
+
+        # For now, just acknowledge
+        dispatcher.utter_message(
+            text="💾 **Cart saved!**\n\n"
+                 "Your items are saved and will be here when you return.\n\n"
+                 "Note: This is a temporary save for this session.",
+            buttons=[
+                {"title": "🛍️ Continue Shopping", "payload": "/show_categories"},
+                {"title": "📍 Find Stores", "payload": "find stores"}
+            ]
+        )
+
+        return []
+
+
+class ActionHandleWhatsAppNativeOrder(Action):
+    """
+    Handle native WhatsApp cart checkout when user clicks "Place order".
+
+    Flow:
+    1. Receive order items from WhatsApp native cart
+    2. Check if user exists by phone number
+    3a. If EXISTS → Show saved address → Confirm → Pay (3 steps)
+    3b. If NEW → Auto-register → Ask for address → Confirm → Pay (4 steps)
+    """
+
+    def name(self) -> Text:
+        return "action_handle_whatsapp_native_order"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        cart_log.debug("[NATIVE ORDER] ========== WHATSAPP NATIVE ORDER RECEIVED ==========")
+
+        events = []
+
+        # Get sender phone number (WhatsApp ID)
+        sender_id = tracker.sender_id
+        phone = sender_id
+
+        # Clean phone number
+        if phone:
+            phone = re.sub(r'[^0-9+]', '', phone)
+            # Remove leading + for API compatibility if needed
+            phone_for_api = phone.lstrip('+')
+        else:
+            dispatcher.utter_message(text="Sorry, I couldn't identify your phone number. Please try again.")
+            return []
+
+        cart_log.debug("[NATIVE ORDER] Customer phone: %s", phone)
+
+        # Get order items from metadata
+        metadata = tracker.latest_message.get("metadata", {})
+        order_items = metadata.get("order_items", [])
+        total_items = metadata.get("order_total_items", 0)
+        total_amount = metadata.get("order_total_amount", 0)
+        catalog_id = metadata.get("catalog_id", "")
+
+        # Get store_id from metadata or slot (no hardcoded fallback)
+        store_id = metadata.get("store_id") or tracker.get_slot("store_id")
+        store_name = metadata.get("store_name") or tracker.get_slot("store_name") or "Store"
+        events.append(SlotSet("store_id", store_id))
+        events.append(SlotSet("store_name", store_name))
+
+        cart_log.debug("[NATIVE ORDER] Store: %s (ID: %s)", store_name, store_id)
+        cart_log.debug("[NATIVE ORDER] Items: %s, Total: $%.2f", total_items, total_amount)
+        cart_log.debug("[NATIVE ORDER] Order items: %s", LazyJson(order_items))
+
+        if not order_items:
+            dispatcher.utter_message(text="Sorry, I couldn't read your cart items. Please try again.")
+            return []
+
+        # Store order items in slot for later use
+        events.append(SlotSet("whatsapp_order_items", json.dumps(order_items)))
+        events.append(SlotSet("whatsapp_order_total", total_amount))
+
+        # ===== STEP 1: CHECK IF USER EXISTS BY PHONE =====
+        try:
+            cart_log.debug("[NATIVE ORDER] Checking user by phone: %s", phone_for_api)
+
+            # Use enhanced phone lookup that tries multiple formats
+            user_data = self._lookup_user_by_phone(phone_for_api, sender_id=sender_id)
+
+            cart_log.debug("[NATIVE ORDER] User lookup response status: %s, has_data: %s",
+                           user_data.get('status'), bool(user_data.get('data')))
+            cart_log.debug("[NATIVE ORDER] Full response: %s", LazyJson(user_data))
+
+            if user_data.get("status") == 1 and user_data.get("data"):
+                cart_log.debug("[NATIVE ORDER] ✅ User lookup SUCCESS - going to fast checkout")
+                # ===== USER EXISTS - FAST CHECKOUT =====
+                user_info = user_data.get("data", {})
+                user_id = str(user_info.get("user_id"))
+                user_name = user_info.get("name", "there")
+                default_address = user_info.get("default_address")
+
+                cart_log.debug("[NATIVE ORDER] ✅ User found: %s (ID: %s)", user_name, user_id)
+
+                # Set user as logged in
+                events.append(SlotSet("user_id", user_id))
+
+                # Sync WhatsApp cart to backend
+                sync_result = self._sync_cart_to_backend(user_id, order_items, tracker)
+                if sync_result["failed_items"]:
+                    # The backend cart does not match the order - never take payment for it
+                    self._report_failed_sync(dispatcher, sync_result["failed_items"], store_id)
+                    return events
+                events.append(SlotSet("checkout_step", "confirm_address"))
+
+                # ⭐ Use backend cart totals for accurate pricing
+                cart_totals = sync_result.get("cart_totals", {})
+                sub_total = cart_totals.get("sub_total_amount", 0)
+                discount_amount = cart_totals.get("discount_amount", 0)
+                discounted_price = cart_totals.get("discounted_price", 0)
+                coupon_discount = cart_totals.get("coupon_discount", 0)
+                tax = cart_totals.get("tax", 0)
+                delivery_fee = cart_totals.get("delivery_fee", 0)
+                platform_fee = cart_totals.get("platform_fee", 0)
+                backend_total = cart_totals.get("total", 0)
+
+                # Build order summary with product details (for display)
+                order_summary = self._build_order_summary(order_items, total_amount, tracker, return_total=False)
+
+                # Build pricing breakdown - show full details
+                display_subtotal = discounted_price if discounted_price > 0 else total_amount
+                cart_log.debug("[NATIVE ORDER] Original: $%.2f, Discounts: -$%.2f, After discount: $%.2f, Tax: $%.2f, Total: $%.2f",
+                               sub_total, discount_amount, discounted_price, tax, backend_total)
+
+                # Build detailed pricing text
+                pricing_lines = []
+                pricing_lines.append(f"💰 Subtotal: ${display_subtotal:.2f}")
+                if discount_amount > 0:
+                    pricing_lines.append(f"🏷️ _You save ${discount_amount:.2f}!_")
+                if coupon_discount > 0:
+                    pricing_lines.append(f"🎟️ Coupon: -${coupon_discount:.2f}")
+                if tax > 0:
+                    pricing_lines.append(f"📋 Tax: ${tax:.2f}")
+                if delivery_fee > 0:
+                    pricing_lines.append(f"🚚 Delivery: ${delivery_fee:.2f}")
+                if platform_fee > 0:
+                    pricing_lines.append(f"🏪 Platform Fee: ${platform_fee:.2f}")
+                if backend_total > 0:
+                    pricing_lines.append(f"\n*💵 Total: ${backend_total:.2f}*")
+                else:
+                    pricing_lines.append(f"\n_(Final total with tax at checkout)_")
+
+                pricing_text = "\n".join(pricing_lines)
+
+                if default_address:
+                    # User has a saved address - show it
+                    addr = default_address
+                    address_text = (
+                        f"📍 *{addr.get('address_name', 'Saved Address')}*\n"
+                        f"{addr.get('full_address', addr.get('address', ''))}"
+                    )
+
+                    msg_text = f"👋 Hi {user_name}!\n\n📦 Your Order:\n{order_summary}\n\n{pricing_text}\n\n🚚 Deliver to:\n{address_text}"
+
+                    # Use ONLY json_message for WhatsApp to avoid duplicate messages
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": msg_text,
+                            "buttons": [
+                                {"id": "confirm_order_pay", "title": "✅ Confirm & Pay"},
+                                {"id": "apply_promo_code", "title": "🎟️ Apply Promo Code"},
+                                {"id": "change_address", "title": "📍 Different Address"}
+                            ]
+                        }
+                    )
+
+                    events.append(SlotSet("delivery_address_id", str(addr.get("address_id"))))
+                    events.append(SlotSet("delivery_address", json.dumps(addr)))
+
+                else:
+                    # User exists but no saved address
+                    msg_text = f"👋 Hi {user_name}!\n\n📦 Your Order:\n{order_summary}\n\n{pricing_text}\n\n📍 Please share your delivery address:"
+
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": msg_text,
+                            "buttons": [
+                                {"id": "share_location", "title": "📍 Share Location"},
+                                {"id": "type_address", "title": "✏️ Type Address"}
+                            ]
+                        }
+                    )
+                    events.append(SlotSet("checkout_step", "awaiting_address"))
+
+            else:
+                # ===== NEW USER - AUTO-REGISTER =====
+                cart_log.debug("[NATIVE ORDER] 🆕 New user, auto-registering...")
+
+                # Detect country code from phone number and extract phone without country code
+                country_code = "+1"  # Default USA
+                phone_without_country = phone_for_api  # Default: use full number
+
+                if phone_for_api.startswith("91") and len(phone_for_api) >= 12:
+                    country_code = "+91"  # India
+                    phone_without_country = phone_for_api[2:]  # Remove "91" prefix
+                elif phone_for_api.startswith("44") and len(phone_for_api) >= 11:
+                    country_code = "+44"  # UK
+                    phone_without_country = phone_for_api[2:]  # Remove "44" prefix
+                elif phone_for_api.startswith("1") and len(phone_for_api) == 11:
+                    country_code = "+1"  # USA/Canada
+                    phone_without_country = phone_for_api[1:]  # Remove "1" prefix
+
+                cart_log.debug("[NATIVE ORDER] Detected country code: %s, phone without country: %s",
+                               country_code, phone_without_country)
+
+                # Auto-register guest user - send phone WITHOUT country code
+                register_payload = {
+                    "phone": phone_without_country,
+                    "name": "WhatsApp Customer",
+                    "country_code": country_code
+                }
+                cart_log.debug("[NATIVE ORDER] Guest register request: %s", LazyJson(register_payload))
+
+                register_response = requests.post(
+                    f"{API_BASE}/guest-register",
+                    json=register_payload,
+                    timeout=10
+                )
+                register_data = register_response.json()
+
+                cart_log.debug("[NATIVE ORDER] Guest register response: %s", LazyJson(register_data))
+
+                if register_data.get("status") == 1:
+                    new_user = register_data.get("data", {})
+                    user_id = str(new_user.get("user_id"))
+                    is_new = new_user.get("is_new", True)
+
+                    cart_log.debug("[NATIVE ORDER] ✅ User created/found: ID %s, is_new: %s", user_id, is_new)
+                    invalidate_user_lookup(sender_id)
+
+                    events.append(SlotSet("user_id", user_id))
+                    events.append(SlotSet("is_guest_user", True))
+
+                    # Sync cart to backend
+                    sync_result = self._sync_cart_to_backend(user_id, order_items, tracker)
+                    if sync_result["failed_items"]:
+                        self._report_failed_sync(dispatcher, sync_result["failed_items"], store_id)
+                        return events
+                    events.append(SlotSet("checkout_step", "awaiting_name"))
+
+                    # ⭐ Use backend cart totals for accurate pricing
+                    cart_totals = sync_result.get("cart_totals", {})
+                    discount_amount = cart_totals.get("discount_amount", 0)
+                    discounted_price = cart_totals.get("discounted_price", 0)
+                    tax = cart_totals.get("tax", 0)
+                    delivery_fee = cart_totals.get("delivery_fee", 0)
+                    platform_fee = cart_totals.get("platform_fee", 0)
+                    backend_total = cart_totals.get("total", 0)
+
+                    # Build order summary with product details (for display)
+                    order_summary = self._build_order_summary(order_items, total_amount, tracker, return_total=False)
+
+                    # Use discounted_price (after product discounts) as subtotal display
+                    display_subtotal = discounted_price if discounted_price > 0 else total_amount
+                    cart_log.debug("[NATIVE ORDER] Discounted price: $%.2f, Discount: -$%.2f, Total: $%.2f",
+                                   discounted_price, discount_amount, backend_total)
+
+                    # Build detailed pricing text
+                    pricing_lines = []
+                    pricing_lines.append(f"💰 Subtotal: ${display_subtotal:.2f}")
+                    if discount_amount > 0:
+                        pricing_lines.append(f"🏷️ _You save ${discount_amount:.2f}!_")
+                    if tax > 0:
+                        pricing_lines.append(f"📋 Tax: ${tax:.2f}")
+                    if delivery_fee > 0:
+                        pricing_lines.append(f"🚚 Delivery: ${delivery_fee:.2f}")
+                    if platform_fee > 0:
+                        pricing_lines.append(f"🏪 Platform Fee: ${platform_fee:.2f}")
+                    if backend_total > 0:
+                        pricing_lines.append(f"\n*💵 Total: ${backend_total:.2f}*")
+                    else:
+                        pricing_lines.append(f"\n_(Delivery fee added after address)_")
+
+                    pricing_text = "\n".join(pricing_lines)
+
+                    msg_text = f"📦 Your Order:\n{order_summary}\n\n{pricing_text}\n\nTo deliver your order, please share:\n\n📍 Your delivery location:"
+
+                    # Use ONLY json_message for WhatsApp to avoid duplicate messages
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": msg_text,
+                            "buttons": [
+                                {"id": "share_location", "title": "📍 Share Location"},
+                                {"id": "type_address", "title": "✏️ Type Address"}
+                            ]
+                        }
+                    )
+                    events.append(SlotSet("checkout_step", "awaiting_address"))
+
+                else:
+                    # Guest registration failed - log details
+                    cart_log.warning("[NATIVE ORDER] ❌ Guest registration FAILED!")
+                    cart_log.warning("[NATIVE ORDER] ❌ Response: %s", LazyJson(register_data))
+                    error_msg = register_data.get("message", "Registration failed")
+                    cart_log.warning("[NATIVE ORDER] ❌ Error message: %s", error_msg)
+
+                    dispatcher.utter_message(
+                        text="Sorry, I couldn't process your order right now. Please try again or contact support."
+                    )
+                    return []
+
+        except Exception as e:
+            cart_log.warning("[NATIVE ORDER] ❌ Exception Error: %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(
+                text="Sorry, something went wrong. Please try again or type 'help' for assistance."
+            )
+            return []
+
+        return events
+
+    def _build_order_summary(self, order_items: List[Dict], total_amount: float, tracker: Tracker = None, return_total: bool = False):
+        """Build a text summary of order items with product names and proper pricing
+
+        Shows: ~~$original~~ discount% → $discounted_price
+
+        Args:
+            return_total: If True, returns tuple (summary_text, calculated_total)
+        """
+        lines = []
+        calculated_total = 0.0
+
+        # Get store_id for product lookup
+        store_id = None
+        if tracker:
+            store_id = tracker.get_slot("store_id")
+        cart_log.debug("[ORDER SUMMARY] Using store_id: %s", store_id)
+
+        # Fetch all products once to avoid multiple API calls
+        product_cache = self._fetch_store_products(store_id)
+
+        for i, item in enumerate(order_items, 1):
+            product_id = str(item.get("product_retailer_id", "Unknown"))
+            quantity = item.get("quantity", 1)
+
+            # Get product info from cache (now contains full pricing)
+            product_info = product_cache.get(product_id)
+
+            if product_info and isinstance(product_info, dict):
+                product_name = product_info.get("name", f"Item #{product_id}")
+                original_price = product_info.get("original_price", 0)
+                discount_percent = product_info.get("discount_percent", 0)
+                discounted_price = product_info.get("discounted_price", original_price)
+
+                # Calculate line total using discounted price
+                line_total = discounted_price * quantity
+                calculated_total += line_total
+
+                # Format price display
+                if discount_percent > 0 and original_price > discounted_price:
+                    # Show: ~~$999~~ 99% OFF → $9.99
+                    price_display = f"~${original_price:.2f}~ {discount_percent:.0f}% OFF → *${discounted_price:.2f}*"
+                else:
+                    price_display = f"${discounted_price:.2f}"
+
+                lines.append(f"  {i}. {product_name} x{quantity} - {price_display}")
+            else:
+                # Fallback if product not in cache (use WhatsApp price)
+                whatsapp_price = float(item.get("item_price", 0))
+                product_name = product_info if isinstance(product_info, str) else f"Item #{product_id}"
+                lines.append(f"  {i}. {product_name} x{quantity} - ${whatsapp_price * quantity:.2f}")
+                calculated_total += whatsapp_price * quantity
+
+        summary_text = "\n".join(lines) if lines else "Items from your cart"
+
+        if return_total:
+            return summary_text, calculated_total
+        return summary_text
+
+    def _fetch_store_products(self, store_id: str) -> Dict[str, Dict]:
+        """Fetch all products from a store and return as id -> product info mapping
+
+        Returns dict with product_id -> {name, original_price, discount_percent, discounted_price}
+        """
+        product_cache = {}
+        try:
+            cart_log.debug("[PRODUCT CACHE] ========== FETCHING PRODUCTS ==========")
+            cart_log.debug("[PRODUCT CACHE] Store ID: %s", store_id)
+
+            # Use the correct API parameters (wh_account_id, not store_id)
+            payload = {
+                "wh_account_id": str(store_id),
+                "upc": "",
+                "ai_category_id": "",
+                "ai_product_id": "",
+                "product_id": "",
+                "search_string": "",
+                "zipcode": "",
+                "user_id": "",
+                "page": "1",
+                "items": "50"
+            }
+
+            response = seller_post("getMasterProducts", payload, timeout=10)
+
+            cart_log.debug("[PRODUCT CACHE] HTTP Status: %s", response.status_code)
+
+            if response.status_code == 200:
+                data = response.json()
+                cart_log.debug("[PRODUCT CACHE] API status: %s", data.get('status'))
+
+                # Products are in data.data.getMasterProducts
+                products = []
+                api_data = data.get("data", {})
+
+                if isinstance(api_data, dict):
+                    products = api_data.get("getMasterProducts", [])
+                    if not products:
+                        products = api_data.get("products", [])
+                elif isinstance(api_data, list):
+                    products = api_data
+
+                cart_log.debug("[PRODUCT CACHE] Found %s products", len(products))
+
+                if products:
+                    store_log.debug("[PRODUCT CACHE] First product sample: %s", LazyJson(products[0]))
+
+                for product in products:
+                    # Try multiple ID fields - use SAME order as WhatsApp catalog builder:
+                    pid = str(product.get("product_id") or product.get("ai_product_id") or product.get("id") or "")
+                    # Try multiple name fields
+                    name = product.get("title") or product.get("name") or product.get("product_name") or f"Item #{pid}"
+
+                    # Get pricing info
+                    original_price = float(product.get("product_price", 0) or 0)
+                    discount_percent = float(product.get("discount", 0) or 0)
+                    discounted_price = float(product.get("discounted_price", 0) or 0)
+
+                    # If no discounted_price but has discount, calculate it
+                    if original_price > 0 and discount_percent > 0 and discounted_price == 0:
+                        discounted_price = original_price * (1 - discount_percent / 100)
+
+                    if pid:
+                        product_info = {
+                            "name": name,
+                            "original_price": original_price,
+                            "discount_percent": discount_percent,
+                            "discounted_price": discounted_price if discounted_price > 0 else original_price
+                        }
+                        product_cache[pid] = product_info
+                        # Also cache by ai_product_id if different (for fallback)
+                        ai_pid = str(product.get("ai_product_id") or "")
+                        if ai_pid and ai_pid != pid:
+                            product_cache[ai_pid] = product_info
+
+                cart_log.debug("[PRODUCT CACHE] Cached products: %s", LazyJson(list(product_cache.keys())))
+            else:
+                cart_log.warning("[PRODUCT CACHE] HTTP Error: %s", response.text[:200])
+
+        except Exception as e:
+            cart_log.warning("[PRODUCT CACHE] ❌ Error: %s", e)
+            import traceback
+            traceback.print_exc()
+
+        cart_log.debug("[PRODUCT CACHE] Total cached: %s products", len(product_cache))
+        return product_cache
+
+    def _get_product_name(self, product_id: str, store_id: str = None) -> str:
+        """Fetch product name from API by product ID"""
+        try:
+            cart_log.debug("[PRODUCT LOOKUP] Looking up product %s in store %s", product_id, store_id)
+            response = seller_post("getMasterProducts", {"store_id": store_id}, timeout=5)
+
+            if response.status_code == 200:
+                data = response.json()
+                products = data.get("data", {}).get("products", [])
+                cart_log.debug("[PRODUCT LOOKUP] Found %s products in response", len(products))
+
+                # Search for matching product
+                for product in products:
+                    if str(product.get("id")) == str(product_id):
+                        name = product.get("title") or product.get("name") or f"Product #{product_id}"
+                        cart_log.debug("[PRODUCT LOOKUP] ✅ Found: %s", name)
+                        return name
+
+            cart_log.warning("[PRODUCT LOOKUP] ⚠️ Product %s not found", product_id)
+            return f"Item #{product_id}"
+
+        except Exception as e:
+            cart_log.warning("[PRODUCT LOOKUP] Error fetching product %s: %s", product_id, e)
+            return f"Item #{product_id}"
+
+    def _lookup_user_by_phone(self, phone: str, sender_id: str = None) -> Dict:
+        """
+        Try to find user by phone number with multiple format attempts.
+        WhatsApp sends phone with country code, but DB might store differently.
+        IMPORTANT: Prefer SHORTER formats to find real accounts before guest accounts!
+
+        All formats are probed concurrently; the match earliest in the
+        preference list wins. Results (found or not) are cached per sender.
+        """
+        cart_log.debug("[USER LOOKUP] ========== LOOKING UP USER ==========")
+        cart_log.debug("[USER LOOKUP] Raw phone input: '%s'", phone)
+
+        cached = get_cached_user_lookup(sender_id)
+        if cached is not None:
+            cart_log.debug("[USER LOOKUP] ⚡ Cache hit for sender %s: status=%s", sender_id, cached.get('status'))
+            return cached
+
+        # Clean the phone number
+        clean_phone = re.sub(r'[^0-9]', '', phone)
+        cart_log.debug("[USER LOOKUP] Cleaned phone: '%s' (length: %s)", clean_phone, len(clean_phone))
+
+        # Try different phone formats - SHORTER FIRST to find real accounts before guest accounts!
+        # Guest accounts are created with full WhatsApp number (918826516009)
+        # Real accounts often have shorter numbers (8826516009)
+        phone_formats = [
+            clean_phone[-10:] if len(clean_phone) >= 10 else None,  # Last 10 digits FIRST (8826516009)
+            clean_phone[-9:] if len(clean_phone) >= 9 else None,    # Last 9 digits
+            clean_phone[2:] if len(clean_phone) >= 12 else None,    # Remove country code (8826516009)
+            clean_phone[1:] if len(clean_phone) >= 11 else None,    # Remove first digit
+            clean_phone,                                             # Full number LAST (918826516009)
+        ]
+
+        # Remove None and duplicates while preserving order
+        phone_formats = [p for p in phone_formats if p and len(p) >= 6]
+        phone_formats = list(dict.fromkeys(phone_formats))
+
+        cart_log.debug("[USER LOOKUP] Probing these formats concurrently (preference order): %s",
+                       LazyJson(phone_formats))
+
+        def probe(phone_attempt: str) -> Dict:
+            response = requests.post(
+                f"{API_BASE}/user-by-phone",
+                json={"phone": phone_attempt},
+                timeout=10
+            )
+            return response.json()
+
+        # Rank -> response for every format that matched
+        matches: Dict[int, Dict] = {}
+        errors = 0
+        pending = set(range(len(phone_formats)))
+        executor = ThreadPoolExecutor(max_workers=max(1, len(phone_formats)))
+        try:
+            futures = {executor.submit(in_action_context(probe), p): rank for rank, p in enumerate(phone_formats)}
+            for future in as_completed(futures):
+                rank = futures[future]
+                pending.discard(rank)
+                try:
+                    data = future.result()
+                    cart_log.debug("[USER LOOKUP] '%s': status=%s, message=%s",
+                                   phone_formats[rank], data.get('status'), data.get('message'))
+                    if data.get("status") == 1 and data.get("data"):
+                        matches[rank] = data
+                except Exception as e:
+                    errors += 1
+                    cart_log.warning("[USER LOOKUP] ❌ Error with %s: %s", phone_formats[rank], e)
+
+                # Stop as soon as no more-preferred format is still in flight
+                if matches and not any(r < min(matches) for r in pending):
+                    break
+        finally:
+            executor.shutdown(wait=False)
+
+        if matches:
+            best = min(matches)
+            data = matches[best]
+            user_info = data.get("data", {})
+            cart_log.debug("[USER LOOKUP] ✅ SUCCESS with '%s'! Found user:", phone_formats[best])
+            cart_log.debug("[USER LOOKUP]    Name: %s", user_info.get('name'))
+            cart_log.debug("[USER LOOKUP]    ID: %s", user_info.get('user_id'))
+            cart_log.debug("[USER LOOKUP]    Phone in DB: %s", user_info.get('phone'))
+            cart_log.debug("[USER LOOKUP]    Has address: %s", bool(user_info.get('default_address')))
+            cache_user_lookup(sender_id, data)
+            return data
+
+        if errors:
+            # API down / circuit open - don't cache "not found", fall back to the last known user
+            stale = get_stale_user_lookup(sender_id)
+            if stale is not None:
+                cart_log.warning("[USER LOOKUP] ⚠️ %s lookups failed, using last known user for %s",
+                                 errors, sender_id)
+                return stale
+            cart_log.warning("[USER LOOKUP] ❌ %s lookups failed, not caching the result", errors)
+            return {"status": 0, "message": "User lookup failed", "data": None}
+
+        cart_log.warning("[USER LOOKUP] ❌ USER NOT FOUND with any format!")
+        cart_log.debug("[USER LOOKUP] Make sure database has a user with phone matching one of: %s",
+                       LazyJson(phone_formats))
+        result = {"status": 0, "message": "User not found", "data": None}
+        cache_user_lookup(sender_id, result)
+        return result
+
+    def _send_whatsapp_message(self, dispatcher: CollectingDispatcher, tracker: Tracker,
+                                text: str, buttons: List[Dict] = None, header: str = None):
+        """
+        Send message appropriately for WhatsApp vs Web channels.
+        Avoids duplicate messages by using only json_message for WhatsApp with buttons.
+        """
+        input_channel = tracker.get_latest_input_channel()
+        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+        if is_whatsapp and buttons:
+            # WhatsApp with buttons - ONLY send json_message to avoid duplicates
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": text,
+                    "buttons": buttons,
+                    "header": header
+                }
+            )
+        elif buttons:
+            # Web channel with buttons
+            dispatcher.utter_message(text=text, buttons=buttons)
+        else:
+            # Plain text message
+            dispatcher.utter_message(text=text)
+
+    def _report_failed_sync(self, dispatcher: CollectingDispatcher, failed_items: List[Dict], store_id: str = None):
+        """Tell the customer which order lines could not be put in their cart"""
+        product_ids = [str(f["product_id"]) for f in failed_items if f.get("product_id")]
+        products = self._fetch_store_products(store_id) if product_ids else {}
+        names = []
+        for product_id in product_ids:
+            info = products.get(product_id)
+            name = info.get("name") if isinstance(info, dict) else (info or f"Item #{product_id}")
+            if name not in names:
+                names.append(name)
+        if names:
+            item_list = "\n".join(f"• {name}" for name in names)
+            text = (f"⚠️ Sorry, I couldn't add these items to your cart:\n{item_list}\n\n"
+                    "They may be out of stock. Please update your cart and place the order again.")
+        else:
+            text = "⚠️ Sorry, I couldn't update your cart right now. Please place the order again in a moment."
+        cart_log.warning("[NATIVE ORDER] ❌ Cart sync failed for %s item(s), not continuing to checkout",
+                         len(failed_items))
+        dispatcher.utter_message(text=text)
+
+    def _sync_cart_to_backend(self, user_id: str, order_items: List[Dict], tracker: Tracker) -> Dict:
+        """Sync WhatsApp native cart items to backend cart and return cart totals"""
+        try:
+            cart_log.debug("[CART SYNC] Syncing %s items to backend for user %s", len(order_items), user_id)
+
+            # Get store_id from tracker - API uses shipper_id
+            store_id = tracker.get_slot("store_id")
+
+            # ⭐ Diff the backend cart against the order and apply only the changes.
+            # Lines from other stores are removed, so carts never mix stores.
+            op_results, cart_data = reconcile_cart(user_id, store_id, order_items)
+            failed_items = [r for r in op_results if not r["success"]]
+            for failed in failed_items:
+                cart_log.warning("[CART SYNC] ⚠️ Failed to %s %s: %s",
+                                 failed['op'], failed['product_id'], failed['error'])
+            failed_products = {str(r["product_id"]) for r in failed_items if r["op"] in ("add", "update")}
+            order_products = {str(i.get("product_retailer_id", "")) for i in order_items if i.get("product_retailer_id")}
+            success_count = len(order_products - failed_products)
+            cart_log.debug("[CART SYNC] Applied %s cart operations, %s failed", len(op_results), len(failed_items))
+
+            # ⭐ After syncing, read cart totals from backend for accurate pricing
+            # API fields explained:
+            # - sub_total_amount: Original prices total (before any discounts)
+            # - discount_amount: Total product discounts
+            # - discounted_price: After product discounts (sub_total - discount_amount)
+            # - coupon_discount: Additional coupon discount
+            # - discounted_price_after_coupon: After all discounts
+            # - delivery_fee, Platform_Fee, tax: Additional charges
+            # - total: Final amount to pay
+            cart_totals = {
+                "sub_total_amount": 0,
+                "discount_amount": 0,
+                "discounted_price": 0,
+                "coupon_discount": 0,
+                "discounted_price_after_coupon": 0,
+                "delivery_fee": 0,
+                "platform_fee": 0,
+                "tax": 0,
+                "total": 0
+            }
+            try:
+                # cart_data is the cart-list response after reconciliation
+                if cart_data:
+                    if cart_data.get("status") == 1:
+                        order_meta = cart_data.get("data", {}).get("orderMetaData", {})
+                        cart_totals = {
+                            "sub_total_amount": float(order_meta.get("sub_total_amount", 0) or 0),
+                            "discount_amount": float(order_meta.get("discount_amount", 0) or 0),
+                            "discounted_price": float(order_meta.get("discounted_price", 0) or 0),
+                            "coupon_discount": float(order_meta.get("coupon_discount", 0) or 0),
+                            "discounted_price_after_coupon": float(order_meta.get("discounted_price_after_coupon", 0) or 0),
+                            "delivery_fee": float(order_meta.get("delivery_fee", 0) or order_meta.get("total_delivery_charge", 0) or 0),
+                            "platform_fee": float(order_meta.get("Platform_Fee", 0) or order_meta.get("platform_fee", 0) or 0),
+                            "tax": float(order_meta.get("tax", 0) or 0),
+                            "total": float(order_meta.get("total", 0) or 0)
+                        }
+                        cart_log.debug("[CART SYNC] ✅ Backend totals: original=$%.2f, discounts=-$%.2f, after_discount=$%.2f, total=$%.2f",
+                                       cart_totals['sub_total_amount'], cart_totals['discount_amount'], cart_totals['discounted_price'], cart_totals['total'])
+            except Exception as cart_err:
+                cart_log.warning("[CART SYNC] Warning - couldn't fetch cart totals: %s", cart_err)
+
+            return {
+                "success": success_count > 0,
+                "message": f"Synced {success_count}/{len(order_products)} items",
+                "synced_count": success_count,
+                "failed_items": failed_items,
+                "cart_totals": cart_totals
+            }
+
+        except Exception as e:
+            cart_log.warning("[CART SYNC] ❌ Error: %s", e)
+            failed_items = [{"op": "sync", "product_id": None, "quantity": None, "success": False, "error": str(e)}]
+            return {"success": False, "message": str(e), "synced_count": 0, "failed_items": failed_items,
+                    "cart_totals": {}}
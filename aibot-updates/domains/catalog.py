@@ -0,0 +1,1086 @@
+# actions/domains/catalog.py
+"""
+Catalog Actions
+Categories, product search and selection, paging through store products.
+
+1. action_product_llm_search extracts the product from free text with
+   the LLM (keyword fallback when OpenAI is unavailable)
+2. Product slots are compacted / resolved through catalog_cache
+"""
+import json
+import os
+import re
+from typing import Any, Dict, List, Text
+
+from rasa_sdk import Action, Tracker
+from rasa_sdk.events import EventType, FollowupAction, SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.action_logging import LazyJson
+from actions.action_registry import get_action
+from actions.backend_client import seller_post
+from actions.catalog_cache import compact_product_slot, refetch_product, resolve_product_slot
+from actions.domains.common import API_BASE, OPENAI_AVAILABLE, openai_client, store_log
+from actions.selection_index import get_selection_index
+
+
+# ============================================================================
+# LLM-BASED ENTITY EXTRACTION FOR NATURAL LANGUAGE SEARCH
+# ============================================================================
+
+def extract_product_with_llm(user_query: str) -> dict:
+    """
+    Use LLM to intelligently extract product/category from natural language.
+
+    Examples:
+    - "Buy me a samosa" → {"product": "samosa", "type": "product"}
+    - "I want something spicy" → {"product": "spicy", "type": "preference"}
+    - "What's popular?" → {"product": "popular", "type": "recommendation"}
+    - "Show me vegetarian options" → {"product": "vegetarian", "type": "category"}
+
+    Returns: {"product": str, "type": str, "confidence": str} or None
+    """
+    if not OPENAI_AVAILABLE:
+        store_log.debug("[LLM EXTRACT] OpenAI not available")
+        return None
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        store_log.debug("[LLM EXTRACT] No API key")
+        return None
+
+    system_prompt = """You are a product extraction assistant for a food ordering chatbot.
+Your job is to extract WHAT THE USER WANTS TO ORDER from their message.
+
+RULES:
+1. Extract the CORE product/food name only (not articles like "a", "an", "the", "some")
+2. If user asks for recommendations/suggestions, return "popular"
+3. If user mentions a category (vegetarian, spicy, desserts), extract that
+4. If user is just greeting or chatting, return null
+5. Be concise - extract 1-3 words max
+
+RESPOND WITH JSON ONLY:
+{"product": "extracted_term", "type": "product|category|preference|recommendation"}
+
+If nothing to extract, respond: {"product": null, "type": null}
+
+EXAMPLES:
+"Buy me a samosa" → {"product": "samosa", "type": "product"}
+"I want 2 pizzas" → {"product": "pizza", "type": "product"}
+"Get me something spicy" → {"product": "spicy", "type": "preference"}
+"What's good here?" → {"product": "popular", "type": "recommendation"}
+"Show vegetarian items" → {"product": "vegetarian", "type": "category"}
+"I'm craving paneer tikka" → {"product": "paneer tikka", "type": "product"}
+"Any snacks?" → {"product": "snacks", "type": "category"}
+"Surprise me" → {"product": "popular", "type": "recommendation"}
+"hello" → {"product": null, "type": null}"""
+
+    try:
+        client = openai_client(api_key)
+
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_query}
+            ],
+            max_tokens=50,
+            temperature=0.1  # Low temperature for consistent extraction
+        )
+
+        result_text = response.choices[0].message.content.strip()
+        store_log.debug("[LLM EXTRACT] Query: '%s' → %s", user_query, result_text)
+
+        # Parse JSON response
+        result = json.loads(result_text)
+
+        if result.get("product"):
+            return result
+        return None
+
+    except json.JSONDecodeError as e:
+        store_log.warning("[LLM EXTRACT] JSON parse error: %s", e)
+        return None
+    except Exception as e:
+        store_log.warning("[LLM EXTRACT] Error: %s", e)
+        return None
+
+
+def simple_extract_product(user_query: str) -> str:
+    """
+    Simple fallback extraction when LLM is unavailable.
+    Uses pattern removal to extract product name.
+    """
+    query = user_query.lower().strip()
+
+    # Remove question marks and punctuation first
+    query = re.sub(r'[?!.,;:]+', '', query).strip()
+
+    # Remove common PHRASES first (order matters - longer phrases first)
+    phrase_patterns = [
+        # Question patterns
+        r"^do you have\s+",
+        r"^do you sell\s+",
+        r"^do you serve\s+",
+        r"^do u have\s+",
+        r"^you got\s+",
+        r"^got any\s+",
+        r"^have any\s+",
+        r"^is there\s+",
+        r"^are there\s+",
+        r"^any\s+",
+        # Looking/searching patterns
+        r"^looking for\s+",
+        r"^searching for\s+",
+        r"^search for\s+",
+        r"^i'?m looking for\s+",
+        r"^i'?m searching for\s+",
+        r"^i'?m craving\s+",
+        r"^craving\s+",
+        # Request patterns
+        r"^can i have\s+",
+        r"^can i get\s+",
+        r"^can you get me\s+",
+        r"^can you show me\s+",
+        r"^could i have\s+",
+        r"^i want\s+",
+        r"^i need\s+",
+        r"^i'?d like\s+",
+        r"^i would like\s+",
+        r"^get me\s+",
+        r"^give me\s+",
+        r"^show me\s+",
+        r"^find me\s+",
+        r"^bring me\s+",
+        # Simple patterns
+        r"^buy\s+",
+        r"^order\s+",
+        r"^find\s+",
+        r"^search\s+",
+        r"^show\s+",
+        # Hinglish
+        r"^mujhe\s+",
+        r"^mere liye\s+",
+        r"\s+chahiye$",
+        r"\s+dena$",
+        r"\s+do$",
+    ]
+
+    result = query
+    for pattern in phrase_patterns:
+        result = re.sub(pattern, '', result, flags=re.IGNORECASE)
+
+    # Remove remaining filler words
+    remove_words = [
+        "me", "us", "some", "a", "an", "the", "one", "two",
+        "please", "pls", "plz",
+        "yo", "hey", "hi", "hello", "bro", "dude", "man",
+        "ek",
+    ]
+
+    for word in remove_words:
+        result = re.sub(rf'\b{word}\b', '', result, flags=re.IGNORECASE)
+
+    # Clean up whitespace
+    result = re.sub(r'\s+', ' ', result).strip()
+
+    store_log.debug("[SIMPLE EXTRACT] '%s' → '%s'", user_query, LazyJson(result))
+    return result if len(result) >= 2 else None
+
+
+class ActionShowCategoriesWithProducts(Action):
+    """Modified to show NATIVE LIST on WhatsApp"""
+
+    def name(self) -> Text:
+        return "action_show_categories_with_products"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[EventType]:
+        try:
+            # Check inputs
+            store_id = tracker.get_slot("store_id")  # No fallback - use store from session
+            store_name = tracker.get_slot("store_name") or "Store"
+            catalog_id = tracker.get_slot("catalog_id")
+            is_dedicated_bot = tracker.get_slot("is_dedicated_bot")
+
+            # Detect WhatsApp
+            input_channel = tracker.get_latest_input_channel()
+            is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+            # Fetch Categories & Products
+            payload = {"zipcode": ""}
+            response = seller_post("getCategories", payload, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+            categories = data.get("data", {}).get("getCategories", [])
+
+            if not categories:
+                dispatcher.utter_message(text="Sorry, no categories found.")
+                return []
+
+            # Collect products
+            all_products = []
+            for category in categories:
+                cat_products = category.get("getMasterProductOfCategory", [])
+                # Filter by store if needed (using shipper_id or wh_account_id)
+                if store_id:
+                     cat_products = [p for p in cat_products if str(p.get("shipper_id")) == str(store_id)]
+                all_products.extend(cat_products)
+
+            # ⭐ NATIVE WHATSAPP LIST LOGIC
+            if is_whatsapp and all_products:
+                product_items = []
+                # WhatsApp limits lists to 30 items
+                for p in all_products[:30]:
+                    # Get ID that matches your Catalog
+                    raw_id = p.get("product_id") or p.get("ai_product_id") or p.get("id")
+                    if raw_id:
+                        product_items.append({
+                            "product_retailer_id": str(raw_id).strip()
+                        })
+
+                if product_items and catalog_id:
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "product_list",
+                            "catalog_id": catalog_id,  # ⭐ DYNAMIC CATALOG ID
+                            "header": f"{store_name} Menu",
+                            "body": f"Here are our top items available for you.",
+                            "sections": [
+                                {
+                                    "title": "Popular Items",
+                                    "product_items": product_items
+                                }
+                            ]
+                        }
+                    )
+                    return [SlotSet("recent_products", compact_product_slot(all_products, self.name()))]
+                elif product_items and not catalog_id:
+                    # No catalog - fallback to text list
+                    messages = []
+                    for idx, p in enumerate(all_products[:10], start=1):
+                        title = p.get("title", "Product")
+                        price = p.get("product_price", "-")
+                        messages.append(f"{idx}. {title} (${price})")
+                    prod_text = "\n".join(messages)
+                    dispatcher.utter_message(text=f"🛍️ Products at {store_name}:\n{prod_text}")
+                    return [SlotSet("recent_products", compact_product_slot(all_products, self.name()))]
+
+            # --- Fallback for Website / Non-WhatsApp (Text List) ---
+            messages = []
+            global_idx = 1
+            for p in all_products[:10]:
+                title = p.get("title", "Product")
+                price = p.get("product_price", "-")
+                messages.append(f"{global_idx}. {title} (${price})")
+                global_idx += 1
+
+            prod_text = "\n".join(messages)
+            dispatcher.utter_message(text=f"Here are some products:\n{prod_text}")
+
+            return [SlotSet("recent_products", compact_product_slot(all_products, self.name()))]
+
+        except Exception as e:
+            store_log.warning("[EXCEPTION] in ActionShowCategoriesWithProducts: %s", e)
+            dispatcher.utter_message(text="Sorry, I couldn't fetch products right now.")
+            return []
+
+
+class ActionSearchProducts(Action):
+    """Search products with free text or entity-based search"""
+
+    def name(self) -> Text:
+        return "action_search_products"
+
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[EventType]:
+
+        # Get entities from the latest user message
+        category = next(tracker.get_latest_entity_values("product_category"), None)
+        name = next(tracker.get_latest_entity_values("product_name"), None)
+
+        # Get the user's full message for free text search
+        user_message = tracker.latest_message.get("text", "").strip()
+
+        # Extract search query
+        search_string = ""
+
+        # Priority: entity > extracted from message
+        if name:
+            search_string = name
+        elif category:
+            search_string = category
+        else:
+            # Try to extract search query from common patterns
+            message_lower = user_message.lower()
+            search_patterns = [
+                "search for ", "search ", "find ", "looking for ",
+                "i want ", "show me ", "do you have ", "get me ",
+                "order ", "buy ", "i need "
+            ]
+            for pattern in search_patterns:
+                if pattern in message_lower:
+                    # Extract text after the pattern
+                    idx = message_lower.find(pattern)
+                    search_string = user_message[idx + len(pattern):].strip()
+                    # Clean up common suffixes
+                    for suffix in ["?", "!", ".", "please", "pls"]:
+                        search_string = search_string.replace(suffix, "").strip()
+                    break
+
+            # If still empty, use the whole message (minus common words)
+            if not search_string:
+                skip_words = ["search", "find", "show", "products", "product", "me", "i", "want", "to", "a", "the"]
+                words = [w for w in user_message.split() if w.lower() not in skip_words]
+                search_string = " ".join(words)
+
+        if not search_string or len(search_string) < 2:
+            dispatcher.utter_message(text="What would you like to search for? Type something like 'search pizza' or 'find samosa'")
+            return []
+
+        store_log.debug("[SEARCH] Query: '%s'", search_string)
+
+        # Get store context for filtering
+        store_id = tracker.get_slot("store_id")
+        is_dedicated_bot = tracker.get_slot("is_dedicated_bot")
+
+        # Detect channel
+        input_channel = tracker.get_latest_input_channel()
+        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+        json_body = {
+            "wh_account_id": str(store_id) if (is_dedicated_bot and store_id) else "",
+            "upc": "",
+            "ai_category_id": "",
+            "ai_product_id": "",
+            "product_id": "",
+            "search_string": search_string,
+            "zipcode": "",
+            "user_id": "",
+            "page": "1",
+            "items": "10"
+        }
+
+        try:
+            store_log.debug("[SEARCH] API request: %s", LazyJson(json_body))
+            response = seller_post("getMasterProducts", json_body, timeout=10)
+            data = response.json()
+
+            store_log.debug("[SEARCH] API status: %s", data.get('status'))
+
+            # Correct parsing: data.getMasterProducts
+            products = data.get("data", {}).get("getMasterProducts", [])
+
+            if not products or len(products) == 0:
+                if is_whatsapp:
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": f"🔍 No products found for '{search_string}'.\n\nTry a different search or browse our catalog.",
+                            "buttons": [
+                                {"id": "browse_products", "title": "🛍️ Browse Products"}
+                            ]
+                        }
+                    )
+                else:
+                    dispatcher.utter_message(text=f"No products found matching '{search_string}'.")
+                return []
+
+            store_log.debug("[SEARCH] Found %s products", len(products))
+
+            if is_whatsapp:
+                # Build WhatsApp list message for search results
+                sections = [{
+                    "title": f"Results for '{search_string[:20]}'",
+                    "rows": []
+                }]
+
+                for p in products[:10]:  # Max 10 items
+                    product_id = p.get("product_id", p.get("ai_product_id", ""))
+                    title = p.get("title", "Product")[:24]
+
+                    try:
+                        price = float(p.get("discounted_price") or p.get("product_price", 0))
+                        price_str = f"${price:.2f}"
+                    except:
+                        price_str = ""
+
+                    store_name = p.get("store_name", "")[:20]
+                    description = f"{price_str} - {store_name}" if store_name else price_str
+
+                    sections[0]["rows"].append({
+                        "id": f"product_{product_id}",
+                        "title": title,
+                        "description": description[:72]
+                    })
+
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "list",
+                        "text": f"🔍 Found {len(products)} result(s) for *{search_string}*\n\nTap below to view:",
+                        "button_text": "View Products",
+                        "sections": sections
+                    }
+                )
+            else:
+                # Text format for web
+                product_lines = []
+                for idx, p in enumerate(products[:5], start=1):
+                    title = p.get("title", "Unnamed Product")
+                    try:
+                        price = float(p.get("discounted_price") or p.get("product_price", 0))
+                        price_str = f"${price:.2f}"
+                    except:
+                        price_str = "-"
+                    product_lines.append(f"{idx}. {title} ({price_str})")
+
+                message = f"🔍 Search results for '{search_string}':\n\n" + "\n".join(product_lines)
+                dispatcher.utter_message(text=message + "\n\nReply with the product number to select it.")
+
+            # Save product list in slot for selection
+            return [SlotSet("recent_products", compact_product_slot(products, self.name()))]
+
+        except Exception as e:
+            store_log.warning("[SEARCH] Exception: %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="Sorry, I couldn't search right now. Please try again.")
+            return []
+
+
+class ActionSelectProduct(Action):
+    def name(self) -> Text:
+        return "action_select_product"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[EventType]:
+
+        # 1. Handle login flow first
+        if tracker.get_slot("login_step"):
+            try:
+                login_action = get_action("action_login_user")
+                return login_action.run(dispatcher, tracker, domain)
+            except Exception as e:
+                store_log.warning("[EXCEPTION] delegating to login: %s", e)
+                return [FollowupAction("action_login_user")]
+
+        user_text = tracker.latest_message.get("text", "").strip().lower()
+
+        # 2. ✅ NEW: Check for store selection context FIRST
+        # This is the most important check. If stores_list exists, we are selecting a store.
+        stores_list = tracker.get_slot("stores_list")
+        if stores_list:
+            store_log.debug("[ActionSelectProduct] Detected stores_list, delegating to ActionSetSelectedStore.")
+            try:
+                store_action = get_action("action_set_selected_store")
+                return store_action.run(dispatcher, tracker, domain)
+            except Exception as e:
+                store_log.warning("[EXCEPTION] delegating to store action: %s", e)
+                return [FollowupAction("action_set_selected_store")]
+
+        # 3. Check for product selection context
+        recent_products_json = tracker.get_slot("recent_products")
+        if not recent_products_json:
+            # 3a. No products AND no stores. Check if it's a new zip code.
+            if re.fullmatch(r"\d{5}", user_text):
+                return [
+                    SlotSet("zipcode", user_text),
+                    SlotSet("stores_list", None),
+                    SlotSet("selected_store", None),
+                    FollowupAction("action_get_nearest_store")
+                ]
+            # 3b. No context at all.
+            dispatcher.utter_message(text="I don't have any recently shown products to select from. Please search for products first.")
+            return []
+
+        # 4. We are NOT selecting a store and we HAVE recent products. Proceed with product selection.
+        try:
+            # Built from the snapshot only: a product missing from it is fetched below, once it is picked
+            index = get_selection_index(recent_products_json, lambda slot: resolve_product_slot(slot, fetch_missing=False))
+        except (json.JSONDecodeError, ValueError, TypeError) as e:
+            store_log.warning("[EXCEPTION] loading recent products: %s, slot content: %s", e, recent_products_json)
+            dispatcher.utter_message(text="Sorry, there was an internal error with product selection. Please show the categories/products again first.")
+            return [SlotSet("recent_products", None)] # Clear bad slot
+
+        # Check if this is a WhatsApp list selection
+        metadata = tracker.latest_message.get("metadata", {})
+        list_item_id = metadata.get("list_item_id")
+
+        selected_product = None
+
+        # Handle WhatsApp list selection (format: "product_{product_id}")
+        if list_item_id and list_item_id.startswith("product_"):
+            selected_product = index.match_list_item(list_item_id)
+            store_log.debug("[SELECT] WhatsApp list selection: %s -> %s",
+                            list_item_id, 'found' if selected_product else 'not found')
+
+        # Handle text-based selection (number)
+        if not selected_product and user_text.isdigit():
+            selected_product = index.by_position(int(user_text))
+
+        # Handle text-based selection (name matching, typo tolerant)
+        # Text might include description from list click, e.g. "Veg Samosa\n₹5.95 - Crispy Pastry..."
+        if not selected_product:
+            selected_product, score = index.match_title(user_text)
+            if selected_product:
+                store_log.debug("[SELECT] Matched by title (score %.2f)", score)
+
+        if not selected_product:
+            dispatcher.utter_message(text="Sorry, I couldn't find a product matching your selection. Please try again.")
+            return []
+
+        if selected_product.get("unresolved"):
+            # The shown list expired and this product could not be loaded with it - ask the API again
+            selected_product = refetch_product(selected_product)
+            if not selected_product:
+                dispatcher.utter_message(text="Sorry, that product list has expired. Please search for the product again.")
+                return [SlotSet("recent_products", None)]
+
+        title = selected_product.get("title", "Unnamed Product")
+        try:
+            price = float(selected_product.get("discounted_price")) if selected_product.get("discounted_price") else float(selected_product.get("product_price", 0))
+            price_str = f"${price:.2f}"
+        except (ValueError, TypeError):
+            price_str = "-"
+        description = selected_product.get("description", "No description available.")
+        product_type = selected_product.get("product_type", "")
+        store_name = selected_product.get("store_name", "Unknown Store")
+        discount = selected_product.get("discount")
+        try:
+            qty = float(selected_product.get("quantity", 0))
+            ordered = float(selected_product.get("ordered_qty", 0))
+            available = int(qty - ordered)
+        except (ValueError, TypeError):
+            available = "Unknown"
+        extras = []
+        try:
+            if discount and float(discount) > 0:
+                extras.append(f"{discount}% off")
+        except (ValueError, TypeError):
+            pass
+        if available != "Unknown":
+            extras.append(f"{available} available")
+        extra_info = " | ".join(extras)
+
+        # Get product image
+        image_url = selected_product.get("images", "")
+        if image_url and isinstance(image_url, str):
+            # Handle comma-separated images
+            image_url = image_url.split(",")[0].strip()
+
+        # Detect if WhatsApp
+        input_channel = tracker.get_latest_input_channel()
+        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+        if is_whatsapp:
+            # Send product image first (if available)
+            if image_url:
+                try:
+                    message = f"*{title}*\n\n{description}\n\n💰 Price: {price_str}"
+                    if extra_info:
+                        message += f"\n📦 {extra_info}"
+
+                    dispatcher.utter_message(image=image_url, text=message)
+                except Exception as e:
+                    store_log.warning("[SELECT] Error sending image: %s", e)
+
+            # Send interactive buttons (WhatsApp allows max 3 buttons)
+            button_message = "What would you like to do?"
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": button_message,
+                    "buttons": [
+                        {"id": "add_to_cart", "title": "🛒 Add to Cart"},
+                        {"id": "add_to_wishlist", "title": "❤️ Save to Favorites"},
+                        {"id": "no_thanks", "title": "❌ No, thanks"}
+                    ]
+                }
+            )
+        else:
+            # Web widget - show details with buttons
+            message = (
+                f"You selected: {title}\n"
+                f"Price: {price_str}\n"
+            )
+            if product_type:
+                message += f"Type: {product_type}\n"
+            message += (
+                f"Store: {store_name}\n"
+                f"Availability: {extra_info}\n"
+                f"Description: {description}\n\n"
+                "Would you like to add this product to your cart?"
+            )
+
+            dispatcher.utter_message(
+                text=message,
+                buttons=[
+                    {"title": "🛒 Add to cart", "payload": "Add to Cart"},
+                    {"title": "❤️ Save to Favorites", "payload": "/add_to_wishlist"},
+                    {"title": "No", "payload": "No"}
+                ]
+            )
+
+        # Store selected product info for wishlist action
+        product_id = selected_product.get("product_id") or selected_product.get("id")
+        shipper_id = selected_product.get("shipper_id")
+
+        return [
+            SlotSet("selected_product", json.dumps(selected_product)),
+            SlotSet("selected_product_id", str(product_id) if product_id else None),
+            SlotSet("selected_product_name", title),
+            SlotSet("shipper_id", str(shipper_id) if shipper_id else None)
+        ]
+
+
+class ActionProductLLMSearch(Action):
+    """Modified to auto-filter by store for dedicated bots"""
+
+    def name(self) -> str:
+        return "action_product_llm_search"
+
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[EventType]:
+
+        user_query = tracker.latest_message.get("text", "").strip()
+        if user_query and "near" in user_query.lower():
+            try:
+                store_action = get_action("action_get_nearest_store")
+                return store_action.run(dispatcher, tracker, domain)
+            except Exception as e:
+                store_log.warning("[EXCEPTION] delegating to ActionGetNearestStore: %s", e)
+                pass
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            dispatcher.utter_message(text="OpenAI API key not configured. Please contact administrator.")
+            return []
+
+        if not user_query:
+            dispatcher.utter_message(text="Please tell me what product or category you want to search for.")
+            return []
+
+        intent_name = tracker.latest_message.get("intent", {}).get("name")
+
+        page = tracker.get_slot("search_page")
+        try:
+            page = int(page) if page else 1
+        except (TypeError, ValueError):
+            page = 1
+
+        last_search_string = tracker.get_slot("last_search_string")
+
+        if intent_name == "search_products":
+            # ============================================================
+            # LLM-BASED NATURAL LANGUAGE UNDERSTANDING FOR SEARCH
+            # ============================================================
+            query_lower = user_query.lower().strip()
+
+            # ============================================================
+            # BUTTON CLICK DETECTION - prompt user for search query
+            # ============================================================
+            search_button_patterns = [
+                "search_products",
+                "🔍 search",
+                "🔍 search products",
+                "🔍search",
+            ]
+            is_button_click = any(query_lower == pattern.lower() or query_lower.replace(" ", "") == pattern.lower().replace(" ", "") for pattern in search_button_patterns)
+
+            if is_button_click:
+                store_log.debug("[DEBUG] Search button clicked, prompting user for query")
+                dispatcher.utter_message(
+                    text="🔍 What would you like to search for?\n\nType a product name like *pizza*, *burger*, *samosa*, etc."
+                )
+                return [SlotSet("last_search_string", None)]
+
+            # ============================================================
+            # USE LLM TO EXTRACT PRODUCT FROM NATURAL LANGUAGE
+            # ============================================================
+            search_keyword = None
+
+            # Try LLM extraction first (handles all natural language cases)
+            llm_result = extract_product_with_llm(user_query)
+
+            if llm_result and llm_result.get("product"):
+                search_keyword = llm_result["product"]
+                extract_type = llm_result.get("type", "unknown")
+                store_log.debug("[LLM SEARCH] Extracted '%s' (type: %s) from: '%s'",
+                                search_keyword, extract_type, user_query)
+
+            # ============================================================
+            # FALLBACK: Simple extraction if LLM fails
+            # ============================================================
+            if not search_keyword:
+                store_log.warning("[LLM SEARCH] LLM extraction failed, using simple fallback")
+                search_keyword = simple_extract_product(user_query)
+
+            # If still nothing, use original query cleaned up
+            if not search_keyword:
+                search_keyword = re.sub(r'[?!.,;:]+', '', user_query).strip()
+                store_log.debug("[LLM SEARCH] Using cleaned original query: '%s'", search_keyword)
+
+            # ============================================================
+            # REMOVED: All the old regex patterns - now handled by LLM
+            # - Category patterns (breakfast, lunch, dinner, etc.)
+            # - Dietary patterns (veg, non-veg, spicy, etc.)
+            # - Hunger patterns
+            # - 50+ search patterns
+            # ============================================================
+
+            store_log.debug("[DEBUG] Final search keyword: '%s' from query: '%s'", search_keyword, user_query)
+
+            last_search_string = search_keyword
+            page = 1
+
+        elif intent_name == "search_products_next":
+            if not last_search_string:
+                last_search_string = user_query
+        else:
+            if not last_search_string:
+                last_search_string = user_query
+
+        store_log.debug("[DEBUG] Using search string for backend API: '%s', page: %s", last_search_string, page)
+
+        # ⭐ NEW: Get store context for filtering
+        store_id = tracker.get_slot("store_id")
+        is_dedicated_bot = tracker.get_slot("is_dedicated_bot")
+
+        # Build payload with store filter
+        payload = {
+            "wh_account_id": str(store_id) if (is_dedicated_bot and store_id) else "",  # ⭐ AUTO-FILTER
+            "upc": "",
+            "ai_category_id": "",
+            "ai_product_id": "",
+            "product_id": "",
+            "search_string": last_search_string,
+            "zipcode": "",
+            "user_id": "",
+            "page": str(page),
+            "items": "5"
+        }
+
+        store_log.debug("[STORE FILTER] Calling backend API with payload: %s", LazyJson(payload))
+        store_log.debug("[STORE FILTER] wh_account_id: %s", payload['wh_account_id'])
+
+        try:
+            api_response = seller_post("getMasterProducts", payload, timeout=8)
+            api_response.raise_for_status()
+            data = api_response.json()
+            api_data = data.get("data", {}) if data else {}
+            if isinstance(api_data, dict):
+                products = api_data.get("getMasterProducts", [])
+            else:
+                products = api_data
+            store_log.debug("[DEBUG] Backend API returned %s products", len(products))
+        except Exception as e:
+            store_log.warning("[WARN] Could not fetch products from backend: %s", e)
+            products = []
+
+        product_dicts = [p for p in products if isinstance(p, dict)] if isinstance(products, list) else []
+
+        if product_dicts:
+            # Build WhatsApp list message for better UX
+            sections = []
+            items = []
+            for idx, p in enumerate(product_dicts):
+                product_id = p.get('product_id') or p.get('id', str(idx+1))
+                title = p.get('product_name') or p.get('title', 'Unnamed Product')
+                price = p.get('discounted_price', p.get('product_price', ''))
+                price_str = f"₹{price}" if price else ""
+                desc = p.get('description', '').strip()
+                desc_short = (desc[:70] + '...') if desc and len(desc) > 70 else desc
+
+                items.append({
+                    "id": f"product_{product_id}",
+                    "title": title[:24] if len(title) > 24 else title,
+                    "description": f"{price_str} - {desc_short}" if desc_short else price_str
+                })
+
+            sections.append({
+                "title": "Products",
+                "rows": items
+            })
+
+            # Add "Show More" option if there might be more results
+            sections.append({
+                "title": "More Options",
+                "rows": [
+                    {"id": "next_page", "title": "Show More Results", "description": "See more products"}
+                ]
+            })
+
+            dispatcher.utter_message(
+                json_message={
+                    "type": "list",
+                    "text": f"🔍 Found {len(product_dicts)} result(s) for *{last_search_string}*\n\nTap below to view products:",
+                    "button_text": "View Products",
+                    "sections": sections
+                }
+            )
+        else:
+            # Special handling for recommendation queries (popular, etc.)
+            if last_search_string in ["popular", "featured", "best seller", "recommended"]:
+                # Show menu/categories instead of error message
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": "🍽️ Let me show you what we have!\n\nTap below to browse our menu:",
+                        "buttons": [
+                            {"id": "browse_products", "title": "🛍️ Browse Menu"},
+                            {"id": "search_products", "title": "🔍 Search Products"}
+                        ]
+                    }
+                )
+            else:
+                # Regular "not found" message with helpful buttons
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": f"😕 Sorry, I couldn't find any products matching *{last_search_string}*.\n\nTry browsing our menu or searching for something else:",
+                        "buttons": [
+                            {"id": "browse_products", "title": "🛍️ Browse Menu"},
+                            {"id": "search_products", "title": "🔍 Search Again"}
+                        ]
+                    }
+                )
+
+        if product_dicts:
+            return [
+                SlotSet("recent_products", compact_product_slot(product_dicts, self.name())),
+                SlotSet("search_page", page),
+                SlotSet("last_search_string", last_search_string)
+            ]
+        else:
+            return [
+                SlotSet("recent_products", None),
+                SlotSet("search_page", 1),
+                SlotSet("last_search_string", last_search_string)
+            ]
+
+
+class ActionNextProductPage(Action):
+    def name(self) -> str:
+        return "action_next_product_page"
+
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[EventType]:
+
+        page = tracker.get_slot("search_page")
+        try:
+            page = int(page) + 1 if page else 2
+        except (ValueError, TypeError):
+            page = 2
+
+        store_log.debug("[DEBUG] Incrementing search page slot to: %s", page)
+
+        # Update page slot, search action will use updated page on next call
+        return [SlotSet("search_page", page)]
+
+
+class ActionResetSearchPage(Action):
+    def name(self) -> str:
+        return "action_reset_search_page"
+
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[EventType]:
+
+        store_log.debug("[DEBUG] Resetting search_page slot to 1 for new search.")
+        return [SlotSet("search_page", 1)]
+
+
+class ActionShowStoreProducts(Action):
+    """Show products for a specific store (dedicated store bots)"""
+
+    def name(self) -> Text:
+        return "action_show_store_products"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[EventType]:
+        try:
+            store_log.debug("[STORE PRODUCTS] ========== ACTION STARTED ==========")
+            # Get store context
+            store_id = tracker.get_slot("store_id")
+            store_name = tracker.get_slot("store_name")
+            catalog_id = tracker.get_slot("catalog_id")
+            is_dedicated_bot = tracker.get_slot("is_dedicated_bot")
+            input_channel = tracker.get_latest_input_channel()
+
+            store_log.debug("[STORE PRODUCTS] 🔍 Slots:")
+            store_log.debug("[STORE PRODUCTS]   - store_id: %s", store_id)
+            store_log.debug("[STORE PRODUCTS]   - store_name: %s", store_name)
+            store_log.debug("[STORE PRODUCTS]   - catalog_id: %s", catalog_id)
+            store_log.debug("[STORE PRODUCTS]   - is_dedicated: %s", is_dedicated_bot)
+            store_log.debug("[STORE PRODUCTS]   - channel: %s", input_channel)
+
+            if not is_dedicated_bot or not store_id:
+                store_log.warning("[STORE PRODUCTS] ❌ ERROR: No store context! is_dedicated=%s, store_id=%s",
+                                  is_dedicated_bot, store_id)
+                dispatcher.utter_message(text="Please select a store first.")
+                return []
+
+            # Fetch products for this store
+            search_endpoint = f"{API_BASE}/getMasterProducts"
+            payload = {
+                "wh_account_id": str(store_id),
+                "upc": "",
+                "ai_category_id": "",
+                "ai_product_id": "",
+                "product_id": "",
+                "search_string": "",
+                "zipcode": "",
+                "user_id": "",
+                "page": "1",
+                "items": "20"
+            }
+
+            store_log.debug("[STORE PRODUCTS] API REQUEST %s: %s", search_endpoint, LazyJson(payload))
+
+            response = seller_post("getMasterProducts", payload, timeout=10)
+
+            store_log.debug("[STORE PRODUCTS] Status Code: %s", response.status_code)
+
+            response.raise_for_status()
+            data = response.json()
+
+            store_log.debug("[STORE PRODUCTS] Parsed JSON: %s", LazyJson(data, limit=1000))
+
+            # Parse products
+            products = []
+            if isinstance(data, dict):
+                api_data = data.get("data", {})
+                store_log.debug("[STORE PRODUCTS] data type: %s", type(api_data).__name__)
+
+                if isinstance(api_data, dict):
+                    products = api_data.get("getMasterProducts", [])
+                    store_log.debug("[STORE PRODUCTS] Found in getMasterProducts: %s", len(products))
+                elif isinstance(api_data, list):
+                    products = api_data
+                    store_log.debug("[STORE PRODUCTS] data is list: %s", len(products))
+            elif isinstance(data, list):
+                products = data
+                store_log.debug("[STORE PRODUCTS] Top-level list: %s", len(products))
+
+            store_log.debug("[STORE PRODUCTS] ✅ FINAL: %s products found", len(products))
+
+            if len(products) > 0:
+                store_log.debug("[STORE PRODUCTS] Sample product: %s", LazyJson(products[0]))
+
+            if not products:
+                dispatcher.utter_message(
+                    text=f"Sorry, no products are currently available at {store_name}. Please check back later!",
+                    buttons=[
+                        {"title": "🔄 Refresh", "payload": "/browse_store_products"},  # ✅ Use intent
+                        {"title": "🛒 View Cart", "payload": "/view_cart"}
+                    ]
+                )
+                # ✅ ADD THIS LINE TO CLEAR THE SLOT
+                return [SlotSet("recent_products", None)]
+
+            # Detect if WhatsApp to use List Message
+            input_channel = tracker.get_latest_input_channel()
+            is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+            if is_whatsapp:
+                # ⭐ NEW: Build Native WhatsApp Product List
+                # This requires IDs to match your Catalog exactly!
+
+                product_items = []
+                for p in products[:30]:  # WhatsApp allows max 30 items
+                    # Get ID (Must match what you sent in sync_catalog.py)
+                    raw_id = p.get("product_id") or p.get("ai_product_id")
+                    if raw_id:
+                        product_items.append({
+                            "product_retailer_id": str(raw_id).strip()
+                        })
+
+                if product_items and catalog_id:
+                    store_log.debug("[STORE PRODUCTS] ✅ Sending native WhatsApp product list with %s items",
+                                    len(product_items))
+                    store_log.debug("[STORE PRODUCTS] Catalog ID: %s", catalog_id)
+                    store_log.debug("[STORE PRODUCTS] Sample product IDs: %s",
+                                    [item['product_retailer_id'] for item in product_items[:3]])
+
+                    # Send the native catalog message
+                    # Note: Don't show item count as API count may differ from actual WhatsApp catalog count
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "product_list",  # Matches connector logic
+                            "catalog_id": catalog_id,  # ⭐ DYNAMIC CATALOG ID FROM SLOT
+                            "header": f"{store_name} Menu",
+                            "body": "Browse our products below and add to cart!",
+                            "sections": [
+                                {
+                                    "title": "Available Products",
+                                    "product_items": product_items
+                                }
+                            ]
+                        }
+                    )
+                    store_log.debug("[STORE PRODUCTS] ✅ Product list message sent successfully")
+                elif product_items and not catalog_id:
+                    # No catalog linked - show text list instead
+                    store_log.warning("[STORE PRODUCTS] ⚠️ No catalog_id for store, using text fallback")
+                    product_lines = []
+                    for idx, p in enumerate(products[:10], start=1):
+                        title = p.get("title") or p.get("product_name", "Unnamed Product")
+                        try:
+                            price = float(p.get("discounted_price", 0) or p.get("product_price", 0))
+                            price_str = f"${price:.2f}"
+                        except (ValueError, TypeError):
+                            price_str = "-"
+                        product_lines.append(f"{idx}. {title} ({price_str})")
+
+                    message = f"🛍️ **Products at {store_name}:**\n\n" + "\n".join(product_lines)
+                    dispatcher.utter_message(text=message)
+                else:
+                    store_log.warning("[STORE PRODUCTS] ⚠️ No product items to send (products found but no valid IDs)")
+                    dispatcher.utter_message(text="Found products, but they don't seem linked to our WhatsApp catalog yet.")
+            else:
+                # Web widget - show simple list
+                product_lines = []
+                for idx, p in enumerate(products[:10], start=1):
+                    title = p.get("title") or p.get("product_name", "Unnamed Product")
+                    try:
+                        price = float(p.get("discounted_price", 0) or p.get("product_price", 0))
+                        price_str = f"${price:.2f}"
+                    except (ValueError, TypeError):
+                        price_str = "-"
+
+                    discount = p.get("discount")
+                    try:
+                        qty = float(p.get("quantity", 0))
+                        ordered = float(p.get("ordered_qty", 0))
+                        available = int(qty - ordered)
+                    except (ValueError, TypeError):
+                        available = None
+
+                    extras = []
+                    if discount and float(discount) > 0:
+                        extras.append(f"{discount}% off")
+                    if available is not None:
+                        extras.append(f"{available} available")
+
+                    extra_info = f" [{' | '.join(extras)}]" if extras else ""
+                    product_lines.append(f"{idx}. {title} ({price_str}){extra_info}")
+
+                message = f"🛍️ **Products at {store_name}:**\n\n" + "\n".join(product_lines)
+                message += "\n\n➡️ Reply with the product number to see details."
+
+                dispatcher.utter_message(text=message)
+
+            return [
+                SlotSet("recent_products", compact_product_slot(products[:10], self.name())),
+                SlotSet("store_context", False) # ✅ ADD THIS LINE
+            ]
+
+        except Exception as e:
+            store_log.warning("[STORE PRODUCTS] ❌❌❌ EXCEPTION in ActionShowStoreProducts ❌❌❌")
+            store_log.warning("[STORE PRODUCTS] Error type: %s", type(e).__name__)
+            store_log.warning("[STORE PRODUCTS] Error message: %s", e)
+            import traceback
+            store_log.debug("[STORE PRODUCTS] Full traceback:")
+            traceback.print_exc()
+            dispatcher.utter_message(text=f"Sorry, I couldn't fetch products right now. Error: {str(e)[:100]}")
+            return []
@@ -0,0 +1,1872 @@
+# actions/domains/checkout.py
+"""
+Checkout Actions
+Delivery address, Stripe payment and order tracking.
+
+1. The only domain that imports stripe - the SDK loads with the first
+   checkout action, not at action-server startup
+2. Checkout sessions are reused per cart fingerprint (checkout_sessions)
+"""
+import json
+import os
+import re
+from typing import Any, Dict, List, Text
+
+import requests
+import stripe
+from rasa_sdk import Action, Tracker
+from rasa_sdk.events import EventType, FollowupAction, SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.action_logging import LazyJson
+from actions.cart_cache import get_cart_list, invalidate_cart
+from actions.catalog_cache import compact_store_slot
+from actions.checkout_sessions import (
+    checkout_fingerprint,
+    forget_checkout_session,
+    get_or_create_checkout_session,
+    latest_order_id,
+)
+from actions.coupon_cache import invalidate_coupons
+from actions.domains.common import API_BASE, checkout_log
+from actions.geo_index import nearest_stores
+from actions.order_cache import find_order_by_payment, get_order, get_recent_orders, note_new_order
+from actions.store_directory import search_stores
+from actions.stripe_webhook import claim_confirmation
+from actions.user_cache import add_address, get_address, get_addresses, invalidate_user_lookup
+
+# Stripe API host override (stub backend for load tests); unset = api.stripe.com
+if os.getenv("STRIPE_API_BASE"):
+    stripe.api_base = os.getenv("STRIPE_API_BASE")
+
+
+class ActionCheckout(Action):
+    """
+    Main checkout action - delegates to appropriate step based on checkout state.
+    Flow: Check login -> Check address -> Create Stripe payment
+    """
+
+    def name(self) -> Text:
+        return "action_checkout"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[EventType]:
+        user_id = tracker.get_slot("user_id")
+
+        # Step 1: Check if user is logged in
+        if not user_id or not isinstance(user_id, str) or not user_id.isdigit():
+            dispatcher.utter_message(text="You need to log in to proceed to checkout.")
+            return [FollowupAction("action_prompt_login")]
+
+        # Step 2: Check checkout step / address status
+        checkout_step = tracker.get_slot("checkout_step")
+        delivery_address_id = tracker.get_slot("delivery_address_id")
+
+        checkout_log.debug("[CHECKOUT] user_id: %s, checkout_step: %s, address_id: %s",
+                           user_id, checkout_step, delivery_address_id)
+
+        # If address is already confirmed, proceed to payment
+        if checkout_step == "confirm_address" and delivery_address_id:
+            checkout_log.debug("[CHECKOUT] Address confirmed, proceeding to payment")
+            return [FollowupAction("action_create_stripe_checkout")]
+
+        # Otherwise, need to get/confirm address first
+        checkout_log.debug("[CHECKOUT] Need to confirm address first")
+        return [FollowupAction("action_get_address")]
+
+
+class ActionGetAddress(Action):
+
+    def name(self) -> Text:
+        return "action_get_address"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+        user_id = tracker.get_slot("user_id")
+        # Require login: if user_id missing or invalid, prompt login
+        if not user_id or not isinstance(user_id, str) or not user_id.isdigit():
+            dispatcher.utter_message(text="You need to log in to view your address. Please type 'login' to log in.")
+            return [FollowupAction("action_prompt_login")]
+
+        # Check channel for WhatsApp (needed for prompts)
+        input_channel = tracker.get_latest_input_channel()
+        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+        # ✅ FIRST: Check if we already have address info in slot (from native order flow)
+        delivery_address = tracker.get_slot("delivery_address")
+        delivery_address_id = tracker.get_slot("delivery_address_id")
+
+        if delivery_address and delivery_address_id:
+            checkout_log.debug("[ADDRESS FETCH] Using existing address from slot: %s", delivery_address_id)
+            try:
+                # Parse the stored address JSON
+                if isinstance(delivery_address, str):
+                    addr = json.loads(delivery_address)
+                else:
+                    addr = delivery_address
+
+                # Display the address
+                title = addr.get("address_name", "Home")
+                name = addr.get("name", "")
+                line1 = addr.get("full_address") or addr.get("address", "")
+                city = addr.get("city", "")
+                state = addr.get("state", "")
+                zipc = addr.get("zip", "")
+                country = addr.get("country_name", "")
+
+                address_msg = f"🏠 *{title}*\n{name}\n{line1}"
+                if city or state or zipc:
+                    address_msg += f"\n{city}, {state} {zipc}"
+                if country:
+                    address_msg += f"\n{country}"
+
+                dispatcher.utter_message(text=address_msg)
+
+                if is_whatsapp:
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": "Would you like to proceed with this address?",
+                            "buttons": [
+                                {"id": "pay_now", "title": "💳 Pay Now"},
+                                {"id": "change_address", "title": "📍 Different Address"}
+                            ]
+                        }
+                    )
+                else:
+                    dispatcher.utter_message(
+                        text="Would you like to proceed with this address?",
+                        buttons=[{"title": "Pay Now", "payload": "Pay Now"}]
+                    )
+
+                return [SlotSet("checkout_step", "confirm_address")]
+
+            except Exception as e:
+                checkout_log.warning("[ADDRESS FETCH] Error parsing stored address: %s", e)
+                # Fall through to API call
+
+        # Get store_id from slot for shipper_id
+        store_id = tracker.get_slot("store_id") or ""
+        # Get delivery_address_id from slot if available (from native order flow)
+        address_id = tracker.get_slot("delivery_address_id") or ""
+
+        payload = {
+            "user_id": user_id,
+            "shipper_id": store_id,
+            "address_id": address_id,
+        }
+        checkout_log.debug("[ADDRESS FETCH] Request: %s", LazyJson(payload))
+
+        try:
+            url = f"{API_BASE}/getAddress"
+            response = requests.post(url, json=payload, timeout=8)
+            resp_json = response.json()
+
+            checkout_log.debug("[ADDRESS FETCH] Response status: %s", response.status_code)
+            checkout_log.debug("[ADDRESS FETCH] Response data: %s", LazyJson(resp_json))
+
+            # Check channel for WhatsApp (needed for prompts)
+            input_channel = tracker.get_latest_input_channel()
+            is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+            if (
+                response.status_code != 200
+                or resp_json.get("status") != 1
+                or not resp_json.get("data")
+            ):
+                checkout_log.warning("[ADDRESS FETCH] API error or no data")
+                # Instead of just error, prompt user to add address
+                if is_whatsapp:
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": "No saved delivery address found. Please share your delivery location:",
+                            "buttons": [
+                                {"id": "share_location", "title": "📍 Share Location"},
+                                {"id": "type_address", "title": "✏️ Type Address"}
+                            ]
+                        }
+                    )
+                    return [SlotSet("checkout_step", "awaiting_address")]
+                else:
+                    dispatcher.utter_message(text="No saved delivery address found. Please add your address first.")
+                return []
+
+            data = resp_json.get("data", {})
+            address_list = data.get("addressList")
+            if not address_list or not isinstance(address_list, list) or len(address_list) == 0:
+                checkout_log.debug("[ADDRESS FETCH] No addresses in list")
+                # Prompt user to add address
+                if is_whatsapp:
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": "No saved delivery address found. Please share your delivery location:",
+                            "buttons": [
+                                {"id": "share_location", "title": "📍 Share Location"},
+                                {"id": "type_address", "title": "✏️ Type Address"}
+                            ]
+                        }
+                    )
+                    return [SlotSet("checkout_step", "awaiting_address")]
+                else:
+                    dispatcher.utter_message(text="No saved delivery address found. Please add your address first.")
+                return []
+
+            address = address_list[0]  # pick first (or loop if you want to display all)
+
+            # Extract address fields
+            address_id = address.get("id") or address.get("address_id")
+            title = address.get("address_name", "Home")
+            name = address.get("name", "")
+            line1 = address.get("address", "")
+            line2 = address.get("address2", "")
+            city = address.get("city", "")
+            state = address.get("state", "")
+            zipc = address.get("zip", "")
+            country = address.get("country_name", "")
+            phone = address.get("phone", "")
+            email = address.get("email", "")
+
+            checkout_log.debug("[ADDRESS FETCH] Found address ID: %s, title: %s", address_id, title)
+
+            address_msg = (
+                f"🏠 **{title}**\n\n"
+                f"{name}\n"
+                f"{line1}" + (f"\n{line2}" if line2 else "") + "\n"
+                f"{city}, {state}, {zipc}\n"
+                f"{country}\n\n"
+                f"📞 {phone}"
+            )
+            dispatcher.utter_message(text=address_msg)
+
+            # is_whatsapp already defined above
+
+            if is_whatsapp:
+                # WhatsApp interactive buttons
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": "Would you like to proceed with this address?",
+                        "buttons": [
+                            {"id": "pay_now", "title": "💳 Pay Now"},
+                            {"id": "change_address", "title": "📍 Different Address"}
+                        ]
+                    }
+                )
+            else:
+                # Web widget buttons
+                dispatcher.utter_message(
+                    text="Would you like to proceed with this address?",
+                    buttons=[{"title": "Pay Now", "payload": "Pay Now"}]
+                )
+
+            # Store address info in slots for later use in checkout
+            return [
+                SlotSet("delivery_address_id", str(address_id) if address_id else ""),
+                SlotSet("delivery_address", json.dumps(address)),
+                SlotSet("checkout_step", "confirm_address")
+            ]
+
+        except Exception as e:
+            checkout_log.warning("[EXCEPTION] in ActionGetAddress: %s", e)
+            import traceback
+            traceback.print_exc()
+            # Prompt to add address on error
+            input_channel = tracker.get_latest_input_channel()
+            is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+            if is_whatsapp:
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": "Sorry, couldn't fetch address. Please share your delivery location:",
+                        "buttons": [
+                            {"id": "share_location", "title": "📍 Share Location"},
+                            {"id": "type_address", "title": "✏️ Type Address"}
+                        ]
+                    }
+                )
+                return [SlotSet("checkout_step", "awaiting_address")]
+            else:
+                dispatcher.utter_message(text="Sorry, an error occurred while retrieving your address.")
+        return []
+
+
+class ActionCreateStripeCheckout(Action):
+    def name(self) -> Text:
+        return "action_create_stripe_checkout"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id or not isinstance(user_id, str) or not user_id.isdigit():
+            dispatcher.utter_message(text="You must be logged in to proceed with payment.")
+            return [FollowupAction("action_prompt_login")]
+
+        # Get WhatsApp number
+        sender_id = tracker.sender_id
+        whatsapp_number = None
+
+        if sender_id:
+            if isinstance(sender_id, str) and sender_id.startswith("whatsapp:"):
+                whatsapp_number = sender_id.replace("whatsapp:", "").strip()
+            elif isinstance(sender_id, str) and (sender_id.startswith("+") or sender_id.isdigit()):
+                whatsapp_number = sender_id.strip()
+            elif isinstance(sender_id, str):
+                cleaned = ''.join(c for c in sender_id if c.isdigit() or c == '+')
+                if len(cleaned) >= 10:
+                    whatsapp_number = cleaned
+
+        checkout_log.debug("[DEBUG] WhatsApp number: %s", whatsapp_number)
+
+        # Get applied coupon if any
+        applied_coupon_id = tracker.get_slot("applied_coupon_id") or ""
+        applied_coupon_code = tracker.get_slot("applied_coupon_code") or ""
+        store_id = tracker.get_slot("store_id")  # Get store filter
+        checkout_log.debug("[STRIPE CHECKOUT] Applied coupon: %s (ID: %s), store_id: %s",
+                           applied_coupon_code, applied_coupon_id, store_id)
+
+        # Fetch Cart with coupon applied
+        try:
+            cart_status_code, cart_data = get_cart_list(user_id, store_id, applied_coupon_id, timeout=10)
+            checkout_log.debug("[STRIPE CHECKOUT] Cart response: %s", LazyJson(cart_data))
+
+            if cart_status_code != 200 or cart_data.get("status") != 1:
+                dispatcher.utter_message(text="Sorry, I couldn't fetch your cart.")
+                return []
+
+            order_meta = cart_data.get("data", {}).get("orderMetaData", {})
+            # Use discounted total if coupon applied, otherwise use regular total
+            total_amount = float(order_meta.get("total", 0))
+            coupon_discount = float(order_meta.get("coupon_discount", 0))
+
+            checkout_log.debug("[STRIPE CHECKOUT] Total: $%.2f, Coupon discount: $%.2f", total_amount, coupon_discount)
+
+            if total_amount <= 0:
+                dispatcher.utter_message(text="Your cart is empty.")
+                return []
+
+            # ✅ FORCE USD: Assume cart returns USD already
+            # If cart returns INR, you need to convert here
+            # Example: total_amount_usd = total_amount / 83  # INR to USD conversion
+
+            if total_amount < 0.50:
+                dispatcher.utter_message(text=f"⚠️ Cart total (${total_amount:.2f}) is below minimum $0.50.")
+                return []
+
+            amount_in_cents = int(total_amount * 100)
+
+        except Exception as e:
+            checkout_log.warning("[EXCEPTION] Fetching cart: %s", e)
+            dispatcher.utter_message(text="Error fetching cart.")
+            return []
+
+        # Create Stripe Session - FORCE USD ONLY
+        stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+
+        try:
+            input_channel = tracker.get_latest_input_channel()
+            is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+            # Get delivery address ID for order
+            delivery_address_id = tracker.get_slot("delivery_address_id") or ""
+
+            metadata = {
+                "user_id": user_id,
+                "channel": "whatsapp" if is_whatsapp else "website",
+                "delivery_address_id": delivery_address_id,
+                "store_id": tracker.get_slot("store_id") or "",  # ⭐ For backend to know which WhatsApp to notify
+                "wh_account_id": tracker.get_slot("store_id") or "",  # ⭐ Same as store_id for clarity
+                "store_name": tracker.get_slot("store_name") or ""
+            }
+
+            # Add coupon info to metadata if applied
+            if applied_coupon_id:
+                metadata["coupon_id"] = applied_coupon_id
+                metadata["coupon_code"] = applied_coupon_code
+                metadata["coupon_discount"] = str(coupon_discount)
+
+            if whatsapp_number:
+                metadata["whatsapp_number"] = whatsapp_number
+                checkout_log.debug("[DEBUG] ✅ Added WhatsApp to metadata: %s", whatsapp_number)
+
+            if is_whatsapp:
+                # Lets the Stripe webhook confirm payment to this sender via this seller's number
+                message_meta = tracker.latest_message.get("metadata") or {}
+                metadata["sender_id"] = sender_id
+                metadata["phone_number_id"] = message_meta.get("phone_number_id") or ""
+                metadata["bot_phone_number"] = message_meta.get("bot_phone_number") or ""
+
+            # Build description
+            description = f"Order for User #{user_id}"
+            if applied_coupon_code:
+                description += f" (Coupon: {applied_coupon_code})"
+
+            # ✅ CRITICAL FIX: Only specify USD, remove any other currency hints
+            fingerprint = checkout_fingerprint(
+                user_id, cart_data, total_amount, delivery_address_id,
+                applied_coupon_id, store_id, metadata["channel"], latest_order_id(user_id)
+            )
+            # Same cart/address/coupon as an open session -> reuse its URL
+            session, reused_session = get_or_create_checkout_session(
+                fingerprint,
+                lambda idempotency_key, expires_at: stripe.checkout.Session.create(
+                    payment_method_types=["card"],
+                    line_items=[{
+                        "price_data": {
+                            "currency": "usd",  # ✅ ONLY USD
+                            "product_data": {
+                                "name": "AnythingInstantly Cart Payment",
+                                "description": description
+                            },
+                            "unit_amount": amount_in_cents,
+                        },
+                        "quantity": 1,
+                    }],
+                    mode="payment",
+                    locale="en",  # Force English locale
+                    currency="usd",  # Force USD currency display
+                    metadata=metadata,
+                    success_url="https://stageshipperapi.thedelivio.com/api/bot-payment-status?session_id={CHECKOUT_SESSION_ID}&status=success",
+                    cancel_url="https://stageshipperapi.thedelivio.com/api/bot-payment-status?session_id={CHECKOUT_SESSION_ID}&status=cancel",
+                    payment_intent_data={
+                        "capture_method": "automatic",
+                    },
+                    expires_at=expires_at,
+                    idempotency_key=idempotency_key,
+                ),
+            )
+
+            payment_url = session.url
+
+            checkout_log.debug("[DEBUG] Stripe session %s: %s", 'reused' if reused_session else 'created', session.id)
+            checkout_log.debug("[DEBUG] Currency: usd")
+            checkout_log.debug("[DEBUG] Amount: $%.2f", total_amount)
+
+            # Build payment text with coupon info
+            if coupon_discount > 0 and applied_coupon_code:
+                payment_text = (
+                    f"🎟️ Coupon: {applied_coupon_code}\n"
+                    f"💵 Discount: -${coupon_discount:.2f}\n"
+                    f"💰 Total: ${total_amount:.2f}\n\n"
+                    f"Tap the button below to complete your secure payment."
+                )
+            else:
+                payment_text = f"💰 Total: ${total_amount:.2f}\n\nTap the button below to complete your secure payment."
+
+            # Send payment link
+            if is_whatsapp:
+                # Send CTA URL button for beautiful payment link
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "cta_url",
+                        "header": "💳 Ready to Pay!",
+                        "text": payment_text,
+                        "button_text": "💳 Pay Now",
+                        "url": payment_url,
+                        "footer": "Secure payment by Stripe"
+                    }
+                )
+                # Send follow-up message with confirmation button
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": "After payment, tap below to confirm:",
+                        "buttons": [
+                            {"id": "check_payment", "title": "✅ I've Paid"}
+                        ]
+                    }
+                )
+            else:
+                dispatcher.utter_message(
+                    text=f"💳 **Complete your payment of ${total_amount:.2f}**\n\n"
+                         f"Click below to open secure checkout:\n\n"
+                         f'<a href="{payment_url}" target="_blank">👉 Pay ${total_amount:.2f} with Stripe</a>\n\n'
+                         f"You'll receive automatic confirmation after payment!"
+                )
+                dispatcher.utter_message(
+                    text="After payment, click here:",
+                    buttons=[
+                        {"title": "✅ Check Payment", "payload": "/check_payment_status"}
+                    ]
+                )
+
+            return [
+                SlotSet("stripe_session_id", session.id),
+                SlotSet("payment_amount", total_amount)
+            ]
+
+        except Exception as e:
+            checkout_log.warning("[EXCEPTION] Creating Stripe session: %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="Error creating payment session")
+            return []
+
+
+class ActionCheckStripePayment(Action):
+    """Manual payment check with full order details + Continue Shopping buttons"""
+
+    def name(self) -> Text:
+        return "action_check_stripe_payment"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[EventType]:
+        session_id = tracker.get_slot("stripe_session_id")
+        user_id = tracker.get_slot("user_id")
+
+        if not session_id:
+            dispatcher.utter_message(text="No payment session found. Please create a new order.")
+            return []
+
+        if not user_id:
+            dispatcher.utter_message(text="Please log in to check payment status.")
+            return [FollowupAction("action_prompt_login")]
+
+        stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+
+        # Detect channel FIRST (before any if/else blocks)
+        input_channel = tracker.get_latest_input_channel()
+        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+        try:
+            # Retrieve Stripe session
+            session = stripe.checkout.Session.retrieve(session_id)
+
+            checkout_log.debug("[MANUAL CHECK] Session ID: %s", session_id)
+            checkout_log.debug("[MANUAL CHECK] Payment Status: %s", session.payment_status)
+            checkout_log.debug("[MANUAL CHECK] Channel: %s, is_whatsapp: %s", input_channel, is_whatsapp)
+
+            if session.payment_status == "paid":
+                # ✅ Payment is complete - backend turns the cart into an order
+                invalidate_cart(user_id)
+                invalidate_coupons(user_id)  # one-time coupons are used up
+                forget_checkout_session(session_id)
+
+                # Get payment amount from Stripe
+                amount_total = session.amount_total / 100  # Convert cents to dollars
+
+                # 🔍 Fetch the order this payment created
+                order_id = None
+                invoice_no = None
+
+                try:
+                    # Matched by session / PaymentIntent id, not just the newest order (retried briefly)
+                    order = find_order_by_payment(user_id, [session_id, getattr(session, "payment_intent", None)])
+
+                    if order:
+                        order_id = order.get("id")
+                        invoice_no = order.get("invoice_no")
+                        checkout_log.debug("[ORDER FOUND] Order ID: %s, Invoice: %s", order_id, invoice_no)
+                    else:
+                        checkout_log.debug("[ORDER LIST] No order for session %s yet", session_id)
+
+                except Exception as e:
+                    checkout_log.warning("[WARNING] Could not fetch order: %s", e)
+                    import traceback
+                    traceback.print_exc()
+
+                # is_whatsapp already defined at function start
+
+                # Build response message
+                if not claim_confirmation(session_id):
+                    # The Stripe webhook (or an earlier tap) already sent the confirmation
+                    checkout_log.debug("[MANUAL CHECK] Session %s already confirmed", session_id)
+                    order_ref = f" (Order #{order_id})" if order_id else ""
+                    dispatcher.utter_message(text=f"✅ Your payment is already confirmed{order_ref}. Type 'my orders' to track it.")
+                elif order_id:
+                    # ✅ We have order details
+                    if is_whatsapp:
+                        response_text = (
+                            f"✅ *Payment Successful!*\n\n"
+                            f"💳 *Amount Paid:* ${amount_total:.2f}\n"
+                            f"📦 *Order ID:* #{order_id}\n"
+                        )
+                        if invoice_no:
+                            response_text += f"📄 *Invoice:* {invoice_no}\n"
+                        response_text += (
+                            f"\nTrack your order:\n"
+                            f"https://stage.anythinginstantly.com/my-orders\n\n"
+                            f"Thank you for shopping! 🎉"
+                        )
+                        dispatcher.utter_message(text=response_text)
+
+                        # WhatsApp interactive buttons for next actions
+                        # Use ONLY json_message to avoid duplicate messages
+                        dispatcher.utter_message(
+                            json_message={
+                                "type": "buttons",
+                                "text": "What would you like to do next?",
+                                "buttons": [
+                                    {"id": "browse_products", "title": "🛍️ Browse Products"},
+                                    {"id": "my_orders", "title": "📦 My Orders"},
+                                    {"id": "view_cart", "title": "🛒 View Cart"}
+                                ]
+                            }
+                        )
+                    else:
+                        response_text = (
+                            f"✅ **Payment Confirmed!**\n\n"
+                            f"💳 **Amount Paid:** ${amount_total:.2f}\n"
+                            f"📦 **Order ID:** #{order_id}\n"
+                        )
+                        if invoice_no:
+                            response_text += f"📄 **Invoice:** {invoice_no}\n"
+                        response_text += "\nYour order has been placed successfully."
+
+                        dispatcher.utter_message(text=response_text)
+
+                        # Add clickable link
+                        dispatcher.utter_message(
+                            text='<a href="https://stage.anythinginstantly.com/my-orders" target="_blank" rel="noopener noreferrer">🔗 View Your Orders</a>'
+                        )
+
+                        dispatcher.utter_message(text="Thank you! 🎉")
+
+                        # ✅ ADD CONTINUE SHOPPING BUTTONS
+                        dispatcher.utter_message(
+                            text="What would you like to do next?",
+                            buttons=[
+                                {"title": "🛍️ Browse Products", "payload": "/show_categories"},
+                                {"title": "📍 Find Stores", "payload": "find stores near me"},
+                                {"title": "📦 My Orders", "payload": "/track_my_orders"}
+                            ]
+                        )
+
+                else:
+                    # ⚠️ Order not found yet
+                    if is_whatsapp:
+                        # Send payment confirmation text
+                        dispatcher.utter_message(
+                            text=f"✅ Payment Successful!\n\n💳 Amount Paid: ${amount_total:.2f}\n\nYour order is being processed.\n\nThank you! 🎉"
+                        )
+                        # Then send interactive buttons for next actions
+                        dispatcher.utter_message(
+                            json_message={
+                                "type": "buttons",
+                                "text": "What would you like to do next?",
+                                "buttons": [
+                                    {"id": "browse_products", "title": "🛍️ Browse Products"},
+                                    {"id": "my_orders", "title": "📦 My Orders"},
+                                    {"id": "view_cart", "title": "🛒 View Cart"}
+                                ]
+                            }
+                        )
+                    else:
+                        response_text = (
+                            f"✅ **Payment Confirmed!**\n\n"
+                            f"💳 **Amount Paid:** ${amount_total:.2f}\n\n"
+                            f"Your order is being processed."
+                        )
+                        dispatcher.utter_message(text=response_text)
+
+                    if not is_whatsapp:
+                        dispatcher.utter_message(
+                            text='<a href="https://stage.anythinginstantly.com/my-orders" target="_blank" rel="noopener noreferrer">🔗 View Your Orders</a>'
+                        )
+                        dispatcher.utter_message(text="Thank you! 🎉")
+
+                        # ✅ ADD CONTINUE SHOPPING BUTTONS
+                        dispatcher.utter_message(
+                            text="What would you like to do next?",
+                            buttons=[
+                                {"title": "🛍️ Browse Products", "payload": "/show_categories"},
+                                {"title": "📍 Find Stores", "payload": "find stores near me"},
+                                {"title": "📦 My Orders", "payload": "/track_my_orders"}
+                            ]
+                        )
+
+                # Clear payment session and store last order ID
+                return [
+                    SlotSet("stripe_session_id", None),
+                    SlotSet("payment_amount", None),
+                    SlotSet("last_created_order_id", str(order_id) if order_id else None),
+                    SlotSet("applied_coupon_id", None),  # Clear coupon after payment
+                    SlotSet("applied_coupon_code", None),
+                    SlotSet("applied_coupon_discount", None)
+                ]
+
+            elif session.payment_status == "unpaid":
+                # Payment not completed yet
+                if is_whatsapp:
+                    # WhatsApp: Use ONLY json_message to avoid duplicates
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": "⏳ Payment not completed yet.\n\nPlease complete your payment and click below:",
+                            "buttons": [
+                                {"id": "check_payment", "title": "✅ Check Again"}
+                            ]
+                        }
+                    )
+                else:
+                    # Web widget
+                    dispatcher.utter_message(
+                        text="⏳ Payment not completed yet.\n\nPlease complete your payment.",
+                        buttons=[
+                            {"title": "✅ Check Again", "payload": "/check_payment_status"}
+                        ]
+                    )
+                return []
+
+            else:
+                # Other status (pending, etc.)
+                if is_whatsapp:
+                    # WhatsApp: Use ONLY json_message to avoid duplicates
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": f"ℹ️ Payment status: {session.payment_status}\n\nPlease check again.",
+                            "buttons": [
+                                {"id": "check_payment", "title": "🔄 Retry"}
+                            ]
+                        }
+                    )
+                else:
+                    # Web widget
+                    dispatcher.utter_message(
+                        text=f"ℹ️ Payment status: {session.payment_status}\n\nPlease check again.",
+                        buttons=[
+                            {"title": "🔄 Retry", "payload": "/check_payment_status"}
+                        ]
+                    )
+                return []
+
+        except stripe.error.InvalidRequestError as e:
+            checkout_log.warning("[ERROR] Invalid Stripe session: %s", e)
+            dispatcher.utter_message(text="Payment session expired. Please create a new order.")
+            return [
+                SlotSet("stripe_session_id", None),
+                SlotSet("payment_amount", None)
+            ]
+        except Exception as e:
+            checkout_log.warning("[ERROR] Payment check failed: %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="Error checking payment. Please try again.")
+            return []
+
+
+def _parse_whatsapp_address(address_text: str) -> Dict[str, str]:
+    """
+    Parse WhatsApp location address string to extract components.
+
+    WhatsApp address format examples:
+    - "11A, 2nd Cross Rd, Bengaluru, 560037, KA, IN"
+    - "123 Main St, New York, 10001, NY, US"
+    - "Some Location Name" (simple format)
+
+    Returns dict with: address, city, state, zip_code, country
+    """
+    result = {
+        "address": address_text,
+        "city": "",
+        "state": "NA",  # Default to NA if not found (API requires non-empty)
+        "zip_code": "",
+        "country": "United States"
+    }
+
+    if not address_text:
+        return result
+
+    # Split by comma and clean up
+    parts = [p.strip() for p in address_text.split(",")]
+
+    if len(parts) >= 4:
+        # Full address format: "Street, City, ZIP, State, Country"
+        # or "Street, City, State ZIP, Country"
+
+        # Check last part for country code
+        last_part = parts[-1].upper()
+        country_map = {
+            "IN": "India",
+            "US": "United States",
+            "USA": "United States",
+            "UK": "United Kingdom",
+            "GB": "United Kingdom",
+            "CA": "Canada",
+            "AU": "Australia"
+        }
+
+        if last_part in country_map:
+            result["country"] = country_map[last_part]
+            parts = parts[:-1]  # Remove country from parts
+
+        # Check second-to-last for state code (2 letters)
+        if len(parts) >= 2:
+            potential_state = parts[-1].upper().strip()
+            if len(potential_state) == 2 and potential_state.isalpha():
+                result["state"] = potential_state
+                parts = parts[:-1]
+
+        # Check for ZIP code (digits only or digit-letter mix)
+        for i, part in enumerate(reversed(parts)):
+            clean_part = part.replace(" ", "").replace("-", "")
+            if clean_part.isdigit() and 4 <= len(clean_part) <= 10:
+                result["zip_code"] = part.strip()
+                parts = parts[:-(i+1)] if i > 0 else parts[:-1]
+                break
+            elif len(clean_part) >= 5 and any(c.isdigit() for c in clean_part):
+                # Could be alphanumeric ZIP like "SW1A 1AA" (UK) or "560037"
+                if i < len(parts) - 1:  # Not the first part
+                    result["zip_code"] = part.strip()
+                    parts = parts[:-(i+1)] if i > 0 else parts[:-1]
+                    break
+
+        # City is typically the second-to-last meaningful part
+        if len(parts) >= 2:
+            result["city"] = parts[-1].strip()
+            result["address"] = ", ".join(parts[:-1])
+        elif len(parts) == 1:
+            result["address"] = parts[0].strip()
+
+    elif len(parts) == 3:
+        # Short format: "Street, City, State" or "Location, City, State"
+        result["address"] = parts[0].strip()
+        result["city"] = parts[1].strip()
+        potential_state = parts[2].strip().upper()
+        if len(potential_state) <= 3:
+            result["state"] = potential_state
+        else:
+            result["city"] = parts[2].strip()
+
+    elif len(parts) == 2:
+        result["address"] = parts[0].strip()
+        result["city"] = parts[1].strip()
+
+    # Ensure state is never empty (API requires it)
+    if not result["state"]:
+        result["state"] = "NA"
+
+    checkout_log.debug("[ADDRESS PARSE] Input: '%s'", address_text)
+    checkout_log.debug("[ADDRESS PARSE] Result: %s", LazyJson(result))
+
+    return result
+
+
+class ActionHandleDeliveryLocation(Action):
+    """
+    Handle location shared by user for delivery.
+    Can be WhatsApp location share or typed address.
+    """
+
+    def name(self) -> Text:
+        return "action_handle_delivery_location"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        checkout_log.debug("[DELIVERY LOCATION] ========== LOCATION RECEIVED ==========")
+
+        events = []
+        user_id = tracker.get_slot("user_id")
+
+        # Check metadata for location data
+        metadata = tracker.latest_message.get("metadata", {})
+        latitude = metadata.get("latitude")
+        longitude = metadata.get("longitude")
+
+        # Marketplace store search: a location shared while picking a store
+        # goes straight to the nearest stores instead of asking for a ZIP
+        in_store_search = tracker.get_slot("store_context") or (
+            not tracker.get_slot("selected_store") and not tracker.get_slot("checkout_step")
+        )
+        if latitude and longitude and in_store_search and not tracker.get_slot("is_dedicated_bot"):
+            stores = nearest_stores(latitude, longitude)
+            if not stores and tracker.get_slot("zipcode"):
+                # The index only knows stores of zips seen on this worker - load the customer's zip
+                try:
+                    search_stores(tracker.get_slot("zipcode"))
+                    stores = nearest_stores(latitude, longitude)
+                except Exception as e:
+                    checkout_log.debug("[DELIVERY LOCATION] Could not load stores for %s: %s",
+                                       tracker.get_slot('zipcode'), e)
+            checkout_log.debug("[DELIVERY LOCATION] Store search by location: %s stores in range", len(stores))
+            if stores:
+                lines = [
+                    f"{idx}. {store['name']} - {store['address']} ({store['distance_km']:.1f} km)"
+                    for idx, store in enumerate(stores, start=1)
+                ]
+                dispatcher.utter_message(text="Found these stores near you:\n" + "\n".join(lines))
+                dispatcher.utter_message(text="Please select a store by typing its option number or name.")
+                store_refs = compact_store_slot(stores, self.name())
+                return [
+                    SlotSet("delivery_latitude", str(latitude)),
+                    SlotSet("delivery_longitude", str(longitude)),
+                    SlotSet("stores_list", store_refs),
+                    SlotSet("recent_products", store_refs),
+                    SlotSet("store_context", True),
+                    SlotSet("selected_store", None)
+                ]
+            if not user_id:
+                dispatcher.utter_message(text="I couldn't find stores near that location. Please provide your 5-digit ZIP code.")
+                return [SlotSet("store_context", True)]
+
+        if not user_id:
+            dispatcher.utter_message(text="Please start your order first by browsing products.")
+            return []
+        location_name = metadata.get("location_name", "")
+        location_address = metadata.get("location_address", "")
+
+        checkout_log.debug("[DELIVERY LOCATION] Lat: %s, Lng: %s", latitude, longitude)
+        checkout_log.debug("[DELIVERY LOCATION] Name: %s, Address: %s", location_name, location_address)
+
+        if latitude and longitude:
+            # ===== LOCATION SHARED VIA WHATSAPP =====
+            # Use reverse geocoding or the address from WhatsApp
+
+            address_text = location_address or location_name or f"Location: {latitude}, {longitude}"
+
+            # Store location
+            events.append(SlotSet("delivery_latitude", str(latitude)))
+            events.append(SlotSet("delivery_longitude", str(longitude)))
+            events.append(SlotSet("delivery_address_text", address_text))
+            events.append(SlotSet("checkout_step", "confirm_location"))
+
+            # Get order total from slot
+            order_total = tracker.get_slot("whatsapp_order_total") or 0
+
+            # Save address to user account
+            sender_id = tracker.sender_id
+            phone = re.sub(r'[^0-9]', '', sender_id) if sender_id else ""
+
+            # Parse the address to extract city, state, zip
+            parsed_addr = _parse_whatsapp_address(address_text)
+
+            try:
+                addr_result = add_address(user_id, {
+                    "address_name": "WhatsApp Location",
+                    "name": "WhatsApp Customer",
+                    "email": f"wa_{phone}@whatsapp.guest",
+                    "phone": phone,
+                    "address": parsed_addr["address"],
+                    "address2": f"Lat: {latitude}, Lng: {longitude}",
+                    "city": parsed_addr["city"] or "Unknown",
+                    "state": parsed_addr["state"],  # Required field - defaults to "NA"
+                    "country": parsed_addr["country"],
+                    "zip_code": parsed_addr["zip_code"] or "00000"
+                })
+                checkout_log.debug("[DELIVERY LOCATION] Address saved: %s", LazyJson(addr_result))
+                invalidate_user_lookup(sender_id)
+            except Exception as e:
+                checkout_log.warning("[DELIVERY LOCATION] Warning - couldn't save address: %s", e)
+
+            msg_text = f"📍 Delivery Location:\n{address_text}\n\n💰 Total: ${order_total:.2f}\n\nIs this correct?"
+
+            # Use ONLY json_message for WhatsApp to avoid duplicate messages
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": msg_text,
+                    "buttons": [
+                        {"id": "confirm_order_pay", "title": "✅ Confirm & Pay"},
+                        {"id": "change_address", "title": "📍 Change Location"}
+                    ]
+                }
+            )
+
+        else:
+            # No location in metadata - prompt user
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": "Please share your delivery location:",
+                    "buttons": [
+                        {"id": "share_location", "title": "📍 Share Location"},
+                        {"id": "type_address", "title": "✏️ Type Address"}
+                    ]
+                }
+            )
+            events.append(SlotSet("checkout_step", "awaiting_address"))
+
+        return events
+
+
+class ActionConfirmOrderAndPay(Action):
+    """
+    Confirm order and create Stripe payment link.
+    Final step before payment.
+    """
+
+    def name(self) -> Text:
+        return "action_confirm_order_and_pay"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        checkout_log.debug("[CONFIRM & PAY] ========== CREATING PAYMENT ==========")
+
+        user_id = tracker.get_slot("user_id")
+
+        if not user_id:
+            dispatcher.utter_message(text="Session expired. Please start over by browsing products.")
+            return [FollowupAction("action_restart")]
+
+        # Get delivery address
+        delivery_address = tracker.get_slot("delivery_address")
+        delivery_address_text = tracker.get_slot("delivery_address_text")
+        delivery_latitude = tracker.get_slot("delivery_latitude")
+        delivery_longitude = tracker.get_slot("delivery_longitude")
+
+        # If we have location but no saved address, save it first
+        if delivery_latitude and not delivery_address:
+            # Save address to user account
+            try:
+                sender_id = tracker.sender_id
+                phone = re.sub(r'[^0-9]', '', sender_id) if sender_id else ""
+
+                # Parse the address to extract city, state, zip
+                addr_text = delivery_address_text or f"Lat: {delivery_latitude}, Lng: {delivery_longitude}"
+                parsed_addr = _parse_whatsapp_address(addr_text)
+
+                addr_result = add_address(user_id, {
+                    "address_name": "WhatsApp Delivery",
+                    "name": "WhatsApp Customer",
+                    "email": f"wa_{phone}@whatsapp.guest",
+                    "phone": phone,
+                    "address": parsed_addr["address"],
+                    "address2": f"Lat: {delivery_latitude}, Lng: {delivery_longitude}",
+                    "city": parsed_addr["city"] or "Unknown",
+                    "state": parsed_addr["state"],  # Required field - defaults to "NA"
+                    "country": parsed_addr["country"],
+                    "zip_code": parsed_addr["zip_code"] or "00000"
+                })
+                checkout_log.debug("[CONFIRM & PAY] Address saved: %s", LazyJson(addr_result))
+                invalidate_user_lookup(sender_id)
+
+            except Exception as e:
+                checkout_log.warning("[CONFIRM & PAY] Warning - couldn't save address: %s", e)
+
+        # Get applied coupon if any
+        applied_coupon_id = tracker.get_slot("applied_coupon_id") or ""
+        applied_coupon_code = tracker.get_slot("applied_coupon_code") or ""
+        store_id = tracker.get_slot("store_id")  # Get store filter
+        coupon_discount = 0.0
+        checkout_log.debug("[CONFIRM & PAY] Applied coupon: %s (ID: %s), store_id: %s",
+                           applied_coupon_code, applied_coupon_id, store_id)
+
+        # Get cart total from backend (more accurate than WhatsApp total)
+        cart_data = None
+        try:
+            _, cart_data = get_cart_list(user_id, store_id, applied_coupon_id, timeout=10)
+            checkout_log.debug("[CONFIRM & PAY] Cart response: %s", LazyJson(cart_data))
+
+            if cart_data.get("status") == 1:
+                order_meta = cart_data.get("data", {}).get("orderMetaData", {})
+                total_amount = float(order_meta.get("total", 0))
+                coupon_discount = float(order_meta.get("coupon_discount", 0))
+                checkout_log.debug("[CONFIRM & PAY] Total: $%.2f, Coupon discount: $%.2f",
+                                   total_amount, coupon_discount)
+            else:
+                # Fallback to WhatsApp total
+                total_amount = float(tracker.get_slot("whatsapp_order_total") or 0)
+
+        except Exception as e:
+            checkout_log.warning("[CONFIRM & PAY] Cart fetch error: %s", e)
+            total_amount = float(tracker.get_slot("whatsapp_order_total") or 0)
+
+        if total_amount <= 0:
+            dispatcher.utter_message(text="Your cart appears to be empty. Please add items first.")
+            return []
+
+        if total_amount < 0.50:
+            dispatcher.utter_message(text=f"Order total (${total_amount:.2f}) is below minimum $0.50.")
+            return []
+
+        # Create Stripe session
+        stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+
+        try:
+            sender_id = tracker.sender_id
+            whatsapp_number = re.sub(r'[^0-9+]', '', sender_id) if sender_id else None
+
+            amount_in_cents = int(total_amount * 100)
+
+            # Get delivery address ID
+            delivery_address_id = tracker.get_slot("delivery_address_id") or ""
+
+            metadata = {
+                "user_id": user_id,
+                "channel": "whatsapp_native_cart",
+                "checkout_type": "optimal_flow",
+                "delivery_address_id": delivery_address_id,
+                "store_id": tracker.get_slot("store_id") or "",  # ⭐ For backend to know which WhatsApp to notify
+                "wh_account_id": tracker.get_slot("store_id") or "",  # ⭐ Same as store_id for clarity
+                "store_name": tracker.get_slot("store_name") or ""
+            }
+
+            # Add coupon info to metadata if applied
+            if applied_coupon_id:
+                metadata["coupon_id"] = applied_coupon_id
+                metadata["coupon_code"] = applied_coupon_code
+                metadata["coupon_discount"] = str(coupon_discount)
+
+            if whatsapp_number:
+                metadata["whatsapp_number"] = whatsapp_number
+
+            # Lets the Stripe webhook confirm payment to this sender via this seller's number
+            message_meta = tracker.latest_message.get("metadata") or {}
+            metadata["sender_id"] = sender_id or ""
+            metadata["phone_number_id"] = message_meta.get("phone_number_id") or ""
+            metadata["bot_phone_number"] = message_meta.get("bot_phone_number") or ""
+
+            # Build description
+            description = f"Order via WhatsApp for User #{user_id}"
+            if applied_coupon_code:
+                description += f" (Coupon: {applied_coupon_code})"
+
+            fingerprint = checkout_fingerprint(
+                user_id, cart_data, total_amount, delivery_address_id,
+                applied_coupon_id, store_id, metadata["channel"], latest_order_id(user_id)
+            )
+            # Same cart/address/coupon as an open session -> reuse its URL
+            session, reused_session = get_or_create_checkout_session(
+                fingerprint,
+                lambda idempotency_key, expires_at: stripe.checkout.Session.create(
+                    payment_method_types=["card"],
+                    line_items=[{
+                        "price_data": {
+                            "currency": "usd",
+                            "product_data": {
+                                "name": "WhatsApp Order",
+                                "description": description
+                            },
+                            "unit_amount": amount_in_cents,
+                        },
+                        "quantity": 1,
+                    }],
+                    mode="payment",
+                    locale="en",  # Force English locale
+                    currency="usd",  # Force USD currency display
+                    metadata=metadata,
+                    success_url="https://stageshipperapi.thedelivio.com/api/bot-payment-status?session_id={CHECKOUT_SESSION_ID}&status=success",
+                    cancel_url="https://stageshipperapi.thedelivio.com/api/bot-payment-status?session_id={CHECKOUT_SESSION_ID}&status=cancel",
+                    expires_at=expires_at,
+                    idempotency_key=idempotency_key,
+                ),
+            )
+
+            payment_url = session.url
+
+            checkout_log.debug("[CONFIRM & PAY] ✅ Stripe session %s: %s",
+                               'reused' if reused_session else 'created', session.id)
+            checkout_log.debug("[CONFIRM & PAY] Payment URL: %s", payment_url)
+
+            # Build payment text with coupon info
+            if coupon_discount > 0 and applied_coupon_code:
+                payment_text = (
+                    f"🎟️ Coupon: {applied_coupon_code}\n"
+                    f"💵 Discount: -${coupon_discount:.2f}\n"
+                    f"💰 Total: ${total_amount:.2f}\n\n"
+                    f"Tap the button below to complete your secure payment."
+                )
+            else:
+                payment_text = f"💰 Total: ${total_amount:.2f}\n\nTap the button below to complete your secure payment."
+
+            # Send CTA URL button for beautiful payment link
+            dispatcher.utter_message(
+                json_message={
+                    "type": "cta_url",
+                    "header": "✅ Order Confirmed!",
+                    "text": payment_text,
+                    "button_text": "💳 Pay Now",
+                    "url": payment_url,
+                    "footer": "Secure payment by Stripe"
+                }
+            )
+            # Send follow-up message with confirmation button
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": "After payment, tap below to confirm:",
+                    "buttons": [
+                        {"id": "check_payment", "title": "✅ I've Paid"}
+                    ]
+                }
+            )
+
+            return [
+                SlotSet("stripe_session_id", session.id),
+                SlotSet("payment_amount", total_amount),
+                SlotSet("checkout_step", "awaiting_payment")
+            ]
+
+        except Exception as e:
+            checkout_log.warning("[CONFIRM & PAY] ❌ Stripe error: %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="Sorry, couldn't create payment link. Please try again.")
+            return []
+
+
+class ActionPromptShareLocation(Action):
+    """Prompt user to share their location via WhatsApp"""
+
+    def name(self) -> Text:
+        return "action_prompt_share_location"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        # Use ONLY json_message for WhatsApp to avoid duplicate messages
+        dispatcher.utter_message(
+            json_message={
+                "type": "buttons",
+                "text": "📍 To share your location:\n\n1️⃣ Tap the 📎 attachment button\n2️⃣ Select Location\n3️⃣ Choose Send Your Current Location\n\nOr tap below to type your address:",
+                "buttons": [
+                    {"id": "type_address", "title": "✏️ Type Address"}
+                ]
+            }
+        )
+
+        return [SlotSet("checkout_step", "awaiting_location")]
+
+
+class ActionPromptTypeAddress(Action):
+    """Prompt user to type their address manually"""
+
+    def name(self) -> Text:
+        return "action_prompt_type_address"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        dispatcher.utter_message(
+            text="Please type your delivery address in this format:\n\n"
+                 "*Street Address, City, State, ZIP*\n\n"
+                 "Example: 123 Main St, New York, NY 10001"
+        )
+
+        return [SlotSet("checkout_step", "awaiting_typed_address")]
+
+
+class ActionProcessTypedAddress(Action):
+    """Process address typed by user"""
+
+    def name(self) -> Text:
+        return "action_process_typed_address"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        checkout_log.debug("[TYPED ADDRESS] Processing typed address...")
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id:
+            dispatcher.utter_message(text="Session expired. Please start over.")
+            return []
+
+        # Get the typed address from user's message
+        address_text = tracker.latest_message.get("text", "").strip()
+
+        if not address_text or len(address_text) < 10:
+            dispatcher.utter_message(
+                text="That doesn't look like a valid address. Please include street, city, state, and ZIP.\n\n"
+                     "Example: 123 Main St, New York, NY 10001"
+            )
+            return []
+
+        # Parse address (simple split by comma)
+        parts = [p.strip() for p in address_text.split(",")]
+
+        if len(parts) >= 3:
+            street = parts[0]
+            city = parts[1] if len(parts) > 1 else ""
+            # Try to extract state and ZIP from last part
+            state_zip = parts[2] if len(parts) > 2 else ""
+            state_zip_parts = state_zip.split()
+            state = state_zip_parts[0] if state_zip_parts else ""
+            zip_code = state_zip_parts[-1] if len(state_zip_parts) > 1 else ""
+        else:
+            street = address_text
+            city = ""
+            state = ""
+            zip_code = ""
+
+        # Save address
+        try:
+            sender_id = tracker.sender_id
+            phone = re.sub(r'[^0-9]', '', sender_id) if sender_id else ""
+
+            result = add_address(user_id, {
+                "address_name": "Home",
+                "name": "WhatsApp Customer",
+                "email": f"wa_{phone}@whatsapp.guest",
+                "phone": phone,
+                "address": street,
+                "address2": "",
+                "city": city,
+                "state": state,
+                "country": "United States",
+                "zip_code": zip_code
+            })
+            checkout_log.debug("[TYPED ADDRESS] Address save result: %s", LazyJson(result))
+            invalidate_user_lookup(sender_id)
+
+            if result.get("status") == 1:
+                # Address saved - proceed to payment confirmation
+                order_total = tracker.get_slot("whatsapp_order_total") or 0
+
+                msg_text = f"📍 Delivery Address:\n{address_text}\n\n💰 Total: ${order_total:.2f}\n\nReady to complete your order?"
+
+                # Use ONLY json_message for WhatsApp to avoid duplicate messages
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": msg_text,
+                        "buttons": [
+                            {"id": "confirm_order_pay", "title": "✅ Confirm & Pay"},
+                            {"id": "type_address", "title": "✏️ Edit Address"}
+                        ]
+                    }
+                )
+
+                return [
+                    SlotSet("delivery_address_text", address_text),
+                    SlotSet("checkout_step", "confirm_address")
+                ]
+            else:
+                dispatcher.utter_message(text="Couldn't save address. Please try again.")
+                return []
+
+        except Exception as e:
+            checkout_log.warning("[TYPED ADDRESS] Error: %s", e)
+            dispatcher.utter_message(text="Error saving address. Please try again.")
+            return []
+
+
+class ActionShowUserAddresses(Action):
+    """Show user's saved addresses for selection"""
+
+    def name(self) -> Text:
+        return "action_show_user_addresses"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id:
+            dispatcher.utter_message(text="Please login first to see your addresses.")
+            return [FollowupAction("action_prompt_login")]
+
+        try:
+            addresses = get_addresses(user_id)
+
+            if addresses:
+                # Build list of addresses
+                sections = [{
+                    "title": "Your Addresses",
+                    "rows": []
+                }]
+
+                for addr in addresses[:8]:  # Max 8 for WhatsApp list (leave room for options)
+                    addr_id = addr.get("address_id")
+                    addr_name = addr.get("address_name", "Address")
+                    full_addr = f"{addr.get('address', '')}, {addr.get('city', '')}"
+
+                    sections[0]["rows"].append({
+                        "id": f"select_address_{addr_id}",
+                        "title": addr_name[:24],
+                        "description": full_addr[:72]
+                    })
+
+                # Add option for new address
+                sections[0]["rows"].append({
+                    "id": "share_location",
+                    "title": "📍 Share New Location",
+                    "description": "Add a new delivery address"
+                })
+                sections[0]["rows"].append({
+                    "id": "type_address",
+                    "title": "✏️ Type New Address",
+                    "description": "Enter address manually"
+                })
+
+                # Use ONLY json_message for WhatsApp to avoid duplicate messages
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "list",
+                        "text": "Select a delivery address or add a new one:",
+                        "button_text": "📍 Choose Address",
+                        "sections": sections
+                    }
+                )
+
+            else:
+                # Use ONLY json_message for WhatsApp to avoid duplicate messages
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": "You don't have any saved addresses. Please share your location:",
+                        "buttons": [
+                            {"id": "share_location", "title": "📍 Share Location"},
+                            {"id": "type_address", "title": "✏️ Type Address"}
+                        ]
+                    }
+                )
+
+        except Exception as e:
+            checkout_log.warning("[SHOW ADDRESSES] Error: %s", e)
+            dispatcher.utter_message(text="Couldn't load addresses. Please try again.")
+
+        return []
+
+
+class ActionSelectDeliveryAddress(Action):
+    """Handle when user selects a delivery address from the list"""
+
+    def name(self) -> Text:
+        return "action_select_delivery_address"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        checkout_log.debug("[SELECT ADDRESS] ========== USER SELECTED ADDRESS ==========")
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id:
+            dispatcher.utter_message(text="Session expired. Please start over.")
+            return []
+
+        # Get selected address ID from metadata
+        metadata = tracker.latest_message.get("metadata", {})
+        selected_address_id = metadata.get("selected_address_id")
+
+        # Also try to extract from message text (format: /select_delivery_address{123})
+        if not selected_address_id:
+            message_text = tracker.latest_message.get("text", "")
+            import re
+            match = re.search(r'\{(\d+)\}', message_text)
+            if match:
+                selected_address_id = match.group(1)
+
+        checkout_log.debug("[SELECT ADDRESS] Selected address ID: %s", selected_address_id)
+
+        if not selected_address_id:
+            dispatcher.utter_message(text="Please select an address from the list.")
+            return [FollowupAction("action_show_user_addresses")]
+
+        # Fetch the selected address details
+        try:
+            # Usually served from the address book loaded by action_show_user_addresses
+            addr = get_address(user_id, selected_address_id)
+            checkout_log.debug("[SELECT ADDRESS] Address: %s", LazyJson(addr))
+
+            if addr:
+                addr_name = addr.get("address_name", "Selected Address")
+                street = addr.get("address", "")
+                city = addr.get("city", "")
+                state = addr.get("state", "")
+                zip_code = addr.get("zip_code", "")
+
+                full_address = f"{street}, {city}"
+                if state:
+                    full_address += f", {state}"
+                if zip_code:
+                    full_address += f" {zip_code}"
+
+                # Get order total
+                order_total = tracker.get_slot("whatsapp_order_total") or 0
+
+                msg_text = f"📍 Delivery Address:\n{addr_name}\n{full_address}\n\n💰 Total: ${order_total:.2f}\n\nReady to complete your order?"
+
+                # Use ONLY json_message for WhatsApp to avoid duplicate messages
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": msg_text,
+                        "buttons": [
+                            {"id": "confirm_order_pay", "title": "✅ Confirm & Pay"},
+                            {"id": "change_address", "title": "📍 Different Address"}
+                        ]
+                    }
+                )
+
+                return [
+                    SlotSet("delivery_address_id", selected_address_id),
+                    SlotSet("delivery_address_text", full_address),
+                    SlotSet("checkout_step", "confirm_address")
+                ]
+            else:
+                dispatcher.utter_message(text="Couldn't find that address. Please select another.")
+                return [FollowupAction("action_show_user_addresses")]
+
+        except Exception as e:
+            checkout_log.warning("[SELECT ADDRESS] Error: %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="Error loading address. Please try again.")
+            return [FollowupAction("action_show_user_addresses")]
+
+
+class ActionPaymentConfirmed(Action):
+    """
+    Handle payment confirmation from Stripe webhook.
+    This action is called when Stripe confirms payment success.
+    It sends a confirmation message to the user.
+    """
+
+    def name(self) -> Text:
+        return "action_payment_confirmed"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        checkout_log.debug("[PAYMENT CONFIRMED] Processing webhook payment confirmation...")
+
+        # Get payment details from slot or latest message entities
+        order_id = tracker.get_slot("order_id")
+        amount = tracker.get_slot("whatsapp_order_total") or 0
+
+        # Pushed by the Stripe webhook (see stripe_webhook.py) - amount comes from the session
+        message_meta = tracker.latest_message.get("metadata") or {}
+        if message_meta.get("interaction_type") == "stripe_webhook":
+            amount = message_meta.get("payment_amount") or amount
+            checkout_log.debug("[PAYMENT CONFIRMED] Stripe session %s", message_meta.get('stripe_session_id'))
+        session_id = message_meta.get("stripe_session_id") or tracker.get_slot("stripe_session_id")
+        forget_checkout_session(session_id)
+        done_events = [
+            SlotSet("checkout_step", None),
+            SlotSet("payment_pending", False),
+            SlotSet("stripe_session_id", None),  # a later "Check Payment" has nothing left to confirm
+        ]
+
+        # Get user info
+        user_id = tracker.get_slot("user_id") or message_meta.get("user_id")
+        if user_id:
+            invalidate_cart(user_id)  # paid cart became an order
+            invalidate_coupons(user_id)
+            note_new_order(user_id)
+
+        if not claim_confirmation(session_id):
+            checkout_log.debug("[PAYMENT CONFIRMED] Session %s already confirmed via Check Payment, not repeating",
+                               session_id)
+            return done_events
+
+        if user_id and not order_id:
+            # The order of this payment - if the backend has not created it yet, say it is processing
+            order = find_order_by_payment(user_id, [session_id, message_meta.get("stripe_payment_intent")])
+            if order:
+                order_id = order.get("id")
+
+        try:
+            amount = float(amount)
+        except (TypeError, ValueError):
+            amount = 0.0
+
+        # Check input channel for WhatsApp formatting
+        input_channel = tracker.get_latest_input_channel()
+        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+        confirmation_message = (
+            f"✅ **Payment Successful!**\n\n"
+            f"🎉 Thank you for your payment!\n\n"
+            f"💰 Amount Paid: ${amount:.2f}\n"
+        )
+
+        if order_id:
+            confirmation_message += f"📦 Order ID: #{order_id}\n\n"
+        else:
+            confirmation_message += "\n"
+
+        confirmation_message += (
+            "Your order is now being processed.\n"
+            "You'll receive updates on your delivery status.\n\n"
+            "Thank you for shopping with us! 🙏"
+        )
+
+        if is_whatsapp:
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": confirmation_message,
+                    "buttons": [
+                        {"id": "track_order", "title": "📦 Track Order"},
+                        {"id": "continue_shopping", "title": "🛍️ Shop More"}
+                    ]
+                }
+            )
+        else:
+            dispatcher.utter_message(text=confirmation_message)
+
+        # Reset checkout state
+        return done_events + [SlotSet("last_created_order_id", str(order_id) if order_id else None)]
+
+
+class ActionTrackOrder(Action):
+    """
+    Track order - shows recent orders for logged-in user
+    If order_id entity is provided, tracks that specific order
+    If last_created_order_id slot is set (just after payment), shows only that order
+    """
+    def name(self) -> Text:
+        return "action_track_order"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[EventType]:
+        user_id = tracker.get_slot("user_id")
+
+        checkout_log.debug("[TRACK ORDER] Starting... user_id=%s", user_id)
+
+        # Check if user is logged in
+        if not user_id:
+            dispatcher.utter_message(text="Please login to track your orders.")
+            return [FollowupAction("action_prompt_login")]
+
+        # Check for specific order ID in entity
+        order_id = next(tracker.get_latest_entity_values("order_id"), None)
+
+        # Check if we just completed payment - show only that order
+        last_created_order_id = tracker.get_slot("last_created_order_id")
+        if last_created_order_id and not order_id:
+            order_id = last_created_order_id
+            checkout_log.debug("[TRACK ORDER] Using last_created_order_id: %s", order_id)
+
+        # Detect channel
+        input_channel = tracker.get_latest_input_channel()
+        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+        try:
+            # Specific order (payment just completed / order id given) or recent list, cache first
+            if order_id:
+                orders = get_order(user_id, order_id)
+            else:
+                orders = get_recent_orders(user_id, limit=5)
+
+            if orders is None:
+                checkout_log.warning("[TRACK ORDER] Order lookup failed")
+                dispatcher.utter_message(text="Couldn't fetch your orders. Please try again later.")
+                return [SlotSet("last_created_order_id", None)]
+
+            checkout_log.debug("[TRACK ORDER] Found %s orders", len(orders) if orders else 0)
+
+            if not orders or len(orders) == 0:
+                if is_whatsapp:
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": "📦 You don't have any orders yet.\n\nStart shopping now!",
+                            "buttons": [
+                                {"id": "browse_products", "title": "🛍️ Browse Products"}
+                            ]
+                        }
+                    )
+                else:
+                    dispatcher.utter_message(text="You don't have any orders yet. Start shopping! 🛍️")
+                return []
+
+            # Build order summary message
+            msg_lines = ["📦 *Your Recent Orders*\n"]
+
+            for order in orders[:5]:
+                # Use correct field names from API
+                oid = order.get("id", "N/A")
+                store_name = order.get("shipper_company_name", order.get("shipper_name", ""))
+                status = order.get("order_status", "Processing")
+                total = order.get("total_amount", order.get("discounted_amount_after_coupon", "0"))
+                order_date = order.get("order_date", "")
+
+                # Format date (order_date is "2025-12-06 12:34:36")
+                date_display = order_date[:10] if order_date else ""
+
+                # Status emoji
+                status_emoji = "🟡"  # Default - Order Placed
+                status_lower = str(status).lower() if status else ""
+                if "deliver" in status_lower:
+                    status_emoji = "✅"
+                elif "cancel" in status_lower:
+                    status_emoji = "❌"
+                elif "ship" in status_lower or "transit" in status_lower or "on the way" in status_lower:
+                    status_emoji = "🚚"
+                elif "picked" in status_lower:
+                    status_emoji = "📦"
+                elif "accept" in status_lower or "confirmed" in status_lower:
+                    status_emoji = "👍"
+                elif "placed" in status_lower or "pending" in status_lower:
+                    status_emoji = "⏳"
+
+                msg_lines.append(f"{status_emoji} *Order #{oid}*")
+                if store_name:
+                    msg_lines.append(f"   🏪 {store_name[:30]}")
+                msg_lines.append(f"   📋 {status}")
+                try:
+                    msg_lines.append(f"   💰 ${float(total):.2f}")
+                except:
+                    msg_lines.append(f"   💰 ${total}")
+                if date_display:
+                    msg_lines.append(f"   📅 {date_display}")
+                msg_lines.append("")
+
+            msg_text = "\n".join(msg_lines)
+
+            if is_whatsapp:
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": msg_text,
+                        "buttons": [
+                            {"id": "continue_shopping", "title": "🛍️ Shop More"},
+                            {"id": "view_cart", "title": "🛒 View Cart"}
+                        ]
+                    }
+                )
+            else:
+                dispatcher.utter_message(text=msg_text)
+
+        except Exception as e:
+            checkout_log.warning("[TRACK ORDER] Exception: %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="An error occurred while fetching your orders. Please try again.")
+
+        # Clear the last_created_order_id slot after showing it
+        return [SlotSet("last_created_order_id", None)]
+
+
+class ActionTrackMyOrders(Action):
+    def name(self) -> Text:
+        return "action_track_my_orders"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[EventType]:
+        user_id = tracker.get_slot("user_id")
+
+        if not user_id:
+            dispatcher.utter_message(text="Please login to view your orders.")
+            return [FollowupAction("action_prompt_login")]
+
+        # Detect channel
+        input_channel = tracker.get_latest_input_channel()
+        is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+        orders_url = "https://stage.anythinginstantly.com/my-orders"
+
+        try:
+            # Fetch user's recent orders (limit to 5), cache first
+            orders = get_recent_orders(user_id, limit=5)
+
+            if orders and len(orders) > 0:
+                # Build order summary message
+                msg_lines = ["📦 *Your Recent Orders*\n"]
+
+                for order in orders[:5]:
+                    oid = order.get("id", "N/A")
+                    store_name = order.get("shipper_company_name", order.get("shipper_name", ""))
+                    status = order.get("order_status", "Processing")
+                    total = order.get("total_amount", order.get("discounted_amount_after_coupon", "0"))
+                    order_date = order.get("order_date", "")
+                    date_display = order_date[:10] if order_date else ""
+
+                    # Status emoji
+                    status_emoji = "⏳"
+                    status_lower = str(status).lower() if status else ""
+                    if "deliver" in status_lower:
+                        status_emoji = "✅"
+                    elif "cancel" in status_lower:
+                        status_emoji = "❌"
+                    elif "ship" in status_lower or "transit" in status_lower or "on the way" in status_lower:
+                        status_emoji = "🚚"
+                    elif "picked" in status_lower:
+                        status_emoji = "📦"
+                    elif "accept" in status_lower or "confirmed" in status_lower:
+                        status_emoji = "👍"
+
+                    msg_lines.append(f"{status_emoji} *Order #{oid}*")
+                    if store_name:
+                        msg_lines.append(f"   🏪 {store_name[:30]}")
+                    msg_lines.append(f"   📋 {status}")
+                    try:
+                        msg_lines.append(f"   💰 ${float(total):.2f}")
+                    except:
+                        msg_lines.append(f"   💰 ${total}")
+                    if date_display:
+                        msg_lines.append(f"   📅 {date_display}")
+                    msg_lines.append("")
+
+                msg_lines.append(f"View all orders: {orders_url}")
+                msg_text = "\n".join(msg_lines)
+
+                if is_whatsapp:
+                    dispatcher.utter_message(
+                        json_message={
+                            "type": "buttons",
+                            "text": msg_text,
+                            "buttons": [
+                                {"id": "browse_products", "title": "🛍️ Shop More"},
+                                {"id": "view_cart", "title": "🛒 View Cart"}
+                            ]
+                        }
+                    )
+                else:
+                    dispatcher.utter_message(text=msg_text)
+                return []
+
+            # Fallback - no orders or error
+            if is_whatsapp:
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": f"📦 No recent orders found.\n\nView all orders: {orders_url}",
+                        "buttons": [
+                            {"id": "browse_products", "title": "🛍️ Browse Products"}
+                        ]
+                    }
+                )
+            else:
+                dispatcher.utter_message(
+                    text=f'📦 **Your Orders**\n\n'
+                         f'<a href="{orders_url}" target="_blank" rel="noopener noreferrer">Click here to view your orders</a>'
+                )
+
+        except Exception as e:
+            checkout_log.warning("[TRACK MY ORDERS] Error: %s", e)
+            # Fallback to link only
+            if is_whatsapp:
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": f"📦 Your Orders\n\nView all your orders:\n{orders_url}",
+                        "buttons": [
+                            {"id": "browse_products", "title": "🛍️ Browse Products"}
+                        ]
+                    }
+                )
+            else:
+                dispatcher.utter_message(
+                    text=f'📦 **Your Orders**\n\n'
+                         f'<a href="{orders_url}" target="_blank" rel="noopener noreferrer">Click here to view your orders</a>'
+                )
+
+        return []
@@ -0,0 +1,45 @@
+# actions/domains/common.py
+"""
+Domain Shared Helpers
+Backend base URL, subsystem loggers and the OpenAI client for the action
+domains.
+
+1. openai is only looked up here, not imported: the SDK (with httpx and
+   pydantic) loads on the first LLM call
+2. openai_client() keeps one client per API key instead of building a
+   new one for every message
+"""
+import importlib.util
+import os
+import threading
+from typing import Any, Dict
+
+from actions.action_logging import get_logger
+from actions.action_metrics import install_http_hooks
+
+API_BASE = os.getenv("SELLER_API_URL", "https://stageshipperapi.thedelivio.com/api")
+
+# Subsystem loggers for payload dumps (ACTION_LOG_LEVELS, see action_logging.py)
+session_log = get_logger("session")
+store_log = get_logger("store")
+cart_log = get_logger("cart")
+checkout_log = get_logger("checkout")
+coupon_log = get_logger("coupon")
+
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+if not OPENAI_AVAILABLE:
+    print("[WARNING] OpenAI library not installed. Smart fallback will use basic mode.")
+
+_openai_clients: Dict[str, Any] = {}
+_openai_lock = threading.Lock()
+
+
+def openai_client(api_key: str):
+    """OpenAI client for api_key, importing the SDK on first use"""
+    with _openai_lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            from openai import OpenAI
+            install_http_hooks()  # time the SDK's httpx calls, now that it loaded httpx
+            client = _openai_clients[api_key] = OpenAI(api_key=api_key)
+    return client
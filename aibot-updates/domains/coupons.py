@@ -0,0 +1,465 @@
+# actions/domains/coupons.py
+"""
+Coupon Actions
+List, apply and remove promo codes (coupon_cache pre-checks the rules
+the bot can evaluate itself).
+"""
+import json
+import re
+from typing import Any, Dict, List, Text
+
+import requests
+from rasa_sdk import Action, Tracker
+from rasa_sdk.events import EventType, SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.action_logging import LazyJson
+from actions.cart_cache import get_cart_list, invalidate_cart
+from actions.coupon_cache import applicable_coupons, cart_subtotal, get_coupons, precheck_coupon
+from actions.domains.common import API_BASE, coupon_log
+
+
+# ============================================================================
+# PROMO CODES / COUPONS ACTIONS
+# ============================================================================
+
+class ActionViewCoupons(Action):
+    """Show available coupons/promo codes for the user"""
+
+    def name(self) -> Text:
+        return "action_view_coupons"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id:
+            dispatcher.utter_message(text="Please login first to view available coupons!")
+            return []
+
+        # Get store context for filtering
+        store_id = tracker.get_slot("store_id")
+        is_dedicated_bot = tracker.get_slot("is_dedicated_bot")
+
+        # Determine shipper_id for filtering
+        # Empty string = all general coupons
+        # Specific ID = store-specific coupons
+        shipper_id = str(store_id) if (is_dedicated_bot and store_id) else ""
+
+        # Cart subtotal for the eligibility check (cart-list snapshot; None if no cart)
+        cart_total = None
+        try:
+            _, cart_data = get_cart_list(user_id, store_id, "", timeout=10)
+            if cart_data.get("status") == 1:
+                cart_total = cart_subtotal(cart_data.get("data", {})) or None
+        except Exception as e:
+            coupon_log.warning("[COUPONS] Cart fetch failed, not filtering by minimum: %s", e)
+
+        try:
+            coupon_log.debug("[COUPONS] Fetching coupons: user_id=%s, shipper_id=%s", user_id, shipper_id)
+            all_coupons = get_coupons(user_id, shipper_id)
+
+            # Only coupons that apply to this cart, best savings first
+            coupons = applicable_coupons(all_coupons, cart_total)
+            coupon_log.debug("[COUPONS] Found %s coupons, %s applicable (cart total: %s)",
+                             len(all_coupons), len(coupons), cart_total)
+
+            if not coupons:
+                no_coupons_text = (
+                    "🎟️ *No Coupons Available*\n\nNone of the current promo codes apply to your cart yet.\n\nAdd more items or check back later for deals!"
+                    if all_coupons else
+                    "🎟️ *No Coupons Available*\n\nThere are no active promo codes right now.\n\nCheck back later for deals!"
+                )
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": no_coupons_text,
+                        "buttons": [
+                            {"id": "view_cart", "title": "🛒 View Cart"},
+                            {"id": "browse_products", "title": "🛍️ Browse Menu"}
+                        ]
+                    }
+                )
+                return []
+
+            # Build WhatsApp list message with coupons
+            sections = []
+            items = []
+
+            for coupon in coupons[:10]:  # Limit to 10
+                coupon_id = coupon.get("coupon_id")
+                code = coupon.get("code", "")
+                name = coupon.get("name", code)
+                discount = coupon.get("discount", 0)
+                coupon_type = coupon.get("type", "O")  # O=Order, U=User specific
+                min_amount = coupon.get("min_amount", 0)
+                date_end = coupon.get("date_end", "")
+
+                # Format discount display
+                try:
+                    discount_val = float(discount)
+                    if coupon_type == "P":  # Percentage
+                        discount_str = f"{discount_val:.0f}% off"
+                    else:  # Fixed amount
+                        discount_str = f"${discount_val:.2f} off"
+                except:
+                    discount_str = f"${discount} off"
+
+                # Truncate name for WhatsApp (max 24 chars)
+                display_name = code[:24] if len(code) > 24 else code
+
+                # Description with details
+                desc = discount_str
+                if coupon.get("savings"):
+                    desc += f" - save ${coupon['savings']:.2f}"
+                if min_amount and float(min_amount) > 0:
+                    desc += f" (Min ${float(min_amount):.0f})"
+
+                items.append({
+                    "id": f"apply_coupon_{code}",
+                    "title": display_name,
+                    "description": desc[:72]
+                })
+
+            sections.append({
+                "title": "Available Coupons",
+                "rows": items
+            })
+
+            # Add option to type custom code
+            sections.append({
+                "title": "Other Options",
+                "rows": [
+                    {"id": "type_coupon_code", "title": "✏️ Enter Code", "description": "Type your own promo code"}
+                ]
+            })
+
+            dispatcher.utter_message(
+                json_message={
+                    "type": "list",
+                    "text": f"🎟️ *Available Coupons* ({len(coupons)})\n\nTap a coupon to apply it to your cart:",
+                    "button_text": "View Coupons",
+                    "sections": sections
+                }
+            )
+
+            return [SlotSet("available_coupons", json.dumps(coupons))]
+
+        except Exception as e:
+            coupon_log.warning("[COUPONS ERROR] %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="Sorry, couldn't load coupons right now. Please try again.")
+            return []
+
+
+class ActionApplyCoupon(Action):
+    """Apply a coupon/promo code to the cart"""
+
+    def name(self) -> Text:
+        return "action_apply_coupon"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        coupon_log.debug("[COUPON APPLY] ========== ACTION STARTED ==========")
+
+        # Debug: Print all relevant slots
+        user_id = tracker.get_slot("user_id")
+        store_id = tracker.get_slot("store_id")
+        recent_cart = tracker.get_slot("recent_cart_items")
+        wa_order = tracker.get_slot("whatsapp_order_items")
+        wa_total = tracker.get_slot("whatsapp_order_total")
+        checkout_step = tracker.get_slot("checkout_step")
+
+        coupon_log.debug("[COUPON APPLY] 🔍 Slot Values:")
+        coupon_log.debug("[COUPON APPLY]   - user_id: %s", user_id)
+        coupon_log.debug("[COUPON APPLY]   - store_id: %s", store_id)
+        coupon_log.debug("[COUPON APPLY]   - recent_cart_items: %s (%s chars)",
+                         bool(recent_cart), len(recent_cart) if recent_cart else 0)
+        coupon_log.debug("[COUPON APPLY]   - whatsapp_order_items: %s (%s chars)",
+                         bool(wa_order), len(wa_order) if wa_order else 0)
+        coupon_log.debug("[COUPON APPLY]   - whatsapp_order_total: %s", wa_total)
+        coupon_log.debug("[COUPON APPLY]   - checkout_step: %s", checkout_step)
+
+        if not user_id:
+            dispatcher.utter_message(text="Please login first to apply coupons!")
+            return []
+
+        # Get coupon code from entity or message
+        coupon_code = next(tracker.get_latest_entity_values("coupon_code"), None)
+        latest_message = tracker.latest_message.get("text", "")
+
+        # Try to extract from button click: apply_coupon_CODENAME
+        if not coupon_code and "apply_coupon_" in latest_message:
+            coupon_code = latest_message.replace("apply_coupon_", "").strip()
+
+        # Try to extract from message if not found
+        if not coupon_code:
+            # Try common patterns
+            patterns = [
+                r"apply\s+(?:code\s+)?([A-Z0-9\-]+)",
+                r"use\s+(?:code\s+|promo\s+|coupon\s+)?([A-Z0-9\-]+)",
+                r"code\s+([A-Z0-9\-]+)",
+                r"([A-Z0-9\-]{4,})",  # Any 4+ char alphanumeric
+            ]
+            for pattern in patterns:
+                match = re.search(pattern, latest_message, re.IGNORECASE)
+                if match:
+                    coupon_code = match.group(1).upper()
+                    break
+
+        if not coupon_code:
+            dispatcher.utter_message(
+                text="🎟️ Please enter a promo code.\n\nExample: *Apply code SAVE10*"
+            )
+            return []
+
+        coupon_log.debug("[COUPON APPLY] Attempting to apply: %s", coupon_code)
+
+        # Get cart info - check both regular cart and WhatsApp native cart
+        recent_cart_json = tracker.get_slot("recent_cart_items")
+        whatsapp_order_json = tracker.get_slot("whatsapp_order_items")
+        whatsapp_order_total = tracker.get_slot("whatsapp_order_total")
+        store_id = tracker.get_slot("store_id")  # No hardcoded fallback
+        cart_id = None
+        cart_total = 0
+
+        coupon_log.debug("[COUPON APPLY] Slots: recent_cart=%s, wa_order=%s, wa_total=%s, store_id=%s",
+                         bool(recent_cart_json), bool(whatsapp_order_json), whatsapp_order_total, store_id)
+
+        # First try regular cart items from slot
+        if recent_cart_json:
+            try:
+                cart_items = json.loads(recent_cart_json)
+                if cart_items:
+                    # Get cart_id from first item (cart_id field, not id)
+                    cart_id = cart_items[0].get("cart_id") or cart_items[0].get("id")
+                    for item in cart_items:
+                        price = float(item.get("discounted_price", 0) or item.get("price", 0))
+                        qty = int(item.get("quantity", 1))
+                        cart_total += price * qty
+                    coupon_log.debug("[COUPON APPLY] Got cart from recent_cart_items slot: cart_id=%s, total=%s",
+                                     cart_id, cart_total)
+            except Exception as e:
+                coupon_log.warning("[COUPON APPLY] Error parsing recent_cart_items: %s", e)
+
+        # If no cart from slot, ALWAYS try to fetch from backend API
+        # This handles WhatsApp native cart flow where cart is synced to backend
+        if not cart_id:
+            coupon_log.debug("[COUPON APPLY] No cart in slot, fetching from backend API...")
+            try:
+                # Use /api/cart-list to get cart (NOT getCart)
+                _, cart_data = get_cart_list(user_id, store_id, "", timeout=10)
+                coupon_log.debug("[COUPON APPLY] cart-list API response: %s", LazyJson(cart_data, limit=500))
+
+                if cart_data.get("status") == 1:
+                    # Cart items are in data.cartlist[]
+                    cart_items_data = cart_data.get("data", {}).get("cartlist", [])
+                    coupon_log.debug("[COUPON APPLY] Found %s items in backend cart", len(cart_items_data))
+
+                    if cart_items_data:
+                        # Get cart_id from first item (cartlist[].cart_id)
+                        first_item = cart_items_data[0]
+                        cart_id = first_item.get("cart_id")
+
+                    # Lines total, else orderMetaData.sub_total_amount
+                    cart_total = cart_subtotal(cart_data.get("data", {}))
+                    coupon_log.debug("[COUPON APPLY] Backend cart: cart_id=%s, total=$%.2f", cart_id, cart_total)
+
+            except Exception as e:
+                coupon_log.warning("[COUPON APPLY] Error fetching cart from backend: %s", e)
+                import traceback
+                traceback.print_exc()
+
+        if not cart_id or cart_total <= 0:
+            coupon_log.warning("[COUPON APPLY] ❌ No cart found! cart_id=%s, cart_total=%s", cart_id, cart_total)
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": "🛒 Your cart is empty!\n\nAdd items to your cart first, then apply a coupon.",
+                    "buttons": [
+                        {"id": "browse_products", "title": "🛍️ Browse Menu"}
+                    ]
+                }
+            )
+            return []
+
+        # Known coupon that is expired / below its minimum -> no need to ask the backend
+        ok, reason = precheck_coupon(user_id, coupon_code, cart_total)
+        if not ok:
+            coupon_log.warning("[COUPON APPLY] ❌ Rejected locally: %s", reason)
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": f"❌ *Coupon Not Applied*\n\n{reason}\n\nTry a different code or browse available coupons.",
+                    "buttons": [
+                        {"id": "view_coupons", "title": "🎟️ View Coupons"},
+                        {"id": "view_cart", "title": "🛒 View Cart"}
+                    ]
+                }
+            )
+            return []
+
+        # Call API to check/apply coupon
+        try:
+            endpoint = f"{API_BASE}/check-coupon"
+
+            payload = {
+                "coupon_code": coupon_code,
+                "user_id": str(user_id),
+                "cart_id": str(cart_id),
+                "amount": str(cart_total)
+            }
+
+            coupon_log.debug("[COUPON APPLY] API Request: %s", LazyJson(payload))
+            response = requests.post(endpoint, json=payload, timeout=10)
+            invalidate_cart(user_id)
+            data = response.json()
+            coupon_log.debug("[COUPON APPLY] API Response: %s", LazyJson(data))
+
+            api_status = data.get("status")
+            message = data.get("message", "")
+            coupon_data = data.get("data", {})
+
+            if api_status == 1:
+                # Success - coupon applied
+                # Use values from API response instead of calculating manually
+                coupon_id = coupon_data.get("coupon_id")
+                coupon_type = coupon_data.get("type", "O")
+                coupon_value = float(coupon_data.get("discount", 0))
+
+                # Get actual discount from API
+                actual_discount = float(coupon_data.get("total_discount", 0))
+                order_meta = coupon_data.get("getOrderMetaData", {})
+                if not actual_discount and order_meta:
+                    actual_discount = float(order_meta.get("coupon_discount", 0))
+
+                # ✅ FETCH FROM CART-LIST API with coupon to get correct total with tax
+                try:
+                    _, cart_data = get_cart_list(user_id, store_id, coupon_id, timeout=10)
+                    coupon_log.debug("[COUPON APPLY] Cart-list response: %s", cart_data.get('status'))
+
+                    if cart_data.get("status") == 1:
+                        cart_order_meta = cart_data.get("data", {}).get("orderMetaData", {})
+                        # Get total WITH tax from cart-list API
+                        new_total = float(cart_order_meta.get("total", 0))
+                        actual_discount = float(cart_order_meta.get("coupon_discount", 0))
+                        coupon_log.debug("[COUPON APPLY] Cart total with tax: $%.2f, coupon_discount: $%.2f",
+                                         new_total, actual_discount)
+                    else:
+                        # Fallback to check-coupon response
+                        new_total = float(coupon_data.get("discounted_total", 0))
+                except Exception as cart_err:
+                    coupon_log.warning("[COUPON APPLY] Cart fetch error: %s", cart_err)
+                    new_total = float(coupon_data.get("discounted_total", 0))
+
+                # Build discount display string
+                if coupon_type == "P":  # Percentage
+                    discount_str = f"{coupon_value:.0f}%"
+                else:  # Fixed/Other
+                    discount_str = f"${coupon_value:.2f}"
+
+                # Use API message if available
+                api_message = message or f"You saved ${actual_discount:.2f}!"
+
+                coupon_log.debug("[COUPON APPLY] ✅ Applied: discount=%s, new_total=%s", actual_discount, new_total)
+
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": f"✅ *Coupon Applied!*\n\n🎟️ Code: *{coupon_code}*\n💰 Discount: {discount_str}\n💵 {api_message}\n\n🛒 Total: ${new_total:.2f} _(incl. tax)_",
+                        "buttons": [
+                            {"id": "view_cart", "title": "🛒 View Cart"},
+                            {"id": "checkout", "title": "💳 Checkout"},
+                            {"id": "remove_coupon", "title": "❌ Remove Coupon"}
+                        ]
+                    }
+                )
+
+                return [
+                    SlotSet("applied_coupon_code", coupon_code),
+                    SlotSet("applied_coupon_id", str(coupon_id)),
+                    SlotSet("coupon_discount_amount", actual_discount)
+                ]
+
+            else:
+                # Failed - show error message
+                error_msg = message or "Invalid coupon code"
+
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": f"❌ *Coupon Not Applied*\n\n{error_msg}\n\nTry a different code or browse available coupons.",
+                        "buttons": [
+                            {"id": "view_coupons", "title": "🎟️ View Coupons"},
+                            {"id": "view_cart", "title": "🛒 View Cart"}
+                        ]
+                    }
+                )
+                return []
+
+        except Exception as e:
+            coupon_log.warning("[COUPON APPLY ERROR] %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="Sorry, couldn't apply coupon right now. Please try again.")
+            return []
+
+
+class ActionRemoveCoupon(Action):
+    """Remove applied coupon from cart"""
+
+    def name(self) -> Text:
+        return "action_remove_coupon"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        applied_coupon = tracker.get_slot("applied_coupon_code")
+        user_id = tracker.get_slot("user_id")
+        if user_id:
+            invalidate_cart(user_id)
+
+        if not applied_coupon:
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": "🎟️ No coupon is currently applied to your cart.",
+                    "buttons": [
+                        {"id": "view_coupons", "title": "🎟️ View Coupons"},
+                        {"id": "view_cart", "title": "🛒 View Cart"}
+                    ]
+                }
+            )
+            return []
+
+        dispatcher.utter_message(
+            json_message={
+                "type": "buttons",
+                "text": f"✅ Coupon *{applied_coupon}* has been removed from your cart.",
+                "buttons": [
+                    {"id": "view_coupons", "title": "🎟️ New Coupon"},
+                    {"id": "view_cart", "title": "🛒 View Cart"},
+                    {"id": "checkout", "title": "💳 Checkout"}
+                ]
+            }
+        )
+
+        return [
+            SlotSet("applied_coupon_code", None),
+            SlotSet("applied_coupon_id", None),
+            SlotSet("coupon_discount_amount", 0)
+        ]
@@ -0,0 +1,565 @@
+# actions/domains/fallback.py
+"""
+Fallback Actions
+Out-of-scope and low-confidence messages.
+
+1. action_smart_fallback_enhanced tries the local intent classifier, then
+   OpenAI, then a keyword fallback
+2. The OpenAI SDK is imported on the first LLM call (common.openai_client)
+"""
+import json
+import os
+import re
+from typing import Any, Dict, List, Text
+
+import requests
+from rasa_sdk import Action, Tracker
+from rasa_sdk.events import EventType, FollowupAction, SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.action_registry import get_action
+from actions.action_logging import LazyJson
+from actions.domains.common import API_BASE, OPENAI_AVAILABLE, openai_client, session_log
+from actions.intent_classifier import classify_fallback, log_fallback_example
+
+
+class ActionCustomFallback(Action):
+    def name(self) -> Text:
+        return "action_custom_fallback"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+        # If we are currently in the middle of a login flow, delegate the message
+        # to the login handler instead of treating it as a fallback.
+        if tracker.get_slot("login_step"):
+            try:
+                login_action = get_action("action_login_user")
+                return login_action.run(dispatcher, tracker, domain)
+            except Exception as e:
+                session_log.warning("[EXCEPTION] delegating to login: %s", e)
+                return [FollowupAction("action_login_user")]
+
+        # Check if we're awaiting typed address - delegate to address processor
+        checkout_step = tracker.get_slot("checkout_step")
+        if checkout_step == "awaiting_typed_address":
+            session_log.debug("[FALLBACK] Detected awaiting_typed_address, delegating to action_process_typed_address")
+            try:
+                typed_address_action = get_action("action_process_typed_address")
+                return typed_address_action.run(dispatcher, tracker, domain)
+            except Exception as e:
+                session_log.warning("[EXCEPTION] delegating to typed address: %s", e)
+                return [FollowupAction("action_process_typed_address")]
+
+        # Grab the raw text of the user's latest message
+        user_text = (tracker.latest_message.get("text") or "").strip()
+        # If it's a 5-digit number and no ZIP code has been set yet, treat it as
+        # a zip code input and jump directly to the nearest store search.
+        if re.fullmatch(r"\d{5}", user_text) and not tracker.get_slot("zipcode"):
+            return [
+                SlotSet("zipcode", user_text),
+                SlotSet("stores_list", None),
+                SlotSet("selected_store", None),
+                FollowupAction("action_get_nearest_store"),
+            ]
+        # Otherwise, respond with the default fallback message
+        dispatcher.utter_message(text="Sorry, I didn't understand that. Could you rephrase?")
+        return []
+
+
+# General AI Actions for enhanced functionality
+class ActionGeneralAIResponse(Action):
+    def name(self) -> Text:
+        return "action_general_ai_response"
+
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[EventType]:
+
+        user_message = tracker.latest_message.get('text', '')
+
+        # Try to get response from your API first
+        api_response = self.try_api_call(user_message)
+
+        if api_response:
+            dispatcher.utter_message(text=api_response)
+            return [SlotSet("api_fallback_used", False)]
+
+        # If API fails, use AI fallback
+        ai_response = self.generate_ai_response(user_message, tracker)
+        dispatcher.utter_message(text=ai_response)
+
+        return [
+            SlotSet("api_fallback_used", True),
+            SlotSet("last_query", user_message)
+        ]
+
+    def try_api_call(self, query: str) -> str:
+        """Try to get response from your AnythingInstantly API"""
+        try:
+            # Replace with your actual API endpoint
+            api_url = f"{API_BASE}/general-query"
+            response = requests.post(api_url,
+                                   json={"query": query},
+                                   timeout=5)
+
+            if response.status_code == 200:
+                data = response.json()
+                return data.get('answer', '')
+        except Exception:
+            return ""
+
+    def generate_ai_response(self, query: str, tracker: Tracker) -> str:
+        """Generate AI-like response when API fails"""
+
+        query_lower = query.lower()
+
+        if any(word in query_lower for word in ['weather', 'temperature']):
+            return "I don't have real-time weather data, but you can check weather apps or websites for current conditions in your area."
+
+        elif any(word in query_lower for word in ['time', 'clock']):
+            return "I don't have access to current time, but you can check your device's clock or search 'current time' online."
+
+        elif any(word in query_lower for word in ['joke', 'funny']):
+            jokes = [
+                "Why don't scientists trust atoms? Because they make up everything!",
+                "I told my wife she was drawing her eyebrows too high. She looked surprised!",
+                "Why did the scarecrow win an award? He was outstanding in his field!"
+            ]
+            import random
+            return random.choice(jokes)
+
+        elif any(word in query_lower for word in ['how are you', 'how do you feel']):
+            return "I'm doing well, thank you for asking! I'm here and ready to help you with anything you need."
+
+        elif any(word in query_lower for word in ['what is', 'define', 'meaning']):
+            return f"I don't have detailed information about '{query}' in my current database, but I'd recommend checking reliable sources like Wikipedia or educational websites for accurate definitions."
+
+        elif any(word in query_lower for word in ['calculate', 'math', '+', '-', '*', '/']):
+            return "I can help with basic calculations, but for complex math, I'd recommend using a calculator app or math tool."
+
+        else:
+            # Generic intelligent response
+            responses = [
+                f"That's an interesting question about '{query}'. While I don't have specific information about this topic, I'm designed to help with shopping and general assistance. Is there something specific I can help you find or learn about?",
+                f"I understand you're asking about '{query}'. I don't have detailed information on this topic, but I'm here to help however I can. Would you like me to help you find products related to this, or is there another way I can assist?",
+                f"Thanks for your question about '{query}'. While this isn't in my specialty area, I'm always learning. Is there something shopping-related or another topic I might be better equipped to help with?"
+            ]
+            import random
+            return random.choice(responses)
+
+
+class ActionSmartFallback(Action):
+    def name(self) -> Text:
+        return "action_smart_fallback"
+
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[EventType]:
+
+        # Get the user's message
+        user_message = tracker.latest_message.get('text', '')
+
+        # Check if the last action was a specific action that already handled the response
+        last_action = tracker.get_last_event_for("action")
+        if last_action and last_action.get("name") in [
+            "action_track_my_orders",
+            "action_prompt_login",
+            "action_login_user",
+            "action_view_cart",
+            "action_get_address"
+        ]:
+            # Don't show fallback message if a specific action just ran
+            return []
+
+        # Provide contextual fallback based on conversation history
+        if 'product' in user_message.lower() or 'buy' in user_message.lower():
+            response = "I can help you find products! Try asking me to 'show categories' or 'search for [product name]'."
+        elif 'store' in user_message.lower() or 'location' in user_message.lower():
+            response = "I can help you find stores near you! Just say 'find stores' or 'search stores'."
+        else:
+            response = "I didn't quite understand that. I can help you with:\n• Shopping and finding products\n• Store locations\n• General questions\n• Cart management\n\nWhat would you like to help with?"
+
+        dispatcher.utter_message(text=response)
+        return []
+
+
+class ActionSmartFallbackEnhanced(Action):
+    """
+    Enhanced fallback that uses OpenAI to understand unclear queries
+    """
+
+    def name(self) -> Text:
+        return "action_smart_fallback_enhanced"
+
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[EventType]:
+
+        user_message = tracker.latest_message.get('text', '').strip()
+
+        session_log.debug("[FALLBACK] Triggered for message: '%s'", user_message)
+
+        if not user_message:
+            dispatcher.utter_message(text="I didn't catch that. Could you please rephrase?")
+            return []
+
+        # Check if in login flow
+        if tracker.get_slot("login_step"):
+            try:
+                login_action = get_action("action_login_user")
+                return login_action.run(dispatcher, tracker, domain)
+            except Exception as e:
+                session_log.warning("[EXCEPTION] Login delegation: %s", e)
+                return [FollowupAction("action_login_user")]
+
+        # Check if awaiting typed address
+        checkout_step = tracker.get_slot("checkout_step")
+        if checkout_step == "awaiting_typed_address":
+            session_log.debug("[FALLBACK] Detected awaiting_typed_address, delegating to action_process_typed_address")
+            try:
+                typed_address_action = get_action("action_process_typed_address")
+                return typed_address_action.run(dispatcher, tracker, domain)
+            except Exception as e:
+                session_log.warning("[EXCEPTION] Typed address delegation: %s", e)
+                return [FollowupAction("action_process_typed_address")]
+
+        # Check if it's a zipcode
+        if re.fullmatch(r"\d{5}", user_message):
+            return [
+                SlotSet("zipcode", user_message),
+                FollowupAction("action_get_nearest_store")
+            ]
+
+        # Try the local classifier first - only uncertain messages go to the LLM
+        local_prediction = classify_fallback(user_message)
+        if local_prediction:
+            action = local_prediction["action"]
+            session_log.debug("[LOCAL CLASSIFIER] Action: %s, Confidence: %.2f, %.3fms",
+                              action, local_prediction['confidence'], local_prediction['latency_ms'])
+            if action == 'none':
+                return self.basic_fallback(dispatcher, user_message)
+            return [FollowupAction(action)]
+
+        # Try OpenAI analysis
+        if OPENAI_AVAILABLE and os.getenv("OPENAI_API_KEY"):
+            try:
+                intent_analysis = self.analyze_intent_with_ai(user_message, tracker)
+
+                if intent_analysis:
+                    action = intent_analysis.get('action')
+                    confidence = intent_analysis.get('confidence', 0)
+                    clarification = intent_analysis.get('clarification')
+                    response_text = intent_analysis.get('response')
+
+                    session_log.debug("[AI ANALYSIS] Action: %s, Confidence: %s", action, confidence)
+                    log_fallback_example(user_message, action, confidence)
+
+                    # High confidence - execute action directly
+                    if confidence >= 0.8 and action and action != 'none':
+                        if response_text:
+                            dispatcher.utter_message(text=response_text)
+                        return [FollowupAction(action)]
+
+                    # Medium confidence - ask for confirmation
+                    elif confidence >= 0.5 and action and action != 'none':
+                        dispatcher.utter_message(
+                            text=clarification or f"Did you mean: {response_text}?",
+                            buttons=[
+                                {"title": "Yes", "payload": "/affirm"},
+                                {"title": "No, let me rephrase", "payload": "/deny"}
+                            ]
+                        )
+                        return [
+                            SlotSet("pending_action", action),
+                            SlotSet("pending_query", user_message)
+                        ]
+
+                    # Low confidence - provide response
+                    else:
+                        if response_text:
+                            dispatcher.utter_message(text=response_text)
+                            return []
+
+            except Exception as e:
+                session_log.warning("[EXCEPTION] OpenAI analysis failed: %s", e)
+
+        # Fallback to basic pattern matching
+        return self.basic_fallback(dispatcher, user_message)
+
+    def analyze_intent_with_ai(self, user_message: str, tracker: Tracker) -> Dict[str, Any]:
+        """Use OpenAI to analyze user intent"""
+
+        if not OPENAI_AVAILABLE:
+            return None
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            session_log.warning("[WARN] OpenAI API key not found")
+            return None
+
+        # Get conversation context
+        recent_intents = []
+        for event in tracker.events[-5:]:
+            if event.get("event") == "user":
+                intent_name = event.get("parse_data", {}).get("intent", {}).get("name")
+                if intent_name:
+                    recent_intents.append(intent_name)
+
+        context = f"Recent topics: {', '.join(recent_intents)}" if recent_intents else "New conversation"
+
+        system_prompt = """You are an intent classifier for an AI shopping assistant bot.
+
+Available actions:
+- action_product_llm_search: Search products
+- action_get_nearest_store: Find stores
+- action_view_cart: View cart
+- action_login_user: Login
+- action_show_categories_with_products: Show categories
+- none: Out of scope
+
+For gibberish or random text, return:
+{
+    "action": "none",
+    "confidence": 0.1,
+    "response": "I didn't quite understand that. I can help you with shopping, finding stores, or managing your cart. What would you like to do?"
+}
+
+Return JSON with:
+{
+    "action": "action_name or none",
+    "confidence": 0.0-1.0,
+    "clarification": "confirmation question",
+    "response": "helpful text"
+}"""
+
+        try:
+            client = openai_client(api_key)
+
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": f"{context}\nUser: {user_message}"}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.3,
+                max_tokens=300
+            )
+
+            result = json.loads(response.choices[0].message.content)
+            session_log.debug("[AI ANALYSIS] Result: %s", LazyJson(result))
+            return result
+
+        except Exception as e:
+            session_log.warning("[EXCEPTION] OpenAI API call failed: %s", e)
+            return None
+
+    def basic_fallback(self, dispatcher: CollectingDispatcher, user_message: str) -> List[EventType]:
+        """Basic pattern matching fallback"""
+
+        msg_lower = user_message.lower()
+
+        session_log.debug("[BASIC FALLBACK] Processing: '%s'", msg_lower)
+
+        # Check for gibberish (less than 3 chars or all same char)
+        if len(user_message) < 3 or len(set(user_message.lower())) == 1:
+            dispatcher.utter_message(
+                text="I didn't understand that. Could you please try again?",
+                buttons=[
+                    {"title": "Browse Products", "payload": "/show_categories"},
+                    {"title": "Find Stores", "payload": "find stores"},
+                    {"title": "View Cart", "payload": "/view_cart"}
+                ]
+            )
+            return []
+
+        # Check if it looks like a store/business name
+        store_keywords = ['barber', 'shop', 'salon', 'restaurant', 'cafe', 'store', 'mart',
+                          'market', 'mall', 'outlet', 'center', 'pizza', 'burger',
+                          'coffee', 'pharmacy', 'gym', 'spa']
+
+        is_store_query = any(keyword in msg_lower for keyword in store_keywords)
+
+        # Pattern matching for products vs stores
+        if any(word in msg_lower for word in ['product', 'buy', 'find', 'show']) or 'ice' in msg_lower or 'cream' in msg_lower:
+
+            if is_store_query:
+                # Asking about a specific store/business
+                dispatcher.utter_message(
+                    text="I can help you find stores nearby! What are you looking for?",
+                    buttons=[
+                        {"title": "Show Nearest Stores", "payload": "find stores near me"},
+                        {"title": "Browse Products", "payload": "/show_categories"}
+                    ]
+                )
+            else:
+                # General product search
+                dispatcher.utter_message(
+                    text="I can help you find products! What are you looking for?",
+                    buttons=[
+                        {"title": "Show Categories", "payload": "/show_categories"},
+                        {"title": "Find Stores", "payload": "find stores near me"}
+                    ]
+                )
+
+        elif any(word in msg_lower for word in ['store', 'location', 'near', 'shop']):
+            dispatcher.utter_message(
+                text="I can help you find stores. Please provide your ZIP code.",
+                buttons=[
+                    {"title": "Enter ZIP Code", "payload": "08852"}
+                ]
+            )
+            return []
+
+        elif any(word in msg_lower for word in ['cart', 'basket']):
+            return [FollowupAction("action_view_cart")]
+
+        else:
+            # Complete fallback
+            dispatcher.utter_message(
+                text="I'm not sure what you mean. I can help you with:\n"
+                     "🛍️ Finding products\n"
+                     "📍 Locating stores\n"
+                     "🛒 Managing your cart\n"
+                     "💳 Checkout\n\n"
+                     "What would you like to do?",
+                buttons=[
+                    {"title": "Browse Products", "payload": "/show_categories"},
+                    {"title": "Find Stores", "payload": "find stores near me"},
+                    {"title": "View Cart", "payload": "/view_cart"}
+                ]
+            )
+        return []
+
+
+class ActionConfirmAndExecute(Action):
+    """Execute pending action after user confirmation"""
+
+    def name(self) -> Text:
+        return "action_confirm_and_execute"
+
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[EventType]:
+
+        pending_action = tracker.get_slot("pending_action")
+        pending_query = tracker.get_slot("pending_query")
+
+        # Clear pending slots
+        events = [
+            SlotSet("pending_action", None),
+            SlotSet("pending_query", None)
+        ]
+
+        # User confirmed - execute the action
+        if pending_action:
+            # For product search, set the search query
+            if pending_action == "action_product_llm_search" and pending_query:
+                events.append(SlotSet("last_search_string", pending_query))
+
+            events.append(FollowupAction(pending_action))
+        else:
+            dispatcher.utter_message(text="What would you like me to help you with?")
+
+        return events
+
+
+class ActionHandleDeny(Action):
+    """Handle when user denies the clarification"""
+
+    def name(self) -> Text:
+        return "action_handle_deny"
+
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[EventType]:
+
+        dispatcher.utter_message(
+            text="No problem! Could you please rephrase what you're looking for?",
+            buttons=[
+                {"title": "Browse Products", "payload": "/show_categories"},
+                {"title": "Find Stores", "payload": "find stores"},
+                {"title": "View Cart", "payload": "/view_cart"}
+            ]
+        )
+
+        return [
+            SlotSet("pending_action", None),
+            SlotSet("pending_query", None)
+        ]
+
+
+class ActionIntelligentResponse(Action):
+    """Provide intelligent responses for general questions using OpenAI"""
+
+    def name(self) -> Text:
+        return "action_intelligent_response"
+
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[EventType]:
+
+        user_message = tracker.latest_message.get('text', '')
+
+        # Try to get intelligent response from OpenAI
+        response_text = self.generate_intelligent_response(user_message, tracker)
+
+        if response_text:
+            dispatcher.utter_message(text=response_text)
+        else:
+            # Fallback response
+            dispatcher.utter_message(
+                text="I'm here to help with shopping! What would you like to do?",
+                buttons=[
+                    {"title": "Browse Products", "payload": "/show_categories"},
+                    {"title": "Find Stores", "payload": "find stores"},
+                ]
+            )
+
+        return []
+
+    def generate_intelligent_response(self, user_message: str, tracker: Tracker) -> str:
+        """Generate intelligent response using OpenAI"""
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            return None
+
+        system_prompt = """You are a helpful AI shopping assistant named AnythingInstantly Bot.
+
+Your capabilities:
+- Help users find and buy products
+- Locate nearby stores
+- Manage shopping carts
+- Process payments
+
+When users ask questions outside shopping:
+1. Provide brief, helpful responses
+2. Gently guide them back to shopping-related topics
+3. Be friendly and conversational
+4. Keep responses under 100 words
+
+For shopping-related questions, encourage them to use your features."""
+
+        try:
+            client = openai_client(api_key)
+
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_message}
+                ],
+                temperature=0.7,
+                max_tokens=150
+            )
+
+            return response.choices[0].message.content.strip()
+
+        except Exception as e:
+            session_log.warning("[EXCEPTION] OpenAI response generation failed: %s", e)
+            return None
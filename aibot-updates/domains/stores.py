@@ -0,0 +1,547 @@
+# actions/domains/stores.py
+"""
+Store Actions
+Zipcode, nearest store and store selection.
+
+1. Nearest stores come from geo_index, text search from store_directory
+2. validate_zipcode_form is the only async action (FormValidationAction)
+"""
+import json
+import re
+from typing import Any, Dict, List, Text
+
+from rasa_sdk import Action, Tracker
+from rasa_sdk.events import EventType, FollowupAction, SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+from rasa_sdk.forms import FormValidationAction
+
+from actions.action_logging import LazyJson
+from actions.action_registry import get_action
+from actions.backend_client import seller_post
+from actions.catalog_cache import compact_product_slot, compact_store_slot, resolve_store_slot
+from actions.domains.common import session_log, store_log
+from actions.store_config import get_store_from_phone
+from actions.store_directory import find_store, search_stores
+
+
+class ActionChangeZipcode(Action):
+    def name(self) -> Text:
+        return "action_change_zipcode"
+
+    def run(
+        self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
+    ) -> List[EventType]:
+        # Clear the zipcode and related store slots
+        dispatcher.utter_message(text="Sure, please provide your 5-digit ZIP code.")
+        return [
+            SlotSet("zipcode", None),
+            SlotSet("stores_list", None),
+            SlotSet("selected_store", None),
+            SlotSet("store_context", False),
+            SlotSet("recent_products", None)
+        ]
+
+
+# Regex to validate US ZIP code format (5 digits)
+ZIP_REGEX = re.compile(r"^\d{5}$")
+
+
+class ValidateZipcodeForm(FormValidationAction):
+    def name(self) -> Text:
+        return "validate_zipcode_form"
+
+    def validate_zipcode(
+        self,
+        slot_value: Any,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> Dict[Text, Any]:
+        """Validate ZIP code"""
+
+        if slot_value and ZIP_REGEX.match(str(slot_value)):
+            return {"zipcode": slot_value}
+        else:
+            dispatcher.utter_message(text="That ZIP code doesn't seem valid. Please enter a proper 5-digit US ZIP code.")
+            return {"zipcode": None}
+
+
+class ActionGetNearestStore(Action):
+    """Modified to block store switching for dedicated bots"""
+
+    def name(self) -> Text:
+        return "action_get_nearest_store"
+
+    def run(
+        self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
+    ) -> List[EventType]:
+
+        # ⭐ NEW: Check if this is a store-specific bot
+        is_dedicated_bot = tracker.get_slot("is_dedicated_bot")
+        store_name = tracker.get_slot("store_name")
+
+        # 🚫 BLOCK STORE SEARCH FOR DEDICATED BOTS
+        if is_dedicated_bot:
+            store_log.debug("[STORE SEARCH] Blocked - This is a dedicated bot for %s", store_name)
+
+            input_channel = tracker.get_latest_input_channel()
+            is_whatsapp = input_channel in ["twilio_whatsapp", "whatsapp_business"]
+
+            if is_whatsapp:
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": f"🏪 You're shopping at {store_name}!\n\nThis bot is exclusive to our store.\n\nWhat would you like to do?",
+                        "buttons": [
+                            {"id": "browse_products", "title": "🛍️ Browse Products"},
+                            {"id": "view_cart", "title": "🛒 View Cart"},
+                            {"id": "my_orders", "title": "📦 My Orders"}
+                        ]
+                    }
+                )
+            else:
+                dispatcher.utter_message(
+                    text=f"🏪 **You're shopping at {store_name}!**\n\n"
+                         f"This bot is exclusive to our store.",
+                    buttons=[
+                        {"title": "🛍️ Browse Our Products", "payload": "/show_categories"},
+                        {"title": "🛒 View Cart", "payload": "/view_cart"}
+                    ]
+                )
+                dispatcher.utter_message(
+                    text='<a href="https://stagebot.anythinginstantly.com" target="_blank">Visit Marketplace for other stores</a>'
+                )
+
+            return []
+
+        # ✅ CONTINUE WITH MARKETPLACE LOGIC (original code)
+        zipcode = tracker.get_slot("zipcode")
+        user_text = (tracker.latest_message.get("text") or "").strip()
+
+        if tracker.get_slot("login_step"):
+            return [FollowupAction("action_login_user")]
+
+        lower_text = user_text.lower()
+        if lower_text in ["login", "log in", "log me in", "sign in"]:
+            return [FollowupAction("action_login_user")]
+        if lower_text in ["register", "sign up", "create account", "new user registration"]:
+            dispatcher.utter_message(text="Sure, here is the sign-up page:\nhttps://stage.anythinginstantly.com")
+            return []
+
+        if user_text.isdigit() and not re.fullmatch(r"\d{5}", user_text):
+            if tracker.get_slot("store_context") or tracker.get_slot("stores_list"):
+                try:
+                    store_action = get_action("action_set_selected_store")
+                    return store_action.run(dispatcher, tracker, domain)
+                except Exception as e:
+                    store_log.warning("[EXCEPTION] delegating to store action: %s", e)
+                    return [FollowupAction("action_set_selected_store")]
+
+            recent_products_json = tracker.get_slot("recent_products")
+            if recent_products_json:
+                try:
+                    product_action = get_action("action_select_product")
+                    return product_action.run(dispatcher, tracker, domain)
+                except Exception as e:
+                    store_log.warning("[EXCEPTION] delegating to product action: %s", e)
+                    return [FollowupAction("action_select_product")]
+
+        if not zipcode:
+            if re.fullmatch(r"\d{5}", user_text):
+                zipcode = user_text
+            else:
+                dispatcher.utter_message(text="Please provide your 5-digit ZIP code first.")
+                return []
+
+        store_search_string = None
+        for ent in tracker.latest_message.get("entities", []):
+            if ent.get("entity") == "store_name":
+                store_search_string = ent.get("value")
+                break
+
+        try:
+            # Per-zip cached store list, filtered by name locally
+            store_dicts = search_stores(zipcode, store_search_string)
+
+            if not store_dicts:
+                dispatcher.utter_message(
+                    text="Sorry, no stores found for this ZIP code. Would you like to try a different ZIP code?"
+                )
+                return [SlotSet("stores_list", []), SlotSet("selected_store", None)]
+
+            lines = []
+            for idx, store in enumerate(store_dicts[:5], start=1):
+                lines.append(f"{idx}. {store['name']} - {store['address']}")
+            dispatcher.utter_message(text="Found these stores in your area:\n" + "\n".join(lines))
+            dispatcher.utter_message(text="Please select a store by typing its option number or name.")
+
+            store_refs = compact_store_slot(store_dicts, self.name())
+            return [
+                SlotSet("zipcode", zipcode),
+                SlotSet("stores_list", store_refs),
+                SlotSet("recent_products", store_refs),
+                SlotSet("store_context", True),
+                SlotSet("selected_store", None)
+            ]
+
+        except Exception as e:
+            store_log.warning("[EXCEPTION] in ActionGetNearestStore: %s", e)
+            dispatcher.utter_message(text="Sorry, I am facing issues fetching stores right now. Please try again later.")
+            return []
+
+
+class ActionSetSelectedStore(Action):
+    def name(self) -> Text:
+        return "action_set_selected_store"
+
+    def run(
+        self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
+    ) -> List[EventType]:
+
+        selected_text = tracker.latest_message.get("text", "").strip()
+
+        # If we are not currently in a store selection context but we do have a list of recent products
+        if not tracker.get_slot("store_context"):
+            recent_products_json = tracker.get_slot("recent_products")
+            stores = tracker.get_slot("stores_list")
+            if recent_products_json and (stores is None or stores == []) and selected_text and selected_text.isdigit():
+                try:
+                    product_action = get_action("action_select_product")
+                    return product_action.run(dispatcher, tracker, domain)
+                except Exception as e:
+                    store_log.warning("[EXCEPTION] delegating to product action: %s", e)
+                    return [FollowupAction("action_select_product")]
+
+        # Retrieve the list of stores that was shown (refs, in order); stores missing
+        # from the snapshot (expired, other worker) are looked up by id, never re-searched
+        zipcode = tracker.get_slot("zipcode")
+        store_lookup = lambda key: find_store(zipcode, key)  # noqa: E731
+        try:
+            stores = resolve_store_slot(tracker.get_slot("stores_list"), lookup=store_lookup, keep_missing=True)
+        except (json.JSONDecodeError, ValueError, TypeError):
+            stores = []
+        if not any(stores):
+            lookup = store_lookup if tracker.get_slot("store_context") else None
+            try:
+                stores = resolve_store_slot(tracker.get_slot("recent_products"), lookup=lookup, keep_missing=True)
+            except (json.JSONDecodeError, ValueError, TypeError):
+                stores = []
+            if not any(stores):
+                stores = []
+
+        if not stores:
+            dispatcher.utter_message(text="I don't have any store list in memory, please search for stores first.")
+            return []
+
+        # Try to infer store choice from number or name matches
+        selected_store = None
+        # Check if user input is a digit within range
+        if selected_text.isdigit():
+            idx = int(selected_text) - 1
+            if 0 <= idx < len(stores):
+                selected_store = stores[idx]
+                if selected_store is None:
+                    dispatcher.utter_message(text="I couldn't find that store anymore, please search for stores again.")
+                    return []
+        else:
+            # Match by name case-insensitive substring
+            for store in stores:
+                if store and selected_text.lower() in store.get("name", "").lower():
+                    selected_store = store
+                    break
+
+        if selected_store:
+            dispatcher.utter_message(text=f"You have selected {selected_store.get('name')} located at {selected_store.get('address')}.")
+            events: List[EventType] = [
+                SlotSet("selected_store", selected_store),
+                SlotSet("store_context", True)
+            ]
+
+            # After selecting a store, fetch products specific to that store
+            try:
+                wh_account_id = selected_store.get("wh_account_id") or ""
+                store_name = selected_store.get("store_name") or selected_store.get("name") or ""
+                zipcode = tracker.get_slot("zipcode") or ""
+                user_id = tracker.get_slot("user_id") or ""
+
+                search_payload = {
+                    "wh_account_id": str(wh_account_id),
+                    "upc": "",
+                    "ai_category_id": "",
+                    "ai_product_id": "",
+                    "product_id": "",
+                    "search_string": "",
+                    "zipcode": str(zipcode),
+                    "user_id": str(user_id),
+                    "page": "1",
+                    "items": "5"
+                }
+                # Call getMasterProducts API to fetch products for the selected store
+                products_resp = seller_post("getMasterProducts", search_payload, timeout=8)
+                products_data = products_resp.json()
+                # Parse products list
+                product_list = []
+                if isinstance(products_data, list):
+                    product_list = products_data
+                elif isinstance(products_data, dict):
+                    pdata = products_data.get("data") or products_data.get("getMasterProducts") or products_data.get("products")
+                    if isinstance(pdata, list):
+                        product_list = pdata
+                    elif isinstance(pdata, dict):
+                        product_list = pdata.get("getMasterProducts", []) or pdata.get("products", [])
+
+                if product_list:
+                    lines = []
+                    for idx, p in enumerate(product_list[:5], start=1):
+                        title = p.get("title") or p.get("product_name") or "Unnamed Product"
+                        price = p.get("discounted_price") or p.get("product_price") or "-"
+                        price_str = f"₹{price}"
+                        desc = p.get("description", "").strip()
+                        if len(desc) > 80:
+                            desc = desc[:80] + "…"
+                        lines.append(f"{idx}. **{title}**\n{price_str}\n{desc}")
+                    msg = "🛒 **Products available in this store:**\n\n" + "\n\n".join(lines) + "\n\n➡️ Reply with the product number to see details."
+                    dispatcher.utter_message(text=msg)
+                    # Save to recent_products slot
+                    events.append(SlotSet("recent_products", compact_product_slot(product_list, self.name())))
+                    # Reset search_page for next
+                    events.append(SlotSet("search_page", 1))
+                    # Exit store context after presenting store products
+                    events.append(SlotSet("store_context", False))
+                    # Clear the stores_list slot
+                    events.append(SlotSet("stores_list", None))
+                else:
+                    dispatcher.utter_message(text="Sorry, I couldn't find any products for this store.")
+                    events.append(SlotSet("recent_products", None))
+                    events.append(SlotSet("store_context", False))
+                    events.append(SlotSet("stores_list", None))
+            except Exception as e:
+                store_log.warning("[EXCEPTION] fetching products for selected store: %s", e)
+                dispatcher.utter_message(text="An error occurred while fetching products for this store.")
+            return events
+
+        else:
+            dispatcher.utter_message(text="Sorry, I couldn't find a matching store. Please try again or enter a different name.")
+            return [SlotSet("selected_store", None)]
+
+
+class ActionRecallPreviousLocation(Action):
+    def name(self) -> Text:
+        return "action_recall_previous_location"
+
+    def run(
+        self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
+    ) -> List[EventType]:
+        last_zip = tracker.get_slot("last_zipcode")
+        last_store = tracker.get_slot("selected_store")
+
+        if last_zip and last_store:
+            store_name = last_store.get("name") if isinstance(last_store, dict) else str(last_store)
+            dispatcher.utter_message(text=f"Welcome back! Would you like to continue with your last ZIP code {last_zip} and store {store_name}?")
+            return []
+        else:
+            dispatcher.utter_message(text="Welcome! How can I assist you today?")
+            return []
+
+
+class ActionShowStoreOptions(Action):
+    def name(self) -> Text:
+        return "action_show_store_options"
+
+    def run(
+        self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
+    ) -> List[EventType]:
+        zipcode = tracker.get_slot("zipcode")
+        try:
+            stores = [s for s in resolve_store_slot(tracker.get_slot("stores_list"),
+                                                    lookup=lambda key: find_store(zipcode, key)) if s]
+        except (json.JSONDecodeError, ValueError, TypeError):
+            stores = []
+        events: List[EventType] = []
+        if not stores and zipcode:
+            if tracker.get_slot("store_context"):
+                try:
+                    # Show the list from the last search again, so option numbers still match it
+                    stores = resolve_store_slot(tracker.get_slot("recent_products"),
+                                                lookup=lambda key: find_store(zipcode, key))
+                except (json.JSONDecodeError, ValueError, TypeError):
+                    stores = []
+            if not stores:
+                try:
+                    stores = search_stores(zipcode)
+                except Exception as e:
+                    store_log.warning("[EXCEPTION] loading stores from directory: %s", e)
+                    stores = []
+        if stores:
+            # Numbers typed next refer to the list shown now
+            store_refs = compact_store_slot(stores, self.name())
+            events = [SlotSet("stores_list", store_refs), SlotSet("recent_products", store_refs)]
+        if not stores or not isinstance(stores, list):
+            dispatcher.utter_message(text="I don't have any stores to show. Please search for stores first.")
+            return []
+
+        store_lines = []
+        for idx, store in enumerate(stores[:5], start=1):
+            name = store.get("name", "Unknown Store")
+            address = store.get("address", "")
+            store_lines.append(f"{idx}. {name} - {address}")
+
+        store_list_text = "Found these stores in your area:\n" + "\n".join(store_lines)
+        dispatcher.utter_message(text=store_list_text)
+        dispatcher.utter_message(text="Please select a store by typing its option number or name.")
+        return events
+
+
+class ActionChangeStore(Action):
+    def name(self) -> Text:
+        return "action_change_store"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[EventType]:
+        dispatcher.utter_message(text="Sure! Let me help you find a different store.")
+        # Clear current store selection and trigger store search
+        return [
+            SlotSet("selected_store", None),
+            SlotSet("store_context", True),
+            SlotSet("recent_products", None),
+            FollowupAction("action_get_nearest_store")
+        ]
+
+
+class ActionChangeZipcodeEnhanced(Action):
+    """Enhanced zipcode change handler"""
+
+    def name(self) -> Text:
+        return "action_change_zipcode_enhanced"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        current_zipcode = tracker.get_slot("zipcode")
+
+        if current_zipcode:
+            dispatcher.utter_message(
+                text=f"Your current ZIP code is: {current_zipcode}\n\nPlease enter your new 5-digit ZIP code to find stores in a different area."
+            )
+        else:
+            dispatcher.utter_message(
+                text="Please enter your 5-digit ZIP code to find stores near you."
+            )
+
+        # Clear all location-related slots
+        return [
+            SlotSet("zipcode", None),
+            SlotSet("stores_list", None),
+            SlotSet("selected_store", None),
+            SlotSet("store_context", False),
+            SlotSet("recent_products", None),
+            SlotSet("last_zipcode", current_zipcode)  # Save for reference
+        ]
+
+
+class ActionDetectStoreContext(Action):
+    """
+    Detect if this is a store-specific bot or marketplace bot
+    Runs at conversation start
+    """
+
+    def name(self) -> Text:
+        return "action_detect_store_context"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        store_log.debug("[STORE DETECTION] Starting store context detection...")
+
+        store_id = None
+        store_name = None
+        catalog_id = None
+        is_dedicated_bot = False
+
+        # Get existing slots (for comparison)
+        existing_store_id = tracker.get_slot("store_id")
+        existing_catalog_id = tracker.get_slot("catalog_id")
+        session_log.debug("[SESSION] Existing slot store_id = '%s', catalog_id = '%s'", existing_store_id, existing_catalog_id)
+
+        # Method 1: Check metadata FIRST (fresh data from connector/widget)
+        metadata = tracker.latest_message.get("metadata", {})
+        session_log.debug("[SESSION] Full metadata from tracker = %s", LazyJson(metadata))
+
+        # Check if connector already set store info in metadata
+        if metadata.get("store_id"):
+            store_id = str(metadata.get("store_id"))
+            store_name = metadata.get("store_name")
+            catalog_id = metadata.get("catalog_id")
+            is_dedicated_bot = metadata.get("is_dedicated_bot", True)
+            store_log.debug("✅ [STORE DETECTION] Store from metadata: %s (ID: %s, catalog: %s)",
+                            store_name, store_id, catalog_id)
+
+            # Check if different from cached
+            if existing_store_id and existing_store_id != store_id:
+                store_log.debug("⚠️ [STORE DETECTION] Store changed! %s → %s", existing_store_id, store_id)
+
+        # Method 2: If not in metadata, try WhatsApp phone detection
+        if not store_id:
+            input_channel = tracker.get_latest_input_channel()
+            sender_id = tracker.sender_id
+
+            store_log.debug("🔍 DEBUG: input_channel = '%s'", input_channel)
+            store_log.debug("🔍 DEBUG: sender_id = '%s'", sender_id)
+
+            if input_channel in ["twilio_whatsapp", "whatsapp_business"] and sender_id:
+                store_log.debug("[STORE DETECTION] WhatsApp channel detected, sender: %s", sender_id)
+
+                bot_phone = metadata.get("bot_phone_number")
+                store_log.debug("🔍 DEBUG: bot_phone from metadata = '%s'", bot_phone)
+
+                if bot_phone:
+                    store_log.debug("🔍 DEBUG: Calling get_store_from_phone('%s')", bot_phone)
+                    store_info = get_store_from_phone(bot_phone)
+                    store_log.debug("🔍 DEBUG: get_store_from_phone returned: %s", LazyJson(store_info))
+
+                    if store_info:
+                        store_id = store_info.get("store_id")
+                        store_name = store_info.get("store_name")
+                        catalog_id = store_info.get("catalog_id")
+                        is_dedicated_bot = True
+                        store_log.debug("✅ [STORE DETECTION] WhatsApp store bot: %s (ID: %s, catalog: %s)",
+                                        store_name, store_id, catalog_id)
+                    else:
+                        store_log.warning("⚠️ [STORE DETECTION] WhatsApp marketplace bot (no store mapping)")
+                else:
+                    store_log.warning("⚠️ [STORE DETECTION] No bot_phone_number in metadata!")
+
+        # Method 3: If still not found, use cached slots if available
+        if not store_id and existing_store_id:
+            store_id = existing_store_id
+            store_name = tracker.get_slot("store_name")
+            catalog_id = existing_catalog_id
+            is_dedicated_bot = tracker.get_slot("is_dedicated_bot")
+            store_log.debug("✅ [STORE DETECTION] Using cached slots: %s (ID: %s, catalog: %s)",
+                            store_name, store_id, catalog_id)
+            return []  # No need to update slots
+
+        # Method 4: Marketplace bot (default)
+        if not store_id:
+            store_log.debug("[STORE DETECTION] Marketplace bot (no store context)")
+            is_dedicated_bot = False
+
+        # Set/update slots
+        events = [
+            SlotSet("store_id", store_id),
+            SlotSet("store_name", store_name),
+            SlotSet("catalog_id", catalog_id),
+            SlotSet("is_dedicated_bot", is_dedicated_bot)
+        ]
+
+        store_log.debug("[STORE DETECTION] Final: store_id=%s, catalog_id=%s, is_dedicated=%s",
+                        store_id, catalog_id, is_dedicated_bot)
+
+        return events
@@ -0,0 +1,667 @@
+# actions/domains/wishlist.py
+"""
+Wishlist Actions
+Saved products per customer (cached in user_cache).
+"""
+import json
+from typing import Any, Dict, List, Text
+
+import requests
+from rasa_sdk import Action, Tracker
+from rasa_sdk.events import EventType, FollowupAction, SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.action_logging import LazyJson
+from actions.cart_cache import invalidate_cart
+from actions.cart_sync import bulk_add_to_cart
+from actions.catalog_cache import get_product, resolve_product_slot
+from actions.domains.common import API_BASE, cart_log
+from actions.user_cache import (
+    add_to_wishlist,
+    get_cached_wishlist,
+    get_wishlist,
+    invalidate_wishlist,
+    remove_from_wishlist,
+)
+
+
+# ============================================================================
+# WISHLIST / FAVORITES ACTIONS
+# ============================================================================
+
+class ActionAddToWishlist(Action):
+    """Add a product to user's wishlist/favorites"""
+
+    def name(self) -> Text:
+        return "action_add_to_wishlist"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id:
+            dispatcher.utter_message(
+                text="Please login first to save favorites! Type 'login' to get started."
+            )
+            return []
+
+        # Get product info from slot or recent selection
+        product_id = tracker.get_slot("selected_product_id")
+        shipper_id = tracker.get_slot("store_id") or tracker.get_slot("shipper_id")
+
+        # Try to get from recent_products if not in slot
+        if not product_id:
+            recent_products = tracker.get_slot("recent_products")
+            if recent_products:
+                try:
+                    products = resolve_product_slot(recent_products, fetch_missing=False)
+                    if products and len(products) > 0:
+                        # Get the first/selected product
+                        product = products[0]
+                        product_id = product.get("product_id") or product.get("id")
+                        shipper_id = shipper_id or product.get("shipper_id")
+                except:
+                    pass
+
+        if not product_id:
+            dispatcher.utter_message(
+                text="Please select a product first before adding to favorites.\n\nYou can browse products by saying 'show menu' or search for something specific."
+            )
+            return []
+
+        # Call API to add to wishlist
+        try:
+            cart_log.debug("[WISHLIST] Adding product %s to wishlist for user %s", product_id, user_id)
+            # Also appends the product to the cached wishlist
+            data = add_to_wishlist(user_id, product_id, shipper_id, product=get_product(product_id))
+
+            if data.get("status") == 1 or data.get("code") == 200:
+                total = data.get("data", {}).get("total_Wishlist", 1)
+
+                # Get product name if available
+                product_name = tracker.get_slot("selected_product_name") or "Product"
+
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": f"❤️ *{product_name}* added to your favorites!\n\nYou now have {total} item(s) in your favorites.",
+                        "buttons": [
+                            {"id": "view_wishlist", "title": "❤️ View Favorites"},
+                            {"id": "continue_shopping", "title": "🛍️ Continue Shopping"}
+                        ]
+                    }
+                )
+            else:
+                message = data.get("message", "Couldn't add to favorites. Please try again.")
+                dispatcher.utter_message(text=f"⚠️ {message}")
+
+        except Exception as e:
+            cart_log.warning("[WISHLIST ERROR] %s", e)
+            dispatcher.utter_message(text="Sorry, couldn't add to favorites right now. Please try again later.")
+
+        return []
+
+
+class ActionViewWishlist(Action):
+    """View user's wishlist/favorites"""
+
+    def name(self) -> Text:
+        return "action_view_wishlist"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id:
+            dispatcher.utter_message(
+                text="Please login first to view your favorites! Type 'login' to get started."
+            )
+            return []
+
+        try:
+            cart_log.debug("[WISHLIST] Loading wishlist for user %s", user_id)
+            wishlist = get_wishlist(user_id)
+
+            if not wishlist:
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": "❤️ *Your Favorites*\n\nYou haven't saved any favorites yet!\n\nBrowse our products and tap the ❤️ button to save items for quick reordering.",
+                        "buttons": [
+                            {"id": "show_menu", "title": "🍽️ Browse Menu"},
+                            {"id": "search_products", "title": "🔍 Search Products"}
+                        ]
+                    }
+                )
+                return []
+
+            # Build WhatsApp list message with wishlist items
+            sections = []
+            items = []
+
+            for item in wishlist[:10]:  # Limit to 10 items for WhatsApp list
+                product_id = item.get("product_id")
+                wishlist_id = item.get("wishlist_id") or item.get("wishlist_detail_id")
+                title = item.get("title", "Unknown Product")
+                price = item.get("discounted_price") or item.get("product_price", 0)
+                store_name = item.get("store_name", "")
+
+                # Truncate title for WhatsApp (max 24 chars)
+                display_title = title[:24] if len(title) > 24 else title
+
+                items.append({
+                    "id": f"wishlist_item_{product_id}_{wishlist_id}",
+                    "title": display_title,
+                    "description": f"₹{price} - {store_name}" if store_name else f"₹{price}"
+                })
+
+            sections.append({
+                "title": "Your Favorites",
+                "rows": items
+            })
+
+            # Add action options
+            sections.append({
+                "title": "Options",
+                "rows": [
+                    {"id": "add_all_to_cart", "title": "🛒 Add All to Cart", "description": "Add all favorites to cart"},
+                    {"id": "clear_wishlist", "title": "🗑️ Clear Favorites", "description": "Remove all favorites"}
+                ]
+            })
+
+            dispatcher.utter_message(
+                json_message={
+                    "type": "list",
+                    "text": f"❤️ *Your Favorites* ({len(wishlist)} items)\n\nTap to view details or add to cart:",
+                    "button_text": "View Favorites",
+                    "sections": sections
+                }
+            )
+
+            # Store wishlist for reference
+            return [SlotSet("current_wishlist", json.dumps(wishlist))]
+
+        except Exception as e:
+            cart_log.warning("[WISHLIST ERROR] %s", e)
+            import traceback
+            traceback.print_exc()
+            dispatcher.utter_message(text="Sorry, couldn't load your favorites right now. Please try again later.")
+            return []
+
+
+class ActionRemoveFromWishlist(Action):
+    """Remove a product from user's wishlist/favorites"""
+
+    def name(self) -> Text:
+        return "action_remove_from_wishlist"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id:
+            dispatcher.utter_message(text="Please login first!")
+            return []
+
+        # Get product to remove - could be from button click or slot
+        latest_message = tracker.latest_message.get("text", "")
+
+        product_id = None
+        wishlist_id = None
+
+        # Check if it's a button click with format: wishlist_item_{product_id}_{wishlist_id}
+        if "wishlist_item_" in latest_message:
+            parts = latest_message.replace("wishlist_item_", "").split("_")
+            if len(parts) >= 2:
+                product_id = parts[0]
+                wishlist_id = parts[1]
+
+        # Or get from slot
+        if not product_id:
+            product_id = tracker.get_slot("selected_product_id")
+
+        # Try to get wishlist_id from stored wishlist
+        if product_id and not wishlist_id:
+            current_wishlist = tracker.get_slot("current_wishlist") or get_cached_wishlist(user_id)
+            if current_wishlist:
+                try:
+                    wishlist = json.loads(current_wishlist) if isinstance(current_wishlist, str) else current_wishlist
+                    for item in wishlist:
+                        if str(item.get("product_id")) == str(product_id):
+                            wishlist_id = item.get("wishlist_id") or item.get("wishlist_detail_id")
+                            break
+                except:
+                    pass
+
+        if not product_id:
+            dispatcher.utter_message(text="Please select a product to remove from favorites.")
+            return [FollowupAction("action_view_wishlist")]
+
+        try:
+            cart_log.debug("[WISHLIST] Removing product %s from wishlist for user %s", product_id, user_id)
+            # Also drops the product from the cached wishlist
+            data = remove_from_wishlist(user_id, product_id, wishlist_id)
+
+            if data.get("data", {}).get("status") == True:
+                remaining = data.get("data", {}).get("total_Wishlist", 0)
+
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": f"✅ Removed from favorites!\n\nYou have {remaining} item(s) remaining in favorites.",
+                        "buttons": [
+                            {"id": "view_wishlist", "title": "❤️ View Favorites"},
+                            {"id": "continue_shopping", "title": "🛍️ Continue Shopping"}
+                        ]
+                    }
+                )
+            else:
+                message = data.get("data", {}).get("message", "Couldn't remove from favorites.")
+                dispatcher.utter_message(text=f"⚠️ {message}")
+
+        except Exception as e:
+            cart_log.warning("[WISHLIST ERROR] %s", e)
+            dispatcher.utter_message(text="Sorry, couldn't remove from favorites right now. Please try again.")
+
+        return []
+
+
+class ActionAddWishlistToCart(Action):
+    """Add wishlist item(s) to cart - supports single item or ALL items"""
+
+    def name(self) -> Text:
+        return "action_add_wishlist_to_cart"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id:
+            dispatcher.utter_message(text="Please login first!")
+            return []
+
+        # Get product from button click or slot
+        latest_message = tracker.latest_message.get("text", "").lower().strip()
+        store_id = tracker.get_slot("store_id")
+
+        # ============================================================
+        # CHECK IF "ADD ALL TO CART" - add all wishlist items
+        # ============================================================
+        add_all_patterns = ["add_all_to_cart", "add all to cart", "add all favorites", "🛒 add all"]
+        is_add_all = any(pattern in latest_message for pattern in add_all_patterns)
+
+        if is_add_all:
+            cart_log.debug("[WISHLIST->CART] ADD ALL requested")
+
+            # Get wishlist - cached while fresh, otherwise fetched from API
+            try:
+                wishlist = get_wishlist(user_id)
+                cart_log.debug("[WISHLIST->CART] Wishlist has %s items", len(wishlist))
+            except Exception as e:
+                cart_log.warning("[WISHLIST->CART] API fetch error: %s", e)
+                wishlist = []
+
+            if not wishlist:
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": "❤️ Your favorites list is empty! Browse our menu to add items.",
+                        "buttons": [
+                            {"id": "browse_products", "title": "🛍️ Browse Menu"}
+                        ]
+                    }
+                )
+                return []
+
+            # Add all items to cart concurrently (bounded), one result per item
+            results = bulk_add_to_cart(user_id, wishlist, default_shipper_id=store_id)
+            added_count = sum(1 for r in results if r["success"])
+            failed_items = [(r["title"] or "Product")[:20] for r in results if not r["success"]]
+            cart_log.debug("[WISHLIST->CART] Added %s/%s items, %s failed",
+                           added_count, len(results), len(failed_items))
+
+            # Show result
+            if added_count > 0:
+                msg = f"🛒 Added {added_count} item(s) from favorites to cart!"
+                if failed_items:
+                    msg += f"\n\n⚠️ Some items couldn't be added: {', '.join(failed_items)}"
+
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": msg + "\n\nWhat would you like to do next?",
+                        "buttons": [
+                            {"id": "view_cart", "title": "🛒 View Cart"},
+                            {"id": "checkout", "title": "💳 Checkout"}
+                        ]
+                    }
+                )
+            else:
+                dispatcher.utter_message(text="⚠️ Couldn't add items to cart. Please try again.")
+
+            return [SlotSet("current_wishlist", json.dumps(wishlist))]
+
+        # ============================================================
+        # SINGLE ITEM - original behavior
+        # ============================================================
+        product_id = None
+        shipper_id = None
+
+        # Parse from wishlist_item button click
+        if "wishlist_item_" in latest_message:
+            parts = latest_message.replace("wishlist_item_", "").split("_")
+            if len(parts) >= 1:
+                product_id = parts[0]
+
+        # Get from stored wishlist
+        current_wishlist = tracker.get_slot("current_wishlist")
+        if product_id and current_wishlist:
+            try:
+                wishlist = json.loads(current_wishlist) if isinstance(current_wishlist, str) else current_wishlist
+                for item in wishlist:
+                    if str(item.get("product_id")) == str(product_id):
+                        shipper_id = item.get("shipper_id")
+                        product_name = item.get("title", "Product")
+                        break
+            except:
+                pass
+
+        if not product_id:
+            dispatcher.utter_message(text="Please select an item from your favorites to add to cart.")
+            return [FollowupAction("action_view_wishlist")]
+
+        # Add to cart using existing cart API
+        try:
+            shipper_id = shipper_id or store_id
+
+            cart_endpoint = f"{API_BASE}/addtocart"
+            cart_payload = {
+                "product_id": str(product_id),
+                "user_id": str(user_id),
+                "product_qty": "1",
+                "shipper_id": str(shipper_id) if shipper_id else ""
+            }
+
+            cart_log.debug("[WISHLIST->CART] Adding product %s to cart", product_id)
+            response = requests.post(cart_endpoint, json=cart_payload, timeout=10)
+            invalidate_cart(user_id)
+            data = response.json()
+
+            if data.get("status") == 1 or data.get("code") == 200:
+                dispatcher.utter_message(
+                    json_message={
+                        "type": "buttons",
+                        "text": f"🛒 Added to cart from favorites!\n\nWhat would you like to do next?",
+                        "buttons": [
+                            {"id": "view_cart", "title": "🛒 View Cart"},
+                            {"id": "view_wishlist", "title": "❤️ More Favorites"},
+                            {"id": "checkout", "title": "💳 Checkout"}
+                        ]
+                    }
+                )
+            else:
+                message = data.get("message", "Couldn't add to cart.")
+                dispatcher.utter_message(text=f"⚠️ {message}")
+
+        except Exception as e:
+            cart_log.warning("[WISHLIST->CART ERROR] %s", e)
+            dispatcher.utter_message(text="Sorry, couldn't add to cart right now. Please try again.")
+
+        return []
+
+
+class ActionGetWishlistCount(Action):
+    """Get the total count of wishlist items (for badge display)"""
+
+    def name(self) -> Text:
+        return "action_get_wishlist_count"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id:
+            return [SlotSet("wishlist_count", 0)]
+
+        cached_wishlist = get_cached_wishlist(user_id)
+        if cached_wishlist is not None:
+            return [SlotSet("wishlist_count", len(cached_wishlist))]
+
+        try:
+            endpoint = f"{API_BASE}/getTotalWishlistItem"
+            payload = {"user_id": str(user_id)}
+
+            response = requests.post(endpoint, json=payload, timeout=5)
+            data = response.json()
+
+            count = data.get("data", {}).get("total_Wishlist", 0)
+            return [SlotSet("wishlist_count", count)]
+
+        except Exception as e:
+            cart_log.warning("[WISHLIST COUNT ERROR] %s", e)
+            return [SlotSet("wishlist_count", 0)]
+
+
+class ActionClearWishlist(Action):
+    """Clear all items from user's wishlist/favorites"""
+
+    def name(self) -> Text:
+        return "action_clear_wishlist"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id:
+            dispatcher.utter_message(text="Please login first!")
+            return []
+
+        cart_log.debug("[CLEAR WISHLIST] Starting for user %s", user_id)
+
+        # ALWAYS fetch fresh wishlist from API (slot may be stale)
+        wishlist = []
+        try:
+            cart_log.debug("[CLEAR WISHLIST] Fetching wishlist from API")
+            wishlist = get_wishlist(user_id, fresh=True)
+            cart_log.debug("[CLEAR WISHLIST] Found %s items in wishlist", len(wishlist))
+        except Exception as e:
+            cart_log.warning("[CLEAR WISHLIST] API fetch error: %s", e)
+            # Try slot as fallback
+            current_wishlist = tracker.get_slot("current_wishlist")
+            if current_wishlist:
+                try:
+                    wishlist = json.loads(current_wishlist) if isinstance(current_wishlist, str) else current_wishlist
+                    cart_log.debug("[CLEAR WISHLIST] Using slot fallback: %s items", len(wishlist))
+                except Exception as e2:
+                    cart_log.warning("[CLEAR WISHLIST] Slot parse error: %s", e2)
+                    wishlist = []
+
+        if not wishlist:
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": "❤️ Your favorites list is already empty!",
+                    "buttons": [
+                        {"id": "browse_products", "title": "🛍️ Browse Menu"}
+                    ]
+                }
+            )
+            return []
+
+        # Remove all items
+        removed_count = 0
+        total_items = len(wishlist)
+
+        for item in wishlist:
+            try:
+                product_id = item.get("product_id")
+                wishlist_id = item.get("wishlist_id") or item.get("wishlist_detail_id") or item.get("id")
+                title = item.get("title", "Unknown")
+
+                if not product_id:
+                    cart_log.debug("[CLEAR WISHLIST] Skipping item - no product_id: %s", LazyJson(item))
+                    continue
+
+                cart_log.debug("[CLEAR WISHLIST] Removing: %s (product_id=%s, wishlist_id=%s)",
+                               title, product_id, wishlist_id)
+                result = remove_from_wishlist(user_id, product_id, wishlist_id, timeout=5)
+                cart_log.debug("[CLEAR WISHLIST] Remove result: %s", LazyJson(result))
+
+                # Check various success indicators
+                is_success = (
+                    result.get("status") == 1 or
+                    result.get("status") == "1" or
+                    result.get("code") == 200 or
+                    result.get("data", {}).get("status") or
+                    result.get("message", "").lower().find("success") >= 0 or
+                    result.get("message", "").lower().find("removed") >= 0
+                )
+
+                if is_success:
+                    removed_count += 1
+                    cart_log.debug("[CLEAR WISHLIST] ✓ Removed %s", title)
+                else:
+                    cart_log.warning("[CLEAR WISHLIST] ✗ Failed to remove %s: %s", title, LazyJson(result))
+
+            except Exception as e:
+                cart_log.warning("[CLEAR WISHLIST] Error removing item: %s", e)
+
+        cart_log.debug("[CLEAR WISHLIST] Removed %s/%s items", removed_count, total_items)
+        invalidate_wishlist(user_id)
+
+        if removed_count > 0:
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": f"✅ Cleared {removed_count} item(s) from your favorites!",
+                    "buttons": [
+                        {"id": "browse_products", "title": "🛍️ Browse Menu"},
+                        {"id": "continue_shopping", "title": "🛍️ Continue Shopping"}
+                    ]
+                }
+            )
+        else:
+            dispatcher.utter_message(
+                json_message={
+                    "type": "buttons",
+                    "text": f"⚠️ Couldn't clear favorites. Please try again or contact support.",
+                    "buttons": [
+                        {"id": "view_wishlist", "title": "❤️ View Favorites"},
+                        {"id": "browse_products", "title": "🛍️ Browse Menu"}
+                    ]
+                }
+            )
+
+        return [
+            SlotSet("current_wishlist", None),
+            SlotSet("wishlist_count", 0)
+        ]
+
+
+class ActionHandleWishlistItemSelection(Action):
+    """Handle when user selects an item from wishlist - show options"""
+
+    def name(self) -> Text:
+        return "action_handle_wishlist_item_selection"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[EventType]:
+
+        user_id = tracker.get_slot("user_id")
+        if not user_id:
+            dispatcher.utter_message(text="Please login first!")
+            return []
+
+        latest_message = tracker.latest_message.get("text", "")
+        metadata = tracker.latest_message.get("metadata", {})
+        list_item_id = metadata.get("list_item_id", "")
+
+        # Get product info from wishlist (slot, else the cached wishlist)
+        current_wishlist = tracker.get_slot("current_wishlist") or get_cached_wishlist(user_id)
+        if not current_wishlist:
+            return [FollowupAction("action_view_wishlist")]
+
+        try:
+            wishlist = json.loads(current_wishlist) if isinstance(current_wishlist, str) else current_wishlist
+        except:
+            return [FollowupAction("action_view_wishlist")]
+
+        selected_item = None
+        product_id = None
+        wishlist_id = None
+
+        # Parse from list item ID: "wishlist_item_{product_id}_{wishlist_id}"
+        if list_item_id and "wishlist_item_" in list_item_id:
+            parts = list_item_id.replace("wishlist_item_", "").split("_")
+            if len(parts) >= 1:
+                product_id = parts[0]
+                if len(parts) >= 2:
+                    wishlist_id = parts[1]
+
+            for item in wishlist:
+                if str(item.get("product_id")) == product_id:
+                    selected_item = item
+                    break
+
+        # Fallback: match by text (title)
+        if not selected_item:
+            clean_text = latest_message.split('\n')[0].strip().lower()
+            for item in wishlist:
+                title = (item.get("title") or "").lower()
+                if clean_text in title or title in clean_text:
+                    selected_item = item
+                    break
+
+        if not selected_item:
+            dispatcher.utter_message(text="Couldn't find that item. Please try again.")
+            return [FollowupAction("action_view_wishlist")]
+
+        # Show options for selected item
+        product_name = selected_item.get("title", "Product")
+        product_id = selected_item.get("product_id")
+        wishlist_id = selected_item.get("wishlist_id") or selected_item.get("wishlist_detail_id")
+        price = selected_item.get("discounted_price") or selected_item.get("product_price", 0)
+
+        dispatcher.utter_message(
+            json_message={
+                "type": "buttons",
+                "text": f"❤️ *{product_name}*\n💰 ₹{price}\n\nWhat would you like to do?",
+                "buttons": [
+                    {"id": f"add_wishlist_to_cart_{product_id}", "title": "🛒 Add to Cart"},
+                    {"id": f"remove_wishlist_{product_id}_{wishlist_id}", "title": "🗑️ Remove"}
+                ]
+            }
+        )
+
+        return [
+            SlotSet("selected_product_id", str(product_id)),
+            SlotSet("selected_product_name", product_name)
+        ]
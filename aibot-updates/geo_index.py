@@ -0,0 +1,154 @@
+# actions/geo_index.py
+"""
+Store Geo Index
+"Stores within N km of this point", ranked by distance, for WhatsApp
+location shares.
+
+Store coordinates are packed into flat float arrays (radians) and scanned
+with a vectorized haversine when NumPy is installed, or a pure-Python loop
+with a latitude-band reject otherwise (about 0.7 ms for 5,000 stores in
+pure Python, microseconds with NumPy).
+
+The shared index is built from the store directory (stores with latitude /
+longitude) and rebuilt whenever the directory changes. It is best-effort:
+the directory only holds stores from zips searched on this worker, its
+background refresh and STORE_DIRECTORY_SEED_ZIPS, so callers fall back
+to a ZIP search when nothing is in range.
+"""
+import logging
+import math
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from actions.store_directory import all_stores, directory_version
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+EARTH_RADIUS_KM = 6371.0088
+
+DEFAULT_RADIUS_KM = 15.0
+DEFAULT_LIMIT = 5
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        f = float(value)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) else None
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in km between two points given in degrees"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """Packed store coordinates with radius / nearest queries"""
+
+    def __init__(self, items: List[Dict[str, Any]]):
+        self.items: List[Dict[str, Any]] = []
+        lats, lons = array("d"), array("d")
+        for item in items:
+            lat, lon = _to_float(item.get("latitude")), _to_float(item.get("longitude"))
+            if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                continue
+            self.items.append(item)
+            lats.append(math.radians(lat))
+            lons.append(math.radians(lon))
+        self._lats, self._lons = lats, lons
+        if NUMPY_AVAILABLE:
+            self._np_lats = np.frombuffer(lats, dtype=np.float64) if lats else np.zeros(0)
+            self._np_lons = np.frombuffer(lons, dtype=np.float64) if lons else np.zeros(0)
+            self._np_cos_lats = np.cos(self._np_lats)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _distances_numpy(self, lat: float, lon: float):
+        dp = self._np_lats - lat
+        dl = self._np_lons - lon
+        a = np.sin(dp / 2) ** 2 + math.cos(lat) * self._np_cos_lats * np.sin(dl / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+    def within(self, latitude: float, longitude: float, radius_km: float = DEFAULT_RADIUS_KM,
+               limit: Optional[int] = DEFAULT_LIMIT) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Items within radius_km of a point, nearest first.
+
+        Returns:
+            [(item, distance_km), ...]
+        """
+        if not self.items:
+            return []
+        lat, lon = math.radians(latitude), math.radians(longitude)
+
+        if NUMPY_AVAILABLE:
+            dist = self._distances_numpy(lat, lon)
+            idx = np.nonzero(dist <= radius_km)[0]
+            if limit is not None and len(idx) > limit:
+                idx = idx[np.argpartition(dist[idx], limit - 1)[:limit]]
+            hits = [(int(i), float(dist[i])) for i in idx]
+        else:
+            # Latitude band reject before the trig (1 rad of latitude ~ R km)
+            max_dlat = radius_km / EARTH_RADIUS_KM
+            cos_lat = math.cos(lat)
+            hits = []
+            for i, (p2, l2) in enumerate(zip(self._lats, self._lons)):
+                if abs(p2 - lat) > max_dlat:
+                    continue
+                a = math.sin((p2 - lat) / 2) ** 2 + cos_lat * math.cos(p2) * math.sin((l2 - lon) / 2) ** 2
+                d = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+                if d <= radius_km:
+                    hits.append((i, d))
+
+        hits.sort(key=lambda h: h[1])
+        if limit is not None:
+            hits = hits[:limit]
+        return [(self.items[i], d) for i, d in hits]
+
+
+# ============================================
+# SHARED STORE INDEX
+# ============================================
+
+_store_index: Optional[GeoIndex] = None
+_store_index_version = -1
+_lock = threading.Lock()
+
+
+def get_store_geo_index() -> GeoIndex:
+    """Geo index over directory stores, rebuilt when the directory changed"""
+    global _store_index, _store_index_version
+    version = directory_version()
+    with _lock:
+        if _store_index is None or _store_index_version != version:
+            _store_index = GeoIndex(all_stores())
+            _store_index_version = version
+            logger.info(f"[GEO INDEX] Built index of {len(_store_index)} stores (numpy={NUMPY_AVAILABLE})")
+        return _store_index
+
+
+def nearest_stores(latitude: Any, longitude: Any, radius_km: float = DEFAULT_RADIUS_KM,
+                   limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+    """
+    Directory stores near a point, nearest first, each with "distance_km".
+    Empty if the point is invalid or no store with coordinates is in range.
+    """
+    lat, lon = _to_float(latitude), _to_float(longitude)
+    if lat is None or lon is None:
+        return []
+    return [
+        dict(store, distance_km=round(distance, 2))
+        for store, distance in get_store_geo_index().within(lat, lon, radius_km, limit)
+    ]
@@ -0,0 +1,282 @@
+# actions/intent_classifier.py
+"""
+Local Fallback Intent Pre-Classifier
+Character n-gram TF-IDF + multinomial logistic regression, pure Python.
+
+Sits in front of ActionSmartFallbackEnhanced.analyze_intent_with_ai():
+1. predict() maps the fallback text to an action name with a probability
+2. Confident predictions are executed directly (no OpenAI round-trip)
+3. Uncertain ones are escalated to the LLM, whose answer is logged
+   (log_fallback_example) so the model can be retrained offline with
+   scripts/train_intent_classifier.py
+"""
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Model file produced by scripts/train_intent_classifier.py
+MODEL_PATH = os.getenv(
+    "FALLBACK_CLASSIFIER_MODEL",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "fallback_intent_model.json"),
+)
+
+# Minimum probability to answer locally instead of calling the LLM
+CONFIDENCE_THRESHOLD = float(os.getenv("FALLBACK_CLASSIFIER_THRESHOLD", "0.85"))
+
+# JSONL file where LLM-labelled fallback texts are appended (disabled if empty)
+TRAINING_LOG_PATH = os.getenv("FALLBACK_TRAINING_LOG", "")
+
+NGRAM_RANGE = (2, 4)
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+# ============================================
+# FEATURES
+# ============================================
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = (text or "").lower()
+    text = re.sub(r"[^a-z0-9\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def char_ngrams(text: str, ngram_range: Tuple[int, int] = NGRAM_RANGE) -> Counter:
+    """Character n-grams inside word boundaries (like sklearn's char_wb)"""
+    counts = Counter()
+    n_min, n_max = ngram_range
+    for word in normalize_text(text).split():
+        padded = f" {word} "
+        for n in range(n_min, n_max + 1):
+            for i in range(len(padded) - n + 1):
+                counts[padded[i:i + n]] += 1
+    return counts
+
+
+# ============================================
+# MODEL
+# ============================================
+
+class IntentClassifier:
+    """
+    Sparse TF-IDF + softmax regression.
+
+    Weights are stored per feature (feature -> [weight per class]) so a
+    prediction only touches the n-grams present in the message.
+    """
+
+    def __init__(self, labels: List[str], idf: Dict[str, float],
+                 weights: Dict[str, List[float]], bias: List[float],
+                 ngram_range: Tuple[int, int] = NGRAM_RANGE):
+        self.labels = labels
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.ngram_range = tuple(ngram_range)
+
+    # ---------- inference ----------
+
+    def vectorize(self, text: str) -> Dict[str, float]:
+        """Sublinear TF-IDF vector, L2-normalised, restricted to the vocabulary"""
+        vec = {}
+        for gram, count in char_ngrams(text, self.ngram_range).items():
+            idf = self.idf.get(gram)
+            if idf is not None:
+                vec[gram] = (1.0 + math.log(count)) * idf
+        norm = math.sqrt(sum(v * v for v in vec.values()))
+        if norm:
+            for gram in vec:
+                vec[gram] /= norm
+        return vec
+
+    def _scores(self, vec: Dict[str, float]) -> List[float]:
+        scores = list(self.bias)
+        for gram, value in vec.items():
+            row = self.weights.get(gram)
+            if row:
+                for k, w in enumerate(row):
+                    scores[k] += w * value
+        return scores
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """Probability per label"""
+        return dict(zip(self.labels, _softmax(self._scores(self.vectorize(text)))))
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """Return (label, probability) of the best class"""
+        vec = self.vectorize(text)
+        if not vec:
+            return None, 0.0
+        probs = _softmax(self._scores(vec))
+        best = max(range(len(probs)), key=probs.__getitem__)
+        return self.labels[best], probs[best]
+
+    # ---------- training ----------
+
+    @classmethod
+    def train(cls, texts: List[str], labels: List[str], epochs: int = 30,
+              learning_rate: float = 0.5, l2: float = 1e-4, min_df: int = 1,
+              ngram_range: Tuple[int, int] = NGRAM_RANGE, seed: int = 42) -> "IntentClassifier":
+        """Fit IDF weights and a softmax regression with plain SGD"""
+        label_set = sorted(set(labels))
+        label_index = {label: i for i, label in enumerate(label_set)}
+        n_docs = len(texts)
+
+        doc_grams = [char_ngrams(t, ngram_range) for t in texts]
+        df = Counter()
+        for grams in doc_grams:
+            df.update(grams.keys())
+        idf = {
+            gram: math.log((1 + n_docs) / (1 + count)) + 1.0
+            for gram, count in df.items() if count >= min_df
+        }
+
+        model = cls(label_set, idf, {}, [0.0] * len(label_set), ngram_range)
+        vectors = [model.vectorize(t) for t in texts]
+        targets = [label_index[label] for label in labels]
+
+        n_classes = len(label_set)
+        weights = defaultdict(lambda: [0.0] * n_classes)
+        bias = model.bias
+        order = list(range(n_docs))
+        rng = random.Random(seed)
+
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            lr = learning_rate / (1.0 + 0.1 * epoch)
+            for i in order:
+                vec = vectors[i]
+                scores = list(bias)
+                for gram, value in vec.items():
+                    row = weights[gram]
+                    for k in range(n_classes):
+                        scores[k] += row[k] * value
+                probs = _softmax(scores)
+                probs[targets[i]] -= 1.0  # gradient of cross-entropy
+                for k in range(n_classes):
+                    bias[k] -= lr * probs[k]
+                for gram, value in vec.items():
+                    row = weights[gram]
+                    for k in range(n_classes):
+                        row[k] -= lr * (probs[k] * value + l2 * row[k])
+
+        model.weights = dict(weights)
+        return model
+
+    # ---------- persistence ----------
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "labels": self.labels,
+            "ngram_range": list(self.ngram_range),
+            "bias": [round(b, 6) for b in self.bias],
+            "idf": {g: round(v, 6) for g, v in self.idf.items()},
+            "weights": {g: [round(w, 6) for w in row] for g, row in self.weights.items()},
+        }
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["labels"], data["idf"], data["weights"], data["bias"],
+                   tuple(data.get("ngram_range", NGRAM_RANGE)))
+
+
+def _softmax(scores: List[float]) -> List[float]:
+    top = max(scores)
+    exps = [math.exp(s - top) for s in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+# ============================================
+# RUNTIME HELPERS (used by the fallback action)
+# ============================================
+
+def get_fallback_classifier() -> Optional[IntentClassifier]:
+    """Load the trained model once; None if no model has been trained yet"""
+    global _model, _model_loaded
+    if _model_loaded:
+        return _model
+    with _model_lock:
+        if not _model_loaded:
+            if os.path.exists(MODEL_PATH):
+                try:
+                    _model = IntentClassifier.load(MODEL_PATH)
+                    logger.info(f"[INTENT CLASSIFIER] Loaded model with labels {_model.labels}")
+                except Exception as e:
+                    logger.error(f"[INTENT CLASSIFIER] Failed to load {MODEL_PATH}: {e}")
+                    _model = None
+            else:
+                logger.info(f"[INTENT CLASSIFIER] No model at {MODEL_PATH}, LLM only")
+            _model_loaded = True
+    return _model
+
+
+def classify_fallback(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Classify a fallback message locally.
+
+    Returns:
+        {"action", "confidence", "latency_ms"} when the model is confident,
+        None when the message should be escalated to the LLM
+    """
+    model = get_fallback_classifier()
+    if model is None:
+        return None
+    start = time.perf_counter()
+    action, confidence = model.predict(text)
+    latency_ms = (time.perf_counter() - start) * 1000
+    logger.debug(f"[INTENT CLASSIFIER] '{text}' -> {action} ({confidence:.2f}) in {latency_ms:.3f}ms")
+    if action is None or confidence < CONFIDENCE_THRESHOLD:
+        return None
+    return {"action": action, "confidence": confidence, "latency_ms": latency_ms}
+
+
+def log_fallback_example(text: str, action: Optional[str], confidence: float = None):
+    """Append an LLM-labelled fallback text to the training log"""
+    if not TRAINING_LOG_PATH or not text or not action:
+        return
+    record = {"text": text, "action": action, "confidence": confidence, "ts": int(time.time())}
+    try:
+        with _log_lock, open(TRAINING_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except Exception as e:
+        logger.warning(f"[INTENT CLASSIFIER] Could not write training log: {e}")
+
+
+def load_examples(paths: Iterable[str], min_confidence: float = 0.0) -> Tuple[List[str], List[str]]:
+    """Read (text, action) pairs from one or more JSONL training logs"""
+    texts, labels = [], []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                confidence = record.get("confidence")
+                if confidence is not None and confidence < min_confidence:
+                    continue
+                if record.get("text") and record.get("action"):
+                    texts.append(record["text"])
+                    labels.append(record["action"])
+    return texts, labels
@@ -0,0 +1,222 @@
+# actions/order_cache.py
+"""
+Recent Orders Cache
+Per-customer cache of order-lists, shared by ActionTrackOrder,
+ActionTrackMyOrders and ActionCheckStripePayment.
+
+- Repeated "My Orders" / "Check payment" taps within ORDER_CACHE_TIMEOUT
+  are served from memory
+- After a payment / order event (note_new_order / refresh_recent_orders)
+  only the newest order(s) are requested and prepended instead of
+  reloading the whole list
+- find_order_by_payment() picks the order a Stripe payment created by its
+  payment reference, not whichever order happens to be newest
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+API_BASE = os.getenv("SELLER_API_URL", "https://stageshipperapi.thedelivio.com/api")
+
+# Cache timeout (seconds) - order statuses change, keep it short
+ORDER_CACHE_TIMEOUT = int(os.getenv("ORDER_CACHE_TTL", "60"))
+MAX_CACHED_ORDERS = 10
+DEFAULT_PAGE_SIZE = 5
+
+# Order fields that may hold the Stripe Checkout session / PaymentIntent id
+ORDER_PAYMENT_FIELDS = [f.strip() for f in os.getenv(
+    "ORDER_PAYMENT_FIELDS", "stripe_session_id,session_id,payment_intent_id,transaction_id,payment_id").split(",")
+    if f.strip()]
+
+_orders_cache: Dict[str, List[Dict[str, Any]]] = {}
+_orders_timestamps: Dict[str, float] = {}
+# Customers with a new order since their list was cached
+_pending_new_orders: Set[str] = set()
+_lock = threading.Lock()
+
+
+def _fetch_orders(customer_id: str, items: int, order_id: str = "") -> Optional[List[Dict[str, Any]]]:
+    """One order-lists call; None on HTTP/API error"""
+    payload = {
+        "customer_id": str(customer_id),
+        "order_id": "",
+        "search_string": "",
+        "status_type": "",
+        "page": "1",
+        "items": str(items),
+        "id": str(order_id) if order_id else ""
+    }
+    try:
+        response = requests.post(f"{API_BASE}/order-lists", json=payload, timeout=10)
+        if response.status_code != 200:
+            logger.warning(f"[ORDER CACHE] order-lists HTTP {response.status_code}")
+            return None
+        data = response.json()
+        if data.get("status") != 1:
+            logger.warning(f"[ORDER CACHE] order-lists status != 1: {data.get('message')}")
+            return None
+        orders = data.get("data") or []
+        logger.info(f"[ORDER CACHE] order-lists customer={customer_id} items={items} -> {len(orders)} orders")
+        return orders if isinstance(orders, list) else []
+    except Exception as e:
+        logger.warning(f"[ORDER CACHE] order-lists failed: {e}")
+        return None
+
+
+def _order_key(order: Dict[str, Any]) -> int:
+    try:
+        return int(order.get("id") or 0)
+    except (ValueError, TypeError):
+        return 0
+
+
+def _store(customer_id: str, orders: List[Dict[str, Any]]):
+    with _lock:
+        _orders_cache[customer_id] = orders[:MAX_CACHED_ORDERS]
+        _orders_timestamps[customer_id] = time.time()
+        _pending_new_orders.discard(customer_id)
+
+
+def get_recent_orders(customer_id: Any, limit: int = DEFAULT_PAGE_SIZE) -> Optional[List[Dict[str, Any]]]:
+    """
+    Most recent orders (newest first), from cache while fresh.
+
+    Returns:
+        list of orders (possibly empty), or None if the API call failed
+    """
+    key = str(customer_id)
+    with _lock:
+        ts = _orders_timestamps.get(key)
+        fresh = ts is not None and (time.time() - ts) < ORDER_CACHE_TIMEOUT and limit <= DEFAULT_PAGE_SIZE
+        pending = key in _pending_new_orders
+        if fresh and not pending:
+            logger.debug(f"[ORDER CACHE] Hit for customer {key}")
+            return _orders_cache[key][:limit]
+
+    if fresh and pending:
+        orders = refresh_recent_orders(key)
+        return orders[:limit] if orders is not None else None
+
+    orders = _fetch_orders(key, max(limit, DEFAULT_PAGE_SIZE))
+    if orders is None:
+        with _lock:
+            stale = _orders_cache.get(key)
+        if stale is not None:
+            logger.warning(f"[ORDER CACHE] Refresh failed for customer {key}, serving stale list")
+            return stale[:limit]
+        return None
+    _store(key, orders)
+    return orders[:limit]
+
+
+def refresh_recent_orders(customer_id: Any) -> Optional[List[Dict[str, Any]]]:
+    """
+    Incremental refresh after a payment / order event.
+
+    Fetches only the two newest orders; anything newer than the newest
+    cached order is prepended (a full reload happens only if both are new
+    or nothing is cached yet).
+    """
+    key = str(customer_id)
+    with _lock:
+        cached = list(_orders_cache.get(key, []))
+
+    if not cached:
+        orders = _fetch_orders(key, DEFAULT_PAGE_SIZE)
+        if orders is not None:
+            _store(key, orders)
+        return orders
+
+    newest_cached = _order_key(cached[0])
+    latest = _fetch_orders(key, 2)
+    if latest is None:
+        return None
+
+    new_orders = [o for o in latest if _order_key(o) > newest_cached]
+    if len(new_orders) == len(latest) and len(latest) > 1:
+        # Possibly more new orders than we asked for - reload the page
+        orders = _fetch_orders(key, DEFAULT_PAGE_SIZE)
+        if orders is None:
+            return None
+    else:
+        # Replace cached copies of the fetched orders (status may have changed)
+        fetched_ids = {_order_key(o) for o in latest}
+        orders = latest + [o for o in cached if _order_key(o) not in fetched_ids]
+        orders.sort(key=_order_key, reverse=True)
+    _store(key, orders)
+    logger.info(f"[ORDER CACHE] Incremental refresh for {key}: {len(new_orders)} new order(s)")
+    return orders
+
+
+def get_order(customer_id: Any, order_id: Any) -> Optional[List[Dict[str, Any]]]:
+    """A single order (as a list, like order-lists with id), cache first"""
+    key = str(customer_id)
+    with _lock:
+        ts = _orders_timestamps.get(key)
+        if ts is not None and (time.time() - ts) < ORDER_CACHE_TIMEOUT:
+            for order in _orders_cache.get(key, []):
+                if str(order.get("id")) == str(order_id):
+                    return [order]
+    return _fetch_orders(key, DEFAULT_PAGE_SIZE, order_id=str(order_id))
+
+
+def note_new_order(customer_id: Any):
+    """Payment / order event: the next read does an incremental refresh"""
+    with _lock:
+        if str(customer_id) in _orders_cache:
+            _pending_new_orders.add(str(customer_id))
+
+
+def cached_newest_order_id(customer_id: Any) -> str:
+    """Newest order id in the cache (even if stale), "" if nothing is cached - never calls the API"""
+    with _lock:
+        orders = _orders_cache.get(str(customer_id))
+    return str(orders[0].get("id") or "") if orders else ""
+
+
+def find_order_by_payment(customer_id: Any, payment_ids: List[Any], attempts: int = 3,
+                          delay: float = 1.0) -> Optional[Dict[str, Any]]:
+    """
+    The order created by a payment, matched on ORDER_PAYMENT_FIELDS.
+
+    The backend creates the order from Stripe's callback, which can land
+    after the customer's confirmation - the newest orders are re-read up to
+    attempts times, delay seconds apart.
+
+    Returns:
+        the order, or None if it is not listed (yet)
+    """
+    wanted = {str(p) for p in payment_ids if p}
+    if not wanted:
+        return None
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(delay)
+        for order in refresh_recent_orders(customer_id) or []:
+            if any(str(order.get(field) or "") in wanted for field in ORDER_PAYMENT_FIELDS):
+                return order
+    logger.info(f"[ORDER CACHE] No order of {customer_id} matches payment {', '.join(sorted(wanted))} yet")
+    return None
+
+
+def invalidate_orders(customer_id: Any):
+    """Forget cached orders for a customer"""
+    with _lock:
+        _orders_cache.pop(str(customer_id), None)
+        _orders_timestamps.pop(str(customer_id), None)
+        _pending_new_orders.discard(str(customer_id))
+
+
+def clear_order_cache():
+    """Clear all cached orders"""
+    with _lock:
+        _orders_cache.clear()
+        _orders_timestamps.clear()
+        _pending_new_orders.clear()
+    logger.info("[ORDER CACHE] Cache cleared")
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+"""
+Per-action benchmark against the stub backend
+
+Starts scripts/stub_backend.py in-process, points the actions at it
+(SELLER_API_URL, OPENAI_BASE_URL, stripe.api_base), then runs every Action
+in the package against a synthetic WhatsApp tracker and reports latency
+and backend calls per action.
+
+Save a run with --json and compare later runs with --compare: the script
+exits 1 if an action makes more backend calls than the baseline or its
+p50 got slower than --tolerance x baseline (plus --slack-ms).
+
+Needs the action server's dependencies (rasa_sdk, requests, stripe, openai).
+
+Usage:
+    python scripts/bench_actions.py --iterations 20 --json bench/baseline.json
+    python scripts/bench_actions.py --compare bench/baseline.json
+    python scripts/bench_actions.py --only action_view_cart,action_apply_coupon --cold --latency-ms 80
+"""
+import argparse
+import asyncio
+import importlib.util
+import inspect
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ACTIONS_DIR = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, SCRIPTS_DIR)
+
+from stub_backend import add_stub_arguments, stub_from_args  # noqa: E402
+
+SENDER_ID = "15550000001"
+
+# Slots every synthetic tracker starts with (a logged-in customer in a dedicated store bot)
+BASE_SLOTS: Dict[str, Any] = {
+    "user_id": "101",
+    "store_id": "7",
+    "shipper_id": "7",
+    "store_name": "Stub Store 7",
+    "is_dedicated_bot": True,
+    "zipcode": "10001",
+    "delivery_address_id": "301",
+    "has_been_greeted": True,
+    "selected_product_id": "1001",
+    "selected_product_name": "Stub Product 1",
+    "stripe_session_id": "cs_test_stub000001",
+}
+
+BASE_METADATA: Dict[str, Any] = {
+    "store_id": "7",
+    "store_name": "Stub Store 7",
+    "is_dedicated_bot": True,
+    "bot_phone_number": "15550000000",
+    "phone_number_id": "1000001",
+}
+
+# Per-action message / slot overrides so each action takes its main path
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "action_search_products": {"text": "pizza", "intent": "search_product",
+                               "entities": [{"entity": "product", "value": "pizza"}]},
+    "action_product_llm_search": {"text": "something spicy", "intent": "search_product"},
+    "action_add_to_cart": {"text": "add_to_cart_1001", "intent": "add_to_cart"},
+    "action_select_product": {"text": "1001", "intent": "select_product"},
+    "action_track_order": {"text": "track order 8000", "intent": "track_order",
+                           "entities": [{"entity": "order_id", "value": "8000"}]},
+    "action_get_nearest_store": {"text": "stores near 10001", "intent": "find_store",
+                                 "entities": [{"entity": "zipcode", "value": "10001"}],
+                                 "slots": {"is_dedicated_bot": False, "store_id": None}},
+    "action_show_store_options": {"slots": {"is_dedicated_bot": False}},
+    "action_handle_whatsapp_native_order": {
+        "text": "/whatsapp_order", "intent": "whatsapp_order",
+        "metadata": {"interaction_type": "order", "order_type": "native_whatsapp_cart",
+                     "order_items": [{"product_retailer_id": "1001", "quantity": 2, "item_price": 4.5},
+                                     {"product_retailer_id": "1002", "quantity": 1, "item_price": 6.0}],
+                     "order_total_items": 3, "order_total_amount": 15.0},
+    },
+    "action_handle_delivery_location": {
+        "text": "/provide_delivery_location", "intent": "provide_delivery_location",
+        "metadata": {"interaction_type": "location", "location_type": "shared",
+                     "latitude": 40.7128, "longitude": -74.006, "location_address": "1 Stub Street"},
+    },
+    "action_process_typed_address": {"text": "12 Main Street, Stubville, NY 10001", "intent": "provide_address"},
+    "action_apply_coupon": {"text": "apply code SAVE5", "intent": "apply_coupon",
+                            "entities": [{"entity": "coupon_code", "value": "SAVE5"}]},
+    "action_remove_coupon": {"slots": {"applied_coupon_code": "SAVE5", "applied_coupon_id": "50"}},
+    "action_payment_confirmed": {
+        "text": "/payment_confirmed", "intent": "payment_confirmed",
+        "metadata": {"interaction_type": "stripe_webhook", "stripe_session_id": "cs_test_stub000001",
+                     "payment_amount": 24.5, "user_id": "101"},
+    },
+    "action_login_user": {"text": "15550000001", "slots": {"login_step": "phone"}},
+    "action_smart_fallback": {"text": "can you do something about my thing", "intent": "nlu_fallback"},
+    "action_smart_fallback_enhanced": {"text": "can you do something about my thing", "intent": "nlu_fallback"},
+    "action_general_ai_response": {"text": "what are your opening hours?", "intent": "general_question"},
+    "action_intelligent_response": {"text": "what are your opening hours?", "intent": "general_question"},
+}
+
+DEFAULT_MESSAGE = {"text": "hi", "intent": "greet"}
+
+
+# ============================================
+# SETUP
+# ============================================
+
+def configure_env(backend_url: str):
+    """Point every client at the stub before the actions are imported"""
+    os.environ["SELLER_API_URL"] = f"{backend_url}/api"
+    os.environ["OPENAI_BASE_URL"] = f"{backend_url}/v1"
+    os.environ["OPENAI_API_KEY"] = "sk-stub"
+    os.environ["STRIPE_SECRET_KEY"] = "sk_test_stub"
+    os.environ["ACTION_METRICS_PORT"] = "0"
+    os.environ["STORE_DIRECTORY_REFRESH"] = "0"
+    os.environ.setdefault("ACTION_LOG_LEVEL", "WARNING")
+    os.environ.pop("TRACE_EXPORT_FILE", None)
+    os.environ.pop("TRACE_OTLP_ENDPOINT", None)
+
+
+def import_actions():
+    """Import this directory as the "actions" package (it is deployed under that name)"""
+    if "actions" in sys.modules:
+        return sys.modules["actions"]
+    if os.path.basename(ACTIONS_DIR) == "actions":
+        sys.path.insert(0, os.path.dirname(ACTIONS_DIR))
+        import actions
+        return actions
+    spec = importlib.util.spec_from_file_location(
+        "actions", os.path.join(ACTIONS_DIR, "__init__.py"), submodule_search_locations=[ACTIONS_DIR])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["actions"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def discover_actions(base) -> Dict[str, Any]:
+    """action name -> instance for every Action subclass in the package"""
+    found, pending, seen = {}, list(base.__subclasses__()), set()
+    while pending:
+        cls = pending.pop()
+        if cls in seen:
+            continue
+        seen.add(cls)
+        pending.extend(cls.__subclasses__())
+        if not cls.__module__.startswith("actions") or inspect.isabstract(cls):
+            continue
+        try:
+            action = cls()
+            found[action.name()] = action
+        except Exception as e:
+            print(f"  skip {cls.__name__}: {e}")
+    return dict(sorted(found.items()))
+
+
+def clear_caches():
+    """Empty every in-process cache (--cold)"""
+    for module_name, func in [
+        ("actions.catalog_cache", "clear_catalog_cache"),
+        ("actions.selection_index", "clear_selection_indexes"),
+        ("actions.cart_cache", "clear_cart_cache"),
+        ("actions.user_cache", "clear_user_cache"),
+        ("actions.order_cache", "clear_order_cache"),
+        ("actions.checkout_sessions", "clear_checkout_sessions"),
+        ("actions.stripe_webhook", "clear_confirmations"),
+        ("actions.store_directory", "clear_store_directory"),
+        ("actions.coupon_cache", "clear_coupon_cache"),
+        ("actions.store_config", "clear_cache"),
+    ]:
+        module = sys.modules.get(module_name)
+        if module is not None and hasattr(module, func):
+            getattr(module, func)()
+
+
+def make_tracker(tracker_cls, name: str, sender_id: str = SENDER_ID, slots: Optional[Dict[str, Any]] = None):
+    scenario = SCENARIOS.get(name, {})
+    text = scenario.get("text", DEFAULT_MESSAGE["text"])
+    metadata = dict(BASE_METADATA, **scenario.get("metadata", {}))
+    latest_message = {
+        "text": text,
+        "intent": {"name": scenario.get("intent", DEFAULT_MESSAGE["intent"]), "confidence": 0.99},
+        "entities": scenario.get("entities", []),
+        "metadata": metadata,
+    }
+    slots = {**BASE_SLOTS, **(slots or {}), **scenario.get("slots", {})}
+    events = [{"event": "user", "text": text, "parse_data": latest_message,
+               "input_channel": "whatsapp_business", "metadata": metadata}]
+    return tracker_cls(
+        sender_id=sender_id,
+        slots=slots,
+        latest_message=latest_message,
+        events=events,
+        paused=False,
+        followup_action=None,
+        active_loop={},
+        latest_action_name="action_listen",
+    )
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def bench_action(action, tracker_cls, dispatcher_cls, backend, iterations: int, warmup: int, cold: bool) -> Dict[str, Any]:
+    latencies: List[float] = []
+    calls: Counter = Counter()
+    errors, last_error = 0, ""
+    name = action.name()
+
+    for i in range(warmup + iterations):
+        if cold:
+            clear_caches()
+        tracker = make_tracker(tracker_cls, name)
+        dispatcher = dispatcher_cls()
+        before = backend.snapshot()
+        start = time.perf_counter()
+        try:
+            result = action.run(dispatcher, tracker, {})
+            if inspect.isawaitable(result):
+                asyncio.run(result)
+        except Exception as e:
+            errors += 1
+            last_error = f"{type(e).__name__}: {e}"
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if i >= warmup:
+            latencies.append(elapsed_ms)
+            calls.update(backend.snapshot() - before)
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(statistics.median(latencies), 2) if latencies else 0.0,
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "max_ms": round(max(latencies), 2) if latencies else 0.0,
+        "backend_calls": round(sum(calls.values()) / max(1, iterations), 2),
+        "calls_by_endpoint": {k: round(v / max(1, iterations), 2) for k, v in sorted(calls.items())},
+        "errors": errors,
+        "last_error": last_error[:200],
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float, slack_ms: float) -> List[str]:
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b:
+            continue
+        if r["backend_calls"] > b["backend_calls"] + 0.01:
+            regressions.append(f"{name}: backend calls {b['backend_calls']} -> {r['backend_calls']}")
+        if r["p50_ms"] > b["p50_ms"] * tolerance + slack_ms:
+            regressions.append(f"{name}: p50 {b['p50_ms']:.1f} ms -> {r['p50_ms']:.1f} ms")
+        if r["errors"] > b.get("errors", 0):
+            regressions.append(f"{name}: errors {b.get('errors', 0)} -> {r['errors']} ({r['last_error']})")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Any]]):
+    print(f"\n{'action':<42} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'calls':>7} {'errors':>7}")
+    print("-" * 88)
+    for name, r in sorted(results.items(), key=lambda kv: kv[1]["p50_ms"], reverse=True):
+        print(f"{name:<42} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['max_ms']:>9.1f} "
+              f"{r['backend_calls']:>7.1f} {r['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every action against the stub backend")
+    parser.add_argument("--iterations", type=int, default=10, help="Measured runs per action")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured runs first (fill caches)")
+    parser.add_argument("--cold", action="store_true", help="Clear all caches before every run")
+    parser.add_argument("--only", help="Comma-separated action names")
+    parser.add_argument("--json", dest="json_out", help="Write results to this file")
+    parser.add_argument("--compare", help="Baseline results file; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Allowed p50 ratio vs baseline")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="Absolute p50 slack vs baseline")
+    parser.add_argument("--verbose", action="store_true", help="Show calls per endpoint and errors")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    backend = stub_from_args(args).start()
+    configure_env(backend.url)
+
+    import_actions()
+    import stripe
+    from rasa_sdk import Action, Tracker
+    from rasa_sdk.executor import CollectingDispatcher
+
+    stripe.api_base = backend.url
+    stripe.max_network_retries = 0
+
+    actions = discover_actions(Action)
+    registry = sys.modules.get("actions.action_registry")
+    if registry is not None:
+        registry.preload_domains()  # keep first-use domain imports out of the timings
+    if args.only:
+        wanted = {a.strip() for a in args.only.split(",")}
+        actions = {k: v for k, v in actions.items() if k in wanted}
+    print(f"Benchmarking {len(actions)} actions against {backend.url} "
+          f"({args.iterations} runs, {'cold' if args.cold else 'warm'} caches, {args.latency_ms:.0f} ms backend latency)")
+
+    results = {}
+    for name, action in actions.items():
+        results[name] = bench_action(action, Tracker, CollectingDispatcher, backend,
+                                     args.iterations, args.warmup, args.cold)
+        if args.verbose:
+            r = results[name]
+            print(f"  {name}: {r['calls_by_endpoint']}" + (f"  ERROR {r['last_error']}" if r["errors"] else ""))
+
+    print_table(results)
+    backend.stop()
+
+    if args.json_out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_out)), exist_ok=True)
+        with open(args.json_out, "w") as f:
+            json.dump({"settings": {k: v for k, v in vars(args).items() if k not in ("json_out", "compare")},
+                       "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json_out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare(results, baseline, args.tolerance, args.slack_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) vs {args.compare}:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"\nNo regressions vs {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""
+Action-server startup benchmark
+
+Registers the actions the way `rasa run actions` does (rasa_sdk
+ActionExecutor.register_package) in fresh Python processes and reports,
+per registration target:
+
+- time to import rasa_sdk and to register the actions
+- peak RSS after registration, and after every domain was loaded
+- which heavy SDKs (stripe, openai, twilio, sanic, rasa) registration pulled in
+- import time of each action domain on its first use
+
+Targets default to "actions" (package walk, also imports the connector
+modules) and "actions.action_registry" (registry only). --ref also
+measures the "actions" package of another git revision, e.g. the last
+commit before the domain split.
+
+--check loads every domain and verifies it against ACTION_DOMAINS.
+
+Needs the action server's dependencies (rasa_sdk, requests, ...).
+
+Usage:
+    python scripts/bench_startup.py --runs 5
+    python scripts/bench_startup.py --ref HEAD~1
+    python scripts/bench_startup.py --check
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ACTIONS_DIR = os.path.dirname(SCRIPTS_DIR)
+
+HEAVY_MODULES = ("stripe", "openai", "twilio", "sanic", "rasa", "numpy")
+
+
+# ============================================
+# CHILD (one fresh interpreter per measurement)
+# ============================================
+
+def _peak_rss_mb() -> float:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KB on Linux
+
+
+def child(root: str, target: str, load_domains: bool, check: bool) -> Dict[str, Any]:
+    sys.path.insert(0, root)
+    result: Dict[str, Any] = {"rss_start_mb": round(_peak_rss_mb(), 1)}
+
+    start = time.perf_counter()
+    from rasa_sdk.executor import ActionExecutor
+    result["sdk_import_s"] = time.perf_counter() - start
+    before = set(sys.modules)
+
+    start = time.perf_counter()
+    executor = ActionExecutor()
+    executor.register_package(target)
+    result["register_s"] = time.perf_counter() - start
+    result["registered"] = len(executor.actions)
+    result["rss_registered_mb"] = round(_peak_rss_mb(), 1)
+    loaded = set(sys.modules) - before
+    result["modules"] = len(loaded)
+    result["heavy"] = sorted(m for m in HEAVY_MODULES if m in loaded)
+
+    registry = sys.modules.get("actions.action_registry")
+    if registry is not None and load_domains:
+        result["domains"] = {domain: registry.load_domain(domain) for domain in registry.ACTION_DOMAINS}
+        result["rss_all_loaded_mb"] = round(_peak_rss_mb(), 1)
+        result["heavy_all_loaded"] = sorted(m for m in HEAVY_MODULES if m in sys.modules)
+    if registry is not None and check:
+        result["problems"] = registry.check_registry()
+    return result
+
+
+# ============================================
+# PARENT
+# ============================================
+
+def link_tree(tree: str, tmp: str) -> str:
+    """Directory in which `import actions` finds tree (it is deployed under that name)"""
+    root = tempfile.mkdtemp(dir=tmp)
+    os.symlink(tree, os.path.join(root, "actions"))
+    return root
+
+
+def export_ref(ref: str, tmp: str) -> str:
+    """Check out this directory as of git revision ref into tmp"""
+    toplevel, prefix = subprocess.run(["git", "rev-parse", "--show-toplevel", "--show-prefix"], cwd=ACTIONS_DIR,
+                                      capture_output=True, text=True, check=True).stdout.splitlines()
+    tree = os.path.join(tmp, "ref")
+    os.makedirs(tree)
+    archive = subprocess.run(["git", "archive", "--format=tar", f"{ref}:{prefix}"], cwd=toplevel,
+                             capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", tree], input=archive, check=True)
+    return tree
+
+
+def run_child(root: str, target: str, load_domains: bool, check: bool) -> Optional[Dict[str, Any]]:
+    env = dict(os.environ, ACTION_METRICS_PORT="0", STORE_DIRECTORY_REFRESH="0", ACTION_PRELOAD="")
+    env.setdefault("ACTION_LOG_LEVEL", "WARNING")
+    args = [sys.executable, os.path.abspath(__file__), "--child", root, target]
+    if load_domains:
+        args.append("--domains")
+    if check:
+        args.append("--check")
+    proc = subprocess.run(args, capture_output=True, text=True, env=env, cwd=tempfile.gettempdir())
+    if proc.returncode != 0:
+        print(f"  {target}: child failed\n{proc.stderr.strip()[-2000:]}")
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure(label: str, root: str, target: str, runs: int, load_domains: bool) -> Optional[Dict[str, Any]]:
+    samples = [r for r in (run_child(root, target, load_domains, False) for _ in range(runs)) if r]
+    if not samples:
+        return None
+    summary = dict(samples[-1])
+    summary["label"] = label
+    for key in ("sdk_import_s", "register_s", "rss_registered_mb", "rss_all_loaded_mb"):
+        if key in summary:
+            summary[key] = statistics.median(s[key] for s in samples)
+    if "domains" in summary:
+        summary["domains"] = {d: statistics.median(s["domains"][d] for s in samples) for d in summary["domains"]}
+    return summary
+
+
+def print_table(results: List[Dict[str, Any]]):
+    print(f"\n{'target':<44} {'sdk ms':>8} {'register ms':>12} {'actions':>8} {'modules':>8} "
+          f"{'RSS MB':>8} {'all MB':>8}  heavy SDKs loaded")
+    print("-" * 124)
+    for r in results:
+        all_mb = f"{r['rss_all_loaded_mb']:>8.1f}" if "rss_all_loaded_mb" in r else f"{'-':>8}"
+        print(f"{r['label']:<44} {r['sdk_import_s'] * 1000:>8.0f} {r['register_s'] * 1000:>12.0f} "
+              f"{r['registered']:>8} {r['modules']:>8} {r['rss_registered_mb']:>8.1f} {all_mb}  "
+              f"{', '.join(r['heavy']) or '-'}")
+
+    for r in results:
+        if r.get("domains"):
+            print(f"\nFirst use of each domain ({r['label']}):")
+            for domain, seconds in sorted(r["domains"].items(), key=lambda kv: kv[1], reverse=True):
+                print(f"  {domain:<12} {seconds * 1000:>8.1f} ms")
+            print(f"  {'total':<12} {sum(r['domains'].values()) * 1000:>8.1f} ms"
+                  f"  (heavy SDKs then: {', '.join(r['heavy_all_loaded']) or '-'})")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        root, target = sys.argv[2], sys.argv[3]
+        print(json.dumps(child(root, target, "--domains" in sys.argv, "--check" in sys.argv)))
+        return
+
+    parser = argparse.ArgumentParser(description="Measure action-server startup time and memory")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per target (median is reported)")
+    parser.add_argument("--targets", default="actions,actions.action_registry",
+                        help="Comma-separated packages / modules to register")
+    parser.add_argument("--ref", help="Also measure this git revision of the actions directory")
+    parser.add_argument("--no-domains", action="store_true", help="Skip timing the first use of each domain")
+    parser.add_argument("--check", action="store_true", help="Only verify domains against ACTION_DOMAINS")
+    parser.add_argument("--json", dest="json_out", help="Write results to this file")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-startup-")
+    try:
+        root = link_tree(ACTIONS_DIR, tmp)
+        if args.check:
+            result = run_child(root, "actions.action_registry", False, True)
+            problems = result["problems"] if result else ["registry could not be loaded"]
+            for problem in problems:
+                print(f"  {problem}")
+            print(f"{result['registered'] if result else 0} actions registered, {len(problems)} problem(s)")
+            sys.exit(1 if problems else 0)
+
+        targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+        runs = [(target, root, target) for target in targets]
+        if args.ref:
+            runs.append((f"actions @ {args.ref}", link_tree(export_ref(args.ref, tmp), tmp), "actions"))
+
+        results = []
+        for label, tree_root, target in runs:
+            print(f"Measuring {label} ({args.runs} runs)...")
+            summary = measure(label, tree_root, target, args.runs, not args.no_domains)
+            if summary:
+                results.append(summary)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print_table(results)
+
+    if args.json_out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_out)), exist_ok=True)
+        with open(args.json_out, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
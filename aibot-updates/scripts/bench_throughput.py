@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""
+Action-server throughput benchmark
+
+Starts scripts/stub_backend.py in-process (with latency), then lets many
+senders run turns concurrently on one event loop, the way rasa_sdk calls
+the registered actions:
+
+- inline: each action's synchronous run() is called on the event loop
+  (how a synchronous action runs in rasa_sdk - one turn at a time)
+- pool: the registry's async proxies (worker pool, one turn per sender)
+
+Each sender fires --turns turns at once (rapid taps), cycling through
+--actions; caches are cleared before each mode. Reported per mode:
+turns/s, p50 / p99 time from the burst to each turn's completion, and
+the largest number of turns of one sender that ran at the same time
+(must be 1 when senders are serialized).
+
+Needs the action server's dependencies (rasa_sdk, requests, stripe, openai).
+
+Usage:
+    python scripts/bench_throughput.py --senders 50 --turns 3 --latency-ms 80
+    python scripts/bench_throughput.py --modes pool --workers 32 --json bench/throughput.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from bench_actions import clear_caches, configure_env, import_actions, make_tracker, percentile  # noqa: E402
+from stub_backend import add_stub_arguments, stub_from_args  # noqa: E402
+
+DEFAULT_ACTIONS = ",".join([
+    "action_view_cart",
+    "action_show_store_products",
+    "action_search_products",
+    "action_view_wishlist",
+    "action_view_coupons",
+    "action_track_my_orders",
+])
+
+
+class OverlapTracker:
+    """Largest number of turns of one sender inside an action at the same time"""
+
+    def __init__(self):
+        self.active: Counter = Counter()
+        self.max_overlap = 0
+        self.lock = threading.Lock()
+
+    def wrap(self, action):
+        run = action.run
+
+        def tracked_run(dispatcher, tracker, domain):
+            with self.lock:
+                self.active[tracker.sender_id] += 1
+                self.max_overlap = max(self.max_overlap, self.active[tracker.sender_id])
+            try:
+                return run(dispatcher, tracker, domain)
+            finally:
+                with self.lock:
+                    self.active[tracker.sender_id] -= 1
+
+        action.run = tracked_run  # instance attribute: used by proxies and inline calls alike
+
+
+async def run_turn(mode: str, proxies: Dict[str, Any], registry, name: str, tracker, dispatcher):
+    if mode == "pool":
+        await proxies[name].run(dispatcher, tracker, {})
+    else:
+        result = registry.get_action(name).run(dispatcher, tracker, {})
+        if asyncio.iscoroutine(result):
+            await result
+
+
+async def run_load(mode: str, proxies, registry, tracker_cls, dispatcher_cls, actions: List[str],
+                   senders: int, turns: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Counter = Counter()
+    start = time.perf_counter()
+
+    async def turn(sender: int, i: int):
+        name = actions[(sender + i) % len(actions)]
+        tracker = make_tracker(tracker_cls, name, sender_id=f"1555{sender:07d}", slots={"user_id": str(101 + sender)})
+        try:
+            await run_turn(mode, proxies, registry, name, tracker, dispatcher_cls())
+            latencies.append(time.perf_counter() - start)  # every turn arrived at start
+        except Exception as e:
+            errors[f"{name}: {type(e).__name__}"] += 1
+
+    await asyncio.gather(*(turn(s, i) for s in range(senders) for i in range(turns)))
+    elapsed = time.perf_counter() - start
+    return {
+        "turns": len(latencies),
+        "seconds": round(elapsed, 3),
+        "turns_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else 0.0,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "errors": dict(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-turn throughput of the action server")
+    parser.add_argument("--modes", default="inline,pool", help="inline (sync run on the loop) and/or pool")
+    parser.add_argument("--senders", type=int, default=40, help="Concurrent senders")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per sender, fired at once")
+    parser.add_argument("--actions", default=DEFAULT_ACTIONS, help="Comma-separated actions to cycle through")
+    parser.add_argument("--workers", type=int, help="ACTION_WORKERS for the pool mode")
+    parser.add_argument("--json", dest="json_out", help="Write results to this file")
+    add_stub_arguments(parser)
+    parser.set_defaults(latency_ms=80)
+    args = parser.parse_args()
+
+    backend = stub_from_args(args).start()
+    configure_env(backend.url)
+    if args.workers:
+        os.environ["ACTION_WORKERS"] = str(args.workers)
+
+    import_actions()
+    import stripe
+    from rasa_sdk import Tracker
+    from rasa_sdk.executor import CollectingDispatcher
+
+    registry = sys.modules["actions.action_registry"]
+    stripe.api_base = backend.url
+    stripe.max_network_retries = 0
+
+    actions = [a.strip() for a in args.actions.split(",") if a.strip()]
+    unknown = [a for a in actions if a not in registry.DOMAIN_OF]
+    if unknown:
+        parser.error(f"unknown actions: {', '.join(unknown)}")
+    proxies = {name: registry.PROXIES[name]() for name in actions}
+    overlap = OverlapTracker()
+    for name in actions:
+        action = registry.get_action(name)  # imports the domains before timing
+        if not asyncio.iscoroutinefunction(action.run):
+            overlap.wrap(action)
+
+    print(f"{args.senders} senders x {args.turns} turns of {len(actions)} actions against {backend.url} "
+          f"({args.latency_ms:.0f} ms backend latency, {registry.ACTION_WORKERS} workers)")
+    results = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        if mode not in ("inline", "pool"):
+            parser.error(f"unknown mode {mode}")
+        asyncio.run(run_load(mode, proxies, registry, Tracker, CollectingDispatcher, actions, 2, 1))  # warm up
+        clear_caches()  # every mode starts cold
+        overlap.max_overlap = 0
+        results[mode] = asyncio.run(run_load(mode, proxies, registry, Tracker, CollectingDispatcher, actions,
+                                             args.senders, args.turns))
+        results[mode]["max_turns_per_sender"] = overlap.max_overlap
+    backend.stop()
+
+    print(f"\n{'mode':<8} {'turns':>7} {'seconds':>9} {'turns/s':>9} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'per sender':>11} {'errors':>7}")
+    print("-" * 76)
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['turns']:>7} {r['seconds']:>9.2f} {r['turns_per_s']:>9.1f} {r['p50_ms']:>9.1f} "
+              f"{r['p99_ms']:>9.1f} {r['max_turns_per_sender']:>11} {sum(r['errors'].values()):>7}")
+        for error, count in r["errors"].items():
+            print(f"         {count} x {error}")
+    if "inline" in results and "pool" in results and results["inline"]["turns_per_s"]:
+        print(f"\npool / inline throughput: {results['pool']['turns_per_s'] / results['inline']['turns_per_s']:.1f}x")
+
+    if args.json_out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_out)), exist_ok=True)
+        with open(args.json_out, "w") as f:
+            json.dump({"settings": {k: v for k, v in vars(args).items() if k != "json_out"},
+                       "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
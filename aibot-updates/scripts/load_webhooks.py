@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+"""
+Multi-tenant webhook load generator
+
+Sends Meta-shaped WhatsApp webhooks (text, button_reply, list_reply, native
+order and location messages) for many phone_number_ids and senders to the
+whatsapp_business_webhook blueprint at a fixed rate, and reports per tenant:
+throughput, webhook ack time (p50/p99) and end-to-end time to the first
+reply.
+
+The stub backend runs in-process and doubles as the WhatsApp Graph sink:
+start Rasa and the action server against it, then run this script.
+
+    SELLER_API_URL=http://localhost:8099/api WHATSAPP_GRAPH_URL=http://localhost:8099 rasa run
+    SELLER_API_URL=http://localhost:8099/api OPENAI_BASE_URL=http://localhost:8099/v1 \\
+        STRIPE_API_BASE=http://localhost:8099 rasa run actions
+    python scripts/load_webhooks.py --tenants 10 --senders 50 --rate 20 --duration 120
+
+Load is open-loop: messages go out on schedule whatever the server does,
+and ack/reply times are measured from the scheduled send time, so a
+saturated server shows up as growing latency rather than a lower send rate.
+Stdlib only.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_backend import (  # noqa: E402
+    DEFAULT_PORT,
+    add_stub_arguments,
+    stub_from_args,
+    tenant_display_number,
+    tenant_phone_number_id,
+    tenant_store_id,
+)
+
+DEFAULT_TARGET = "http://localhost:5005/webhooks/whatsapp_business/webhook"
+DEFAULT_MIX = "text=50,button_reply=20,list_reply=15,order=10,location=5"
+
+TEXTS = [
+    "hi", "show me products", "pizza", "do you have milk", "view cart", "my orders",
+    "track order 8000", "apply coupon SAVE5", "find stores near 10001", "checkout",
+]
+BUTTONS = [
+    ("browse_products", "Browse Products"), ("view_cart", "View Cart"), ("my_orders", "My Orders"),
+    ("checkout", "Checkout"), ("view_coupons", "View Coupons"), ("continue_shopping", "Continue Shopping"),
+    ("check_payment", "Check Payment"),
+]
+LIST_ITEMS = [
+    ("product_1001", "Stub Product 1"), ("product_1004", "Stub Product 4"), ("view_wishlist", "My Wishlist"),
+    ("apply_coupon_SAVE5", "Save 5"), ("my_orders", "My Orders"), ("select_address_301", "Home"),
+]
+
+
+# ============================================
+# PAYLOADS
+# ============================================
+
+class Tenant:
+    def __init__(self, n: int):
+        self.n = n
+        self.phone_number_id = tenant_phone_number_id(n)
+        self.display_number = tenant_display_number(n)
+        self.store_id = tenant_store_id(n)
+        self.waba_id = f"2000{n:04d}"
+
+
+def sender_number(tenant: Tenant, i: int) -> str:
+    return f"1777{tenant.n:03d}{i:05d}"
+
+
+def message_body(kind: str, rng: random.Random) -> Dict[str, Any]:
+    """The type-specific part of a Meta message object"""
+    if kind == "text":
+        return {"type": "text", "text": {"body": rng.choice(TEXTS)}}
+    if kind == "button_reply":
+        button_id, title = rng.choice(BUTTONS)
+        return {"type": "interactive", "interactive": {
+            "type": "button_reply", "button_reply": {"id": button_id, "title": title}}}
+    if kind == "list_reply":
+        item_id, title = rng.choice(LIST_ITEMS)
+        return {"type": "interactive", "interactive": {
+            "type": "list_reply", "list_reply": {"id": item_id, "title": title, "description": ""}}}
+    if kind == "order":
+        items = [
+            {"product_retailer_id": str(1000 + rng.randrange(20)), "quantity": rng.randint(1, 3),
+             "item_price": round(rng.uniform(2, 30), 2), "currency": "USD"}
+            for _ in range(rng.randint(1, 4))
+        ]
+        return {"type": "order", "order": {"catalog_id": "", "text": "", "product_items": items}}
+    if kind == "location":
+        return {"type": "location", "location": {
+            "latitude": round(40.7128 + rng.uniform(-0.05, 0.05), 6),
+            "longitude": round(-74.0060 + rng.uniform(-0.05, 0.05), 6),
+            "name": "", "address": f"{rng.randint(1, 999)} Stub Street, Stubville, NY"}}
+    raise ValueError(f"unknown message type: {kind}")
+
+
+def webhook_payload(tenant: Tenant, sender: str, kind: str, seq: int, rng: random.Random) -> Dict[str, Any]:
+    """Meta webhook envelope for one inbound message"""
+    message = {"from": sender, "id": f"wamid.load{seq:010d}", "timestamp": str(int(time.time()))}
+    message.update(message_body(kind, rng))
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": tenant.waba_id,
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": tenant.display_number, "phone_number_id": tenant.phone_number_id},
+                    "contacts": [{"profile": {"name": f"Load {sender[-4:]}"}, "wa_id": sender}],
+                    "messages": [message],
+                },
+            }],
+        }],
+    }
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """"text=50,order=10" -> {"text": 50.0, "order": 10.0}"""
+    mix = {}
+    for entry in value.split(","):
+        name, _, weight = entry.partition("=")
+        if name.strip():
+            mix[name.strip()] = float(weight or 1)
+    for name in mix:
+        message_body(name, random.Random(0))  # validates the type
+    return mix
+
+
+# ============================================
+# RUN
+# ============================================
+
+class Sent:
+    __slots__ = ("tenant", "sender", "kind", "scheduled", "acked", "status", "error")
+
+    def __init__(self, tenant: Tenant, sender: str, kind: str, scheduled: float):
+        self.tenant = tenant
+        self.sender = sender
+        self.kind = kind
+        self.scheduled = scheduled
+        self.acked: Optional[float] = None
+        self.status = 0
+        self.error = ""
+
+
+def post_webhook(target: str, payload: Dict[str, Any], record: Sent, timeout: float):
+    request = urllib.request.Request(
+        target, data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            record.status = resp.status
+            body = resp.read()
+        # The connector answers 200 {"status": "error"} when processing fails
+        if b'"error"' in body:
+            record.error = json.loads(body).get("message", "error")[:200]
+    except urllib.error.HTTPError as e:
+        record.status = e.code
+        record.error = f"HTTP {e.code}"
+    except Exception as e:
+        record.error = f"{type(e).__name__}: {e}"[:200]
+    record.acked = time.monotonic()
+
+
+def run_load(args, tenants: List[Tenant], mix: Dict[str, float]) -> List[Sent]:
+    rng = random.Random(args.seed)
+    kinds, weights = list(mix), list(mix.values())
+    total = int(args.rate * args.duration)
+    records: List[Sent] = []
+    # One message in flight per sender keeps conversations realistic; the
+    # sender pool is large enough that this rarely blocks at sane rates
+    busy = set()
+    busy_lock = threading.Lock()
+
+    def send(record: Sent, payload: Dict[str, Any]):
+        try:
+            post_webhook(args.target, payload, record, args.timeout)
+        finally:
+            with busy_lock:
+                busy.discard(record.sender)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        start = time.monotonic()
+        for seq in range(total):
+            scheduled = start + seq / args.rate
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            tenant = rng.choice(tenants)
+            with busy_lock:
+                for _ in range(10):
+                    sender = sender_number(tenant, rng.randrange(args.senders))
+                    if sender not in busy:
+                        break
+                busy.add(sender)
+            kind = rng.choices(kinds, weights)[0]
+            record = Sent(tenant, sender, kind, scheduled)
+            records.append(record)
+            pool.submit(send, record, webhook_payload(tenant, sender, kind, seq, rng))
+            if args.progress and seq and seq % int(args.rate * args.progress) == 0:
+                done = sum(1 for r in records if r.acked)
+                print(f"  {time.monotonic() - start:6.1f}s  sent {seq}  acked {done}")
+    return records
+
+
+def first_replies(records: List[Sent], sink_log) -> Dict[int, float]:
+    """index of record -> monotonic time of the first Graph send to that sender after it"""
+    replies = defaultdict(list)
+    for ts, phone_number_id, recipient, _type in sink_log:
+        replies[(phone_number_id, recipient)].append(ts)
+    for times in replies.values():
+        times.sort()
+
+    by_sender = defaultdict(list)
+    for i, r in enumerate(records):
+        by_sender[(r.tenant.phone_number_id, r.sender)].append(i)
+
+    result = {}
+    for key, indexes in by_sender.items():
+        times = replies.get(key, [])
+        indexes.sort(key=lambda i: records[i].scheduled)
+        for pos, i in enumerate(indexes):
+            until = records[indexes[pos + 1]].scheduled if pos + 1 < len(indexes) else float("inf")
+            reply = next((t for t in times if records[i].scheduled <= t < until), None)
+            if reply is not None:
+                result[i] = reply
+    return result
+
+
+# ============================================
+# REPORT
+# ============================================
+
+def pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(records: List[Sent], replies: Dict[int, float], elapsed: float) -> Dict[str, Dict[str, Any]]:
+    groups = defaultdict(list)
+    for i, r in enumerate(records):
+        groups[r.tenant.store_id].append(i)
+        groups["ALL"].append(i)
+
+    summary = {}
+    for key, indexes in groups.items():
+        acks = [(records[i].acked - records[i].scheduled) * 1000 for i in indexes if records[i].acked]
+        reply_ms = [(replies[i] - records[i].scheduled) * 1000 for i in indexes if i in replies]
+        errors = sum(1 for i in indexes if records[i].error)
+        summary[key] = {
+            "sent": len(indexes),
+            "errors": errors,
+            "throughput": round(sum(1 for i in indexes if records[i].acked and not records[i].error) / elapsed, 2),
+            "ack_p50_ms": round(statistics.median(acks), 1) if acks else 0.0,
+            "ack_p99_ms": round(pct(acks, 0.99), 1),
+            "reply_p50_ms": round(statistics.median(reply_ms), 1) if reply_ms else 0.0,
+            "reply_p99_ms": round(pct(reply_ms, 0.99), 1),
+            "no_reply": len(indexes) - len(reply_ms),
+        }
+    return summary
+
+
+def print_report(summary: Dict[str, Dict[str, Any]], records: List[Sent]):
+    print(f"\n{'store':<8} {'sent':>7} {'errors':>7} {'msg/s':>8} {'ack p50':>9} {'ack p99':>9} "
+          f"{'reply p50':>10} {'reply p99':>10} {'no reply':>9}")
+    print("-" * 86)
+    keys = sorted((k for k in summary if k != "ALL"), key=int) + ["ALL"]
+    for key in keys:
+        s = summary[key]
+        print(f"{key:<8} {s['sent']:>7} {s['errors']:>7} {s['throughput']:>8.2f} {s['ack_p50_ms']:>9.1f} "
+              f"{s['ack_p99_ms']:>9.1f} {s['reply_p50_ms']:>10.1f} {s['reply_p99_ms']:>10.1f} {s['no_reply']:>9}")
+
+    errors = defaultdict(int)
+    for r in records:
+        if r.error:
+            errors[r.error] += 1
+    if errors:
+        print("\nErrors:")
+        for error, count in sorted(errors.items(), key=lambda kv: -kv[1])[:10]:
+            print(f"  {count:>6}  {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive synthetic multi-tenant WhatsApp webhooks at a target rate")
+    parser.add_argument("--target", default=DEFAULT_TARGET, help="Webhook URL of the Rasa server")
+    parser.add_argument("--tenants", type=int, default=5, help="Number of sellers (phone_number_ids)")
+    parser.add_argument("--senders", type=int, default=50, help="Customers per tenant")
+    parser.add_argument("--rate", type=float, default=5.0, help="Messages per second (all tenants)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Message type weights")
+    parser.add_argument("--concurrency", type=int, default=64, help="Max webhook requests in flight")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Webhook request timeout (s)")
+    parser.add_argument("--drain", type=float, default=10.0, help="Seconds to wait for late replies")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--progress", type=float, default=10.0, help="Progress line every N seconds (0 = off)")
+    parser.add_argument("--sample", action="store_true", help="Print one payload of each type and exit")
+    parser.add_argument("--json", dest="json_out", help="Write the summary to this file")
+    parser.add_argument("--stub-port", type=int, default=DEFAULT_PORT, help="Port of the in-process stub backend")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    tenants = [Tenant(n) for n in range(args.tenants)]
+
+    if args.sample:
+        rng = random.Random(args.seed)
+        for kind in mix:
+            print(json.dumps(webhook_payload(tenants[0], sender_number(tenants[0], 0), kind, 0, rng), indent=2))
+        return
+
+    backend = stub_from_args(args, port=args.stub_port).start()
+    print(f"Stub backend / Graph sink on {backend.url}")
+    print(f"Sending {args.rate:g} msg/s for {args.duration:g}s to {args.target} "
+          f"({args.tenants} tenants x {args.senders} senders, mix {args.mix})")
+
+    start = time.monotonic()
+    records = run_load(args, tenants, mix)
+    elapsed = time.monotonic() - start
+    time.sleep(args.drain)
+
+    replies = first_replies(records, backend.sink.snapshot())
+    summary = summarize(records, replies, elapsed)
+    print_report(summary, records)
+    backend_calls = dict(backend.snapshot())
+    backend.stop()
+
+    if args.json_out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_out)), exist_ok=True)
+        with open(args.json_out, "w") as f:
+            json.dump({"settings": vars(args), "elapsed_s": round(elapsed, 2), "summary": summary,
+                       "backend_calls": backend_calls}, f, indent=2)
+        print(f"\nSummary written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Send a signed Stripe event to the local connector's /stripe webhook
+
+Signs the fixture with STRIPE_WEBHOOK_SECRET the same way Stripe does, so
+the payment-confirmed flow can be exercised without the Stripe CLI.
+--dry-run only checks the signature and shows the mapped bot message.
+
+Usage:
+    STRIPE_WEBHOOK_SECRET=whsec_test python scripts/send_stripe_test_event.py \
+        --sender 15551234567 --url http://localhost:5005/webhooks/whatsapp_business/stripe
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stripe_webhook import (  # noqa: E402
+    STRIPE_WEBHOOK_SECRET,
+    checkout_completed_message,
+    sign_payload,
+    verify_stripe_signature,
+)
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "fixtures", "stripe_checkout_session_completed.json")
+DEFAULT_URL = "http://localhost:5005/webhooks/whatsapp_business/stripe"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a signed Stripe test event")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="Stripe event JSON")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Connector webhook URL")
+    parser.add_argument("--secret", default=STRIPE_WEBHOOK_SECRET, help="Webhook signing secret")
+    parser.add_argument("--sender", help="Override the WhatsApp sender in the session metadata")
+    parser.add_argument("--user-id", help="Override the user_id in the session metadata")
+    parser.add_argument("--dry-run", action="store_true", help="Verify and map locally, do not send")
+    args = parser.parse_args()
+
+    if not args.secret:
+        parser.error("set STRIPE_WEBHOOK_SECRET or pass --secret")
+
+    with open(args.fixture, encoding="utf-8") as f:
+        event = json.load(f)
+
+    session_meta = event["data"]["object"].setdefault("metadata", {})
+    if args.sender:
+        session_meta["sender_id"] = args.sender
+        session_meta["whatsapp_number"] = args.sender
+    if args.user_id:
+        session_meta["user_id"] = args.user_id
+
+    payload = json.dumps(event).encode("utf-8")
+    signature = sign_payload(payload, args.secret)
+
+    if args.dry_run:
+        print(f"Signature valid: {verify_stripe_signature(payload, signature, args.secret)}")
+        print(json.dumps(checkout_completed_message(event), indent=2))
+        return
+
+    import requests
+    response = requests.post(
+        args.url,
+        data=payload,
+        headers={"Content-Type": "application/json", "Stripe-Signature": signature},
+        timeout=30
+    )
+    print(f"{response.status_code} {response.text}")
+
+
+if __name__ == "__main__":
+    main()
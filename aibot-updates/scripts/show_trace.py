@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Print a conversation turn from the trace file as a tree
+
+Reads the JSON-lines file written by turn_tracing (TRACE_EXPORT_FILE) and
+shows one trace hop by hop: webhook, seller lookup, Rasa, each action and
+its HTTP calls, and the outbound WhatsApp sends, with durations and the
+offset of each span from the start of the turn.
+
+Usage:
+    python scripts/show_trace.py /var/log/rasa/traces.jsonl              # slowest trace
+    python scripts/show_trace.py /var/log/rasa/traces.jsonl --trace <id>
+    python scripts/show_trace.py /var/log/rasa/traces.jsonl --sender 15551234567 --last
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+
+def load_spans(path):
+    traces = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                span = json.loads(line)
+            except ValueError:
+                continue
+            traces[span["trace_id"]].append(span)
+    return traces
+
+
+def trace_bounds(spans):
+    start = min(s["start_unix_nano"] for s in spans)
+    end = max(s["end_unix_nano"] for s in spans)
+    return start, end
+
+
+def print_tree(spans):
+    start, end = trace_bounds(spans)
+    ids = {s["span_id"] for s in spans}
+    children = defaultdict(list)
+    for s in spans:
+        # Parents from the other process may be missing from the file - show as roots
+        children[s["parent_span_id"] if s["parent_span_id"] in ids else ""].append(s)
+
+    print(f"trace {spans[0]['trace_id']}  total {(end - start) / 1e6:.1f} ms  ({len(spans)} spans)")
+
+    def walk(parent_id, depth):
+        for s in sorted(children.get(parent_id, []), key=lambda x: x["start_unix_nano"]):
+            offset = (s["start_unix_nano"] - start) / 1e6
+            attrs = {k: v for k, v in s.get("attributes", {}).items() if k in ("sender_id", "store_id", "tenant", "http.status")}
+            extra = " ".join(f"{k}={v}" for k, v in attrs.items())
+            error = f"  ERROR: {s['error']}" if s.get("error") else ""
+            print(f"{'  ' * depth}{s['name']:<50} {s['duration_ms']:>9.1f} ms  @+{offset:.1f} ms  {extra}{error}")
+            walk(s["span_id"], depth + 1)
+
+    walk("", 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show a traced conversation turn")
+    parser.add_argument("trace_file", help="TRACE_EXPORT_FILE (JSON lines)")
+    parser.add_argument("--trace", help="Trace ID (default: slowest trace)")
+    parser.add_argument("--sender", help="Only traces for this WhatsApp sender")
+    parser.add_argument("--last", action="store_true", help="Most recent trace instead of the slowest")
+    args = parser.parse_args()
+
+    traces = load_spans(args.trace_file)
+    if args.sender:
+        traces = {
+            tid: spans for tid, spans in traces.items()
+            if any(str(s.get("attributes", {}).get("sender_id")) == args.sender for s in spans)
+        }
+    if not traces:
+        print("No traces found")
+        sys.exit(1)
+
+    if args.trace:
+        if args.trace not in traces:
+            print(f"Trace {args.trace} not found")
+            sys.exit(1)
+        trace_id = args.trace
+    elif args.last:
+        trace_id = max(traces, key=lambda t: trace_bounds(traces[t])[0])
+    else:
+        trace_id = max(traces, key=lambda t: trace_bounds(traces[t])[1] - trace_bounds(traces[t])[0])
+
+    print_tree(traces[trace_id])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+#!/usr/bin/env python
+"""
+Local stub of every backend the actions call
+
+One HTTP server that answers like:
+- the Laravel seller API (POST /api/<endpoint>: getMasterProducts, cart-list,
+  user-by-phone, getNearestStore, order-lists, getCouponList, ...)
+- Stripe Checkout (/v1/checkout/sessions) - point stripe.api_base at it
+- OpenAI chat completions (/v1/chat/completions) - OPENAI_BASE_URL=<url>/v1
+- the WhatsApp Graph API (POST /<version>/<phone_number_id>/messages) as a
+  sink that records every reply - WHATSAPP_GRAPH_URL=<url>
+
+Responses are synthetic, sized by --products / --cart-items / --stores /
+--orders, and delayed by --latency-ms (plus per-endpoint overrides), so
+action performance can be measured without stageshipperapi, Stripe or
+OpenAI. Request counts per endpoint are kept for the benchmark
+(GET /__stats, POST /__reset).
+
+Tenants: phone_number_id 1000001 + n (display number 1555000000n) maps
+to store 7 + n, so load tests can spread traffic over many sellers.
+
+Usage:
+    python scripts/stub_backend.py --port 8099 --latency-ms 40 --endpoint-latency getMasterProducts=250
+    SELLER_API_URL=http://localhost:8099/api OPENAI_BASE_URL=http://localhost:8099/v1 rasa run actions
+    SELLER_API_URL=http://localhost:8099/api WHATSAPP_GRAPH_URL=http://localhost:8099 rasa run
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_PORT = 8099
+
+# Tenant n: phone_number_id 1000001 + n, display number 15550000000 + n, store 7 + n
+BASE_PHONE_NUMBER_ID = 1000001
+BASE_DISPLAY_NUMBER = 15550000000
+BASE_STORE_ID = 7
+
+
+def tenant_phone_number_id(n: int) -> str:
+    return str(BASE_PHONE_NUMBER_ID + n)
+
+
+def tenant_display_number(n: int) -> str:
+    return str(BASE_DISPLAY_NUMBER + n)
+
+
+def tenant_store_id(n: int) -> str:
+    return str(BASE_STORE_ID + n)
+
+
+def tenant_from_body(body: Dict[str, Any]) -> int:
+    """Tenant number from a whatsapp-config-by-phone(-number-id) request"""
+    for key, base in (("phone_number_id", BASE_PHONE_NUMBER_ID), ("phone_number", BASE_DISPLAY_NUMBER)):
+        digits = "".join(c for c in str(body.get(key) or "") if c.isdigit())
+        if digits and 0 <= int(digits) - base < 100000:
+            return int(digits) - base
+    return 0
+
+
+# ============================================
+# SYNTHETIC DATA
+# ============================================
+
+def make_product(i: int, store_id: str) -> Dict[str, Any]:
+    price = round(2 + (i * 37 % 300) / 10, 2)
+    return {
+        "product_id": str(1000 + i),
+        "ai_product_id": str(1000 + i),
+        "title": f"Stub Product {i}",
+        "product_name": f"Stub Product {i}",
+        "description": "Synthetic product served by the stub backend. " * 3,
+        "product_price": price,
+        "discounted_price": round(price * 0.9, 2),
+        "discount": 10,
+        "shipper_id": store_id,
+        "store_name": f"Stub Store {store_id}",
+        "image": f"https://example.com/img/{1000 + i}.jpg",
+        "ai_category_id": str(i % 8),
+    }
+
+
+def make_store(i: int, zipcode: str) -> Dict[str, Any]:
+    return {
+        "wh_account_id": str(7 + i),
+        "store_name": f"Stub Store {7 + i}",
+        "address": f"{i + 1} Stub Street",
+        "city": "Stubville",
+        "state": "NY",
+        "zipcode": zipcode,
+        "latitude": round(40.7128 + (i % 10) * 0.01, 6),
+        "longitude": round(-74.0060 + (i // 10) * 0.01, 6),
+    }
+
+
+class StubData:
+    """Sizes of the synthetic responses"""
+
+    def __init__(self, products: int = 50, cart_items: int = 3, stores: int = 20, orders: int = 10,
+                 coupons: int = 5, addresses: int = 2, wishlist: int = 4, payment_status: str = "paid"):
+        self.products = products
+        self.cart_items = cart_items
+        self.stores = stores
+        self.orders = orders
+        self.coupons = coupons
+        self.addresses = addresses
+        self.wishlist = wishlist
+        self.payment_status = payment_status
+        self._session_seq = 0
+        self._lock = threading.Lock()
+
+    # ---------- Laravel ----------
+
+    def laravel(self, endpoint: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        store_id = str(body.get("shipper_id") or body.get("wh_account_id") or "7")
+        user_id = str(body.get("user_id") or "101")
+
+        if endpoint == "getMasterProducts":
+            items = int(body.get("items") or self.products)
+            products = [make_product(i, store_id) for i in range(min(items, self.products))]
+            search = str(body.get("search_string") or "").lower()
+            if search:
+                products = [p for p in products if search in p["title"].lower()] or products[:3]
+            return {"status": 1, "data": {"getMasterProducts": products}}
+
+        if endpoint == "getCategories":
+            cats = []
+            for c in range(8):
+                cats.append({
+                    "ai_category_id": str(c),
+                    "category_name": f"Stub Category {c}",
+                    "getMasterProductOfCategory": [make_product(i, store_id) for i in range(c, self.products, 8)],
+                })
+            return {"status": 1, "data": {"getCategories": cats}}
+
+        if endpoint == "cart-list":
+            lines = [
+                dict(make_product(i, store_id), cart_id="5001", id=str(9000 + i), quantity=1 + i % 3, price=make_product(i, store_id)["product_price"])
+                for i in range(self.cart_items)
+            ]
+            sub_total = round(sum(float(l["discounted_price"]) * l["quantity"] for l in lines), 2)
+            coupon_discount = 2.0 if body.get("coupon_id") else 0.0
+            tax = round(sub_total * 0.08, 2)
+            return {"status": 1, "data": {
+                "cartlist": lines,
+                "orderMetaData": {
+                    "sub_total_amount": sub_total, "tax": tax, "delivery_fee": 2.99, "platform_fee": 0.99,
+                    "coupon_discount": coupon_discount,
+                    "total": round(sub_total + tax + 2.99 + 0.99 - coupon_discount, 2),
+                },
+            }}
+
+        if endpoint in ("user-by-phone", "customer-phone-login", "guest-register"):
+            return {"status": 1, "message": "ok", "data": {
+                "user_id": user_id, "id": user_id, "name": "Stub Customer", "phone": body.get("phone", ""),
+                "default_address": {"address_id": "301", "address": "1 Stub Street", "city": "Stubville", "state": "NY", "zip": "10001"},
+            }}
+
+        if endpoint == "getNearestStore":
+            zipcode = str((body.get("address") or {}).get("zip") or "10001")
+            return {"status": 1, "data": {"getNearestStore": [make_store(i, zipcode) for i in range(self.stores)]}}
+
+        if endpoint == "order-lists":
+            limit = int(body.get("items") or body.get("limit") or self.orders)
+            orders = [
+                {"id": 8000 - i, "invoice_no": f"INV-{8000 - i}", "order_status": "Processing", "total_amount": "24.50",
+                 "shipper_name": "Stub Store 7", "order_date": "2026-10-01 12:00:00"}
+                for i in range(min(limit, self.orders))
+            ]
+            return {"status": 1, "data": orders}
+
+        if endpoint == "getAddress":
+            addresses = [
+                {"address_id": str(301 + i), "address_name": "Home" if i == 0 else f"Other {i}", "address": f"{i + 1} Stub Street",
+                 "city": "Stubville", "state": "NY", "zip_code": "10001", "country_name": "USA"}
+                for i in range(self.addresses)
+            ]
+            if body.get("address_id"):
+                addresses = [a for a in addresses if a["address_id"] == str(body["address_id"])]
+            return {"status": 1, "data": {"addressList": addresses}}
+
+        if endpoint == "addAddress":
+            return {"status": 1, "message": "Address added", "data": {"address_id": "399"}}
+
+        if endpoint == "WishlistList":
+            items = [dict(make_product(i, store_id), id=str(700 + i), wishlist_id=str(700 + i)) for i in range(self.wishlist)]
+            return {"status": 1, "data": {"wishlist": items}}
+
+        if endpoint == "getTotalWishlistItem":
+            return {"status": 1, "data": {"total_Wishlist": self.wishlist}}
+
+        if endpoint == "addProductToWishlist":
+            return {"status": 1, "message": "Added", "data": {"total_Wishlist": self.wishlist + 1}}
+
+        if endpoint == "getCouponList":
+            return {"status": 1, "data": [
+                {"coupon_id": str(50 + i), "code": f"SAVE{5 * (i + 1)}", "name": f"Save {5 * (i + 1)}",
+                 "type": "P" if i % 2 else "O", "discount": 5 * (i + 1), "min_amount": 10 * i, "date_end": "2099-12-31"}
+                for i in range(self.coupons)
+            ]}
+
+        if endpoint == "check-coupon":
+            return {"status": 1, "message": "Coupon applied", "data": {
+                "coupon_id": "50", "type": "O", "discount": 5, "total_discount": 5, "discounted_total": 20.0}}
+
+        if endpoint in ("whatsapp-config-by-phone", "whatsapp-config-by-phone-number-id"):
+            n = tenant_from_body(body)
+            return {"status": 1, "data": {
+                "wh_account_id": int(tenant_store_id(n)), "business_name": f"Stub Store {tenant_store_id(n)}",
+                "access_token": "stub-token", "phone_number_id": tenant_phone_number_id(n), "catalog_id": "",
+                "waba_id": "", "display_phone_number": tenant_display_number(n),
+                "is_connected": 1, "connection_status": "connected"}}
+
+        # add-product-to-cart, update-product-cart-quantity, remove..., destroy-cart, general-query, ...
+        return {"status": 1, "code": 200, "message": "ok", "data": {"status": True}}
+
+    # ---------- Stripe ----------
+
+    def stripe_session(self, session_id: Optional[str], form: Dict[str, Any]) -> Dict[str, Any]:
+        if session_id is None:
+            with self._lock:
+                self._session_seq += 1
+                session_id = f"cs_test_stub{self._session_seq:06d}"
+        amount = 0
+        try:
+            amount = int(form.get("line_items[0][price_data][unit_amount]", 0)) * int(form.get("line_items[0][quantity]", 1))
+        except (TypeError, ValueError):
+            pass
+        metadata = {k[len("metadata["):-1]: v for k, v in form.items() if k.startswith("metadata[")}
+        return {
+            "id": session_id,
+            "object": "checkout.session",
+            "url": f"https://checkout.stripe.com/c/pay/{session_id}",
+            "status": "complete" if self.payment_status == "paid" else "open",
+            "payment_status": self.payment_status,
+            "amount_total": amount or 2450,
+            "currency": "usd",
+            "expires_at": int(form.get("expires_at") or time.time() + 3600),
+            "metadata": metadata,
+        }
+
+    # ---------- OpenAI ----------
+
+    @staticmethod
+    def chat_completion(body: Dict[str, Any]) -> Dict[str, Any]:
+        content = json.dumps({
+            "product": "pizza", "type": "product", "action": "none", "confidence": 0.5,
+            "clarification": "", "response": "This is a stub reply.",
+        })
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+        }
+
+
+# ============================================
+# WHATSAPP SINK
+# ============================================
+
+class WhatsAppSink:
+    """Records outbound Graph API sends: (monotonic time, phone_number_id, recipient, type)"""
+
+    def __init__(self):
+        self.sent: List[Tuple[float, str, str, str]] = []
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def record(self, phone_number_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        recipient = str(payload.get("to") or "")
+        with self._lock:
+            self.sent.append((time.monotonic(), phone_number_id, recipient, str(payload.get("type") or "")))
+            self._seq += 1
+            message_id = f"wamid.stub{self._seq:08d}"
+        return {
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": recipient, "wa_id": recipient}],
+            "messages": [{"id": message_id}],
+        }
+
+    def snapshot(self) -> List[Tuple[float, str, str, str]]:
+        with self._lock:
+            return list(self.sent)
+
+    def reset(self):
+        with self._lock:
+            self.sent.clear()
+
+
+# ============================================
+# SERVER
+# ============================================
+
+class StubBackend:
+    """Threaded stub server; counts requests per endpoint"""
+
+    def __init__(self, port: int = 0, latency_ms: float = 0, jitter_ms: float = 0,
+                 endpoint_latency_ms: Optional[Dict[str, float]] = None, data: Optional[StubData] = None,
+                 host: str = "127.0.0.1"):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.endpoint_latency_ms = endpoint_latency_ms or {}
+        self.data = data or StubData()
+        self.sink = WhatsAppSink()
+        self.counts: Counter = Counter()
+        self._counts_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubBackend":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-backend", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def snapshot(self) -> Counter:
+        with self._counts_lock:
+            return Counter(self.counts)
+
+    def reset(self):
+        with self._counts_lock:
+            self.counts.clear()
+        self.sink.reset()
+
+    def _count(self, endpoint: str):
+        with self._counts_lock:
+            self.counts[endpoint] += 1
+
+    def _delay(self, endpoint: str):
+        base = self.endpoint_latency_ms.get(endpoint, self.latency_ms)
+        delay = base + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _handler_class(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _body(self) -> bytes:
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def _reply(self, payload: Dict[str, Any], status: int = 200):
+                raw = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def _route(self, method: str):
+                path = urlsplit(self.path).path.rstrip("/")
+                raw = self._body() if method == "POST" else b""
+
+                if path == "/__stats":
+                    return self._reply(dict(backend.snapshot()))
+                if path == "/__reset":
+                    backend.reset()
+                    return self._reply({"status": "ok"})
+
+                if path.startswith("/api/"):
+                    endpoint = path[len("/api/"):]
+                    try:
+                        body = json.loads(raw or b"{}")
+                    except ValueError:
+                        body = {}
+                    payload = backend.data.laravel(endpoint, body if isinstance(body, dict) else {})
+                elif path.startswith("/v1/checkout/sessions"):
+                    endpoint = "stripe:checkout.sessions"
+                    session_id = path.split("/")[4] if path.count("/") >= 4 else None
+                    form = {k: v[0] for k, v in parse_qs(raw.decode("utf-8")).items()}
+                    payload = backend.data.stripe_session(session_id, form)
+                elif path == "/v1/chat/completions":
+                    endpoint = "openai:chat.completions"
+                    payload = StubData.chat_completion(json.loads(raw or b"{}"))
+                elif path.endswith("/messages") and path.count("/") == 3:
+                    # /<version>/<phone_number_id>/messages
+                    endpoint = "whatsapp:messages"
+                    body = json.loads(raw or b"{}")
+                    payload = backend.sink.record(path.split("/")[2], body if isinstance(body, dict) else {})
+                else:
+                    endpoint = f"unknown:{path}"
+                    backend._count(endpoint)
+                    return self._reply({"error": {"message": f"stub: no route {path}"}}, status=404)
+
+                backend._count(endpoint)
+                backend._delay(endpoint)
+                self._reply(payload)
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_GET(self):
+                self._route("GET")
+
+        return Handler
+
+
+def parse_endpoint_latency(values) -> Dict[str, float]:
+    """["getMasterProducts=250", ...] -> {"getMasterProducts": 250.0}"""
+    result = {}
+    for value in values or []:
+        name, _, ms = value.partition("=")
+        result[name.strip()] = float(ms)
+    return result
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    """Stub options shared with bench_actions.py"""
+    parser.add_argument("--host", default="127.0.0.1", help="Stub listen address")
+    parser.add_argument("--latency-ms", type=float, default=30, help="Latency added to every stub response")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Random +/- latency")
+    parser.add_argument("--endpoint-latency", action="append", metavar="ENDPOINT=MS",
+                        help="Per-endpoint latency, e.g. getMasterProducts=250 or openai:chat.completions=800")
+    parser.add_argument("--products", type=int, default=50, help="Products per getMasterProducts response")
+    parser.add_argument("--cart-items", type=int, default=3, help="Lines in cart-list")
+    parser.add_argument("--stores", type=int, default=20, help="Stores per getNearestStore response")
+    parser.add_argument("--orders", type=int, default=10, help="Orders in order-lists")
+    parser.add_argument("--payment-status", default="paid", choices=["paid", "unpaid"], help="Stripe session payment_status")
+
+
+def stub_from_args(args, port: int = 0) -> StubBackend:
+    return StubBackend(
+        port=port,
+        host=args.host,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        endpoint_latency_ms=parse_endpoint_latency(args.endpoint_latency),
+        data=StubData(products=args.products, cart_items=args.cart_items, stores=args.stores,
+                      orders=args.orders, payment_status=args.payment_status),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the stub Laravel / Stripe / OpenAI backend")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    backend = stub_from_args(args, port=args.port).start()
+    print(f"Stub backend on {backend.url}")
+    print(f"  SELLER_API_URL={backend.url}/api")
+    print(f"  OPENAI_BASE_URL={backend.url}/v1")
+    print(f"  stripe.api_base = \"{backend.url}\"")
+    print(f"  WHATSAPP_GRAPH_URL={backend.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        backend.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Retrain the local fallback intent classifier (actions/intent_classifier.py)
+
+Reads JSONL logs of {"text", "action", "confidence"} written by the fallback
+action (FALLBACK_TRAINING_LOG) and/or the seed examples, holds out a
+stratified test split, trains, prints a held-out accuracy report and saves
+the model.
+
+Usage:
+    python scripts/train_intent_classifier.py fallback_log.jsonl \
+        --seed-file scripts/fallback_seed_examples.jsonl \
+        --output models/fallback_intent_model.json \
+        --report models/fallback_intent_report.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_classifier import (  # noqa: E402
+    CONFIDENCE_THRESHOLD,
+    MODEL_PATH,
+    IntentClassifier,
+    load_examples,
+)
+
+
+def stratified_split(texts, labels, test_size, seed):
+    """Split per label so every action is represented in the held-out set"""
+    by_label = defaultdict(list)
+    for text, label in zip(texts, labels):
+        by_label[label].append(text)
+
+    rng = random.Random(seed)
+    train, test = [], []
+    for label, items in by_label.items():
+        rng.shuffle(items)
+        n_test = int(round(len(items) * test_size)) if len(items) > 1 else 0
+        test += [(t, label) for t in items[:n_test]]
+        train += [(t, label) for t in items[n_test:]]
+    rng.shuffle(train)
+    return train, test
+
+
+def evaluate(model, test, threshold):
+    """Accuracy, per-label precision/recall and coverage at the threshold"""
+    per_label = defaultdict(lambda: {"tp": 0, "fp": 0, "fn": 0})
+    correct = 0
+    confident = 0
+    confident_correct = 0
+    latencies = []
+
+    for text, label in test:
+        start = time.perf_counter()
+        predicted, confidence = model.predict(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if predicted == label:
+            correct += 1
+            per_label[label]["tp"] += 1
+        else:
+            per_label[label]["fn"] += 1
+            if predicted is not None:
+                per_label[predicted]["fp"] += 1
+
+        if predicted is not None and confidence >= threshold:
+            confident += 1
+            confident_correct += predicted == label
+
+    total = len(test) or 1
+    labels = {}
+    for label, c in sorted(per_label.items()):
+        precision = c["tp"] / (c["tp"] + c["fp"]) if c["tp"] + c["fp"] else 0.0
+        recall = c["tp"] / (c["tp"] + c["fn"]) if c["tp"] + c["fn"] else 0.0
+        labels[label] = {
+            "precision": round(precision, 3),
+            "recall": round(recall, 3),
+            "support": c["tp"] + c["fn"],
+        }
+
+    latencies.sort()
+    return {
+        "test_examples": len(test),
+        "accuracy": round(correct / total, 3),
+        "threshold": threshold,
+        "coverage": round(confident / total, 3),
+        "accuracy_when_confident": round(confident_correct / confident, 3) if confident else None,
+        "latency_ms_p50": round(statistics.median(latencies), 4) if latencies else None,
+        "latency_ms_p99": round(latencies[int(0.99 * (len(latencies) - 1))], 4) if latencies else None,
+        "labels": labels,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the fallback intent classifier")
+    parser.add_argument("logs", nargs="*", help="JSONL fallback logs (text, action, confidence)")
+    parser.add_argument("--seed-file", action="append", default=[], help="Extra labelled JSONL files")
+    parser.add_argument("--output", default=MODEL_PATH, help="Where to write the model JSON")
+    parser.add_argument("--report", help="Optional path for the JSON evaluation report")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--min-llm-confidence", type=float, default=0.8,
+                        help="Ignore LLM labels below this confidence")
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    paths = args.logs + args.seed_file
+    if not paths:
+        parser.error("provide at least one JSONL log or --seed-file")
+
+    texts, labels = load_examples(paths, min_confidence=args.min_llm_confidence)
+    print(f"Loaded {len(texts)} examples: {dict(Counter(labels))}")
+    if len(set(labels)) < 2:
+        sys.exit("Need at least two distinct actions to train")
+
+    train, test = stratified_split(texts, labels, args.test_size, args.seed)
+    model = IntentClassifier.train([t for t, _ in train], [l for _, l in train],
+                                   epochs=args.epochs, seed=args.seed)
+    report = evaluate(model, test, args.threshold)
+    report["train_examples"] = len(train)
+
+    print(json.dumps(report, indent=2))
+
+    # Final model is refit on everything once the held-out numbers are known
+    final = IntentClassifier.train(texts, labels, epochs=args.epochs, seed=args.seed)
+    final.save(args.output)
+    print(f"Saved model to {args.output} ({len(final.idf)} features, {len(final.labels)} labels)")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved report to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# actions/selection_index.py
+"""
+Product Selection Index
+Built once when a product list is shown, reused on every tap / typed name.
+
+- by_id:    product_id -> product          (WhatsApp list taps "product_{id}")
+- by_title: normalized title -> product    (exact typed names)
+- trigrams: trigram -> positions           (fuzzy names with typos)
+
+Indexes are cached by the recent_products slot value, so the same list
+shown to many users (or tapped many times) is only indexed once. Entries
+live as long as the catalog snapshot (INDEX_CACHE_TIMEOUT).
+
+An index built while some refs were not in the snapshot (restart, other
+worker, expired list) holds placeholders: they keep their id and position,
+so taps by id or number still work without any API call, and only the
+picked product is fetched. Such a partial index is cached for
+PARTIAL_INDEX_TIMEOUT, then rebuilt from what the snapshot holds by then.
+"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Minimum fuzzy score (0..1) to accept a typed name
+MIN_FUZZY_SCORE = 0.45
+
+MAX_CACHED_INDEXES = 2000
+
+# Same as catalog_cache.CATALOG_CACHE_TIMEOUT: an index never outlives the products it holds
+INDEX_CACHE_TIMEOUT = 1800  # 30 minutes
+
+# Partial indexes (with placeholders) are rebuilt sooner - rebuilding needs no API call
+PARTIAL_INDEX_TIMEOUT = 60
+
+_index_cache: "OrderedDict[str, Tuple[float, SelectionIndex]]" = OrderedDict()  # slot value -> (ts, index)
+_index_lock = threading.Lock()
+
+
+def normalize_title(text: str) -> str:
+    """Lowercase, strip prices/punctuation, collapse whitespace"""
+    text = (text or "").split("\n")[0].lower()
+    text = re.sub(r"[₹$€£]\s*\d+(?:\.\d+)?", " ", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _product_title(product: Dict[str, Any]) -> str:
+    return product.get("title") or product.get("product_name") or ""
+
+
+class SelectionIndex:
+    """Lookup structures over one shown product list"""
+
+    def __init__(self, products: List[Dict[str, Any]]):
+        self.products = products
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.by_title: Dict[str, Dict[str, Any]] = {}
+        self._titles: List[str] = []
+        self._tokens: List[set] = []
+        self._grams: List[set] = []
+        self._gram_index: Dict[str, List[int]] = defaultdict(list)
+        # False if the list holds placeholders for products that could not be resolved
+        self.complete = not any(p.get("unresolved") for p in products)
+
+        for pos, p in enumerate(products):
+            pid = p.get("product_id") or p.get("id")
+            if pid not in (None, ""):
+                self.by_id.setdefault(str(pid), p)
+            title = normalize_title(_product_title(p))
+            self._titles.append(title)
+            self._tokens.append(set(title.split()))
+            grams = _trigrams(title) if title else set()
+            self._grams.append(grams)
+            for g in grams:
+                self._gram_index[g].append(pos)
+            if title:
+                self.by_title.setdefault(title, p)
+
+    def __len__(self):
+        return len(self.products)
+
+    def by_position(self, number: int) -> Optional[Dict[str, Any]]:
+        """1-based position as shown in text lists"""
+        index = number - 1
+        return self.products[index] if 0 <= index < len(self.products) else None
+
+    def match_list_item(self, list_item_id: str) -> Optional[Dict[str, Any]]:
+        """Resolve a WhatsApp list row id ("product_{id}", or legacy "product_{n}")"""
+        if not list_item_id or not list_item_id.startswith("product_"):
+            return None
+        key = list_item_id.split("_", 1)[1]
+        product = self.by_id.get(key)
+        if product is None and key.isdigit():
+            product = self.by_position(int(key))
+        return product
+
+    def match_title(self, text: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        Best product for a typed/tapped name.
+
+        Exact normalized title wins; otherwise candidates sharing a trigram
+        are scored by max(trigram Dice, shared tokens / tokens of the longer
+        name) and the best one above MIN_FUZZY_SCORE is returned.
+        """
+        query = normalize_title(text)
+        if not query:
+            return None, 0.0
+        exact = self.by_title.get(query)
+        if exact is not None:
+            return exact, 1.0
+
+        query_grams = _trigrams(query)
+        query_tokens = set(query.split())
+        shared = defaultdict(int)
+        for g in query_grams:
+            for pos in self._gram_index.get(g, ()):
+                shared[pos] += 1
+
+        best_pos, best_score = None, 0.0
+        for pos, common in shared.items():
+            dice = 2.0 * common / (len(query_grams) + len(self._grams[pos]))
+            tokens = self._tokens[pos]
+            # max, not min: one typed word must not score 1.0 against every title containing it
+            token_set = len(query_tokens & tokens) / max(len(query_tokens), len(tokens)) if tokens else 0.0
+            score = max(dice, token_set)
+            if score > best_score:
+                best_pos, best_score = pos, score
+
+        if best_pos is None or best_score < MIN_FUZZY_SCORE:
+            return None, best_score
+        return self.products[best_pos], best_score
+
+
+def get_selection_index(slot_value: Any, resolver: Callable[[Any], List[Dict[str, Any]]]) -> SelectionIndex:
+    """
+    Cached index for a recent_products slot value.
+
+    Args:
+        slot_value: recent_products slot (JSON string)
+        resolver: turns the slot into product dicts on a cache miss, without
+                  API calls (placeholders for refs missing from the snapshot)
+    """
+    key = slot_value if isinstance(slot_value, str) else repr(slot_value)
+    with _index_lock:
+        entry = _index_cache.get(key)
+        if entry is not None:
+            timeout = INDEX_CACHE_TIMEOUT if entry[1].complete else PARTIAL_INDEX_TIMEOUT
+            if (time.time() - entry[0]) < timeout:
+                _index_cache.move_to_end(key)
+                return entry[1]
+            _index_cache.pop(key, None)
+    index = SelectionIndex(resolver(slot_value))
+    register_selection_index(key, index)
+    return index
+
+
+def register_selection_index(slot_value: str, index: SelectionIndex):
+    """Store an index for a slot value (called when the list is shown, or on a cache miss)"""
+    if not index.complete:
+        logger.debug("[SELECTION INDEX] Caching a partial index for %ss", PARTIAL_INDEX_TIMEOUT)
+    with _index_lock:
+        _index_cache[slot_value] = (time.time(), index)
+        _index_cache.move_to_end(slot_value)
+        while len(_index_cache) > MAX_CACHED_INDEXES:
+            _index_cache.popitem(last=False)
+
+
+def clear_selection_indexes():
+    """Clear all cached indexes"""
+    with _index_lock:
+        _index_cache.clear()
+    logger.info("[SELECTION INDEX] Cache cleared")
@@ -0,0 +1,332 @@
+# actions/store_directory.py
+"""
+Store Directory
+Marketplace store lookups for ActionGetNearestStore, ActionShowStoreOptions
+and ActionSetSelectedStore.
+
+1. Per-zip cache of getNearestStore results (search strings are filtered
+   locally, so one entry serves every search in that zip); a name that is
+   not in a full (ZIP_FETCH_ITEMS) list is searched server-side, since the
+   store may be past the first page (LRU of MAX_SEARCH_ENTRIES results -
+   search strings are free text)
+2. Directory of every store seen, by wh_account_id (geo_index builds its
+   location index from it)
+3. Background refresh that re-fetches the most requested zips before they
+   expire, so popular zips never wait on getNearestStore
+4. STORE_DIRECTORY_SEED_ZIPS are fetched by that thread as soon as the
+   directory is first used, so a new worker has store locations before
+   anyone searched those zips on it (the directory is otherwise only
+   filled by searches)
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+API_BASE = os.getenv("SELLER_API_URL", "https://stageshipperapi.thedelivio.com/api")
+
+# Cache timeout (seconds)
+ZIP_CACHE_TIMEOUT = int(os.getenv("STORE_ZIP_CACHE_TTL", "900"))  # 15 minutes
+
+# Background refresh of popular zips
+DIRECTORY_REFRESH_INTERVAL = int(os.getenv("STORE_DIRECTORY_REFRESH", "600"))  # 10 minutes
+DIRECTORY_REFRESH_ZIPS = 50  # how many of the most requested zips to keep warm
+
+# Zips loaded into the directory on first use, e.g. the seller's delivery area
+SEED_ZIPS = [z.strip() for z in os.getenv("STORE_DIRECTORY_SEED_ZIPS", "").split(",") if z.strip()]
+
+# Stores requested per zip (the list is filtered locally)
+ZIP_FETCH_ITEMS = 50
+
+# Server-side name searches kept (least recently used dropped first)
+MAX_SEARCH_ENTRIES = 1000
+
+_zip_cache: Dict[str, List[Dict[str, Any]]] = {}
+_zip_timestamps: Dict[str, float] = {}
+_zip_hits: Dict[str, int] = {}
+# (zip, name) -> (ts, stores)
+_search_cache: "OrderedDict[Tuple[str, str], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+_directory: Dict[str, Dict[str, Any]] = {}
+_directory_version = 0  # bumped whenever _directory changes (geo_index rebuilds on it)
+_lock = threading.Lock()
+
+_refresher_started = False
+
+
+# ============================================
+# API
+# ============================================
+
+def normalize_store(s: Dict[str, Any]) -> Dict[str, Any]:
+    """getNearestStore row -> the store dict kept in stores_list"""
+    name = s.get("store_name") or s.get("name") or "Unknown Store"
+    parts = [
+        str(part) for part in [
+            s.get("address") or s.get("address1") or "",
+            s.get("city") or "",
+            s.get("state") or "",
+            s.get("zipcode") or s.get("zip") or "",
+        ] if part
+    ]
+    store = {
+        "name": str(name),
+        "address": ", ".join(parts),
+        "wh_account_id": s.get("wh_account_id") or "",
+        "store_name": s.get("store_name") or s.get("name") or "",
+    }
+    latitude = s.get("latitude") or s.get("lat")
+    longitude = s.get("longitude") or s.get("lng") or s.get("long")
+    if latitude not in (None, "") and longitude not in (None, ""):
+        store["latitude"], store["longitude"] = latitude, longitude
+    return store
+
+
+def _extract_stores(data: Any) -> List[Dict[str, Any]]:
+    """Stores from the various getNearestStore response shapes"""
+    if isinstance(data, list):
+        return data
+    stores = []
+    if isinstance(data, dict):
+        nested = data.get("data") or {}
+        if isinstance(nested, dict) and nested.get("getNearestStore"):
+            stores = nested.get("getNearestStore")
+        if not stores:
+            stores = nested.get("stores") if isinstance(nested, dict) else []
+        if not stores and isinstance(nested, list):
+            stores = nested
+    return stores or []
+
+
+def _fetch_zip(zipcode: str, search_string: str = "") -> List[Dict[str, Any]]:
+    """
+    getNearestStore for a zip (optionally a server-side name search), normalized.
+
+    Raises:
+        requests exceptions on HTTP/network errors
+    """
+    payload = {
+        "address": {
+            "store_type_id": "",
+            "zip": str(zipcode),
+            "search_string": search_string,
+            "page": "0",
+            "items": str(ZIP_FETCH_ITEMS)
+        }
+    }
+    response = requests.post(f"{API_BASE}/getNearestStore", json=payload, timeout=8)
+    response.raise_for_status()
+    stores = [normalize_store(s) for s in _extract_stores(response.json() or {}) if isinstance(s, dict)]
+    logger.info(f"[STORE DIRECTORY] getNearestStore zip={zipcode} search={search_string!r} -> {len(stores)} stores")
+    return stores
+
+
+def _add_to_directory(stores: List[Dict[str, Any]]):
+    """Record stores by wh_account_id (called with _lock held)"""
+    global _directory_version
+    changed = False
+    for store in stores:
+        key = str(store.get("wh_account_id") or "")
+        if key and _directory.get(key) != store:
+            _directory[key] = store
+            changed = True
+    if changed:
+        _directory_version += 1
+
+
+def _store_zip(zipcode: str, stores: List[Dict[str, Any]]):
+    with _lock:
+        _zip_cache[zipcode] = stores
+        _zip_timestamps[zipcode] = time.time()
+        _add_to_directory(stores)
+
+
+# ============================================
+# LOOKUPS
+# ============================================
+
+def get_stores_for_zip(zipcode: Any) -> List[Dict[str, Any]]:
+    """
+    All stores for a zip, cached.
+
+    Raises:
+        requests exceptions if the zip is not cached and the API call fails
+    """
+    zipcode = str(zipcode).strip()
+    _ensure_refresher()
+    with _lock:
+        _zip_hits[zipcode] = _zip_hits.get(zipcode, 0) + 1
+        ts = _zip_timestamps.get(zipcode)
+        if ts is not None and (time.time() - ts) < ZIP_CACHE_TIMEOUT:
+            logger.debug(f"[STORE DIRECTORY] Hit for zip {zipcode}")
+            return _zip_cache[zipcode]
+        stale = _zip_cache.get(zipcode)
+
+    try:
+        stores = _fetch_zip(zipcode)
+    except Exception as e:
+        if stale is not None:
+            logger.warning(f"[STORE DIRECTORY] Refresh failed for {zipcode}, serving stale list: {e}")
+            return stale
+        raise
+    _store_zip(zipcode, stores)
+    return stores
+
+
+def _search_remote(zipcode: str, search_string: str) -> List[Dict[str, Any]]:
+    """Server-side name search for a zip, cached like the zip list; [] if the call fails"""
+    key = (zipcode, search_string.lower())
+    with _lock:
+        cached = _search_cache.get(key)
+        if cached is not None and (time.time() - cached[0]) < ZIP_CACHE_TIMEOUT:
+            _search_cache.move_to_end(key)
+            return cached[1]
+    try:
+        stores = _fetch_zip(zipcode, search_string)
+    except Exception as e:
+        logger.warning(f"[STORE DIRECTORY] Server-side search {search_string!r} in {zipcode} failed: {e}")
+        return cached[1] if cached is not None else []
+    now = time.time()
+    with _lock:
+        for old_key in [k for k, (ts, _) in _search_cache.items() if now - ts >= ZIP_CACHE_TIMEOUT]:
+            del _search_cache[old_key]
+        _search_cache[key] = (now, stores)
+        _search_cache.move_to_end(key)
+        while len(_search_cache) > MAX_SEARCH_ENTRIES:
+            _search_cache.popitem(last=False)
+        _add_to_directory(stores)
+    return stores
+
+
+def search_stores(zipcode: Any, search_string: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Stores for a zip, optionally filtered by a case-insensitive name match.
+
+    The name is matched against the cached zip list first; if nothing
+    matches and that list is a full page (ZIP_FETCH_ITEMS), the store may
+    be further down, so getNearestStore is asked with the search string.
+    """
+    stores = get_stores_for_zip(zipcode)
+    if search_string:
+        needle = search_string.lower()
+        matches = [s for s in stores if needle in s["name"].lower()]
+        if not matches and len(stores) >= ZIP_FETCH_ITEMS:
+            matches = _search_remote(str(zipcode).strip(), search_string)
+        stores = matches
+    return stores
+
+
+def find_store(zipcode: Any, wh_account_id: Any) -> Optional[Dict[str, Any]]:
+    """A store by wh_account_id: directory first, then the zip's list (may call the API)"""
+    store = get_store(wh_account_id)
+    if store is None and zipcode and wh_account_id not in (None, ""):
+        try:
+            stores = get_stores_for_zip(zipcode)
+        except Exception as e:
+            logger.warning(f"[STORE DIRECTORY] Could not load {zipcode} to find {wh_account_id}: {e}")
+            return None
+        store = next((s for s in stores if str(s.get("wh_account_id")) == str(wh_account_id)), None)
+    return store
+
+
+def get_store(wh_account_id: Any) -> Optional[Dict[str, Any]]:
+    """A store from the directory (no API call)"""
+    with _lock:
+        return _directory.get(str(wh_account_id)) if wh_account_id not in (None, "") else None
+
+
+def all_stores() -> List[Dict[str, Any]]:
+    """Every store currently in the directory (starts seeding on first use)"""
+    _ensure_refresher()
+    with _lock:
+        return list(_directory.values())
+
+
+def directory_version() -> int:
+    """Changes whenever a store is added or updated"""
+    return _directory_version
+
+
+# ============================================
+# BACKGROUND REFRESH
+# ============================================
+
+def refresh_directory(max_zips: int = DIRECTORY_REFRESH_ZIPS) -> int:
+    """Re-fetch the most requested zips; returns how many were refreshed"""
+    with _lock:
+        zips = sorted(_zip_hits, key=_zip_hits.get, reverse=True)[:max_zips]
+        # Decay so zips that stop being requested drop out of the refresh set,
+        # including ones refreshed this round (kept only while still requested)
+        for z in list(_zip_hits):
+            _zip_hits[z] //= 2
+            if not _zip_hits[z]:
+                _zip_hits.pop(z, None)
+
+    refreshed = 0
+    for zipcode in zips:
+        try:
+            _store_zip(zipcode, _fetch_zip(zipcode))
+            refreshed += 1
+        except Exception as e:
+            logger.warning(f"[STORE DIRECTORY] Background refresh failed for {zipcode}: {e}")
+    logger.info(f"[STORE DIRECTORY] Refreshed {refreshed}/{len(zips)} zips, {len(_directory)} stores known")
+    return refreshed
+
+
+def seed_directory(zips: Optional[List[str]] = None) -> int:
+    """Load zips (SEED_ZIPS by default) into the directory; returns how many were loaded"""
+    loaded = 0
+    for zipcode in zips if zips is not None else SEED_ZIPS:
+        with _lock:
+            if zipcode in _zip_cache:
+                continue
+        try:
+            _store_zip(zipcode, _fetch_zip(zipcode))
+            loaded += 1
+        except Exception as e:
+            logger.warning(f"[STORE DIRECTORY] Seeding {zipcode} failed: {e}")
+    if loaded:
+        logger.info(f"[STORE DIRECTORY] Seeded {loaded} zips, {len(_directory)} stores known")
+    return loaded
+
+
+def _refresh_loop():
+    seed_directory()
+    if DIRECTORY_REFRESH_INTERVAL <= 0:
+        return
+    while True:
+        time.sleep(DIRECTORY_REFRESH_INTERVAL)
+        try:
+            refresh_directory()
+        except Exception as e:
+            logger.error(f"[STORE DIRECTORY] Refresh loop error: {e}")
+
+
+def _ensure_refresher():
+    """Start the seed / refresh thread on first use (DIRECTORY_REFRESH_INTERVAL=0 disables refreshing)"""
+    global _refresher_started
+    if _refresher_started or (DIRECTORY_REFRESH_INTERVAL <= 0 and not SEED_ZIPS):
+        return
+    with _lock:
+        if _refresher_started:
+            return
+        _refresher_started = True
+    threading.Thread(target=_refresh_loop, name="store-directory-refresh", daemon=True).start()
+
+
+def clear_store_directory():
+    """Clear zip cache and directory"""
+    global _directory_version
+    with _lock:
+        _directory_version += 1
+        _zip_cache.clear()
+        _zip_timestamps.clear()
+        _zip_hits.clear()
+        _search_cache.clear()
+        _directory.clear()
+    logger.info("[STORE DIRECTORY] Cache cleared")
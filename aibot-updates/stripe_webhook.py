@@ -0,0 +1,189 @@
+# actions/stripe_webhook.py
+"""
+Stripe Webhook Helpers
+Used by the /stripe route of the WhatsApp Business connector to confirm
+payments as soon as Stripe reports them, instead of waiting for the
+customer to tap "Check Payment".
+
+1. verify_stripe_signature() - checks the Stripe-Signature header (v1 HMAC)
+2. checkout_completed_message() - maps a checkout.session.completed event
+   to the WhatsApp sender, text and metadata for a UserMessage
+3. is_duplicate_event() - Stripe retries deliveries, handle each event once
+4. claim_confirmation() - the webhook (action_payment_confirmed) and the
+   "Check Payment" button (action_check_stripe_payment) send one
+   confirmation per paid session between them. The record is per process:
+   with several action-server processes, a webhook and a tap handled by
+   different ones can both confirm
+"""
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+
+# Reject signatures older than this (seconds), same default as Stripe's SDKs
+SIGNATURE_TOLERANCE = 300
+
+# Intent the connector sends into Rasa (rule: payment_confirmed -> action_payment_confirmed)
+PAYMENT_CONFIRMED_TEXT = "/payment_confirmed"
+
+# Processed event IDs (seconds kept)
+EVENT_DEDUP_TIMEOUT = 86400  # 24 hours
+
+# Paid sessions already confirmed to the customer (seconds kept)
+CONFIRMED_TIMEOUT = 86400
+
+_seen_events: Dict[str, float] = {}
+_confirmed: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+# ============================================
+# SIGNATURE
+# ============================================
+
+def sign_payload(payload: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    """Build a Stripe-Signature header value (used for local fixtures)"""
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    signed = f"{timestamp}.".encode("utf-8") + payload
+    signature = hmac.new(secret.encode("utf-8"), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def verify_stripe_signature(payload: bytes, sig_header: str, secret: str = None,
+                            tolerance: int = SIGNATURE_TOLERANCE) -> bool:
+    """
+    Verify a Stripe-Signature header against the raw request body.
+
+    Returns:
+        True if one of the v1 signatures matches and the timestamp is recent
+    """
+    secret = secret or STRIPE_WEBHOOK_SECRET
+    if not secret or not sig_header:
+        logger.warning("[STRIPE WEBHOOK] Missing webhook secret or signature header")
+        return False
+
+    timestamp, signatures = None, []
+    for part in sig_header.split(","):
+        key, _, value = part.strip().partition("=")
+        if key == "t":
+            timestamp = value
+        elif key == "v1":
+            signatures.append(value)
+
+    try:
+        timestamp = int(timestamp)
+    except (TypeError, ValueError):
+        logger.warning("[STRIPE WEBHOOK] Signature header has no timestamp")
+        return False
+
+    if tolerance and abs(time.time() - timestamp) > tolerance:
+        logger.warning(f"[STRIPE WEBHOOK] Signature timestamp outside tolerance ({tolerance}s)")
+        return False
+
+    expected = sign_payload(payload, secret, timestamp).split("v1=", 1)[1]
+    return any(hmac.compare_digest(expected, sig) for sig in signatures)
+
+
+# ============================================
+# EVENT MAPPING
+# ============================================
+
+def is_duplicate_event(event_id: str) -> bool:
+    """True if this event was already handled; otherwise remembers it"""
+    if not event_id:
+        return False
+    now = time.time()
+    with _lock:
+        for old_id in [e for e, ts in _seen_events.items() if now - ts > EVENT_DEDUP_TIMEOUT]:
+            _seen_events.pop(old_id, None)
+        if event_id in _seen_events:
+            return True
+        _seen_events[event_id] = now
+    return False
+
+
+def forget_event(event_id: str):
+    """Un-mark an event whose handling failed so Stripe's retry is processed"""
+    with _lock:
+        _seen_events.pop(event_id, None)
+
+
+def checkout_completed_message(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Map a paid checkout.session.completed event to a bot message.
+
+    The session metadata is written by ActionCreateStripeCheckout and
+    ActionConfirmOrderAndPay (sender_id, whatsapp_number, user_id,
+    phone_number_id, store_id...).
+
+    Returns:
+        {"sender_id", "text", "metadata", "phone_number_id", "bot_phone_number"}
+        or None if the event is not a paid WhatsApp checkout
+    """
+    if event.get("type") != "checkout.session.completed":
+        return None
+
+    session = (event.get("data") or {}).get("object") or {}
+    if session.get("payment_status") != "paid":
+        logger.info(f"[STRIPE WEBHOOK] Session {session.get('id')} not paid ({session.get('payment_status')})")
+        return None
+
+    session_meta = session.get("metadata") or {}
+    sender_id = session_meta.get("sender_id") or session_meta.get("whatsapp_number", "").lstrip("+")
+    if not sender_id or not session_meta.get("channel", "").startswith("whatsapp"):
+        logger.info(f"[STRIPE WEBHOOK] Session {session.get('id')} is not a WhatsApp checkout")
+        return None
+
+    amount_total = session.get("amount_total")
+    metadata = {
+        "interaction_type": "stripe_webhook",
+        "stripe_event_id": event.get("id"),
+        "stripe_session_id": session.get("id"),
+        "stripe_payment_intent": session.get("payment_intent") or "",
+        "payment_amount": (amount_total or 0) / 100,
+        "user_id": session_meta.get("user_id", ""),
+        "store_id": session_meta.get("store_id", ""),
+        "store_name": session_meta.get("store_name", ""),
+    }
+    return {
+        "sender_id": sender_id,
+        "text": PAYMENT_CONFIRMED_TEXT,
+        "metadata": metadata,
+        "phone_number_id": session_meta.get("phone_number_id", ""),
+        "bot_phone_number": session_meta.get("bot_phone_number", ""),
+    }
+
+
+# ============================================
+# CONFIRMATIONS
+# ============================================
+
+def claim_confirmation(session_id: str) -> bool:
+    """
+    True for the first caller about to confirm this paid session to the
+    customer; False if the webhook or a "Check Payment" tap already did in
+    this process (the record is not shared between processes).
+    """
+    if not session_id:
+        return True
+    now = time.time()
+    with _lock:
+        for old_id in [s for s, ts in _confirmed.items() if now - ts > CONFIRMED_TIMEOUT]:
+            _confirmed.pop(old_id, None)
+        if session_id in _confirmed:
+            return False
+        _confirmed[session_id] = now
+    return True
+
+
+def clear_confirmations():
+    """Forget confirmed sessions"""
+    with _lock:
+        _confirmed.clear()
@@ -0,0 +1,23 @@
+# actions/tests/conftest.py
+"""
+Import this directory as the "actions" package (it is deployed under that
+name) without running __init__.py, so the helper modules can be tested
+without registering every Rasa action.
+
+Run from the package directory:
+    python -m pytest -q tests
+"""
+import os
+import sys
+import types
+
+ACTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "actions" not in sys.modules:
+    package = types.ModuleType("actions")
+    package.__file__ = os.path.join(ACTIONS_DIR, "__init__.py")
+    package.__path__ = [ACTIONS_DIR]
+    sys.modules["actions"] = package
+    # pytest also imports __init__.py to look for setup_module: as "actions" when
+    # deployed, as "__init__" in a checkout whose directory is not a valid name
+    sys.modules.setdefault("__init__", package)
@@ -0,0 +1,69 @@
+# actions/tests/test_cart_sync.py
+from actions.cart_sync import plan_cart_diff
+
+
+def _line(pid, quantity):
+    return {"product_retailer_id": pid, "quantity": quantity}
+
+
+def _cart_item(cart_id, product_id, quantity, shipper_id=7):
+    return {"id": cart_id, "product_id": product_id, "quantity": quantity, "shipper_id": shipper_id}
+
+
+def test_empty_cart_adds_every_line():
+    ops = plan_cart_diff([], [_line("A", 2), _line("B", 1)], shipper_id=7)
+    assert ops == [
+        {"op": "add", "product_id": "A", "quantity": 2},
+        {"op": "add", "product_id": "B", "quantity": 1},
+    ]
+
+
+def test_matching_cart_needs_no_ops():
+    cart = [_cart_item(11, "A", "2.00"), _cart_item(12, "B", 1)]
+    assert plan_cart_diff(cart, [_line("A", 2), _line("B", 1)], shipper_id=7) == []
+
+
+def test_quantity_change_is_an_update_by_cart_line_id():
+    ops = plan_cart_diff([_cart_item(11, "A", 1)], [_line("A", 3)], shipper_id=7)
+    assert ops == [{"op": "update", "cart_id": 11, "product_id": "A", "quantity": 3}]
+
+
+def test_duplicate_order_lines_are_summed():
+    ops = plan_cart_diff([], [_line("A", 1), _line("A", 2)], shipper_id=7)
+    assert ops == [{"op": "add", "product_id": "A", "quantity": 3}]
+
+
+def test_duplicate_cart_lines_keep_the_first_and_remove_the_rest():
+    cart = [_cart_item(11, "A", 2), _cart_item(12, "A", 2)]
+    ops = plan_cart_diff(cart, [_line("A", 2)], shipper_id=7)
+    assert ops == [{"op": "remove", "cart_id": 12, "product_id": "A"}]
+
+
+def test_zero_quantity_line_is_not_added():
+    assert plan_cart_diff([], [_line("A", 0)], shipper_id=7) == []
+
+
+def test_zero_quantity_line_removes_the_cart_line():
+    ops = plan_cart_diff([_cart_item(11, "A", 2)], [_line("A", 0), _line("B", 1)], shipper_id=7)
+    assert ops == [
+        {"op": "remove", "cart_id": 11, "product_id": "A"},
+        {"op": "add", "product_id": "B", "quantity": 1},
+    ]
+
+
+def test_duplicates_cancelling_out_count_as_zero():
+    ops = plan_cart_diff([_cart_item(11, "A", 1)], [_line("A", 1), _line("A", -1)], shipper_id=7)
+    assert ops == [{"op": "remove", "cart_id": 11, "product_id": "A"}]
+
+
+def test_lines_from_another_store_are_removed():
+    ops = plan_cart_diff([_cart_item(11, "A", 1, shipper_id=9)], [_line("A", 1)], shipper_id=7)
+    assert ops == [
+        {"op": "remove", "cart_id": 11, "product_id": "A"},
+        {"op": "add", "product_id": "A", "quantity": 1},
+    ]
+
+
+def test_cart_line_matches_on_ai_product_id():
+    cart = [{"id": 11, "ai_product_id": "A", "product_id": 501, "quantity": 1, "shipper_id": 7}]
+    assert plan_cart_diff(cart, [_line("A", 1)], shipper_id=7) == []
@@ -0,0 +1,125 @@
+# actions/tests/test_circuit_breaker.py
+import types
+
+import pytest
+
+from actions import circuit_breaker
+from actions.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", types.SimpleNamespace(monotonic=clock))
+    monkeypatch.setattr(circuit_breaker, "FAILURE_RATE", 0.5)
+    monkeypatch.setattr(circuit_breaker, "MIN_CALLS", 4)
+    monkeypatch.setattr(circuit_breaker, "WINDOW_SECONDS", 30.0)
+    monkeypatch.setattr(circuit_breaker, "OPEN_SECONDS", 20.0)
+    monkeypatch.setattr(circuit_breaker, "HALF_OPEN_PROBES", 1)
+    return clock
+
+
+def _call(breaker: CircuitBreaker, failed: bool):
+    probe = breaker.acquire()
+    breaker.release(failed, probe)
+
+
+def _trip(breaker: CircuitBreaker):
+    for failed in (False, False, True, True):
+        _call(breaker, failed)
+
+
+def test_opens_at_failure_rate_once_min_calls_reached(clock):
+    breaker = CircuitBreaker("seller_api", "cart-list")
+    for failed in (True, True, True):
+        _call(breaker, failed)
+    assert breaker.state == CLOSED  # under MIN_CALLS
+
+    _call(breaker, False)
+    assert breaker.state == CLOSED  # a success never opens it
+
+    _call(breaker, True)
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_below_failure_rate(clock):
+    breaker = CircuitBreaker("seller_api", "cart-list")
+    for failed in (False, False, False, True, False, True):
+        _call(breaker, failed)
+    assert breaker.state == CLOSED
+
+
+def test_failures_outside_window_are_forgotten(clock):
+    breaker = CircuitBreaker("seller_api", "cart-list")
+    for _ in range(3):
+        _call(breaker, True)
+    clock.now += 31
+    _call(breaker, True)
+    assert breaker.state == CLOSED
+
+
+def test_open_rejects_without_calling(clock):
+    breaker = CircuitBreaker("seller_api", "cart-list")
+    _trip(breaker)
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    clock.now += 19
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = CircuitBreaker("seller_api", "cart-list")
+    _trip(breaker)
+    clock.now += 20
+
+    probe = breaker.acquire()
+    assert probe is True
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()  # the only probe slot is in flight
+
+    breaker.release(False, probe)
+    assert breaker.state == CLOSED
+    assert breaker.acquire() is False
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = CircuitBreaker("seller_api", "cart-list")
+    _trip(breaker)
+    clock.now += 20
+
+    probe = breaker.acquire()
+    breaker.release(True, probe)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+    clock.now += 20
+    assert breaker.acquire() is True
+
+
+def test_cancelled_probe_frees_its_slot(clock):
+    breaker = CircuitBreaker("seller_api", "cart-list")
+    _trip(breaker)
+    clock.now += 20
+
+    breaker.cancel(breaker.acquire())
+    assert breaker.state == HALF_OPEN
+    assert breaker.acquire() is True
+
+
+def test_calls_started_before_opening_are_ignored(clock):
+    breaker = CircuitBreaker("seller_api", "cart-list")
+    late = breaker.acquire()
+    _trip(breaker)
+    breaker.release(False, late)
+    assert breaker.state == OPEN
@@ -0,0 +1,83 @@
+# actions/tests/test_stripe_webhook.py
+import time
+import types
+
+import pytest
+
+from actions import stripe_webhook
+from actions.stripe_webhook import forget_event, is_duplicate_event, sign_payload, verify_stripe_signature
+
+SECRET = "whsec_test"
+PAYLOAD = b'{"id": "evt_1", "type": "checkout.session.completed"}'
+
+
+@pytest.fixture(autouse=True)
+def clear_seen_events():
+    stripe_webhook._seen_events.clear()
+    yield
+    stripe_webhook._seen_events.clear()
+
+
+def test_valid_signature():
+    assert verify_stripe_signature(PAYLOAD, sign_payload(PAYLOAD, SECRET), SECRET)
+
+
+def test_wrong_secret_or_tampered_body_is_rejected():
+    header = sign_payload(PAYLOAD, SECRET)
+    assert not verify_stripe_signature(PAYLOAD, header, "whsec_other")
+    assert not verify_stripe_signature(PAYLOAD + b" ", header, SECRET)
+
+
+def test_any_v1_signature_may_match():
+    # Stripe sends one v1 per active secret while a secret is being rolled
+    timestamp = int(time.time())
+    old = sign_payload(PAYLOAD, "whsec_old", timestamp).split("v1=", 1)[1]
+    current = sign_payload(PAYLOAD, SECRET, timestamp).split("v1=", 1)[1]
+    assert verify_stripe_signature(PAYLOAD, f"t={timestamp},v1={old},v1={current}", SECRET)
+
+
+def test_missing_header_secret_or_timestamp_is_rejected():
+    header = sign_payload(PAYLOAD, SECRET)
+    assert not verify_stripe_signature(PAYLOAD, "", SECRET)
+    assert not verify_stripe_signature(PAYLOAD, header, "")
+    assert not verify_stripe_signature(PAYLOAD, header.split(",", 1)[1], SECRET)
+
+
+def test_timestamp_within_tolerance_is_accepted():
+    header = sign_payload(PAYLOAD, SECRET, int(time.time()) - 299)
+    assert verify_stripe_signature(PAYLOAD, header, SECRET, tolerance=300)
+
+
+@pytest.mark.parametrize("age", [301, -301])
+def test_replayed_or_future_timestamp_is_rejected(age):
+    header = sign_payload(PAYLOAD, SECRET, int(time.time()) - age)
+    assert not verify_stripe_signature(PAYLOAD, header, SECRET, tolerance=300)
+
+
+def test_zero_tolerance_skips_the_age_check():
+    header = sign_payload(PAYLOAD, SECRET, int(time.time()) - 86400)
+    assert verify_stripe_signature(PAYLOAD, header, SECRET, tolerance=0)
+
+
+def test_redelivered_event_is_a_duplicate():
+    assert not is_duplicate_event("evt_1")
+    assert is_duplicate_event("evt_1")
+    assert not is_duplicate_event("evt_2")
+
+
+def test_forgotten_event_is_processed_again():
+    assert not is_duplicate_event("evt_1")
+    forget_event("evt_1")
+    assert not is_duplicate_event("evt_1")
+
+
+def test_seen_events_expire(monkeypatch):
+    assert not is_duplicate_event("evt_1")
+    later = time.time() + stripe_webhook.EVENT_DEDUP_TIMEOUT + 1
+    monkeypatch.setattr(stripe_webhook, "time", types.SimpleNamespace(time=lambda: later))
+    assert not is_duplicate_event("evt_1")
+
+
+def test_event_without_id_is_never_a_duplicate():
+    assert not is_duplicate_event("")
+    assert not is_duplicate_event("")
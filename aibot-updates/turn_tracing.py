@@ -0,0 +1,282 @@
+# actions/turn_tracing.py
+"""
+Turn Tracing
+One trace per WhatsApp message, from the webhook through Rasa and the
+action server down to every Laravel / Stripe / OpenAI / Graph call.
+
+1. WhatsAppBusinessInput.receive_message starts the trace and passes it to
+   Rasa in UserMessage.metadata["trace"] (trace_id, parent span, sampled)
+2. The connector adds spans for the seller lookup, Rasa handling and each
+   outbound Graph send
+3. The action server continues the trace from tracker.latest_message
+   metadata: one span per action (action_metrics) and one per HTTP call
+
+Spans are exported in batches from a background thread to a JSON-lines
+file (TRACE_EXPORT_FILE) and/or an OTLP/HTTP collector
+(TRACE_OTLP_ENDPOINT, e.g. http://localhost:4318). With neither set,
+tracing is off and every helper here is a no-op.
+
+scripts/show_trace.py prints a trace from the file as a tree.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "").rstrip("/")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "aibot")
+
+TRACING_ENABLED = bool(TRACE_EXPORT_FILE or TRACE_OTLP_ENDPOINT)
+
+# Export batching
+FLUSH_INTERVAL = 2.0  # seconds
+MAX_BATCH = 512
+MAX_QUEUE = 10000  # spans beyond this are dropped (exporter down)
+
+# Metadata key the trace context travels under
+METADATA_KEY = "trace"
+
+# Marks "inside a trace that was not sampled" so children are skipped too
+_NOT_SAMPLED = object()
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+# ============================================
+# SPANS
+# ============================================
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+class Span:
+    """One timed operation; exported when end() is called"""
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str = "",
+                 attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None):
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id or ""
+        self.name = name
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self, error: Any = None, end_ns: Optional[int] = None):
+        if self.end_ns:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if error:
+            self.error = str(error)[:500]
+        _exporter.submit(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "service": TRACE_SERVICE_NAME,
+            "start_unix_nano": self.start_ns,
+            "end_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None,
+               parent: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+    """
+    New span under the current span, or under parent (a trace context from
+    message metadata), or a new sampled root. None if tracing is off or the
+    trace is not sampled. Does not make the span current - see span().
+    """
+    if not TRACING_ENABLED:
+        return None
+    current = _current_span.get()
+    if current is _NOT_SAMPLED:
+        return None
+    if isinstance(current, Span):
+        return Span(name, current.trace_id, current.span_id, attributes)
+    if parent and parent.get("trace_id"):
+        if not parent.get("sampled", True):
+            return None
+        return Span(name, str(parent["trace_id"]), str(parent.get("span_id") or ""), attributes)
+    if random.random() >= TRACE_SAMPLE_RATE:
+        return None
+    return Span(name, _new_id(16), "", attributes)
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional[Dict[str, Any]] = None):
+    """
+    Run a block inside a span (made current for nested spans / HTTP calls).
+    Yields the Span, or None when not traced.
+    """
+    if not TRACING_ENABLED:
+        yield None
+        return
+    s = start_span(name, attributes, parent)
+    if s is None and _current_span.get() is None:
+        # Unsampled root - keep its children unsampled too
+        token = _current_span.set(_NOT_SAMPLED)
+    else:
+        token = _current_span.set(s) if s is not None else None
+    error = None
+    try:
+        yield s
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if token is not None:
+            _current_span.reset(token)
+        if s is not None:
+            s.end(error)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, attributes: Optional[Dict[str, Any]] = None,
+                error: Any = None):
+    """Record an already finished leaf operation under the current span"""
+    if not TRACING_ENABLED:
+        return
+    current = _current_span.get()
+    if not isinstance(current, Span):
+        return  # HTTP calls outside a traced turn are not recorded
+    Span(name, current.trace_id, current.span_id, attributes, start_ns=start_ns).end(error, end_ns=end_ns)
+
+
+def trace_context() -> Dict[str, Any]:
+    """Context to put in UserMessage.metadata[METADATA_KEY] (empty if not traced)"""
+    current = _current_span.get()
+    if current is _NOT_SAMPLED:
+        return {"trace_id": "", "span_id": "", "sampled": False}
+    if isinstance(current, Span):
+        return {"trace_id": current.trace_id, "span_id": current.span_id, "sampled": True}
+    return {}
+
+
+def parent_from_metadata(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Trace context carried in message metadata, if any"""
+    ctx = (metadata or {}).get(METADATA_KEY)
+    return ctx if isinstance(ctx, dict) and ("trace_id" in ctx or "sampled" in ctx) else None
+
+
+def current_trace_id() -> str:
+    current = _current_span.get()
+    return current.trace_id if isinstance(current, Span) else ""
+
+
+# ============================================
+# EXPORT
+# ============================================
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": "actions.turn_tracing"},
+                "spans": [
+                    {
+                        "traceId": s.trace_id,
+                        "spanId": s.span_id,
+                        "parentSpanId": s.parent_id,
+                        "name": s.name,
+                        "kind": 1,
+                        "startTimeUnixNano": str(s.start_ns),
+                        "endTimeUnixNano": str(s.end_ns),
+                        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                        "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+                    }
+                    for s in spans
+                ],
+            }],
+        }]
+    }
+
+
+class _Exporter:
+    """Queues finished spans and writes them out from a daemon thread"""
+
+    def __init__(self):
+        self._queue: List[Span] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def submit(self, s: Span):
+        with self._lock:
+            if len(self._queue) >= MAX_QUEUE:
+                self.dropped += 1
+                return
+            self._queue.append(s)
+            full = len(self._queue) >= MAX_BATCH
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"[TRACING] Export failed: {e}")
+
+    def flush(self):
+        with self._lock:
+            spans, self._queue = self._queue, []
+        for start in range(0, len(spans), MAX_BATCH):
+            batch = spans[start:start + MAX_BATCH]
+            if TRACE_EXPORT_FILE:
+                with open(TRACE_EXPORT_FILE, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(s.to_dict(), default=str) + "\n" for s in batch))
+            if TRACE_OTLP_ENDPOINT:
+                # urllib, not requests - the requests hook would trace the exporter itself
+                request = urllib.request.Request(
+                    f"{TRACE_OTLP_ENDPOINT}/v1/traces",
+                    data=json.dumps(_otlp_payload(batch), default=str).encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                urllib.request.urlopen(request, timeout=5).close()
+
+
+_exporter = _Exporter()
+
+
+def flush_traces():
+    """Write out queued spans now (e.g. at shutdown or from scripts)"""
+    _exporter.flush()
@@ -0,0 +1,335 @@
+# actions/user_cache.py
+"""
+Per-Customer Caches
+In-memory, same TTL pattern as store_config.
+
+1. Phone -> user lookup results (including "not found"), by sender ID
+2. Wishlist per user_id (WishlistList), updated in place by add/remove
+3. Address book per user_id (getAddress), updated in place by addAddress
+
+The write helpers (add_address, add_to_wishlist, remove_from_wishlist) call
+the API and patch the cached list, so checkout and favorites flows read
+from memory afterwards instead of refetching.
+
+When a refresh fails (API down, circuit open) the reads serve the last
+list they had, like the store directory does.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+API_BASE = os.getenv("SELLER_API_URL", "https://stageshipperapi.thedelivio.com/api")
+
+# Cache timeouts (seconds)
+USER_LOOKUP_TIMEOUT = 1800        # 30 minutes for found users
+USER_LOOKUP_NEGATIVE_TIMEOUT = 300  # 5 minutes for "not found"
+
+_user_lookup_cache: Dict[str, Dict[str, Any]] = {}
+_user_lookup_expiry: Dict[str, float] = {}
+_lock = threading.Lock()
+
+# How long a cached wishlist / current_wishlist slot can be trusted without refetching
+WISHLIST_FRESH_SECONDS = 300  # 5 minutes
+
+_wishlists: Dict[str, List[Dict[str, Any]]] = {}
+_wishlist_loaded_at: Dict[str, float] = {}
+
+# Address book (addresses rarely change outside the bot)
+ADDRESS_BOOK_TIMEOUT = 900  # 15 minutes
+
+_address_books: Dict[str, List[Dict[str, Any]]] = {}
+_address_loaded_at: Dict[str, float] = {}
+
+
+# ============================================
+# PHONE -> USER LOOKUP
+# ============================================
+
+def get_cached_user_lookup(sender_id: str) -> Optional[Dict[str, Any]]:
+    """Cached user-by-phone response for a sender, or None on miss/expiry"""
+    if not sender_id:
+        return None
+    with _lock:
+        expires = _user_lookup_expiry.get(sender_id)
+        if expires is None or time.time() >= expires:
+            return None
+        return _user_lookup_cache.get(sender_id)
+
+
+def get_stale_user_lookup(sender_id: str) -> Optional[Dict[str, Any]]:
+    """Last found user for a sender, even if expired (for when the API is down)"""
+    if not sender_id:
+        return None
+    with _lock:
+        result = _user_lookup_cache.get(sender_id)
+    return result if result and result.get("status") == 1 and result.get("data") else None
+
+
+def cache_user_lookup(sender_id: str, result: Dict[str, Any]):
+    """Cache a user-by-phone response; misses get the short negative TTL"""
+    if not sender_id:
+        return
+    found = result.get("status") == 1 and result.get("data")
+    ttl = USER_LOOKUP_TIMEOUT if found else USER_LOOKUP_NEGATIVE_TIMEOUT
+    with _lock:
+        _user_lookup_cache[sender_id] = result
+        _user_lookup_expiry[sender_id] = time.time() + ttl
+    logger.info(f"[USER CACHE] Cached {'user' if found else 'not found'} for {sender_id} ({ttl}s)")
+
+
+def invalidate_user_lookup(sender_id: str):
+    """Drop the cached lookup (after registration or address changes)"""
+    with _lock:
+        _user_lookup_cache.pop(sender_id, None)
+        _user_lookup_expiry.pop(sender_id, None)
+
+
+# ============================================
+# WISHLIST
+# ============================================
+
+def mark_wishlist_fresh(user_id: str, wishlist: Optional[List[Dict[str, Any]]] = None):
+    """Record that the wishlist was just loaded from WishlistList"""
+    if user_id:
+        with _lock:
+            _wishlist_loaded_at[str(user_id)] = time.time()
+            if wishlist is not None:
+                _wishlists[str(user_id)] = list(wishlist)
+
+
+def is_wishlist_fresh(user_id: str) -> bool:
+    """True if the wishlist was loaded recently and not invalidated since"""
+    loaded_at = _wishlist_loaded_at.get(str(user_id))
+    return loaded_at is not None and (time.time() - loaded_at) < WISHLIST_FRESH_SECONDS
+
+
+def get_cached_wishlist(user_id: str) -> Optional[List[Dict[str, Any]]]:
+    """Cached wishlist if fresh, else None (no API call)"""
+    with _lock:
+        if not is_wishlist_fresh(user_id) or str(user_id) not in _wishlists:
+            return None
+        return list(_wishlists[str(user_id)])
+
+
+def get_wishlist(user_id: str, fresh: bool = False, timeout: int = 10) -> List[Dict[str, Any]]:
+    """
+    Wishlist items for a user, from cache while fresh.
+
+    Raises:
+        requests exceptions / ValueError like a direct WishlistList call
+    """
+    if not fresh:
+        cached = get_cached_wishlist(user_id)
+        if cached is not None:
+            logger.debug(f"[USER CACHE] Wishlist hit for {user_id}")
+            return cached
+
+    try:
+        response = requests.post(
+            f"{API_BASE}/WishlistList",
+            json={"user_id": str(user_id), "search_string": ""},
+            timeout=timeout
+        )
+        wishlist = (response.json().get("data") or {}).get("wishlist", []) or []
+    except Exception as e:
+        with _lock:
+            stale = _wishlists.get(str(user_id))
+        if stale is not None:
+            logger.warning(f"[USER CACHE] Wishlist refresh failed for {user_id}, serving stale list: {e}")
+            return list(stale)
+        raise
+    mark_wishlist_fresh(user_id, wishlist)
+    logger.info(f"[USER CACHE] Loaded wishlist for {user_id}: {len(wishlist)} items")
+    return list(wishlist)
+
+
+def add_to_wishlist(user_id: str, product_id: Any, shipper_id: Any = "",
+                    product: Optional[Dict[str, Any]] = None, timeout: int = 10) -> Dict[str, Any]:
+    """
+    addProductToWishlist, then add the item to the cached wishlist.
+
+    Args:
+        product: product dict (title, prices, store) used for the cached row
+
+    Returns:
+        API response json
+    """
+    payload = {
+        "user_id": str(user_id),
+        "product_id": str(product_id),
+        "shipper_id": str(shipper_id) if shipper_id else "",
+        "flag": "1"
+    }
+    data = requests.post(f"{API_BASE}/addProductToWishlist", json=payload, timeout=timeout).json()
+
+    if not (data.get("status") == 1 or data.get("code") == 200):
+        return data
+
+    uid = str(user_id)
+    total = (data.get("data") or {}).get("total_Wishlist")
+    with _lock:
+        cached = _wishlists.get(uid)
+        if cached is None or not is_wishlist_fresh(uid):
+            pass
+        elif any(str(item.get("product_id")) == str(product_id) for item in cached):
+            logger.debug(f"[USER CACHE] Product {product_id} already in cached wishlist")
+        else:
+            product = product or {}
+            cached.append({
+                "product_id": product_id,
+                "shipper_id": shipper_id,
+                "title": product.get("title") or product.get("product_name") or "Product",
+                "product_price": product.get("product_price", 0),
+                "discounted_price": product.get("discounted_price"),
+                "store_name": product.get("store_name") or product.get("shipper_name", ""),
+            })
+        # Server count disagrees with the patched list -> reload next time
+        if cached is not None and total is not None and str(total) != str(len(cached)):
+            _wishlists.pop(uid, None)
+            _wishlist_loaded_at.pop(uid, None)
+    return data
+
+
+def remove_from_wishlist(user_id: str, product_id: Any, wishlist_id: Any = "",
+                         timeout: int = 10) -> Dict[str, Any]:
+    """
+    removeProductFromWishlistBot, then drop the item from the cached wishlist.
+
+    Returns:
+        API response json
+    """
+    payload = {
+        "user_id": str(user_id),
+        "product_id": str(product_id),
+        "id": str(wishlist_id) if wishlist_id else ""
+    }
+    data = requests.post(f"{API_BASE}/removeProductFromWishlistBot", json=payload, timeout=timeout).json()
+
+    result = data.get("data") if isinstance(data.get("data"), dict) else {}
+    success = (
+        result.get("status") is True or data.get("status") in (1, "1") or data.get("code") == 200
+    )
+    with _lock:
+        uid = str(user_id)
+        if success and uid in _wishlists:
+            _wishlists[uid] = [i for i in _wishlists[uid] if str(i.get("product_id")) != str(product_id)]
+        elif not success:
+            _wishlists.pop(uid, None)
+            _wishlist_loaded_at.pop(uid, None)
+    return data
+
+
+def invalidate_wishlist(user_id: str):
+    """Forget the cached wishlist (next read refetches)"""
+    with _lock:
+        _wishlists.pop(str(user_id), None)
+        _wishlist_loaded_at.pop(str(user_id), None)
+
+
+# ============================================
+# ADDRESS BOOK
+# ============================================
+
+def get_addresses(user_id: str, timeout: int = 10) -> List[Dict[str, Any]]:
+    """
+    Saved addresses (getAddress addressList), from cache while fresh.
+
+    Raises:
+        requests exceptions / ValueError like a direct getAddress call
+    """
+    uid = str(user_id)
+    with _lock:
+        loaded_at = _address_loaded_at.get(uid)
+        if loaded_at is not None and (time.time() - loaded_at) < ADDRESS_BOOK_TIMEOUT:
+            logger.debug(f"[USER CACHE] Address book hit for {uid}")
+            return list(_address_books[uid])
+
+    try:
+        response = requests.post(
+            f"{API_BASE}/getAddress",
+            json={"user_id": user_id, "shipper_id": "", "address_id": ""},
+            timeout=timeout
+        )
+        data = response.json()
+    except Exception as e:
+        with _lock:
+            stale = _address_books.get(uid)
+        if stale is not None:
+            logger.warning(f"[USER CACHE] Address book refresh failed for {uid}, serving stale list: {e}")
+            return list(stale)
+        raise
+    if data.get("status") != 1:
+        return []
+    addresses = (data.get("data") or {}).get("addressList", []) or []
+    with _lock:
+        _address_books[uid] = list(addresses)
+        _address_loaded_at[uid] = time.time()
+    logger.info(f"[USER CACHE] Loaded {len(addresses)} addresses for {uid}")
+    return list(addresses)
+
+
+def get_address(user_id: str, address_id: Any, timeout: int = 10) -> Optional[Dict[str, Any]]:
+    """One saved address, from the cached address book when possible"""
+    for addr in get_addresses(user_id, timeout=timeout):
+        if str(addr.get("address_id")) == str(address_id):
+            return addr
+
+    # Not in the book (e.g. added from the website) - ask for it directly
+    response = requests.post(
+        f"{API_BASE}/getAddress",
+        json={"user_id": user_id, "shipper_id": "", "address_id": str(address_id)},
+        timeout=timeout
+    )
+    data = response.json()
+    addresses = (data.get("data") or {}).get("addressList", []) if data.get("status") == 1 else []
+    return addresses[0] if addresses else None
+
+
+def add_address(user_id: str, address: Dict[str, Any], timeout: int = 10) -> Dict[str, Any]:
+    """
+    addAddress, then add the new address to the cached address book.
+
+    Args:
+        address: addAddress fields (address_name, address, city, state, zip_code...)
+
+    Returns:
+        API response json
+    """
+    data = requests.post(f"{API_BASE}/addAddress", json=dict(address, user_id=user_id), timeout=timeout).json()
+
+    uid = str(user_id)
+    saved = data.get("data") if isinstance(data.get("data"), dict) else {}
+    address_id = saved.get("address_id") or saved.get("id")
+    with _lock:
+        if data.get("status") == 1 and address_id and uid in _address_books:
+            _address_books[uid].append({**address, **saved, "address_id": address_id})
+        else:
+            # No id to patch with - reload on next read
+            _address_books.pop(uid, None)
+            _address_loaded_at.pop(uid, None)
+    return data
+
+
+def invalidate_addresses(user_id: str):
+    """Forget the cached address book"""
+    with _lock:
+        _address_books.pop(str(user_id), None)
+        _address_loaded_at.pop(str(user_id), None)
+
+
+def clear_user_cache():
+    """Clear all per-customer caches"""
+    with _lock:
+        _user_lookup_cache.clear()
+        _user_lookup_expiry.clear()
+        _wishlists.clear()
+        _wishlist_loaded_at.clear()
+        _address_books.clear()
+        _address_loaded_at.clear()
+    logger.info("[USER CACHE] Cache cleared")
@@ -19,8 +19,16 @@ from sanic.blueprints import Blueprint
 from rasa.core.channels.channel import InputChannel, UserMessage, OutputChannel
 from dotenv import load_dotenv
 
+from actions.action_logging import LazyJson
 # Import multi-tenant store configuration
 from actions.store_config import get_store_from_phone, get_seller_by_phone_number_id
+from actions.stripe_webhook import (
+    checkout_completed_message,
+    forget_event,
+    is_duplicate_event,
+    verify_stripe_signature,
+)
+from actions.turn_tracing import METADATA_KEY as TRACE_METADATA_KEY, span, trace_context
 
 load_dotenv()
 
@@ -31,6 +39,7 @@ DEFAULT_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
 DEFAULT_ACCESS_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
 VERIFY_TOKEN = os.getenv("WHATSAPP_VERIFY_TOKEN", "mytoken_for_aibot_8826037096")
 API_VERSION = os.getenv("WHATSAPP_API_VERSION", "v21.0")
+GRAPH_API_URL = os.getenv("WHATSAPP_GRAPH_URL", "https://graph.facebook.com").rstrip("/")  # stub sink for load tests
 
 
 class WhatsAppBusinessOutput(OutputChannel):
@@ -78,7 +87,7 @@ class WhatsAppBusinessOutput(OutputChannel):
             self.access_token = None
             token_source = "NONE_AVAILABLE"
 
-        self.api_base = f"https://graph.facebook.com/{API_VERSION}/{self.phone_number_id}"
+        self.api_base = f"{GRAPH_API_URL}/{API_VERSION}/{self.phone_number_id}"
         self.headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json"
@@ -90,25 +99,26 @@ class WhatsAppBusinessOutput(OutputChannel):
 
     def _send_request(self, endpoint: Text, payload: Dict[Text, Any]) -> Dict[Text, Any]:
         """Send request to WhatsApp Business API"""
-        try:
-            url = f"{self.api_base}/{endpoint}"
-            logger.info(f"Sending WhatsApp request to {url}")
-            logger.debug(f"Payload: {json.dumps(payload, indent=2)}")
-
-            response = requests.post(url, headers=self.headers, json=payload, timeout=10)
-            response.raise_for_status()
-
-            result = response.json()
-            logger.info(f"WhatsApp API Success: {result.get('messages', [{}])[0].get('id', 'unknown')}")
-            return result
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"WhatsApp API HTTP Error: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                logger.error(f"Response: {e.response.text}")
-            raise
-        except Exception as e:
-            logger.error(f"Error sending WhatsApp message: {e}")
-            raise
+        with span("whatsapp.send", {"endpoint": endpoint, "phone_number_id": self.phone_number_id, "store_id": self.store_id or ""}):
+            try:
+                url = f"{self.api_base}/{endpoint}"
+                logger.info(f"Sending WhatsApp request to {url}")
+                logger.debug("Payload: %s", LazyJson(payload))
+
+                response = requests.post(url, headers=self.headers, json=payload, timeout=10)
+                response.raise_for_status()
+
+                result = response.json()
+                logger.info(f"WhatsApp API Success: {result.get('messages', [{}])[0].get('id', 'unknown')}")
+                return result
+            except requests.exceptions.HTTPError as e:
+                logger.error(f"WhatsApp API HTTP Error: {e}")
+                if hasattr(e, 'response') and e.response is not None:
+                    logger.error(f"Response: {e.response.text}")
+                raise
+            except Exception as e:
+                logger.error(f"Error sending WhatsApp message: {e}")
+                raise
 
     async def send_text_message(self, recipient_id: Text, text: Text, **kwargs: Any) -> None:
         """Send a text message"""
@@ -436,10 +446,15 @@ class WhatsAppBusinessInput(InputChannel):
 
         @whatsapp_webhook.route("/webhook", methods=["POST"])
         async def receive_message(request: Request) -> response.HTTPResponse:
-            """Handle incoming WhatsApp messages - MULTI-TENANT"""
+            """Handle incoming WhatsApp messages - MULTI-TENANT (one trace per message)"""
+            with span("whatsapp.webhook", {"channel": self.name()}) as root:
+                return await process_message(request, root)
+
+        async def process_message(request: Request, root) -> response.HTTPResponse:
             try:
                 body = request.json
-                logger.info(f"Received webhook: {json.dumps(body, indent=2)}")
+                # Full body (phone numbers, message text) only at DEBUG, serialized only if emitted
+                logger.debug("Received webhook: %s", LazyJson(body))
 
                 # Extract data
                 entry = body.get("entry", [])
@@ -459,6 +474,7 @@ class WhatsAppBusinessInput(InputChannel):
                 message = messages[0]
                 sender = message.get("from")
                 message_type = message.get("type")
+                logger.info("Received %s message %s", message_type, message.get("id"))
 
                 # ============================================
                 # MULTI-TENANT: Get seller by phone_number_id
@@ -475,22 +491,25 @@ class WhatsAppBusinessInput(InputChannel):
                 # ============================================
                 store_info = None
 
-                # Method 1: Try lookup by phone_number_id first (Meta's ID)
-                if incoming_phone_number_id:
-                    store_info = get_seller_by_phone_number_id(incoming_phone_number_id)
-                    if store_info:
-                        logger.info(f"MULTI-TENANT: Found by phone_number_id: '{store_info.get('store_name')}' (ID: {store_info.get('store_id')}), has_token: {bool(store_info.get('access_token'))}")
-
-                # Method 2: Try display phone number lookup if:
-                # - Method 1 failed completely, OR
-                # - Method 1 returned store_info but without access_token (fallback/incomplete data)
-                if display_phone_number and (not store_info or not store_info.get('access_token')):
-                    store_info_by_phone = get_store_from_phone(display_phone_number)
-                    if store_info_by_phone:
-                        logger.info(f"MULTI-TENANT: Found by display_phone: '{store_info_by_phone.get('store_name')}' (ID: {store_info_by_phone.get('store_id')}), has_token: {bool(store_info_by_phone.get('access_token'))}")
-                        # Use this if it has token OR if method 1 returned nothing
-                        if store_info_by_phone.get('access_token') or not store_info:
-                            store_info = store_info_by_phone
+                with span("store_config.lookup", {"phone_number_id": incoming_phone_number_id}) as lookup_span:
+                    # Method 1: Try lookup by phone_number_id first (Meta's ID)
+                    if incoming_phone_number_id:
+                        store_info = get_seller_by_phone_number_id(incoming_phone_number_id)
+                        if store_info:
+                            logger.info(f"MULTI-TENANT: Found by phone_number_id: '{store_info.get('store_name')}' (ID: {store_info.get('store_id')}), has_token: {bool(store_info.get('access_token'))}")
+
+                    # Method 2: Try display phone number lookup if:
+                    # - Method 1 failed completely, OR
+                    # - Method 1 returned store_info but without access_token (fallback/incomplete data)
+                    if display_phone_number and (not store_info or not store_info.get('access_token')):
+                        store_info_by_phone = get_store_from_phone(display_phone_number)
+                        if store_info_by_phone:
+                            logger.info(f"MULTI-TENANT: Found by display_phone: '{store_info_by_phone.get('store_name')}' (ID: {store_info_by_phone.get('store_id')}), has_token: {bool(store_info_by_phone.get('access_token'))}")
+                            # Use this if it has token OR if method 1 returned nothing
+                            if store_info_by_phone.get('access_token') or not store_info:
+                                store_info = store_info_by_phone
+                    if lookup_span is not None:
+                        lookup_span.set_attribute("store_id", (store_info or {}).get("store_id") or "")
 
                 if not store_info:
                     logger.warning("MARKETPLACE MODE: No seller mapping found")
@@ -656,17 +675,27 @@ class WhatsAppBusinessInput(InputChannel):
                 metadata["bot_phone_number"] = display_phone_number
                 metadata["phone_number_id"] = incoming_phone_number_id
 
-                # Create user message
-                user_msg = UserMessage(
-                    text=message_text,
-                    output_channel=out_channel,
-                    sender_id=sender,
-                    input_channel=self.name(),
-                    metadata=metadata
-                )
+                if root is not None:
+                    root.set_attribute("sender_id", sender)
+                    root.set_attribute("message_type", message_type)
+                    root.set_attribute("store_id", metadata.get("store_id") or "")
+
+                # Send to Rasa (NLU, policies, action server calls and replies)
+                with span("rasa.handle_message"):
+                    trace = trace_context()
+                    if trace:
+                        metadata[TRACE_METADATA_KEY] = trace  # continued by the action server
+
+                    # Create user message
+                    user_msg = UserMessage(
+                        text=message_text,
+                        output_channel=out_channel,
+                        sender_id=sender,
+                        input_channel=self.name(),
+                        metadata=metadata
+                    )
 
-                # Send to Rasa
-                await on_new_message(user_msg)
+                    await on_new_message(user_msg)
 
                 return response.json({"status": "ok"})
 
@@ -674,6 +703,70 @@ class WhatsAppBusinessInput(InputChannel):
                 logger.error(f"Error processing message: {e}", exc_info=True)
                 return response.json({"status": "error", "message": str(e)})
 
+        @whatsapp_webhook.route("/stripe", methods=["POST"])
+        async def receive_stripe_event(request: Request) -> response.HTTPResponse:
+            """Handle Stripe checkout.session.completed - confirm payment without polling"""
+            if not verify_stripe_signature(request.body, request.headers.get("Stripe-Signature", "")):
+                logger.warning("Stripe webhook: invalid signature")
+                return response.json({"status": "invalid signature"}, status=400)
+
+            event = {}
+            try:
+                event = json.loads(request.body)
+                logger.info("Stripe webhook: %s %s", event.get("type"), event.get("id"))
+                logger.debug("Stripe event: %s", LazyJson(event))
+                if is_duplicate_event(event.get("id")):
+                    logger.info(f"Stripe webhook: duplicate event {event.get('id')}")
+                    return response.json({"status": "ok"})
+
+                confirmation = checkout_completed_message(event)
+                if not confirmation:
+                    return response.json({"status": "ignored"})
+
+                # Reply through the same seller number the customer checked out with
+                store_info = None
+                if confirmation["phone_number_id"]:
+                    store_info = get_seller_by_phone_number_id(confirmation["phone_number_id"])
+                if not store_info and confirmation["bot_phone_number"]:
+                    store_info = get_store_from_phone(confirmation["bot_phone_number"])
+
+                metadata = confirmation["metadata"]
+                if store_info and store_info.get("phone_number_id"):
+                    out_channel = WhatsAppBusinessOutput(
+                        phone_number_id=store_info.get("phone_number_id"),
+                        access_token=store_info.get("access_token"),
+                        seller_config=store_info
+                    )
+                    metadata["is_dedicated_bot"] = True
+                else:
+                    out_channel = WhatsAppBusinessOutput(
+                        phone_number_id=confirmation["phone_number_id"] or self.phone_number_id,
+                        access_token=self.access_token
+                    )
+                    metadata["is_dedicated_bot"] = False
+                metadata["phone_number_id"] = out_channel.phone_number_id
+
+                logger.info(f"Stripe webhook: payment confirmed (session {metadata['stripe_session_id']})")
+
+                with span("rasa.handle_message", {"source": "stripe_webhook", "sender_id": confirmation["sender_id"]}):
+                    trace = trace_context()
+                    if trace:
+                        metadata[TRACE_METADATA_KEY] = trace
+                    await on_new_message(UserMessage(
+                        text=confirmation["text"],
+                        output_channel=out_channel,
+                        sender_id=confirmation["sender_id"],
+                        input_channel=self.name(),
+                        metadata=metadata
+                    ))
+                return response.json({"status": "ok"})
+
+            except Exception as e:
+                # 500 so Stripe retries the delivery
+                logger.error(f"Error processing Stripe event: {e}", exc_info=True)
+                forget_event(event.get("id"))
+                return response.json({"status": "error", "message": str(e)}, status=500)
+
         return whatsapp_webhook
 
 
@@ -155,7 +155,8 @@ class TwilioWhatsAppInput(InputChannel):
                     logger.warning("Received empty message or sender")
                     return response.empty(status=200)
 
-                logger.info(f"Received WhatsApp message from {sender} to bot {to_number}: {message_text}")
+                logger.info(f"Received WhatsApp message for bot {to_number}")
+                logger.debug("From %s: %s", sender, message_text)
 
                 out_channel = TwilioWhatsAppOutput(
                     self.account_sid,